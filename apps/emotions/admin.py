@@ -1,5 +1,8 @@
 from django.contrib import admin
-from .models import EmotionAnalysis, EmotionStatistics
+from .models import (
+    AnalysisJob, EmotionAnalysis, EmotionStatistics, FaceDetection, RealtimeRecording, VideoAnalysis
+)
+from .services.statistics import rebuild_statistics
 
 
 @admin.register(EmotionAnalysis)
@@ -122,14 +125,147 @@ class EmotionStatisticsAdmin(admin.ModelAdmin):
         """
         Acción para actualizar estadísticas seleccionadas.
         """
-        updated = 0
-        for stats in queryset:
-            stats.update_statistics()
-            updated += 1
+        result = rebuild_statistics(queryset.values_list('user_id', flat=True))
         
         self.message_user(
             request,
-            f"Se actualizaron {updated} registros de estadísticas."
+            f"Se actualizaron {result['users']} registros de estadísticas."
         )
     
     update_statistics.short_description = "Actualizar estadísticas seleccionadas"
+
+
+
+@admin.register(AnalysisJob)
+class AnalysisJobAdmin(admin.ModelAdmin):
+    """
+    Administrador para la cola de trabajos de análisis.
+    """
+    list_display = [
+        'id', 'analysis', 'video', 'status', 'attempts', 'max_attempts',
+        'worker', 'queue_time', 'run_time', 'created_at', 'finished_at'
+    ]
+    list_filter = [
+        'status', 'created_at'
+    ]
+    search_fields = [
+        'analysis__user__username', 'video__user__username', 'worker', 'error'
+    ]
+    readonly_fields = [
+        'analysis', 'video', 'attempts', 'worker', 'error', 'created_at', 'started_at',
+        'finished_at', 'lease_expires_at', 'queue_time', 'run_time'
+    ]
+    ordering = ['-created_at']
+    
+    def get_queryset(self, request):
+        """
+        Optimizar consultas incluyendo el análisis o video y su usuario.
+        """
+        return super().get_queryset(request).select_related('analysis__user', 'video__user')
+    
+    actions = ['retry_jobs']
+    
+    def retry_jobs(self, request, queryset):
+        """
+        Acción para volver a encolar trabajos fallidos.
+        """
+        from django.utils import timezone
+        updated = queryset.filter(status=AnalysisJob.Status.FAILED).update(
+            status=AnalysisJob.Status.PENDING,
+            attempts=0,
+            available_at=timezone.now(),
+            error=''
+        )
+        
+        self.message_user(
+            request,
+            f"Se reencolaron {updated} trabajos."
+        )
+    
+    retry_jobs.short_description = "Reintentar trabajos fallidos"
+
+
+@admin.register(FaceDetection)
+class FaceDetectionAdmin(admin.ModelAdmin):
+    """
+    Administrador de los rostros detectados (solo lectura).
+    """
+    list_display = [
+        'analysis', 'user', 'face_index', 'dominant_emotion', 'confidence', 'created_at'
+    ]
+    list_filter = [
+        'dominant_emotion', 'created_at'
+    ]
+    search_fields = [
+        'user__username', 'dominant_emotion'
+    ]
+    ordering = ['-created_at']
+    
+    def get_queryset(self, request):
+        """
+        Optimizar consultas incluyendo el usuario.
+        """
+        return super().get_queryset(request).select_related('user')
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(VideoAnalysis)
+class VideoAnalysisAdmin(admin.ModelAdmin):
+    """
+    Administrador para los análisis de videos.
+    """
+    list_display = [
+        'user', 'created_at', 'duration', 'frames_sampled', 'tracks_detected',
+        'dominant_emotion', 'average_confidence', 'realtime_factor', 'progress'
+    ]
+    list_filter = [
+        'dominant_emotion', 'created_at'
+    ]
+    search_fields = [
+        'user__username', 'notes'
+    ]
+    readonly_fields = [
+        'duration', 'fps', 'width', 'height', 'frames_sampled', 'faces_detected',
+        'tracks_detected', 'dominant_emotion', 'average_confidence', 'timeline', 'tracks',
+        'progress', 'processing_time', 'realtime_factor', 'created_at', 'updated_at'
+    ]
+    ordering = ['-created_at']
+    
+    def get_queryset(self, request):
+        """
+        Optimizar consultas incluyendo el usuario.
+        """
+        return super().get_queryset(request).select_related('user')
+
+
+@admin.register(RealtimeRecording)
+class RealtimeRecordingAdmin(admin.ModelAdmin):
+    """
+    Administrador para las sesiones en tiempo real grabadas.
+    """
+    list_display = [
+        'user', 'source', 'camera', 'started_at', 'ended_at', 'duration',
+        'frames_analyzed', 'faces_detected', 'dominant_emotion', 'average_confidence'
+    ]
+    list_filter = [
+        'source', 'dominant_emotion', 'started_at'
+    ]
+    search_fields = [
+        'user__username', 'user__email', 'camera'
+    ]
+    readonly_fields = [
+        'started_at', 'ended_at', 'duration', 'frames_analyzed', 'faces_detected',
+        'seconds_with_faces', 'emotion_totals', 'dominant_emotion', 'average_confidence', 'updated_at'
+    ]
+    ordering = ['-started_at']
+    
+    def get_queryset(self, request):
+        """
+        Optimizar consultas incluyendo el usuario.
+        """
+        return super().get_queryset(request).select_related('user')
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class EmotionsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.emotions'
+
+    def ready(self):
+        from apps.emotions import signals  # noqa: F401
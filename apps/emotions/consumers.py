@@ -0,0 +1,340 @@
+"""
+Canal WebSocket para el análisis de emociones en tiempo real.
+
+Protocolo (ruta /ws/emotions/stream/):
+    - El servidor autentica una sola vez al conectar, usando la cookie de sesión.
+    - Al aceptar envía {"t": "hello", "labels": [...], "max_fps": N, "capture": perfil}, donde
+      el perfil (max_width, max_height, quality) es el tamaño y la calidad JPEG con que el
+      cliente debe capturar; las respuestas a frames completos traen "capture" actualizado
+      (ver services/capture_profile.py).
+    - El cliente envía cada frame como mensaje binario (JPEG).
+    - El servidor responde con un mensaje de texto compacto por frame analizado:
+      {"t": "r", "seq": n, "ms": tiempo, "dropped": descartados,
+       "f": [[x, y, w, h, emoción, confianza, [probabilidades en orden de labels]], ...]}
+    - Si el frame tuvo rostros, la respuesta incluye "crop": {token, regions, keyframe_interval,
+      max_size} (ver services/crop_sessions.py). Hasta que venza, el cliente puede enviar solo
+      los recortes de esas regiones en un mensaje binario:
+      b"C" + largo del token (1 byte) + token + por recorte: largo (4 bytes big-endian) + JPEG.
+      Si los recortes ya no sirven el servidor responde {"t": "key", "reason": r} y el
+      cliente envía un frame completo.
+    - Mensajes de texto del cliente: {"t": "ping"} -> {"t": "pong"}.
+    - Si el servidor está saturado responde {"t": "busy", "retry_after": s} y descarta el frame.
+
+Si llegan frames más rápido de lo que se analizan, solo se procesa el más reciente.
+"""
+import asyncio
+import json
+import time
+import uuid
+from http.cookies import CookieError, SimpleCookie
+from types import SimpleNamespace
+from urllib.parse import urlparse
+
+import cv2
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import aget_user
+from django.db import close_old_connections
+from django.utils.module_loading import import_string
+
+from apps.emotions.services.admission import PRIORITY_REALTIME, AdmissionRejected, inference_admission
+from apps.emotions.services.capture_profile import capture_advisor
+from apps.emotions.services.crop_sessions import CropRejected, crop_sessions
+from apps.emotions.services.emotion_detector import EmotionDetector, emotion_detector
+from apps.emotions.services.inference_executor import inference_executor
+from apps.emotions.services.session_recorder import session_recorder
+
+
+# Códigos de cierre propios (rango 4000-4999 reservado para aplicaciones)
+CLOSE_UNAUTHORIZED = 4401
+CLOSE_FORBIDDEN_ORIGIN = 4403
+CLOSE_FRAME_TOO_LARGE = 4413
+# Error interno del servidor (código estándar de WebSocket)
+CLOSE_INTERNAL_ERROR = 1011
+
+# Primer byte de un mensaje de recortes (los frames JPEG empiezan con 0xFF)
+CROP_PACKET = b'C'
+
+EMOTION_LABELS = [EmotionDetector.EMOTION_LABELS[i] for i in sorted(EmotionDetector.EMOTION_LABELS)]
+
+
+def _get_headers(scope):
+    """
+    Convierte los headers del scope ASGI en un diccionario (nombres en minúscula).
+    """
+    return {name.decode('latin1').lower(): value.decode('latin1') for name, value in scope.get('headers', [])}
+
+
+async def get_user_from_scope(scope):
+    """
+    Obtiene el usuario autenticado a partir de la cookie de sesión del handshake.
+
+    La conexión no pasa por el ciclo de petición de Django (que cierra las conexiones
+    a la base de datos vencidas o rotas): se cierran antes y después de la consulta, en
+    el mismo hilo en que aget_user la ejecuta.
+    """
+    headers = _get_headers(scope)
+    cookie = SimpleCookie()
+    try:
+        cookie.load(headers.get('cookie', ''))
+    except CookieError:
+        # Cookie mal formada: la conexión queda sin sesión (no autenticada)
+        cookie = SimpleCookie()
+
+    session_key = cookie[settings.SESSION_COOKIE_NAME].value if settings.SESSION_COOKIE_NAME in cookie else None
+    session_store = import_string(f'{settings.SESSION_ENGINE}.SessionStore')
+
+    # aget_user solo necesita un objeto con el atributo session
+    request = SimpleNamespace(session=session_store(session_key))
+    await sync_to_async(close_old_connections)()
+    try:
+        return await aget_user(request)
+    finally:
+        await sync_to_async(close_old_connections)()
+
+
+def is_origin_allowed(scope):
+    """
+    Evita el secuestro de WebSocket entre sitios: el Origin debe coincidir con el Host.
+    """
+    headers = _get_headers(scope)
+    origin = headers.get('origin')
+    if not origin:
+        # Clientes que no son navegadores no envían Origin
+        return True
+    return urlparse(origin).netloc == headers.get('host', '')
+
+
+def decode_and_analyze(frame_bytes):
+    """
+    Decodifica un frame JPEG y analiza las emociones (se ejecuta en el executor).
+    """
+    frame = cv2.imdecode(np.frombuffer(frame_bytes, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if frame is None:
+        return {'error': 'Frame inválido', 'faces_detected': 0, 'faces': []}
+    results = emotion_detector.analyze_frame(frame)
+    results['frame_size'] = [frame.shape[1], frame.shape[0]]
+    return results
+
+
+def parse_crop_packet(packet):
+    """
+    Separa un mensaje de recortes en su token y los bytes de cada recorte.
+
+    Raises:
+        CropRejected: Si el mensaje está mal formado
+    """
+    try:
+        token_length = packet[1]
+        if len(packet) < 2 + token_length:
+            raise CropRejected('packet')
+        token = packet[2:2 + token_length].decode('ascii')
+        crops = []
+        offset = 2 + token_length
+        while offset < len(packet):
+            length = int.from_bytes(packet[offset:offset + 4], 'big')
+            offset += 4
+            if length <= 0 or offset + length > len(packet):
+                raise CropRejected('packet')
+            crops.append(packet[offset:offset + length])
+            offset += length
+    except (IndexError, UnicodeDecodeError):
+        raise CropRejected('packet')
+    return token, crops
+
+
+def analyze_crops(session, crops):
+    """
+    Analiza los recortes de un mensaje con las cajas del último keyframe (en el executor).
+    """
+    face_imgs = crop_sessions.face_images(session, crops)
+    return emotion_detector.analyze_known_faces(face_imgs, session.faces)
+
+
+def compact_results(results):
+    """
+    Convierte los resultados de analyze_frame a la forma compacta del protocolo.
+    """
+    faces = []
+    for face in results.get('faces', []):
+        emotions = face.get('emotions', {})
+        faces.append([
+            face['x'], face['y'], face['width'], face['height'],
+            face['dominant_emotion'],
+            round(face['confidence'], 3),
+            [round(emotions.get(label, 0.0), 3) for label in EMOTION_LABELS],
+        ])
+    return faces
+
+
+class EmotionStreamConsumer:
+    """
+    Aplicación ASGI que atiende una conexión WebSocket de análisis en tiempo real.
+    """
+
+    def __init__(self, scope, receive, send):
+        self.scope = scope
+        self.receive = receive
+        self.send = send
+        self.user = None
+        self.max_fps = getattr(settings, 'EMOTION_WS_MAX_FPS', 10)
+        self.max_frame_bytes = getattr(settings, 'EMOTION_WS_MAX_FRAME_BYTES', 2 * 1024 * 1024)
+
+        # Último frame pendiente (el más reciente reemplaza al anterior)
+        self.pending_frame = None
+        self.frame_event = asyncio.Event()
+        self.seq = 0
+        self.dropped = 0
+        self.closed = False
+
+        # Regiones del último keyframe con rostros (modo de recortes)
+        self.crop_session = None
+        # Nivel de captura anunciado al cliente
+        self.capture_level = capture_advisor.default_level
+        # Clave de la grabación de esta conexión (ver services/session_recorder.py)
+        self.owner = f'ws:{uuid.uuid4().hex}'
+
+    @classmethod
+    async def as_asgi(cls, scope, receive, send):
+        await cls(scope, receive, send).run()
+
+    async def send_json(self, data):
+        await self.send({'type': 'websocket.send', 'text': json.dumps(data, separators=(',', ':'))})
+
+    async def close(self, code=1000):
+        if not self.closed:
+            self.closed = True
+            await self.send({'type': 'websocket.close', 'code': code})
+
+    async def run(self):
+        message = await self.receive()
+        if message['type'] != 'websocket.connect':
+            return
+
+        # Autenticación única al conectar
+        if not is_origin_allowed(self.scope):
+            await self.close(CLOSE_FORBIDDEN_ORIGIN)
+            return
+
+        try:
+            self.user = await get_user_from_scope(self.scope)
+        except Exception as e:
+            # Base de datos o almacén de sesiones caído: no es un problema de credenciales
+            print(f"✗ Error autenticando la conexión WebSocket: {e}")
+            await self.close(CLOSE_INTERNAL_ERROR)
+            return
+        if not self.user.is_authenticated:
+            await self.close(CLOSE_UNAUTHORIZED)
+            return
+
+        await self.send({'type': 'websocket.accept'})
+        await self.send_json({
+            't': 'hello', 'labels': EMOTION_LABELS, 'max_fps': self.max_fps,
+            'capture': capture_advisor.advise(self.capture_level),
+        })
+
+        worker = asyncio.create_task(self.process_frames())
+        try:
+            await self.receive_loop()
+        finally:
+            self.closed = True
+            self.frame_event.set()
+            worker.cancel()
+            try:
+                await worker
+            except asyncio.CancelledError:
+                pass
+            session_recorder.end(self.owner)
+
+    async def receive_loop(self):
+        while True:
+            message = await self.receive()
+
+            if message['type'] == 'websocket.disconnect':
+                break
+
+            if message['type'] != 'websocket.receive':
+                continue
+
+            frame_bytes = message.get('bytes')
+            if frame_bytes is not None:
+                if len(frame_bytes) > self.max_frame_bytes:
+                    await self.close(CLOSE_FRAME_TOO_LARGE)
+                    break
+                if self.pending_frame is not None:
+                    self.dropped += 1
+                self.pending_frame = frame_bytes
+                self.frame_event.set()
+                continue
+
+            try:
+                data = json.loads(message.get('text') or '{}')
+            except json.JSONDecodeError:
+                continue
+            if data.get('t') == 'ping':
+                await self.send_json({'t': 'pong'})
+
+    async def process_frames(self):
+        min_interval = 1.0 / self.max_fps if self.max_fps else 0
+        while not self.closed:
+            await self.frame_event.wait()
+            self.frame_event.clear()
+
+            frame_bytes, self.pending_frame = self.pending_frame, None
+            if frame_bytes is None:
+                continue
+
+            start = time.perf_counter()
+            is_crop = frame_bytes[:1] == CROP_PACKET
+            try:
+                if is_crop:
+                    token, crops = parse_crop_packet(frame_bytes)
+                    session = crop_sessions.check(self.crop_session, token)
+                async with inference_admission.aslot(PRIORITY_REALTIME, timeout=min_interval or 1.0):
+                    if is_crop:
+                        results = await inference_executor.run(analyze_crops, session, crops)
+                    else:
+                        results = await inference_executor.run(decode_and_analyze, frame_bytes)
+            except CropRejected as e:
+                self.crop_session = None
+                if not self.closed:
+                    await self.send_json({'t': 'key', 'reason': e.reason})
+                continue
+            except AdmissionRejected as e:
+                if not self.closed:
+                    await self.send_json({'t': 'busy', 'retry_after': e.retry_after})
+                await asyncio.sleep(min(e.retry_after, 1))
+                continue
+            except Exception as e:
+                print(f"Error analizando frame WebSocket: {e}")
+                results = {'error': str(e), 'faces': []}
+
+            self.seq += 1
+            payload = {
+                't': 'r',
+                'seq': self.seq,
+                'ms': round((time.perf_counter() - start) * 1000),
+                'dropped': self.dropped,
+                'f': compact_results(results),
+            }
+            if results.get('error'):
+                payload['error'] = results['error']
+            else:
+                # Solo en memoria: la escritura por lotes ocurre en el hilo del grabador
+                session_recorder.record(self.user.pk, self.owner, results)
+                if not is_crop:
+                    # Keyframe: sus rostros definen las regiones de los recortes siguientes
+                    self.crop_session = crop_sessions.new_session(results)
+                    if self.crop_session is not None:
+                        payload['crop'] = crop_sessions.offer(self.crop_session)
+                    self.capture_level = capture_advisor.update(self.capture_level, results)
+                    payload['capture'] = capture_advisor.advise(self.capture_level)
+
+            if not self.closed:
+                await self.send_json(payload)
+
+            # Limitar la tasa de análisis por conexión a max_fps
+            elapsed = time.perf_counter() - start
+            if elapsed < min_interval:
+                await asyncio.sleep(min_interval - elapsed)
@@ -3,7 +3,8 @@ Formularios para la aplicación de detección de emociones.
 """
 from django import forms
 from django.core.exceptions import ValidationError
-from .models import EmotionAnalysis
+from django.conf import settings
+from .models import EmotionAnalysis, VideoAnalysis
 
 
 class EmotionAnalysisForm(forms.ModelForm):
@@ -140,4 +141,54 @@ class CameraAnalysisForm(forms.Form):
             if len(image_data.split(',')) < 2:
                 raise ValidationError('Datos de imagen incompletos.')
         
-        return image_data
\ No newline at end of file
+        return image_data
+
+
+class VideoAnalysisForm(forms.ModelForm):
+    """
+    Formulario para subir videos para análisis de emociones.
+    """
+    
+    class Meta:
+        model = VideoAnalysis
+        fields = ['video', 'notes']
+        widgets = {
+            'video': forms.FileInput(attrs={
+                'class': 'block w-full text-sm text-gray-900 border border-gray-300 rounded-lg cursor-pointer bg-gray-50 focus:outline-none',
+                'accept': 'video/*',
+                'id': 'video-upload'
+            }),
+            'notes': forms.Textarea(attrs={
+                'class': 'block w-full p-2.5 text-sm text-gray-900 bg-gray-50 rounded-lg border border-gray-300 focus:ring-blue-500 focus:border-blue-500',
+                'rows': 3,
+                'placeholder': 'Notas adicionales sobre el video (opcional)...'
+            })
+        }
+        labels = {
+            'video': 'Video para Análisis',
+            'notes': 'Notas (Opcional)'
+        }
+        help_texts = {
+            'video': 'Selecciona un video (MP4, AVI, MOV, MKV o WEBM) con rostros para analizar sus emociones.',
+            'notes': 'Puedes agregar cualquier observación o contexto sobre el video.'
+        }
+    
+    def clean_video(self):
+        """
+        Valida el tamaño y la extensión del video subido.
+        """
+        video = self.cleaned_data.get('video')
+        
+        if video:
+            max_mb = getattr(settings, 'EMOTION_VIDEO_MAX_UPLOAD_MB', 500)
+            if video.size > max_mb * 1024 * 1024:
+                raise ValidationError(f'El archivo es demasiado grande. El tamaño máximo permitido es {max_mb}MB.')
+            
+            # El contenido se valida al abrirlo con OpenCV en el worker
+            import os
+            ext = os.path.splitext(video.name)[1].lower()
+            allowed_extensions = ['.mp4', '.avi', '.mov', '.mkv', '.webm']
+            if ext not in allowed_extensions:
+                raise ValidationError('Extensión de archivo no válida. Use: mp4, avi, mov, mkv, webm.')
+        
+        return video
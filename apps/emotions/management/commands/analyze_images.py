@@ -0,0 +1,241 @@
+"""
+Comando para analizar un lote grande de imágenes guardadas (directorio o ZIP) sin subirlas.
+
+Es reanudable: cada análisis guarda el SHA-256 de su archivo y los archivos que el
+usuario ya tiene analizados (o repetidos dentro del lote) se omiten. Si se interrumpe,
+se guardan los resultados recibidos y basta con volver a ejecutarlo.
+
+Uso:
+    python manage.py analyze_images /datos/fotos_2024 --user docente@unemi.edu.ec
+    python manage.py analyze_images fotos.zip --user 3 --workers 6 --notes "Clase 2024-05-10"
+"""
+import multiprocessing
+import os
+import signal
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from apps.emotions.models import EmotionAnalysis, EmotionStatistics, FaceDetection
+from apps.emotions.services.bulk_analysis import (
+    BATCH_SIZE, CHUNK_SIZE, analyze_batch, build_analysis, file_hash, init_worker, iter_image_files
+)
+
+
+class Command(BaseCommand):
+    help = 'Analiza las imágenes de un directorio o archivo ZIP con un pool de procesos'
+    # Sin chequeos: evitan importar las vistas (y cargar el modelo en el proceso principal)
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Directorio o archivo ZIP con las imágenes')
+        parser.add_argument('--user', required=True,
+                            help='Usuario dueño de los análisis (ID, email o nombre de usuario)')
+        parser.add_argument('--workers', type=int,
+                            default=getattr(settings, 'EMOTION_BULK_WORKERS', os.cpu_count() or 1),
+                            help='Procesos de análisis (0 = en el proceso actual)')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                            help='Imágenes por tarea (sus rostros se infieren en un lote)')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                            help='Análisis por bulk_create')
+        parser.add_argument('--notes', default='',
+                            help='Notas que se guardan en cada análisis')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError(f'No existe la ruta: {path}')
+
+        self.user = self._get_user(options['user'])
+        self.notes = options['notes']
+        self.chunk_size = max(1, options['chunk_size'])
+        self.chunk = []
+        self.counts = {'analyzed': 0, 'faces': 0, 'skipped': 0, 'errors': 0}
+        self.start_time = time.time()
+        self._interrupts = None
+
+        workers = max(0, options['workers'])
+        batches = self._batches(iter_image_files(path), max(1, options['batch_size']))
+        self.stdout.write(f'Analizando {path} para {self.user} con {workers or "ningún"} proceso(s) worker...')
+
+        interrupted = False
+        pool = None
+        pending = {}
+        try:
+            if workers == 0:
+                for batch in batches:
+                    # analyze_batch guarda los archivos: el lote se termina y se registra entero
+                    with self._deferred_interrupt():
+                        self._collect(analyze_batch(batch))
+            else:
+                # Con spawn cada proceso carga su propia sesión ONNX
+                pool = ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=init_worker
+                )
+                # Tareas en vuelo acotadas: la lectura no se adelanta al análisis
+                max_pending = workers * 2
+                for batch in batches:
+                    pending[pool.submit(analyze_batch, batch)] = len(batch)
+                    if len(pending) >= max_pending:
+                        self._wait(pending)
+                while pending:
+                    self._wait(pending)
+        except KeyboardInterrupt:
+            interrupted = True
+            self.stdout.write(self.style.WARNING('Interrumpido: terminando los lotes en curso...'))
+        finally:
+            # Otro Ctrl+C no corta el cierre: los lotes en curso ya guardaron sus archivos
+            with self._deferred_interrupt(reraise=False):
+                if pool is not None:
+                    # Se cancelan los lotes en cola; los que ya se están analizando se guardan
+                    pool.shutdown(wait=True, cancel_futures=True)
+                    for future in [future for future in pending if future.cancelled()]:
+                        del pending[future]
+                    while pending:
+                        self._wait(pending)
+                self._flush()
+
+        elapsed = time.time() - self.start_time
+        counts = self.counts
+        message = (
+            f'{counts["analyzed"]} imágenes analizadas ({counts["faces"]} rostros), '
+            f'{counts["skipped"]} omitidas, {counts["errors"]} con error en {elapsed:.1f}s '
+            f'({counts["analyzed"] / elapsed if elapsed > 0 else 0:.1f} imágenes/s, '
+            f'{counts["faces"] / elapsed if elapsed > 0 else 0:.1f} rostros/s)'
+        )
+        if interrupted:
+            self.stdout.write(self.style.WARNING(f'Parcial: {message}. Vuelva a ejecutar para continuar.'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Listo: {message}'))
+
+    def _get_user(self, value):
+        User = get_user_model()
+        if value.isdigit():
+            lookup = {'pk': int(value)}
+        elif '@' in value:
+            lookup = {'email__iexact': value}
+        else:
+            lookup = {'username': value}
+        try:
+            return User.objects.get(**lookup)
+        except User.DoesNotExist:
+            raise CommandError(f'No existe el usuario {value}')
+
+    def _batches(self, files, batch_size):
+        """
+        Agrupa los archivos en lotes, omitiendo los ya analizados por el usuario y los repetidos.
+        """
+        seen = set()
+        batch = []
+        for source, read in files:
+            data = read()
+            digest = file_hash(data)
+            if digest in seen:
+                self.counts['skipped'] += 1
+                continue
+            seen.add(digest)
+            batch.append((source, digest, data))
+
+            if len(batch) >= batch_size:
+                batch = self._without_processed(batch)
+                if batch:
+                    yield batch
+                batch = []
+
+        batch = self._without_processed(batch)
+        if batch:
+            yield batch
+
+    def _without_processed(self, batch):
+        if not batch:
+            return batch
+        processed = set(
+            EmotionAnalysis.objects.filter(
+                user=self.user, image_hash__in=[digest for _, digest, _ in batch]
+            ).values_list('image_hash', flat=True)
+        )
+        self.counts['skipped'] += len(processed)
+        return [item for item in batch if item[1] not in processed]
+
+    @contextmanager
+    def _deferred_interrupt(self, reraise=True):
+        """
+        Difiere Ctrl+C hasta el final del bloque, para que un lote cuyos archivos ya
+        están en el storage no quede sin registrar. Con reraise=False la interrupción
+        recibida se descarta.
+        """
+        if self._interrupts is not None:
+            # Bloque anidado: ya hay un manejador que difiere
+            yield
+            return
+        self._interrupts = []
+        previous = signal.signal(signal.SIGINT, lambda signum, frame: self._interrupts.append(signum))
+        try:
+            yield
+        finally:
+            signal.signal(signal.SIGINT, previous)
+            received, self._interrupts = self._interrupts, None
+        if received and reraise:
+            raise KeyboardInterrupt
+
+    def _wait(self, pending):
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            # Quitar el lote de pending y registrar sus resultados no se separa con Ctrl+C
+            with self._deferred_interrupt():
+                size = pending.pop(future)
+                try:
+                    results = future.result()
+                except Exception as e:
+                    self.counts['errors'] += size
+                    self.stderr.write(f'  Error en un lote de {size} imágenes: {e}')
+                    continue
+                self._collect(results)
+
+    def _collect(self, results):
+        for result in results:
+            if result.get('error'):
+                self.counts['errors'] += 1
+                self.stderr.write(f'  {result["source"]}: {result["error"]}')
+                continue
+            self.chunk.append(build_analysis(self.user, result, self.notes))
+
+        if len(self.chunk) >= self.chunk_size:
+            self._flush()
+
+    def _flush(self):
+        """
+        Guarda los análisis pendientes, sus rostros normalizados y su aporte a las
+        estadísticas.
+        """
+        if not self.chunk:
+            return
+        for analysis in self.chunk:
+            analysis.counted_in_statistics = True
+        with transaction.atomic():
+            EmotionAnalysis.objects.bulk_create(self.chunk)
+            # Un incremento por bloque, en la misma transacción: sin la reconstrucción
+            # (que bloquea las tablas para todos los usuarios)
+            EmotionStatistics.record_created_analyses(self.user.pk, self.chunk)
+            FaceDetection.objects.bulk_create([
+                detection
+                for analysis in self.chunk
+                for detection in FaceDetection.build_for_analysis(analysis)
+            ], batch_size=1000)
+
+        self.counts['analyzed'] += len(self.chunk)
+        self.counts['faces'] += sum(analysis.faces_detected for analysis in self.chunk)
+        self.chunk = []
+
+        elapsed = time.time() - self.start_time
+        self.stdout.write(
+            f'  {self.counts["analyzed"]} analizadas, {self.counts["skipped"]} omitidas, '
+            f'{self.counts["errors"]} con error ({self.counts["analyzed"] / elapsed:.1f} imágenes/s)'
+        )
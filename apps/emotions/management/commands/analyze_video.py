@@ -0,0 +1,61 @@
+"""
+Analiza un archivo de video sin guardarlo y muestra su resumen y la velocidad
+alcanzada como múltiplo del tiempo real (útil para ajustar el muestreo).
+
+Uso:
+    python manage.py analyze_video clase.mp4
+    python manage.py analyze_video clase.mp4 --sample-fps 1 --scene-threshold 0
+"""
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.emotions.models import EMOTION_TRANSLATIONS
+from apps.emotions.services.video_analysis import VideoOpenError, analyze_video_file
+
+
+class Command(BaseCommand):
+    help = 'Analiza un video sin guardarlo y muestra la velocidad frente al tiempo real'
+    # Sin chequeos: evitan importar las vistas (y cargar el modelo antes de tiempo)
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Archivo de video')
+        parser.add_argument('--sample-fps', type=float, default=None,
+                            help='Frames analizados por segundo (0 = solo cambios de escena)')
+        parser.add_argument('--scene-threshold', type=float, default=None,
+                            help='Diferencia media (0-1) que cuenta como cambio de escena (0 desactiva)')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.isfile(path):
+            raise CommandError(f'No existe el archivo: {path}')
+
+        def progress(percent):
+            self.stdout.write(f'  {percent:.0f}%')
+
+        try:
+            results = analyze_video_file(
+                path,
+                sample_fps=options['sample_fps'],
+                scene_threshold=options['scene_threshold'],
+                progress=progress
+            )
+        except VideoOpenError as e:
+            raise CommandError(str(e))
+
+        dominant = results['dominant_emotion']
+        self.stdout.write(
+            f'\n{path}: {results["duration"]:.1f}s, {results["width"]}x{results["height"]} '
+            f'a {results["fps"]:.1f} fps\n'
+            f'  Frames analizados: {results["frames_sampled"]}\n'
+            f'  Rostros detectados: {results["faces_detected"]} '
+            f'({results["tracks_detected"]} persona(s) seguida(s))\n'
+            f'  Emoción dominante: {EMOTION_TRANSLATIONS.get(dominant, "No detectada")} '
+            f'(confianza promedio {results["average_confidence"]:.1f}%)\n'
+            f'  Línea de tiempo: {len(results["timeline"])} segundos con rostros'
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Procesado en {results["processing_time"]:.1f}s: '
+            f'{results["realtime_factor"]:.1f}x tiempo real'
+        ))
@@ -0,0 +1,80 @@
+"""
+Comando para llenar la tabla FaceDetection a partir del JSON de los análisis existentes.
+
+Los análisis nuevos guardan sus rostros al procesarse; este comando migra el historial.
+Es reanudable: solo procesa análisis que todavía no tienen rostros guardados.
+
+Uso:
+    python manage.py backfill_face_detections
+    python manage.py backfill_face_detections --batch-size 2000 --rebuild
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+
+from apps.emotions.models import EmotionAnalysis, FaceDetection
+
+
+class Command(BaseCommand):
+    help = 'Llena la tabla de rostros detectados desde analysis_results'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Análisis leídos por lote (y filas por bulk_create)'
+        )
+        parser.add_argument(
+            '--user', type=int, action='append', dest='users',
+            help='ID de usuario a procesar (se puede repetir). Por defecto, todos'
+        )
+        parser.add_argument(
+            '--rebuild', action='store_true',
+            help='Borrar y volver a generar también los rostros ya existentes'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options['batch_size'])
+        start_time = time.time()
+
+        analyses = EmotionAnalysis.objects.order_by('pk').only(
+            'pk', 'user_id', 'created_at', 'analysis_results'
+        )
+        if options['users']:
+            analyses = analyses.filter(user_id__in=options['users'])
+
+        if options['rebuild']:
+            deleted, _ = FaceDetection.objects.filter(analysis__in=analyses.values('pk')).delete()
+            self.stdout.write(f'Rostros eliminados: {deleted}')
+        else:
+            analyses = analyses.filter(
+                ~Exists(FaceDetection.objects.filter(analysis_id=OuterRef('pk')))
+            )
+
+        processed = 0
+        created = 0
+        last_pk = 0
+        while True:
+            # Paginación por clave: cada lote es una consulta indexada
+            batch = list(analyses.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+
+            detections = []
+            for analysis in batch:
+                detections.extend(FaceDetection.build_for_analysis(analysis))
+
+            with transaction.atomic():
+                FaceDetection.objects.bulk_create(detections, batch_size=batch_size)
+
+            processed += len(batch)
+            created += len(detections)
+            self.stdout.write(f'  {processed} análisis procesados, {created} rostros creados...')
+
+        elapsed = time.time() - start_time
+        rate = processed / elapsed if elapsed > 0 else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'Listo: {processed} análisis, {created} rostros en {elapsed:.2f}s ({rate:.0f} análisis/s)'
+        ))
@@ -0,0 +1,86 @@
+"""
+Compara el análisis de N imágenes con N llamadas individuales (como api_analyze_base64)
+contra una sola llamada al análisis por lotes (api/analyze-batch/).
+
+Se ejecuta en el proceso, sin servidor: mide el trabajo del servidor sin la red.
+
+Uso:
+    python manage.py benchmark_batch_analysis --image foto1.jpg --image foto2.jpg --count 20
+"""
+import base64
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.emotions.services.batch_analysis import iter_batch_results
+
+
+class Command(BaseCommand):
+    help = 'Compara N análisis individuales con un análisis por lotes de N imágenes'
+    # Sin chequeos: evitan importar las vistas (y cargar el modelo antes de tiempo)
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--image', action='append', dest='images', required=True,
+                            help='Imagen a analizar (se puede repetir; se reutilizan en ciclo)')
+        parser.add_argument('--count', type=int, default=20,
+                            help='Imágenes por lote')
+        parser.add_argument('--repeat', type=int, default=3,
+                            help='Repeticiones de cada variante')
+
+    def handle(self, *args, **options):
+        # Importación diferida: el detector carga los modelos ONNX al importarse
+        from apps.emotions.services.emotion_detector import emotion_detector
+
+        sources = []
+        for path in options['images']:
+            try:
+                with open(path, 'rb') as image_file:
+                    sources.append((path, image_file.read()))
+            except OSError as e:
+                raise CommandError(f'No se pudo leer {path}: {e}')
+
+        count = max(1, options['count'])
+        images = [sources[i % len(sources)] for i in range(count)]
+        encoded = [
+            'data:image/jpeg;base64,' + base64.b64encode(data).decode('ascii')
+            for _, data in images
+        ]
+
+        def individual():
+            for image_data in encoded:
+                emotion_detector.analyze_image_from_base64(image_data, use_cache=False)
+
+        first_result = []
+
+        def batch():
+            start = time.perf_counter()
+            for index, _ in enumerate(iter_batch_results(images)):
+                if index == 0:
+                    first_result.append(time.perf_counter() - start)
+
+        # Calentamiento: sesiones ONNX, detectores por hilo y pool del executor
+        emotion_detector.analyze_image_from_base64(encoded[0], use_cache=False)
+        list(iter_batch_results(images[:1]))
+
+        self.stdout.write(f'\n{count} imágenes, {options["repeat"]} repeticiones por variante')
+        individual_time = self._measure(individual, options['repeat'])
+        batch_time = self._measure(batch, options['repeat'])
+
+        self.stdout.write(
+            f'  {count} llamadas individuales: {individual_time * 1000:.0f} ms '
+            f'({count / individual_time:.1f} imágenes/s)\n'
+            f'  1 llamada por lotes:       {batch_time * 1000:.0f} ms '
+            f'({count / batch_time:.1f} imágenes/s, primer resultado en '
+            f'{statistics.median(first_result) * 1000:.0f} ms)'
+        )
+        self.stdout.write(self.style.SUCCESS(f'Aceleración: {individual_time / batch_time:.1f}x'))
+
+    def _measure(self, run, repeat):
+        timings = []
+        for _ in range(max(1, repeat)):
+            start = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - start)
+        return statistics.median(timings)
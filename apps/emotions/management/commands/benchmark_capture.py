@@ -0,0 +1,157 @@
+"""
+Mide el pipeline de tiempo real de las cámaras del servidor (captura -> detección ->
+JPEG) con cualquier fuente de captura, sin navegador ni cámara física. Con --cameras N
+se abren N cámaras con la misma fuente para medir cómo se reparten los hilos
+detectores compartidos. Los clientes usan el mismo stream adaptativo que video_feed;
+--client-kbps simula su ancho de banda para ver cómo bajan de nivel.
+
+Uso:
+    python manage.py benchmark_capture --source synthetic:1280x720@30 --subscribers 4 --detect
+    python manage.py benchmark_capture --source synthetic:640x480@15 --cameras 8 --detect
+    python manage.py benchmark_capture --source synthetic:1280x720@30 --subscribers 20 --client-kbps 2000
+    python manage.py benchmark_capture --source clase.mp4 --seconds 30
+    python manage.py benchmark_capture --source rtsp://camara.local/stream
+"""
+import statistics
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Mide FPS, latencia y reparto de la detección con una o varias cámaras del servidor'
+    # Sin chequeos: evitan importar las vistas (y cargar el modelo antes de tiempo)
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--source', default=getattr(settings, 'EMOTION_CAMERA_SOURCE', '0'),
+                            help='Índice de dispositivo, archivo, URL o synthetic[:WxH][@fps]')
+        parser.add_argument('--cameras', type=int, default=1,
+                            help='Cámaras simultáneas (cada una con su propia fuente)')
+        parser.add_argument('--seconds', type=float, default=10.0,
+                            help='Duración de la medición')
+        parser.add_argument('--subscribers', type=int, default=1,
+                            help='Clientes MJPEG simulados por cámara')
+        parser.add_argument('--client-kbps', type=float, default=0,
+                            help='Ancho de banda simulado de cada cliente en kbit/s (0 = sin límite)')
+        parser.add_argument('--tier', type=int, default=None,
+                            help='Fijar el nivel del stream (0 = el mejor); por defecto adaptativo')
+        parser.add_argument('--detect', action='store_true',
+                            help='Activar la detección de emociones durante la medición')
+        parser.add_argument('--detection-workers', type=int,
+                            default=getattr(settings, 'EMOTION_CAMERA_DETECTION_WORKERS', 2),
+                            help='Hilos detectores compartidos')
+
+    def handle(self, *args, **options):
+        # Importación diferida: la vista carga el detector y sus modelos ONNX
+        from apps.emotions.services.adaptive_stream import AdaptiveRate, adaptive_frames
+        from apps.emotions.services.camera_registry import CameraRegistry, CameraUnavailable
+        from apps.emotions.services.detection_scheduler import DetectionScheduler
+        from apps.emotions.views.video_stream import VideoCamera
+
+        count = max(1, options['cameras'])
+        scheduler = DetectionScheduler(options['detection_workers'])
+        registry = CameraRegistry(
+            lambda key, source: VideoCamera(source, key=key),
+            scheduler=scheduler,
+            resolver=lambda key: options['source'],
+            max_cameras=count
+        )
+
+        keys = [f'cam-{i + 1}' for i in range(count)]
+        try:
+            cameras = [registry.acquire(key) for key in keys]
+        except CameraUnavailable as e:
+            registry.release_all()
+            raise CommandError(str(e))
+
+        for camera in cameras:
+            camera.toggle_detection(options['detect'])
+        scheduler.wake()
+
+        subscribers = max(1, options['subscribers'])
+        stop = threading.Event()
+        rates = {
+            camera.key: [
+                AdaptiveRate(camera.tiers, tier=options['tier'], fixed=options['tier'] is not None)
+                for _ in range(subscribers)
+            ]
+            for camera in cameras
+        }
+        bytes_per_second = options['client_kbps'] * 1000 / 8
+        latencies = []
+
+        def subscriber(camera, rate):
+            for jpeg in adaptive_frames(camera, rate, lambda: not stop.is_set()):
+                encoded_seq, encoded = camera.encoded[rate.tier]
+                seq, _, frame_time = camera.source.latest()
+                if encoded is jpeg and encoded_seq == seq:
+                    latencies.append(time.time() - frame_time)
+                if bytes_per_second:
+                    # Escritura en un socket con el ancho de banda del cliente
+                    time.sleep(len(jpeg) / bytes_per_second)
+
+        threads = [
+            threading.Thread(target=subscriber, args=(camera, rate), daemon=True)
+            for camera in cameras for rate in rates[camera.key]
+        ]
+
+        frames_before = {camera.key: camera.source.frames for camera in cameras}
+        encodes_before = {camera.key: sum(camera.encodes) for camera in cameras}
+        detections_before = {key: value['detections'] for key, value in scheduler.stats().items()}
+        start = time.time()
+        cpu_start = time.process_time()
+        for thread in threads:
+            thread.start()
+        time.sleep(max(0.1, options['seconds']))
+        stop.set()
+        for thread in threads:
+            thread.join(2)
+        elapsed = time.time() - start
+        cpu = time.process_time() - cpu_start
+
+        stats = registry.stats()
+        registry.release_all()
+
+        self.stdout.write(
+            f'\n{count} cámara(s) con {options["source"]} durante {elapsed:.1f}s '
+            f'({subscribers} cliente(s) por cámara'
+            f'{", " + str(options["client_kbps"]) + " kbit/s" if options["client_kbps"] else ""}, detección '
+            f'{"activa con " + str(scheduler.workers) + " hilo(s)" if options["detect"] else "inactiva"})'
+        )
+        detections = []
+        for camera in cameras:
+            camera_stats = stats[camera.key]
+            captured = camera_stats['frames'] - frames_before[camera.key]
+            camera_detections = camera_stats.get('detections', 0) - detections_before.get(camera.key, 0)
+            detections.append(camera_detections)
+            camera_rates = rates[camera.key]
+            tiers = sorted(rate.tier for rate in camera_rates)
+            self.stdout.write(
+                f'  {camera.key}: captura {captured / elapsed:.1f} FPS, '
+                f'entregados {statistics.mean(rate.frames for rate in camera_rates) / elapsed:.1f} FPS por cliente, '
+                f'salida {sum(rate.bytes for rate in camera_rates) / elapsed / 1024:.0f} KB/s, '
+                f'{(sum(camera.encodes) - encodes_before[camera.key]) / elapsed:.1f} codificaciones/s, '
+                f'niveles finales {tiers[0]}-{tiers[-1]}, '
+                f'{camera_detections / elapsed:.2f} detecciones/s '
+                f'(retraso medio {camera_stats.get("avg_lag", 0) * 1000:.0f} ms), '
+                f'{camera_stats["reconnects"]} reconexiones'
+            )
+
+        if latencies:
+            latencies.sort()
+            self.stdout.write(
+                f'  Latencia captura -> JPEG: mediana {statistics.median(latencies) * 1000:.1f} ms, '
+                f'p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:.1f} ms'
+            )
+        if options['detect'] and sum(detections):
+            # Índice de Jain: 1.0 = reparto perfectamente equitativo entre cámaras
+            fairness = sum(detections) ** 2 / (len(detections) * sum(d * d for d in detections))
+            self.stdout.write(
+                f'  Detecciones totales: {sum(detections) / elapsed:.2f}/s, '
+                f'equidad entre cámaras (Jain): {fairness:.3f}'
+            )
+        self.stdout.write(f'  CPU del proceso: {cpu / elapsed * 100:.0f}% de un núcleo')
+        self.stdout.write(self.style.SUCCESS('Listo'))
@@ -0,0 +1,230 @@
+"""
+Prueba de rendimiento de la búsqueda del historial sobre datos generados.
+
+Compara la búsqueda anterior (icontains sobre notas y emoción, sin índice) con
+services/search.py (índices de texto completo y trigramas en PostgreSQL).
+
+Con --max-p50 y --check-complete el comando falla (código de salida 1) si alguna
+búsqueda supera el umbral o si al recorrer sus páginas con el cursor faltan o se
+repiten resultados (en particular con más coincidencias que EMOTION_SEARCH_RANK_WINDOW).
+
+Uso:
+    python manage.py benchmark_search --generate 1000000
+    python manage.py benchmark_search --term "muy feliz" --term miedo --repeat 20 --explain
+    python manage.py benchmark_search --max-p50 50 --check-complete
+    python manage.py benchmark_search --cleanup
+"""
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchQuery
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.emotions.models import EMOTION_KEYS, EmotionAnalysis
+from apps.emotions.services.history import MAX_PAGE_SIZE, filter_history, history_page
+from apps.emotions.services.search import RANK_WINDOW, SEARCH_CONFIG, matching_emotions
+
+BENCH_USERNAME = 'benchmark_search'
+
+# Vocabulario para las notas generadas (algunas palabras son mucho más frecuentes)
+COMMON_WORDS = [
+    'clase', 'reunión', 'estudiante', 'grupo', 'sesión', 'prueba', 'cámara', 'luz',
+    'mañana', 'tarde', 'foto', 'rostro', 'aula', 'docente', 'proyecto', 'video',
+]
+RARE_WORDS = [
+    'felices', 'sonriendo', 'preocupados', 'asombrados', 'cansancio', 'examen',
+    'cumpleaños', 'graduación', 'entrevista', 'laboratorio', 'biblioteca', 'conferencia',
+]
+
+DEFAULT_TERMS = ['clase', 'felices', 'feliz', 'gradua', 'examen final', 'miedo', 'zzzz']
+
+
+def generate_note(rng):
+    words = rng.choices(COMMON_WORDS, k=rng.randint(3, 10))
+    if rng.random() < 0.2:
+        words.insert(rng.randrange(len(words) + 1), rng.choice(RARE_WORDS))
+    return ' '.join(words)
+
+
+def legacy_search(user, term):
+    """
+    Búsqueda anterior: icontains sobre notas y emoción, paginada por fecha.
+    """
+    return list(
+        EmotionAnalysis.objects.filter(user=user)
+        .filter(Q(notes__icontains=term) | Q(dominant_emotion__icontains=term))
+        .only('id', 'created_at')
+        .order_by('-created_at')[:12]
+    )
+
+
+def expected_matches(user, term):
+    """
+    Coincidencias que debe devolver la búsqueda, calculadas sin services/search.py.
+    """
+    condition = Q(notes__icontains=term)
+    emotions = matching_emotions(term)
+    if emotions:
+        condition |= Q(dominant_emotion__in=emotions)
+    if connection.vendor == 'postgresql':
+        condition |= Q(search_vector=SearchQuery(term, config=SEARCH_CONFIG, search_type='websearch'))
+    return EmotionAnalysis.objects.filter(user=user).filter(condition)
+
+
+class Command(BaseCommand):
+    help = 'Mide la búsqueda del historial de análisis sobre datos generados'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--generate', type=int, default=0,
+                            help='Crear N análisis con notas aleatorias para el usuario de prueba')
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Filas por bulk_create al generar')
+        parser.add_argument('--seed', type=int, default=1,
+                            help='Semilla del generador de notas')
+        parser.add_argument('--term', action='append', dest='terms',
+                            help='Texto a buscar (se puede repetir)')
+        parser.add_argument('--repeat', type=int, default=10,
+                            help='Repeticiones por consulta')
+        parser.add_argument('--explain', action='store_true',
+                            help='Mostrar el plan de la búsqueda nueva (solo PostgreSQL)')
+        parser.add_argument('--max-p50', type=float, default=None,
+                            help='Fallar si el p50 de alguna búsqueda supera estos ms')
+        parser.add_argument('--check-complete', action='store_true',
+                            help='Recorrer las páginas de cada búsqueda y comparar con las coincidencias')
+        parser.add_argument('--check-rows', type=int, default=5 * RANK_WINDOW,
+                            help='Máximo de resultados recorridos por búsqueda al comprobar')
+        parser.add_argument('--cleanup', action='store_true',
+                            help='Eliminar el usuario de prueba y sus análisis')
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+
+        if options['cleanup']:
+            deleted, _ = User.objects.filter(username=BENCH_USERNAME).delete()
+            self.stdout.write(self.style.SUCCESS(f'Filas eliminadas: {deleted}'))
+            return
+
+        user, _ = User.objects.get_or_create(
+            username=BENCH_USERNAME, defaults={'email': f'{BENCH_USERNAME}@example.com'}
+        )
+
+        if options['generate']:
+            self._generate(user, options['generate'], max(1, options['batch_size']), options['seed'])
+
+        total = EmotionAnalysis.objects.filter(user=user).count()
+        self.stdout.write(f'\nUsuario {BENCH_USERNAME}: {total} análisis (motor: {connection.vendor})')
+
+        failures = []
+        checked_past_window = False
+        for term in options['terms'] or DEFAULT_TERMS:
+            legacy = self._measure(lambda: legacy_search(user, term), options['repeat'])
+            current = self._measure(
+                lambda: history_page(filter_history(user, search=term))[0], options['repeat']
+            )
+            self.stdout.write(
+                f'\n▶ "{term}"\n'
+                f'  icontains: p50 {legacy["p50"]:.1f} ms  máx {legacy["max"]:.1f} ms  ({legacy["rows"]} filas)\n'
+                f'  búsqueda:  p50 {current["p50"]:.1f} ms  máx {current["max"]:.1f} ms  ({current["rows"]} filas)'
+            )
+            if options['max_p50'] is not None and current['p50'] > options['max_p50']:
+                failures.append(f'"{term}": p50 {current["p50"]:.1f} ms > {options["max_p50"]} ms')
+            if options['check_complete']:
+                expected = expected_matches(user, term).count()
+                checked_past_window |= expected > RANK_WINDOW
+                error = self._check_complete(user, term, expected, max(1, options['check_rows']))
+                if error:
+                    failures.append(f'"{term}": {error}')
+            if options['explain'] and connection.vendor == 'postgresql':
+                self._explain(user, term)
+
+        if options['check_complete'] and not checked_past_window:
+            self.stdout.write(self.style.WARNING(
+                f'\nNinguna búsqueda superó {RANK_WINDOW} coincidencias: genere más datos '
+                f'o use un término más frecuente'
+            ))
+        if failures:
+            raise CommandError('Búsquedas fuera de lo esperado:\n  ' + '\n  '.join(failures))
+
+    def _generate(self, user, count, batch_size, seed):
+        rng = random.Random(seed)
+        now = timezone.now()
+        start_time = time.time()
+        created = 0
+
+        while created < count:
+            size = min(batch_size, count - created)
+            batch = [
+                EmotionAnalysis(
+                    user=user,
+                    image='benchmark/search.jpg',
+                    faces_detected=1,
+                    dominant_emotion=rng.choice(EMOTION_KEYS),
+                    average_confidence=rng.uniform(40, 99),
+                    notes=generate_note(rng),
+                )
+                for _ in range(size)
+            ]
+            with transaction.atomic():
+                EmotionAnalysis.objects.bulk_create(batch)
+                # auto_now_add fija created_at al crear: se reparte en los últimos dos años
+                for analysis in batch:
+                    analysis.created_at = now - timedelta(seconds=rng.randrange(2 * 365 * 86400))
+                EmotionAnalysis.objects.bulk_update(batch, ['created_at'], batch_size=1000)
+
+            created += size
+            self.stdout.write(f'  {created}/{count} análisis generados...')
+
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(f'ANALYZE {EmotionAnalysis._meta.db_table}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Generados {created} análisis en {time.time() - start_time:.1f}s'
+        ))
+
+    def _measure(self, query, repeat):
+        timings = []
+        rows = 0
+        for _ in range(max(1, repeat)):
+            start = time.perf_counter()
+            rows = len(query())
+            timings.append((time.perf_counter() - start) * 1000)
+        return {'p50': statistics.median(timings), 'max': max(timings), 'rows': rows}
+
+    def _check_complete(self, user, term, expected, max_rows):
+        """
+        Recorre las páginas de la búsqueda (hasta max_rows resultados) y devuelve un
+        mensaje de error si faltan o se repiten resultados, o None.
+        """
+        analyses = filter_history(user, search=term)
+        seen = set()
+        rows = 0
+        cursor = None
+        while rows < max_rows:
+            items, cursor = history_page(analyses, cursor, MAX_PAGE_SIZE)
+            rows += len(items)
+            seen.update(analysis.pk for analysis in items)
+            if cursor is None:
+                break
+
+        wanted = min(expected, max_rows)
+        self.stdout.write(f'  completitud: {len(seen)} de {expected} coincidencias recorridas')
+        if rows != len(seen):
+            return f'{rows - len(seen)} resultados repetidos entre páginas'
+        if len(seen) < wanted:
+            return f'se recorrieron {len(seen)} resultados de {wanted} esperados'
+        return None
+
+    def _explain(self, user, term):
+        queryset = filter_history(user, search=term).only('id').order_by('-search_rank', '-created_at', '-id')[:13]
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (ANALYZE, BUFFERS) {sql}', params)
+            for (line,) in cursor.fetchall():
+                self.stdout.write(f'    {line}')
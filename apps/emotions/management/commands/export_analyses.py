@@ -0,0 +1,78 @@
+"""
+Comando para exportar el historial de análisis a CSV o NDJSON sin cargarlo en memoria.
+
+Uso:
+    python manage.py export_analyses --output analisis.csv
+    python manage.py export_analyses --group 3 --date-from 2025-01-01 --date-to 2025-12-31 \
+        --level faces --format ndjson --gzip --output rostros_2025.ndjson.gz
+"""
+import sys
+import time
+from datetime import date
+
+from django.contrib.auth.models import Group
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.emotions.models import EMOTION_KEYS
+from apps.emotions.services.export import FORMATS, LEVELS, export_queryset, stream_export
+
+
+class Command(BaseCommand):
+    help = 'Exporta análisis o rostros detectados en CSV o NDJSON (streaming)'
+    # Sin chequeos: evitan importar las vistas (y cargar el modelo, que escribe en stdout)
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=FORMATS, default='csv',
+                            help='Formato de salida')
+        parser.add_argument('--level', choices=LEVELS, default='analyses',
+                            help='Una fila por análisis o por rostro detectado')
+        parser.add_argument('--user', type=int, action='append', dest='users',
+                            help='ID de usuario a exportar (se puede repetir)')
+        parser.add_argument('--group', help='ID o nombre del grupo cuyos usuarios se exportan')
+        parser.add_argument('--date-from', type=date.fromisoformat,
+                            help='Fecha inicial (AAAA-MM-DD, inclusive)')
+        parser.add_argument('--date-to', type=date.fromisoformat,
+                            help='Fecha final (AAAA-MM-DD, inclusive)')
+        parser.add_argument('--emotion', choices=EMOTION_KEYS,
+                            help='Emoción dominante (del análisis o del rostro según --level)')
+        parser.add_argument('--gzip', action='store_true',
+                            help='Comprimir la salida con gzip')
+        parser.add_argument('--output', default='-',
+                            help='Archivo de salida ("-" para la salida estándar)')
+
+    def handle(self, *args, **options):
+        users = options['users']
+        if options['group']:
+            group = options['group']
+            lookup = {'pk': int(group)} if group.isdigit() else {'name': group}
+            try:
+                group = Group.objects.get(**lookup)
+            except Group.DoesNotExist:
+                raise CommandError(f'No existe el grupo {options["group"]}')
+            users = group.user_set.values('pk')
+
+        header, rows = export_queryset(
+            options['level'],
+            users=users,
+            date_from=options['date_from'],
+            date_to=options['date_to'],
+            emotion=options['emotion'],
+        )
+
+        output = sys.stdout.buffer if options['output'] == '-' else open(options['output'], 'wb')
+        start_time = time.time()
+        written = 0
+        try:
+            for block in stream_export(header, rows, options['format'], compress=options['gzip']):
+                output.write(block)
+                written += len(block)
+        finally:
+            if output is not sys.stdout.buffer:
+                output.close()
+
+        elapsed = time.time() - start_time
+        # El resumen va a stderr para no mezclarse con los datos en la salida estándar
+        self.stderr.write(self.style.SUCCESS(
+            f'Exportación completa: {written / 1024 / 1024:.1f} MB en {elapsed:.1f}s'
+        ))
@@ -0,0 +1,113 @@
+"""
+Prueba de carga de las APIs de análisis: compara las vistas síncronas con sus variantes ASGI.
+
+Uso:
+    python manage.py loadtest_analysis_api --base-url http://127.0.0.1:8000 \
+        --sessionid <cookie sessionid> --image foto.jpg --concurrency 32 --requests 200
+"""
+import base64
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+
+
+# Pares (síncrona, asíncrona) de endpoints comparables
+ENDPOINTS = {
+    'analyze-base64': ('/emotions/api/analyze-base64/', '/emotions/api/async/analyze-base64/'),
+    'current-results': ('/emotions/api/current-results/', '/emotions/api/async/current-results/'),
+}
+
+
+def percentile(values, pct):
+    """
+    Percentil simple (vecino más cercano) de una lista de valores.
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = 'Compara latencia y throughput de las APIs de análisis síncronas y asíncronas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000',
+                            help='URL base del servidor a probar')
+        parser.add_argument('--sessionid', required=True,
+                            help='Cookie sessionid de un usuario autenticado')
+        parser.add_argument('--endpoint', choices=sorted(ENDPOINTS), default='analyze-base64',
+                            help='Par de endpoints a comparar')
+        parser.add_argument('--image', help='Imagen a enviar (requerida para analyze-base64)')
+        parser.add_argument('--concurrency', type=int, default=16,
+                            help='Clientes simultáneos')
+        parser.add_argument('--requests', type=int, default=100,
+                            help='Total de peticiones por variante')
+        parser.add_argument('--only', choices=['sync', 'async'],
+                            help='Probar solo una de las variantes')
+
+    def handle(self, *args, **options):
+        payload = None
+        if options['endpoint'] == 'analyze-base64':
+            if not options['image']:
+                raise CommandError('--image es requerido para analyze-base64')
+            with open(options['image'], 'rb') as f:
+                encoded = base64.b64encode(f.read()).decode('ascii')
+            payload = {'image_data': f'data:image/jpeg;base64,{encoded}'}
+
+        sync_path, async_path = ENDPOINTS[options['endpoint']]
+        variants = [('sync', sync_path), ('async', async_path)]
+        if options['only']:
+            variants = [v for v in variants if v[0] == options['only']]
+
+        for name, path in variants:
+            url = options['base_url'].rstrip('/') + path
+            self.stdout.write(f"\n▶ {name}: {url}")
+            report = self._run(url, payload, options)
+            self.stdout.write(
+                f"  peticiones: {report['total']}  errores: {report['errors']}\n"
+                f"  throughput: {report['throughput']:.1f} req/s\n"
+                f"  latencia p50: {report['p50'] * 1000:.0f} ms  "
+                f"p95: {report['p95'] * 1000:.0f} ms  "
+                f"media: {report['mean'] * 1000:.0f} ms"
+            )
+
+    def _run(self, url, payload, options):
+        cookies = {'sessionid': options['sessionid']}
+        latencies = []
+        errors = 0
+
+        def one_request(_):
+            session = requests.Session()
+            start = time.perf_counter()
+            try:
+                if payload is None:
+                    response = session.get(url, cookies=cookies, timeout=60)
+                else:
+                    response = session.post(url, json=payload, cookies=cookies, timeout=60)
+                ok = response.status_code == 200
+            except requests.RequestException:
+                ok = False
+            return ok, time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            for ok, latency in pool.map(one_request, range(options['requests'])):
+                if ok:
+                    latencies.append(latency)
+                else:
+                    errors += 1
+        elapsed = time.perf_counter() - start
+
+        return {
+            'total': options['requests'],
+            'errors': errors,
+            'throughput': len(latencies) / elapsed if elapsed else 0.0,
+            'p50': percentile(latencies, 50),
+            'p95': percentile(latencies, 95),
+            'mean': statistics.mean(latencies) if latencies else 0.0,
+        }
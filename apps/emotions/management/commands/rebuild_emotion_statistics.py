@@ -0,0 +1,36 @@
+"""
+Comando de reparación: reconstruye EmotionStatistics y el resumen diario (DailyEmotionRollup)
+desde cero a partir de los análisis.
+
+Las estadísticas se mantienen de forma incremental al crear o eliminar análisis;
+este comando solo es necesario si quedaron inconsistentes (cargas manuales de datos,
+errores a mitad de una operación, etc.). En PostgreSQL el cálculo se hace dentro de
+la base de datos; durante la reconstrucción se bloquea la escritura de análisis.
+
+Uso:
+    python manage.py rebuild_emotion_statistics
+    python manage.py rebuild_emotion_statistics --user 5 --user 8
+"""
+from django.core.management.base import BaseCommand
+
+from apps.emotions.services.statistics import rebuild_statistics
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye las estadísticas de emociones de los usuarios (reparación)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', type=int, action='append', dest='users',
+            help='ID de usuario a reconstruir (se puede repetir). Por defecto, todos'
+        )
+
+    def handle(self, *args, **options):
+        # En PostgreSQL todos los usuarios se recalculan en una sola consulta
+        result = rebuild_statistics(options['users'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Estadísticas reconstruidas para {result['users']} usuario(s) "
+            f"y {result['rollups']} fila(s) de resumen diario "
+            f"en {result['duration']:.2f}s ({result['method']})"
+        ))
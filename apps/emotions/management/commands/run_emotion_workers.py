@@ -0,0 +1,108 @@
+"""
+Comando para ejecutar los workers de la cola de análisis de emociones.
+
+Uso:
+    python manage.py run_emotion_workers --workers 4
+    python manage.py run_emotion_workers --once
+"""
+import multiprocessing
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.emotions.services.analysis_jobs import default_worker_id, get_job_setting, run_worker
+
+
+def _worker_process(index, poll_interval, timeout, once):
+    """
+    Punto de entrada de cada proceso worker (contexto spawn).
+    """
+    import django
+    django.setup()
+
+    from apps.emotions.services.analysis_jobs import default_worker_id, run_worker
+
+    try:
+        run_worker(default_worker_id(index), poll_interval=poll_interval, timeout=timeout, once=once)
+    except KeyboardInterrupt:
+        pass
+
+
+class Command(BaseCommand):
+    help = 'Ejecuta procesos worker que procesan la cola de análisis de emociones'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int,
+            default=get_job_setting('EMOTION_JOB_WORKERS', 2),
+            help='Número de procesos worker (límite de concurrencia local)'
+        )
+        parser.add_argument(
+            '--poll-interval', type=float,
+            default=get_job_setting('EMOTION_JOB_POLL_INTERVAL', 1.0),
+            help='Segundos de espera cuando la cola está vacía'
+        )
+        parser.add_argument(
+            '--timeout', type=float,
+            default=get_job_setting('EMOTION_JOB_TIMEOUT', 120),
+            help='Tiempo máximo por trabajo en segundos'
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Procesar los trabajos disponibles y terminar'
+        )
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        poll_interval = options['poll_interval']
+        timeout = options['timeout']
+        once = options['once']
+
+        self.stdout.write(f"Iniciando {workers} worker(s) de análisis de emociones...")
+
+        # Un solo worker se ejecuta en el proceso actual
+        if workers == 1:
+            try:
+                processed = run_worker(default_worker_id(0), poll_interval=poll_interval,
+                                       timeout=timeout, once=once)
+                self.stdout.write(self.style.SUCCESS(f"✓ {processed} trabajo(s) procesado(s)"))
+            except KeyboardInterrupt:
+                self.stdout.write("Worker detenido")
+            return
+
+        # Con spawn cada proceso carga su propia sesión ONNX y conexión a la base de datos
+        context = multiprocessing.get_context('spawn')
+        processes = {}
+
+        def start(index):
+            process = context.Process(
+                target=_worker_process,
+                args=(index, poll_interval, timeout, once),
+                name=f'emotion-worker-{index}',
+                daemon=True
+            )
+            process.start()
+            processes[index] = process
+
+        for index in range(workers):
+            start(index)
+
+        try:
+            while processes:
+                time.sleep(1)
+                for index, process in list(processes.items()):
+                    if process.is_alive():
+                        continue
+                    del processes[index]
+                    # Reiniciar workers caídos salvo en modo --once
+                    if not once and process.exitcode != 0:
+                        self.stderr.write(f"Worker {index} terminó con código {process.exitcode}, reiniciando...")
+                        start(index)
+        except KeyboardInterrupt:
+            self.stdout.write("Deteniendo workers...")
+            for process in processes.values():
+                process.terminate()
+            for process in processes.values():
+                process.join(timeout=5)
+
+        self.stdout.write(self.style.SUCCESS("✓ Workers detenidos"))
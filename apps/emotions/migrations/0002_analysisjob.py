@@ -0,0 +1,40 @@
+# Generated by Django 5.2.4 on 2026-10-19 06:29
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('emotions', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalysisJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pendiente'), ('running', 'En Proceso'), ('done', 'Completado'), ('failed', 'Fallido')], default='pending', max_length=10, verbose_name='Estado')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Intentos')),
+                ('max_attempts', models.PositiveSmallIntegerField(default=3, verbose_name='Máximo de Intentos')),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now, help_text='Momento a partir del cual un worker puede tomar el trabajo', verbose_name='Disponible Desde')),
+                ('lease_expires_at', models.DateTimeField(blank=True, help_text='Si el worker no termina antes de esta fecha, el trabajo se puede reintentar', null=True, verbose_name='Vencimiento de la Reserva')),
+                ('worker', models.CharField(blank=True, max_length=100, verbose_name='Worker')),
+                ('error', models.TextField(blank=True, verbose_name='Último Error')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Encolado')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Fecha de Inicio')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Fecha de Finalización')),
+                ('queue_time', models.FloatField(default=0.0, verbose_name='Tiempo en Cola (segundos)')),
+                ('run_time', models.FloatField(default=0.0, verbose_name='Tiempo de Ejecución (segundos)')),
+                ('analysis', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='job', to='emotions.emotionanalysis', verbose_name='Análisis')),
+            ],
+            options={
+                'verbose_name': 'Trabajo de Análisis',
+                'verbose_name_plural': 'Trabajos de Análisis',
+                'ordering': ['created_at'],
+                'indexes': [models.Index(fields=['status', 'available_at'], name='emotions_an_status_003ff0_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,100 @@
+# Generated by Django 5.2.4 on 2026-10-19 06:40
+
+from django.db import migrations, models
+from django.db.models import Q
+
+
+EMOTION_KEYS = ['neutral', 'happiness', 'surprise', 'sadness', 'anger', 'disgust', 'fear', 'contempt']
+
+
+def iter_faces(analysis):
+    # Copia de EmotionAnalysis.iter_faces (los modelos históricos no tienen métodos)
+    results = analysis.analysis_results
+    if not results:
+        return
+    if 'faces_analysis' in results:
+        faces_data = results['faces_analysis']
+    elif 'faces' in results:
+        faces_data = results['faces']
+    else:
+        if analysis.dominant_emotion:
+            confidence = analysis.average_confidence if analysis.average_confidence > 0 else None
+            for _ in range(analysis.faces_detected):
+                yield analysis.dominant_emotion, confidence
+        return
+    for face in faces_data or []:
+        emotion = face.get('dominant_emotion') or face.get('emotion')
+        confidence = face.get('confidence', 0)
+        if confidence is None:
+            yield emotion, None
+        else:
+            yield emotion, confidence * 100 if confidence < 1 else confidence
+
+
+def build_statistics(apps, schema_editor):
+    """
+    Marca los análisis ya contados y calcula los acumuladores de todos los usuarios,
+    para que el mantenimiento incremental parta de datos consistentes.
+    """
+    EmotionAnalysis = apps.get_model('emotions', 'EmotionAnalysis')
+    EmotionStatistics = apps.get_model('emotions', 'EmotionStatistics')
+
+    countable = EmotionAnalysis.objects.filter(
+        Q(job__isnull=True) | Q(job__status__in=['done', 'failed'])
+    )
+    countable.update(counted_in_statistics=True)
+
+    totals = {}
+    fields = ['user_id', 'faces_detected', 'analysis_results', 'dominant_emotion', 'average_confidence']
+    for analysis in countable.only(*fields).iterator(chunk_size=500):
+        user_totals = totals.setdefault(analysis.user_id, {
+            'total_analyses': 0, 'total_faces_detected': 0,
+            'confidence_sum': 0.0, 'confidence_count': 0,
+            **{f'{emotion}_count': 0 for emotion in EMOTION_KEYS},
+        })
+        user_totals['total_analyses'] += 1
+        user_totals['total_faces_detected'] += analysis.faces_detected
+        for emotion, confidence in iter_faces(analysis):
+            if emotion in EMOTION_KEYS:
+                user_totals[f'{emotion}_count'] += 1
+            if confidence is not None:
+                user_totals['confidence_sum'] += confidence
+                user_totals['confidence_count'] += 1
+
+    for user_id, user_totals in totals.items():
+        stats, created = EmotionStatistics.objects.get_or_create(user_id=user_id)
+        for field, value in user_totals.items():
+            setattr(stats, field, value)
+        emotion_counts = {emotion: user_totals[f'{emotion}_count'] for emotion in EMOTION_KEYS}
+        stats.most_frequent_emotion = max(emotion_counts, key=emotion_counts.get)
+        stats.average_confidence = (
+            stats.confidence_sum / stats.confidence_count if stats.confidence_count else 0.0
+        )
+        stats.average_faces_per_analysis = stats.total_faces_detected / stats.total_analyses
+        stats.save()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('emotions', '0002_analysisjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='emotionanalysis',
+            name='counted_in_statistics',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Contado en Estadísticas'),
+        ),
+        migrations.AddField(
+            model_name='emotionstatistics',
+            name='confidence_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Rostros con Confianza'),
+        ),
+        migrations.AddField(
+            model_name='emotionstatistics',
+            name='confidence_sum',
+            field=models.FloatField(default=0.0, verbose_name='Suma de Confianzas'),
+        ),
+        migrations.RunPython(build_statistics, migrations.RunPython.noop),
+    ]
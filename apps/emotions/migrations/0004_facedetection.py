@@ -0,0 +1,46 @@
+# Generated by Django 5.2.4 on 2026-10-19 06:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('emotions', '0003_incremental_statistics'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FaceDetection',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(verbose_name='Fecha del Análisis')),
+                ('face_index', models.PositiveSmallIntegerField(default=1, verbose_name='Número de Rostro')),
+                ('x', models.PositiveIntegerField(default=0)),
+                ('y', models.PositiveIntegerField(default=0)),
+                ('width', models.PositiveIntegerField(default=0)),
+                ('height', models.PositiveIntegerField(default=0)),
+                ('dominant_emotion', models.CharField(blank=True, max_length=20, verbose_name='Emoción Dominante')),
+                ('confidence', models.FloatField(default=0.0, verbose_name='Confianza (0-1)')),
+                ('neutral', models.FloatField(default=0.0)),
+                ('happiness', models.FloatField(default=0.0)),
+                ('surprise', models.FloatField(default=0.0)),
+                ('sadness', models.FloatField(default=0.0)),
+                ('anger', models.FloatField(default=0.0)),
+                ('disgust', models.FloatField(default=0.0)),
+                ('fear', models.FloatField(default=0.0)),
+                ('contempt', models.FloatField(default=0.0)),
+                ('analysis', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='face_detections', to='emotions.emotionanalysis', verbose_name='Análisis')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='face_detections', to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+            ],
+            options={
+                'verbose_name': 'Rostro Detectado',
+                'verbose_name_plural': 'Rostros Detectados',
+                'ordering': ['-created_at', 'face_index'],
+                'indexes': [models.Index(fields=['user', '-created_at'], name='emotions_fa_user_id_522ec5_idx'), models.Index(fields=['dominant_emotion', '-created_at'], name='emotions_fa_dominan_010f0f_idx'), models.Index(fields=['created_at'], name='emotions_fa_created_8b1a40_idx'), models.Index(condition=models.Q(('neutral__gte', 0.5)), fields=['-created_at', 'neutral'], name='face_strong_neutral_idx'), models.Index(condition=models.Q(('happiness__gte', 0.5)), fields=['-created_at', 'happiness'], name='face_strong_happiness_idx'), models.Index(condition=models.Q(('surprise__gte', 0.5)), fields=['-created_at', 'surprise'], name='face_strong_surprise_idx'), models.Index(condition=models.Q(('sadness__gte', 0.5)), fields=['-created_at', 'sadness'], name='face_strong_sadness_idx'), models.Index(condition=models.Q(('anger__gte', 0.5)), fields=['-created_at', 'anger'], name='face_strong_anger_idx'), models.Index(condition=models.Q(('disgust__gte', 0.5)), fields=['-created_at', 'disgust'], name='face_strong_disgust_idx'), models.Index(condition=models.Q(('fear__gte', 0.5)), fields=['-created_at', 'fear'], name='face_strong_fear_idx'), models.Index(condition=models.Q(('contempt__gte', 0.5)), fields=['-created_at', 'contempt'], name='face_strong_contempt_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.4 on 2026-10-19 06:46
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate
+
+
+def build_rollups(apps, schema_editor):
+    """
+    Llena el resumen diario con los análisis ya contados en las estadísticas.
+    """
+    EmotionAnalysis = apps.get_model('emotions', 'EmotionAnalysis')
+    DailyEmotionRollup = apps.get_model('emotions', 'DailyEmotionRollup')
+
+    rows = (
+        EmotionAnalysis.objects.filter(counted_in_statistics=True)
+        .annotate(day=TruncDate('created_at'), emotion=Coalesce('dominant_emotion', Value('')))
+        .values('user_id', 'day', 'emotion')
+        .annotate(total=Count('id'), total_faces=Sum('faces_detected'), total_confidence=Sum('average_confidence'))
+        .order_by()
+    )
+    DailyEmotionRollup.objects.bulk_create([
+        DailyEmotionRollup(
+            user_id=row['user_id'], date=row['day'], emotion=row['emotion'],
+            analyses=row['total'], faces=row['total_faces'] or 0,
+            confidence_sum=row['total_confidence'] or 0.0,
+        )
+        for row in rows.iterator()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('emotions', '0004_facedetection'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyEmotionRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Fecha')),
+                ('emotion', models.CharField(blank=True, max_length=20, verbose_name='Emoción')),
+                ('analyses', models.IntegerField(default=0, verbose_name='Análisis')),
+                ('faces', models.IntegerField(default=0, verbose_name='Rostros')),
+                ('confidence_sum', models.FloatField(default=0.0, verbose_name='Suma de Confianza Promedio')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_emotion_rollups', to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+            ],
+            options={
+                'verbose_name': 'Resumen Diario de Emociones',
+                'verbose_name_plural': 'Resúmenes Diarios de Emociones',
+                'ordering': ['-date', 'emotion'],
+                'constraints': [models.UniqueConstraint(fields=('user', 'date', 'emotion'), name='unique_daily_emotion_rollup')],
+            },
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-19 06:48
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('emotions', '0005_dailyemotionrollup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='emotionanalysis',
+            name='emotions_em_user_id_9d77a2_idx',
+        ),
+        migrations.AddIndex(
+            model_name='emotionanalysis',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='emotion_history_idx'),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.4 on 2026-10-19 06:56
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+# Objetos exclusivos de PostgreSQL usados por services/search.py. En otros motores
+# no se crean y la búsqueda usa icontains sin índice.
+SEARCH_INDEXES = {
+    # Texto completo sobre el vector almacenado
+    'emotion_search_vector_idx': 'USING gin (search_vector)',
+    # Trigramas sobre UPPER(notes): es la expresión que genera el ORM para icontains
+    'emotion_notes_trgm_idx': 'USING gin (UPPER(notes) gin_trgm_ops)',
+}
+
+SEARCH_TRIGGER = 'emotion_search_vector_update'
+
+
+def create_search_objects(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    table = apps.get_model('emotions', 'EmotionAnalysis')._meta.db_table
+
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    # Mantener search_vector al insertar o al cambiar las notas (incluye bulk_create y update())
+    schema_editor.execute(
+        f"CREATE TRIGGER {SEARCH_TRIGGER} BEFORE INSERT OR UPDATE OF notes ON {table} "
+        f"FOR EACH ROW EXECUTE FUNCTION tsvector_update_trigger(search_vector, 'pg_catalog.spanish', notes)"
+    )
+    schema_editor.execute(
+        f"UPDATE {table} SET search_vector = to_tsvector('pg_catalog.spanish', COALESCE(notes, ''))"
+    )
+    for name, definition in SEARCH_INDEXES.items():
+        schema_editor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {table} {definition}')
+
+
+def drop_search_objects(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    table = apps.get_model('emotions', 'EmotionAnalysis')._meta.db_table
+
+    schema_editor.execute(f'DROP TRIGGER IF EXISTS {SEARCH_TRIGGER} ON {table}')
+    for name in SEARCH_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('emotions', '0006_analysis_history_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='emotionanalysis',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Vector de Búsqueda'),
+        ),
+        migrations.RunPython(create_search_objects, drop_search_objects),
+    ]
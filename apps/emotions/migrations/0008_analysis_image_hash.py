@@ -0,0 +1,24 @@
+# Generated by Django 5.2.4 on 2026-10-19 07:08
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('emotions', '0007_notes_search'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='emotionanalysis',
+            name='image_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True, verbose_name='Hash de la Imagen'),
+        ),
+        migrations.AddIndex(
+            model_name='emotionanalysis',
+            index=models.Index(condition=models.Q(('image_hash__isnull', False)), fields=['user', 'image_hash'], name='emotion_image_hash_idx'),
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.4 on 2026-10-19 07:18
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('emotions', '0008_analysis_image_hash'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='analysisjob',
+            name='analysis',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='job', to='emotions.emotionanalysis', verbose_name='Análisis'),
+        ),
+        migrations.CreateModel(
+            name='VideoAnalysis',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('video', models.FileField(upload_to='emotion_videos/%Y/%m/%d/', verbose_name='Video')),
+                ('notes', models.TextField(blank=True, help_text='Notas adicionales sobre el video', verbose_name='Notas')),
+                ('duration', models.FloatField(default=0.0, verbose_name='Duración (segundos)')),
+                ('fps', models.FloatField(default=0.0, verbose_name='Frames por Segundo')),
+                ('width', models.PositiveIntegerField(default=0, verbose_name='Ancho')),
+                ('height', models.PositiveIntegerField(default=0, verbose_name='Alto')),
+                ('frames_sampled', models.PositiveIntegerField(default=0, verbose_name='Frames Analizados')),
+                ('faces_detected', models.PositiveIntegerField(default=0, help_text='Detecciones en todos los frames analizados', verbose_name='Rostros Detectados')),
+                ('tracks_detected', models.PositiveIntegerField(default=0, help_text='Rostros distintos según el seguimiento entre frames', verbose_name='Personas Seguidas')),
+                ('dominant_emotion', models.CharField(blank=True, max_length=20, null=True, verbose_name='Emoción Dominante')),
+                ('average_confidence', models.FloatField(default=0.0, verbose_name='Confianza Promedio (%)')),
+                ('timeline', models.JSONField(default=list, verbose_name='Línea de Tiempo')),
+                ('tracks', models.JSONField(default=list, verbose_name='Seguimiento de Rostros')),
+                ('progress', models.FloatField(default=0.0, verbose_name='Progreso (%)')),
+                ('processing_time', models.FloatField(default=0.0, verbose_name='Tiempo de Procesamiento (segundos)')),
+                ('realtime_factor', models.FloatField(default=0.0, verbose_name='Velocidad (x tiempo real)')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Fecha de Actualización')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='video_analyses', to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+            ],
+            options={
+                'verbose_name': 'Análisis de Video',
+                'verbose_name_plural': 'Análisis de Videos',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='analysisjob',
+            name='video',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='job', to='emotions.videoanalysis', verbose_name='Video'),
+        ),
+        migrations.AddConstraint(
+            model_name='analysisjob',
+            constraint=models.CheckConstraint(condition=models.Q(models.Q(('analysis__isnull', False), ('video__isnull', True)), models.Q(('analysis__isnull', True), ('video__isnull', False)), _connector='OR'), name='emotion_job_single_target'),
+        ),
+        migrations.AddIndex(
+            model_name='videoanalysis',
+            index=models.Index(fields=['user', '-created_at'], name='emotions_vi_user_id_755692_idx'),
+        ),
+    ]
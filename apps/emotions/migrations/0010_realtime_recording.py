@@ -0,0 +1,59 @@
+# Generated by Django 5.2.4 on 2026-10-19 07:39
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('emotions', '0009_video_analysis'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RealtimeRecording',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(choices=[('browser', 'Cámara del navegador'), ('server', 'Cámara del servidor')], default='browser', max_length=10, verbose_name='Origen')),
+                ('camera', models.CharField(blank=True, help_text='Clave de la cámara del servidor', max_length=64, verbose_name='Cámara')),
+                ('started_at', models.DateTimeField(verbose_name='Inicio')),
+                ('ended_at', models.DateTimeField(blank=True, help_text='Vacío mientras la sesión sigue activa', null=True, verbose_name='Fin')),
+                ('duration', models.FloatField(default=0.0, verbose_name='Duración (segundos)')),
+                ('frames_analyzed', models.PositiveIntegerField(default=0, verbose_name='Frames Analizados')),
+                ('faces_detected', models.PositiveIntegerField(default=0, help_text='Detecciones en todos los frames analizados', verbose_name='Rostros Detectados')),
+                ('seconds_with_faces', models.PositiveIntegerField(default=0, verbose_name='Segundos con Rostros')),
+                ('emotion_totals', models.JSONField(default=list, verbose_name='Totales por Emoción')),
+                ('dominant_emotion', models.CharField(blank=True, max_length=20, null=True, verbose_name='Emoción Dominante')),
+                ('average_confidence', models.FloatField(default=0.0, verbose_name='Confianza Promedio (%)')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Fecha de Actualización')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='realtime_recordings', to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+            ],
+            options={
+                'verbose_name': 'Sesión en Tiempo Real',
+                'verbose_name_plural': 'Sesiones en Tiempo Real',
+                'ordering': ['-started_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='RealtimeTimelineChunk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_second', models.PositiveIntegerField(verbose_name='Segundo Inicial')),
+                ('end_second', models.PositiveIntegerField(verbose_name='Segundo Final')),
+                ('rows', models.JSONField(default=list, verbose_name='Registros')),
+                ('recording', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chunks', to='emotions.realtimerecording', verbose_name='Sesión')),
+            ],
+            options={
+                'verbose_name': 'Tramo de Sesión en Tiempo Real',
+                'verbose_name_plural': 'Tramos de Sesiones en Tiempo Real',
+                'ordering': ['recording', 'start_second'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='realtimerecording',
+            index=models.Index(fields=['user', '-started_at'], name='emotions_re_user_id_50dc10_idx'),
+        ),
+    ]
@@ -1,10 +1,42 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, Q, Value
+from django.db.models.functions import Greatest
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchVectorField
 from django.utils import timezone
 import json
 
 User = get_user_model()
 
+# Emociones del modelo FER+ (cada una tiene un contador en EmotionStatistics)
+EMOTION_KEYS = ['neutral', 'happiness', 'surprise', 'sadness', 'anger', 'disgust', 'fear', 'contempt']
+
+# Nombres en español de las emociones
+EMOTION_TRANSLATIONS = {
+    'neutral': 'Neutral',
+    'happiness': 'Felicidad',
+    'surprise': 'Sorpresa',
+    'sadness': 'Tristeza',
+    'anger': 'Ira',
+    'disgust': 'Disgusto',
+    'fear': 'Miedo',
+    'contempt': 'Desprecio'
+}
+
+# Umbral de los índices parciales de FaceDetection (consultas tipo "fear > 0.6")
+STRONG_EMOTION_THRESHOLD = 0.5
+
+
+def counter_change(field, amount):
+    """
+    Expresión F() que suma amount a un contador. Las restas se acotan en cero: un
+    contador desfasado (datos editados a mano, análisis restado dos veces) no queda
+    negativo.
+    """
+    if amount >= 0:
+        return F(field) + amount
+    return Greatest(F(field) + amount, Value(0.0 if isinstance(amount, float) else 0))
+
 
 class EmotionAnalysis(models.Model):
     """
@@ -74,14 +106,45 @@ class EmotionAnalysis(models.Model):
         help_text='Notas adicionales sobre el análisis'
     )
     
+    # Indica si el análisis ya está sumado en EmotionStatistics (evita contarlo dos veces)
+    counted_in_statistics = models.BooleanField(
+        default=False,
+        editable=False,
+        verbose_name='Contado en Estadísticas'
+    )
+    
+    # SHA-256 del archivo de imagen (análisis masivo: permite omitir archivos ya procesados)
+    image_hash = models.CharField(
+        max_length=64,
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name='Hash de la Imagen'
+    )
+    
+    # Vector de texto completo de las notas. En PostgreSQL lo mantiene un trigger
+    # (migración 0007); en otros motores queda vacío y la búsqueda usa icontains.
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+        verbose_name='Vector de Búsqueda'
+    )
+    
     class Meta:
         verbose_name = 'Análisis de Emoción'
         verbose_name_plural = 'Análisis de Emociones'
         ordering = ['-created_at']
         indexes = [
-            models.Index(fields=['user', '-created_at']),
+            # Historial por usuario paginado por cursor (created_at, id)
+            models.Index(fields=['user', '-created_at', '-id'], name='emotion_history_idx'),
             models.Index(fields=['dominant_emotion']),
             models.Index(fields=['created_at']),
+            # Archivos ya analizados por usuario (comando analyze_images)
+            models.Index(
+                fields=['user', 'image_hash'],
+                name='emotion_image_hash_idx',
+                condition=Q(image_hash__isnull=False)
+            ),
         ]
     
     def __str__(self):
@@ -91,17 +154,7 @@ class EmotionAnalysis(models.Model):
         """
         Traduce las emociones del inglés al español.
         """
-        translations = {
-            'neutral': 'Neutral',
-            'happiness': 'Felicidad',
-            'surprise': 'Sorpresa',
-            'sadness': 'Tristeza',
-            'anger': 'Ira',
-            'disgust': 'Disgusto',
-            'fear': 'Miedo',
-            'contempt': 'Desprecio'
-        }
-        return translations.get(emotion, emotion.title())
+        return EMOTION_TRANSLATIONS.get(emotion, emotion.title())
     
     def get_dominant_emotion_display(self):
         """
@@ -195,10 +248,108 @@ class EmotionAnalysis(models.Model):
         
         return emotion_percentages
     
+    def iter_faces(self):
+        """
+        Recorre los rostros del análisis como pares (emoción, confianza en porcentaje
+        o None si el rostro no la trae).
+        
+        Soporta el formato de subida ('faces_analysis') y el de cámara ('faces'). Si los
+        resultados no traen la lista de rostros, usa la emoción dominante del análisis
+        para cada rostro detectado.
+        """
+        if not self.analysis_results:
+            return
+        
+        faces_data = None
+        if 'faces_analysis' in self.analysis_results:
+            faces_data = self.analysis_results['faces_analysis']
+        elif 'faces' in self.analysis_results:
+            faces_data = self.analysis_results['faces']
+        elif self.dominant_emotion:
+            confidence = self.average_confidence if self.average_confidence > 0 else None
+            for _ in range(self.faces_detected):
+                yield self.dominant_emotion, confidence
+            return
+        
+        for face in faces_data or []:
+            # Buscar emoción dominante en diferentes claves posibles
+            emotion = face.get('dominant_emotion') or face.get('emotion')
+            confidence = face.get('confidence', 0)
+            if confidence is None:
+                # Rostro sin confianza (resultados antiguos o editados): no suma al promedio
+                yield emotion, None
+            else:
+                yield emotion, confidence * 100 if confidence < 1 else confidence
+    
+    def get_face_results(self):
+        """
+        Rostros del análisis normalizados (ambos formatos de analysis_results).
+        
+        Returns:
+            Lista de diccionarios con box (x, y, width, height), dominant_emotion,
+            confidence y emotions, con probabilidades en escala 0-1
+        """
+        if not self.analysis_results:
+            return []
+        faces_data = self.analysis_results.get('faces_analysis')
+        if faces_data is None:
+            faces_data = self.analysis_results.get('faces')
+        
+        def to_unit(value):
+            value = float(value or 0)
+            return value / 100 if value > 1 else value
+        
+        faces = []
+        for face in faces_data or []:
+            if not isinstance(face, dict):
+                continue
+            box = face.get('coordinates') or face
+            emotions = face.get('all_emotions') or face.get('emotions') or {}
+            faces.append({
+                'x': int(box.get('x') or 0),
+                'y': int(box.get('y') or 0),
+                'width': int(box.get('width') or 0),
+                'height': int(box.get('height') or 0),
+                'dominant_emotion': face.get('dominant_emotion') or face.get('emotion') or '',
+                'confidence': to_unit(face.get('confidence')),
+                'emotions': {emotion: to_unit(emotions.get(emotion)) for emotion in EMOTION_KEYS},
+            })
+        return faces
+    
+    def statistics_delta(self):
+        """
+        Aporte de este análisis a los contadores de EmotionStatistics.
+        """
+        delta = {
+            'total_analyses': 1,
+            'total_faces_detected': self.faces_detected,
+            'confidence_sum': 0.0,
+            'confidence_count': 0,
+        }
+        for emotion in EMOTION_KEYS:
+            delta[f'{emotion}_count'] = 0
+        
+        for emotion, confidence in self.iter_faces():
+            if emotion in EMOTION_KEYS:
+                delta[f'{emotion}_count'] += 1
+            if confidence is not None:
+                delta['confidence_sum'] += confidence
+                delta['confidence_count'] += 1
+        
+        return delta
+    
     def save(self, *args, **kwargs):
         """
         Override del método save para calcular emoción dominante y confianza promedio.
         """
+        self.compute_summary()
+        super().save(*args, **kwargs)
+    
+    def compute_summary(self):
+        """
+        Calcula la emoción dominante y la confianza promedio desde analysis_results.
+        bulk_create no llama a save(): quien cree análisis en lote debe llamarlo antes.
+        """
         if self.analysis_results and 'faces_analysis' in self.analysis_results:
             faces_analysis = self.analysis_results['faces_analysis']
             
@@ -214,12 +365,11 @@ class EmotionAnalysis(models.Model):
                     # Obtener la más frecuente
                     self.dominant_emotion = max(emotion_count, key=emotion_count.get)
                 
-                # Calcular confianza promedio
-                confidences = [face.get('confidence', 0) for face in faces_analysis]
+                # Calcular confianza promedio (los rostros sin confianza no cuentan)
+                confidences = [face.get('confidence', 0) for face in faces_analysis
+                               if face.get('confidence', 0) is not None]
                 if confidences:
                     self.average_confidence = sum(confidences) / len(confidences)
-        
-        super().save(*args, **kwargs)
 
 
 class EmotionStatistics(models.Model):
@@ -273,6 +423,17 @@ class EmotionStatistics(models.Model):
         verbose_name='Rostros Promedio por Análisis'
     )
     
+    # Acumuladores para mantener el promedio de confianza de forma incremental
+    confidence_sum = models.FloatField(
+        default=0.0,
+        verbose_name='Suma de Confianzas'
+    )
+    
+    confidence_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Rostros con Confianza'
+    )
+    
     # Timestamps
     last_updated = models.DateTimeField(
         auto_now=True,
@@ -286,85 +447,148 @@ class EmotionStatistics(models.Model):
     def __str__(self):
         return f"Estadísticas de {self.user.username}"
     
-    def update_statistics(self):
+    # Campos que se derivan de los contadores
+    DERIVED_FIELDS = ['most_frequent_emotion', 'average_confidence', 'average_faces_per_analysis', 'last_updated']
+    
+    @classmethod
+    def countable_analyses(cls, user):
         """
-        Actualiza las estadísticas basadas en los análisis del usuario.
+        Análisis que cuentan en las estadísticas: los que no pasan por la cola
+        y los que ya terminaron su trabajo (completado o fallido).
         """
-        analyses = EmotionAnalysis.objects.filter(user=self.user)
-        
-        # Resetear contadores
-        self.total_analyses = analyses.count()
-        self.total_faces_detected = 0
-        
-        emotion_counts = {
-            'neutral': 0,
-            'happiness': 0,
-            'surprise': 0,
-            'sadness': 0,
-            'anger': 0,
-            'disgust': 0,
-            'fear': 0,
-            'contempt': 0
-        }
+        return EmotionAnalysis.objects.filter(user=user).filter(
+            Q(job__isnull=True) | Q(job__status__in=[AnalysisJob.Status.DONE, AnalysisJob.Status.FAILED])
+        )
+    
+    def refresh_derived(self):
+        """
+        Recalcula los campos derivados a partir de los contadores (sin consultar análisis).
+        """
+        emotion_counts = {emotion: getattr(self, f'{emotion}_count') for emotion in EMOTION_KEYS}
+        self.most_frequent_emotion = max(emotion_counts, key=emotion_counts.get)
+        self.average_confidence = (
+            self.confidence_sum / self.confidence_count if self.confidence_count else 0.0
+        )
+        self.average_faces_per_analysis = (
+            self.total_faces_detected / self.total_analyses if self.total_analyses else 0.0
+        )
+    
+    @classmethod
+    def _apply_delta(cls, user_id, delta, sign, create=True):
+        """
+        Suma (sign=1) o resta (sign=-1) el aporte de un análisis con incrementos atómicos F().
+        Debe llamarse dentro de una transacción.
+        """
+        if create:
+            cls.objects.get_or_create(user_id=user_id)
         
-        total_confidence = 0
-        confidence_count = 0
+        changes = {field: counter_change(field, sign * value) for field, value in delta.items() if value}
+        if not cls.objects.filter(user_id=user_id).update(**changes):
+            return None
         
+        # El UPDATE deja la fila bloqueada hasta el fin de la transacción: los campos
+        # derivados se calculan sobre contadores que nadie más puede modificar
+        stats = cls.objects.select_for_update().get(user_id=user_id)
+        stats.refresh_derived()
+        stats.save(update_fields=cls.DERIVED_FIELDS)
+        return stats
+    
+    @classmethod
+    def record_analysis(cls, analysis):
+        """
+        Suma un análisis a las estadísticas de su usuario y al resumen diario (idempotente).
+        """
+        with transaction.atomic():
+            # Marcar primero: si ya estaba contado no se suma dos veces
+            marked = EmotionAnalysis.objects.filter(
+                pk=analysis.pk, counted_in_statistics=False
+            ).update(counted_in_statistics=True)
+            if not marked:
+                return None
+            analysis.counted_in_statistics = True
+            DailyEmotionRollup.apply_analysis(analysis, 1)
+            return cls._apply_delta(analysis.user_id, analysis.statistics_delta(), 1)
+    
+    @classmethod
+    def record_created_analyses(cls, user_id, analyses):
+        """
+        Suma análisis recién creados con bulk_create (con counted_in_statistics=True):
+        un solo incremento F() por contador y uno por fila del resumen diario. Debe
+        llamarse en la misma transacción que los crea.
+        """
+        if not analyses:
+            return None
+        delta = {}
+        rollups = {}
         for analysis in analyses:
-            self.total_faces_detected += analysis.faces_detected
-            
-            # Intentar diferentes estructuras de datos
-            if analysis.analysis_results:
-                faces_data = None
-                
-                # Intentar con 'faces_analysis'
-                if 'faces_analysis' in analysis.analysis_results:
-                    faces_data = analysis.analysis_results['faces_analysis']
-                # Intentar con 'faces'
-                elif 'faces' in analysis.analysis_results:
-                    faces_data = analysis.analysis_results['faces']
-                # Si no hay estructura, usar dominant_emotion del analysis
-                elif analysis.dominant_emotion:
-                    if analysis.dominant_emotion in emotion_counts:
-                        emotion_counts[analysis.dominant_emotion] += analysis.faces_detected
-                    if analysis.average_confidence > 0:
-                        total_confidence += analysis.average_confidence * analysis.faces_detected
-                        confidence_count += analysis.faces_detected
-                    continue
-                
-                if faces_data:
-                    for face in faces_data:
-                        # Buscar emoción dominante en diferentes claves posibles
-                        emotion = face.get('dominant_emotion') or face.get('emotion')
-                        if emotion in emotion_counts:
-                            emotion_counts[emotion] += 1
-                        
-                        confidence = face.get('confidence', 0) * 100 if face.get('confidence', 0) < 1 else face.get('confidence', 0)
-                        total_confidence += confidence
-                        confidence_count += 1
-        
-        # Actualizar contadores individuales
-        self.neutral_count = emotion_counts['neutral']
-        self.happiness_count = emotion_counts['happiness']
-        self.surprise_count = emotion_counts['surprise']
-        self.sadness_count = emotion_counts['sadness']
-        self.anger_count = emotion_counts['anger']
-        self.disgust_count = emotion_counts['disgust']
-        self.fear_count = emotion_counts['fear']
-        self.contempt_count = emotion_counts['contempt']
-        
-        # Calcular emoción más frecuente
-        if emotion_counts:
-            self.most_frequent_emotion = max(emotion_counts, key=emotion_counts.get)
-        
-        # Calcular promedios
-        if confidence_count > 0:
-            self.average_confidence = total_confidence / confidence_count
-        
-        if self.total_analyses > 0:
-            self.average_faces_per_analysis = self.total_faces_detected / self.total_analyses
+            for field, value in analysis.statistics_delta().items():
+                delta[field] = delta.get(field, 0) + value
+            key = (timezone.localdate(analysis.created_at), analysis.dominant_emotion or '')
+            totals = rollups.setdefault(key, [0, 0, 0.0])
+            totals[0] += 1
+            totals[1] += analysis.faces_detected
+            totals[2] += analysis.average_confidence
+        for (date, emotion), (count, faces, confidence_sum) in rollups.items():
+            DailyEmotionRollup.apply_totals(user_id, date, emotion, count, faces, confidence_sum)
+        return cls._apply_delta(user_id, delta, 1)
+    
+    @classmethod
+    def discard_analysis(cls, analysis, deleted=False):
+        """
+        Resta un análisis de las estadísticas (al eliminarlo o antes de reprocesarlo).
         
-        self.save()
+        Args:
+            analysis: Análisis con los valores que se habían sumado
+            deleted: True si la fila ya fue eliminada (señal post_delete)
+        """
+        with transaction.atomic():
+            if deleted:
+                if not analysis.counted_in_statistics:
+                    return None
+            else:
+                unmarked = EmotionAnalysis.objects.filter(
+                    pk=analysis.pk, counted_in_statistics=True
+                ).update(counted_in_statistics=False)
+                if not unmarked:
+                    return None
+            analysis.counted_in_statistics = False
+            DailyEmotionRollup.apply_analysis(analysis, -1)
+            return cls._apply_delta(analysis.user_id, analysis.statistics_delta(), -1, create=False)
+    
+    def update_statistics(self):
+        """
+        Reconstruye las estadísticas desde cero recorriendo todos los análisis del usuario.
+        Es O(N) en el historial del usuario: solo para reparación (comando
+        rebuild_emotion_statistics y acción del admin). El flujo normal usa
+        record_analysis y discard_analysis.
+        """
+        with transaction.atomic():
+            # Mismo orden de bloqueo que record_analysis: primero análisis, luego estadísticas
+            analyses = EmotionAnalysis.objects.filter(user_id=self.user_id)
+            list(analyses.select_for_update().values_list('pk', flat=True))
+            
+            countable = self.countable_analyses(self.user_id)
+            countable.filter(counted_in_statistics=False).update(counted_in_statistics=True)
+            analyses.exclude(pk__in=countable.values('pk')).filter(
+                counted_in_statistics=True
+            ).update(counted_in_statistics=False)
+            
+            list(type(self).objects.select_for_update().filter(pk=self.pk).values_list('pk', flat=True))
+            
+            totals = {field: 0 for field in ['total_analyses', 'total_faces_detected', 'confidence_count']}
+            totals['confidence_sum'] = 0.0
+            for emotion in EMOTION_KEYS:
+                totals[f'{emotion}_count'] = 0
+            
+            fields = ['faces_detected', 'analysis_results', 'dominant_emotion', 'average_confidence']
+            for analysis in countable.only(*fields).iterator(chunk_size=500):
+                for field, value in analysis.statistics_delta().items():
+                    totals[field] += value
+            
+            for field, value in totals.items():
+                setattr(self, field, value)
+            self.refresh_derived()
+            self.save()
     
     def get_emotion_distribution_dict(self):
         """
@@ -387,3 +611,632 @@ class EmotionStatistics(models.Model):
             'Miedo': round((self.fear_count / total) * 100, 2),
             'Desprecio': round((self.contempt_count / total) * 100, 2),
         }
+
+
+class AnalysisJob(models.Model):
+    """
+    Trabajo en cola para procesar un análisis de emociones fuera del ciclo de la petición.
+    Los workers (comando run_emotion_workers) reclaman los trabajos pendientes de la base de datos.
+    """
+    
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Pendiente'
+        RUNNING = 'running', 'En Proceso'
+        DONE = 'done', 'Completado'
+        FAILED = 'failed', 'Fallido'
+    
+    # Cada trabajo procesa un análisis de imagen o un video
+    analysis = models.OneToOneField(
+        EmotionAnalysis,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='job',
+        verbose_name='Análisis'
+    )
+    
+    video = models.OneToOneField(
+        'VideoAnalysis',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='job',
+        verbose_name='Video'
+    )
+    
+    status = models.CharField(
+        max_length=10,
+        choices=Status.choices,
+        default=Status.PENDING,
+        verbose_name='Estado'
+    )
+    
+    # Reintentos
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Intentos'
+    )
+    
+    max_attempts = models.PositiveSmallIntegerField(
+        default=3,
+        verbose_name='Máximo de Intentos'
+    )
+    
+    available_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Disponible Desde',
+        help_text='Momento a partir del cual un worker puede tomar el trabajo'
+    )
+    
+    lease_expires_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        verbose_name='Vencimiento de la Reserva',
+        help_text='Si el worker no termina antes de esta fecha, el trabajo se puede reintentar'
+    )
+    
+    worker = models.CharField(
+        max_length=100,
+        blank=True,
+        verbose_name='Worker'
+    )
+    
+    error = models.TextField(
+        blank=True,
+        verbose_name='Último Error'
+    )
+    
+    # Tiempos del trabajo
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Fecha de Encolado'
+    )
+    
+    started_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        verbose_name='Fecha de Inicio'
+    )
+    
+    finished_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        verbose_name='Fecha de Finalización'
+    )
+    
+    queue_time = models.FloatField(
+        default=0.0,
+        verbose_name='Tiempo en Cola (segundos)'
+    )
+    
+    run_time = models.FloatField(
+        default=0.0,
+        verbose_name='Tiempo de Ejecución (segundos)'
+    )
+    
+    class Meta:
+        verbose_name = 'Trabajo de Análisis'
+        verbose_name_plural = 'Trabajos de Análisis'
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'available_at']),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                condition=Q(analysis__isnull=False, video__isnull=True) | Q(analysis__isnull=True, video__isnull=False),
+                name='emotion_job_single_target'
+            ),
+        ]
+    
+    def __str__(self):
+        if self.video_id:
+            return f"Trabajo #{self.pk} ({self.get_status_display()}) - Video {self.video_id}"
+        return f"Trabajo #{self.pk} ({self.get_status_display()}) - Análisis {self.analysis_id}"
+    
+    @property
+    def is_finished(self):
+        return self.status in (self.Status.DONE, self.Status.FAILED)
+
+
+class FaceDetection(models.Model):
+    """
+    Rostro detectado en un análisis, con sus probabilidades en columnas indexables.
+    
+    Permite consultas de analítica en SQL sin deserializar analysis_results, por ejemplo:
+        FaceDetection.objects.filter(fear__gt=0.6, created_at__gte=hace_una_semana)
+    """
+    
+    analysis = models.ForeignKey(
+        EmotionAnalysis,
+        on_delete=models.CASCADE,
+        related_name='face_detections',
+        verbose_name='Análisis'
+    )
+    
+    # Copias del análisis para filtrar sin JOIN
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='face_detections',
+        verbose_name='Usuario'
+    )
+    
+    created_at = models.DateTimeField(
+        verbose_name='Fecha del Análisis'
+    )
+    
+    face_index = models.PositiveSmallIntegerField(
+        default=1,
+        verbose_name='Número de Rostro'
+    )
+    
+    # Ubicación del rostro en la imagen
+    x = models.PositiveIntegerField(default=0)
+    y = models.PositiveIntegerField(default=0)
+    width = models.PositiveIntegerField(default=0)
+    height = models.PositiveIntegerField(default=0)
+    
+    dominant_emotion = models.CharField(
+        max_length=20,
+        blank=True,
+        verbose_name='Emoción Dominante'
+    )
+    
+    confidence = models.FloatField(
+        default=0.0,
+        verbose_name='Confianza (0-1)'
+    )
+    
+    # Probabilidad de cada emoción (0-1)
+    neutral = models.FloatField(default=0.0)
+    happiness = models.FloatField(default=0.0)
+    surprise = models.FloatField(default=0.0)
+    sadness = models.FloatField(default=0.0)
+    anger = models.FloatField(default=0.0)
+    disgust = models.FloatField(default=0.0)
+    fear = models.FloatField(default=0.0)
+    contempt = models.FloatField(default=0.0)
+    
+    class Meta:
+        verbose_name = 'Rostro Detectado'
+        verbose_name_plural = 'Rostros Detectados'
+        ordering = ['-created_at', 'face_index']
+        indexes = [
+            models.Index(fields=['user', '-created_at']),
+            models.Index(fields=['dominant_emotion', '-created_at']),
+            models.Index(fields=['created_at']),
+        ] + [
+            # Índices parciales pequeños: solo rostros donde la emoción es fuerte
+            models.Index(
+                fields=['-created_at', emotion],
+                condition=Q(**{f'{emotion}__gte': STRONG_EMOTION_THRESHOLD}),
+                name=f'face_strong_{emotion}_idx'
+            )
+            for emotion in EMOTION_KEYS
+        ]
+    
+    def __str__(self):
+        return f"Rostro {self.face_index} del análisis {self.analysis_id} ({self.dominant_emotion})"
+    
+    @classmethod
+    def build_for_analysis(cls, analysis):
+        """
+        Crea (sin guardar) los rostros normalizados de un análisis.
+        """
+        detections = []
+        for index, face in enumerate(analysis.get_face_results(), start=1):
+            detections.append(cls(
+                analysis_id=analysis.pk,
+                user_id=analysis.user_id,
+                created_at=analysis.created_at,
+                face_index=index,
+                x=max(0, face['x']),
+                y=max(0, face['y']),
+                width=max(0, face['width']),
+                height=max(0, face['height']),
+                dominant_emotion=face['dominant_emotion'][:20],
+                confidence=face['confidence'],
+                **face['emotions']
+            ))
+        return detections
+    
+    @classmethod
+    def replace_for_analysis(cls, analysis):
+        """
+        Reemplaza los rostros guardados de un análisis por los de sus resultados actuales.
+        """
+        with transaction.atomic():
+            cls.objects.filter(analysis_id=analysis.pk).delete()
+            return cls.objects.bulk_create(cls.build_for_analysis(analysis))
+
+
+class DailyEmotionRollup(models.Model):
+    """
+    Resumen diario por usuario y emoción dominante, mantenido de forma incremental.
+    Alimenta los gráficos y contadores de la vista de estadísticas sin recorrer análisis.
+    """
+    
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='daily_emotion_rollups',
+        verbose_name='Usuario'
+    )
+    
+    # Fecha local (TIME_ZONE) del análisis
+    date = models.DateField(
+        verbose_name='Fecha'
+    )
+    
+    # Emoción dominante del análisis (vacía si no se determinó)
+    emotion = models.CharField(
+        max_length=20,
+        blank=True,
+        verbose_name='Emoción'
+    )
+    
+    analyses = models.IntegerField(
+        default=0,
+        verbose_name='Análisis'
+    )
+    
+    faces = models.IntegerField(
+        default=0,
+        verbose_name='Rostros'
+    )
+    
+    confidence_sum = models.FloatField(
+        default=0.0,
+        verbose_name='Suma de Confianza Promedio'
+    )
+    
+    class Meta:
+        verbose_name = 'Resumen Diario de Emociones'
+        verbose_name_plural = 'Resúmenes Diarios de Emociones'
+        ordering = ['-date', 'emotion']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'date', 'emotion'], name='unique_daily_emotion_rollup'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user_id} {self.date} {self.emotion or '-'}: {self.analyses}"
+    
+    @classmethod
+    def apply_analysis(cls, analysis, sign):
+        """
+        Suma (sign=1) o resta (sign=-1) un análisis en la fila de su día y emoción.
+        Se llama desde EmotionStatistics.record_analysis/discard_analysis, dentro de su transacción.
+        """
+        cls.apply_totals(
+            analysis.user_id, timezone.localdate(analysis.created_at), analysis.dominant_emotion or '',
+            sign, sign * analysis.faces_detected, sign * analysis.average_confidence
+        )
+    
+    @classmethod
+    def apply_totals(cls, user_id, date, emotion, analyses, faces, confidence_sum):
+        """
+        Suma (o resta, con valores negativos) varios análisis a la fila de un día y emoción
+        con un único UPDATE.
+        """
+        if analyses > 0:
+            cls.objects.get_or_create(user_id=user_id, date=date, emotion=emotion)
+        cls.objects.filter(user_id=user_id, date=date, emotion=emotion).update(
+            analyses=counter_change('analyses', analyses),
+            faces=counter_change('faces', faces),
+            confidence_sum=counter_change('confidence_sum', confidence_sum),
+        )
+
+
+class VideoAnalysis(models.Model):
+    """
+    Análisis de un video subido. En lugar de un EmotionAnalysis por frame se guarda una
+    línea de tiempo compacta con un registro por segundo (ver services/video_analysis.py).
+    """
+    
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='video_analyses',
+        verbose_name='Usuario'
+    )
+    
+    video = models.FileField(
+        upload_to='emotion_videos/%Y/%m/%d/',
+        verbose_name='Video'
+    )
+    
+    notes = models.TextField(
+        blank=True,
+        verbose_name='Notas',
+        help_text='Notas adicionales sobre el video'
+    )
+    
+    # Propiedades del video
+    duration = models.FloatField(
+        default=0.0,
+        verbose_name='Duración (segundos)'
+    )
+    
+    fps = models.FloatField(
+        default=0.0,
+        verbose_name='Frames por Segundo'
+    )
+    
+    width = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Ancho'
+    )
+    
+    height = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Alto'
+    )
+    
+    # Resultados
+    frames_sampled = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Frames Analizados'
+    )
+    
+    faces_detected = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Rostros Detectados',
+        help_text='Detecciones en todos los frames analizados'
+    )
+    
+    tracks_detected = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Personas Seguidas',
+        help_text='Rostros distintos según el seguimiento entre frames'
+    )
+    
+    dominant_emotion = models.CharField(
+        max_length=20,
+        blank=True,
+        null=True,
+        verbose_name='Emoción Dominante'
+    )
+    
+    average_confidence = models.FloatField(
+        default=0.0,
+        verbose_name='Confianza Promedio (%)'
+    )
+    
+    # Un registro por segundo: {'second', 'faces', 'dominant_emotion', 'emotions'}
+    # ('emotions' son las probabilidades promedio en el orden de EMOTION_KEYS)
+    timeline = models.JSONField(
+        default=list,
+        verbose_name='Línea de Tiempo'
+    )
+    
+    # Resumen por persona seguida: {'id', 'start', 'end', 'frames', 'dominant_emotion'}
+    tracks = models.JSONField(
+        default=list,
+        verbose_name='Seguimiento de Rostros'
+    )
+    
+    progress = models.FloatField(
+        default=0.0,
+        verbose_name='Progreso (%)'
+    )
+    
+    processing_time = models.FloatField(
+        default=0.0,
+        verbose_name='Tiempo de Procesamiento (segundos)'
+    )
+    
+    # Segundos de video procesados por segundo de cálculo (>1: más rápido que tiempo real)
+    realtime_factor = models.FloatField(
+        default=0.0,
+        verbose_name='Velocidad (x tiempo real)'
+    )
+    
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Fecha de Creación'
+    )
+    
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Fecha de Actualización'
+    )
+    
+    class Meta:
+        verbose_name = 'Análisis de Video'
+        verbose_name_plural = 'Análisis de Videos'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at']),
+        ]
+    
+    def __str__(self):
+        return f"Video de {self.user.username} - {self.created_at.strftime('%Y-%m-%d %H:%M')}"
+    
+    def get_dominant_emotion_display(self):
+        if self.dominant_emotion:
+            return EMOTION_TRANSLATIONS.get(self.dominant_emotion, self.dominant_emotion.title())
+        return "No detectada"
+    
+    def get_emotion_distribution(self):
+        """
+        Porcentaje de cada emoción ponderado por rostros y segundos de la línea de tiempo.
+        """
+        totals = [0.0] * len(EMOTION_KEYS)
+        for row in self.timeline:
+            for index, probability in enumerate(row['emotions']):
+                totals[index] += probability * row['faces']
+        
+        total = sum(totals)
+        if not total:
+            return {}
+        return {
+            EMOTION_TRANSLATIONS[emotion]: round(value / total * 100, 2)
+            for emotion, value in zip(EMOTION_KEYS, totals)
+        }
+
+
+class RealtimeRecording(models.Model):
+    """
+    Sesión de análisis en tiempo real grabada automáticamente (cámara del navegador o
+    cámara del servidor). Guarda los agregados de la sesión; la línea de tiempo por
+    segundo se escribe por tramos en RealtimeTimelineChunk (ver services/session_recorder.py).
+    """
+    
+    class Source(models.TextChoices):
+        BROWSER = 'browser', 'Cámara del navegador'
+        SERVER = 'server', 'Cámara del servidor'
+    
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='realtime_recordings',
+        verbose_name='Usuario'
+    )
+    
+    source = models.CharField(
+        max_length=10,
+        choices=Source.choices,
+        default=Source.BROWSER,
+        verbose_name='Origen'
+    )
+    
+    camera = models.CharField(
+        max_length=64,
+        blank=True,
+        verbose_name='Cámara',
+        help_text='Clave de la cámara del servidor'
+    )
+    
+    started_at = models.DateTimeField(
+        verbose_name='Inicio'
+    )
+    
+    ended_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Fin',
+        help_text='Vacío mientras la sesión sigue activa'
+    )
+    
+    duration = models.FloatField(
+        default=0.0,
+        verbose_name='Duración (segundos)'
+    )
+    
+    # Agregados de la sesión (se actualizan en cada escritura por lotes)
+    frames_analyzed = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Frames Analizados'
+    )
+    
+    faces_detected = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Rostros Detectados',
+        help_text='Detecciones en todos los frames analizados'
+    )
+    
+    seconds_with_faces = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Segundos con Rostros'
+    )
+    
+    # Suma de las probabilidades de todos los rostros, en el orden de EMOTION_KEYS
+    emotion_totals = models.JSONField(
+        default=list,
+        verbose_name='Totales por Emoción'
+    )
+    
+    dominant_emotion = models.CharField(
+        max_length=20,
+        blank=True,
+        null=True,
+        verbose_name='Emoción Dominante'
+    )
+    
+    average_confidence = models.FloatField(
+        default=0.0,
+        verbose_name='Confianza Promedio (%)'
+    )
+    
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Fecha de Actualización'
+    )
+    
+    class Meta:
+        verbose_name = 'Sesión en Tiempo Real'
+        verbose_name_plural = 'Sesiones en Tiempo Real'
+        ordering = ['-started_at']
+        indexes = [
+            models.Index(fields=['user', '-started_at']),
+        ]
+    
+    def __str__(self):
+        return f"Sesión de {self.user.username} - {self.started_at.strftime('%Y-%m-%d %H:%M')}"
+    
+    @property
+    def is_active(self):
+        return self.ended_at is None
+    
+    @property
+    def timeline(self):
+        """
+        Línea de tiempo completa (mismo formato que VideoAnalysis.timeline), uniendo los tramos.
+        """
+        rows = []
+        for chunk in self.chunks.order_by('start_second').only('rows'):
+            rows.extend(chunk.rows)
+        return rows
+    
+    def get_dominant_emotion_display(self):
+        if self.dominant_emotion:
+            return EMOTION_TRANSLATIONS.get(self.dominant_emotion, self.dominant_emotion.title())
+        return "No detectada"
+    
+    def get_emotion_distribution(self):
+        """
+        Porcentaje de cada emoción sobre todos los rostros de la sesión.
+        """
+        total = sum(self.emotion_totals)
+        if not total:
+            return {}
+        return {
+            EMOTION_TRANSLATIONS[emotion]: round(value / total * 100, 2)
+            for emotion, value in zip(EMOTION_KEYS, self.emotion_totals)
+        }
+
+
+class RealtimeTimelineChunk(models.Model):
+    """
+    Tramo de la línea de tiempo de una sesión en tiempo real: los segundos acumulados
+    entre dos escrituras por lotes, en una sola fila.
+    """
+    
+    recording = models.ForeignKey(
+        RealtimeRecording,
+        on_delete=models.CASCADE,
+        related_name='chunks',
+        verbose_name='Sesión'
+    )
+    
+    start_second = models.PositiveIntegerField(
+        verbose_name='Segundo Inicial'
+    )
+    
+    end_second = models.PositiveIntegerField(
+        verbose_name='Segundo Final'
+    )
+    
+    # Un registro por segundo con rostros: {'second', 'faces', 'dominant_emotion', 'emotions'}
+    rows = models.JSONField(
+        default=list,
+        verbose_name='Registros'
+    )
+    
+    class Meta:
+        verbose_name = 'Tramo de Sesión en Tiempo Real'
+        verbose_name_plural = 'Tramos de Sesiones en Tiempo Real'
+        ordering = ['recording', 'start_second']
+    
+    def __str__(self):
+        return f"Sesión {self.recording_id}: segundos {self.start_second}-{self.end_second}"
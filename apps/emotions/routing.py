@@ -0,0 +1,20 @@
+"""
+Rutas WebSocket de la aplicación de detección de emociones.
+"""
+from apps.emotions.consumers import EmotionStreamConsumer
+
+websocket_urlpatterns = {
+    '/ws/emotions/stream/': EmotionStreamConsumer.as_asgi,
+}
+
+
+async def websocket_application(scope, receive, send):
+    """
+    Despacha las conexiones WebSocket según la ruta; rechaza las rutas desconocidas.
+    """
+    handler = websocket_urlpatterns.get(scope['path'])
+    if handler is None:
+        await receive()
+        await send({'type': 'websocket.close', 'code': 4404})
+        return
+    await handler(scope, receive, send)
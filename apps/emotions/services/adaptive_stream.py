@@ -0,0 +1,186 @@
+"""
+Stream MJPEG adaptativo: cada cliente recibe el nivel (resolución, calidad JPEG y FPS)
+que alcanza a consumir.
+
+Mientras el servidor escribe un frame en el socket, el generador del stream queda
+suspendido; si el cliente no vacía la conexión, esa escritura se bloquea. La fracción
+del tiempo que el stream pasa bloqueado escribiendo (carga) indica si el cliente da
+abasto: con carga alta baja un nivel, y con carga baja sostenida sube uno. Los frames
+de cada nivel se codifican una sola vez por cámara y los comparten todos sus clientes.
+"""
+import asyncio
+import time
+from collections import namedtuple
+from typing import AsyncIterator, Callable, Iterator, List, Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+# Nivel del stream: ancho máximo (px), calidad JPEG (0-100) y FPS máximos
+StreamTier = namedtuple('StreamTier', 'max_width quality fps')
+
+DEFAULT_STREAM_TIERS = [
+    (1280, 80, 30),
+    (960, 70, 20),
+    (640, 60, 12),
+    (480, 50, 8),
+    (320, 40, 4),
+]
+
+
+def load_tiers() -> List[StreamTier]:
+    """
+    Niveles configurados en EMOTION_STREAM_TIERS, del mejor al peor.
+    """
+    tiers = getattr(settings, 'EMOTION_STREAM_TIERS', DEFAULT_STREAM_TIERS)
+    return [StreamTier(int(width), int(quality), float(fps)) for width, quality, fps in tiers]
+
+
+class AdaptiveRate:
+    """
+    Nivel de un cliente del stream según cuánto tarda en recibir los frames.
+
+    Args:
+        tiers: Niveles disponibles, del mejor al peor
+        tier: Nivel inicial (por defecto EMOTION_STREAM_START_TIER)
+        fixed: Si es True el nivel no cambia (cliente que pidió uno concreto)
+        window: Segundos de cada medición de carga
+        high_load: Carga a partir de la cual se baja de nivel
+        low_load: Carga por debajo de la cual se intenta subir
+        upgrade_after: Segundos mínimos desde el último cambio antes de subir
+    """
+
+    def __init__(self, tiers: List[StreamTier], tier: Optional[int] = None, fixed: bool = False,
+                 window: float = 2.0, high_load: float = 0.6, low_load: float = 0.2,
+                 upgrade_after: float = 6.0):
+        self.tiers = tiers
+        if tier is None:
+            tier = getattr(settings, 'EMOTION_STREAM_START_TIER', 1)
+        self.tier = min(max(0, tier), len(tiers) - 1)
+        self.fixed = fixed
+        self.window = window
+        self.high_load = high_load
+        self.low_load = low_load
+        self.upgrade_after = upgrade_after
+
+        now = time.monotonic()
+        self._window_start = now
+        self._window_blocked = 0.0
+        self._window_bytes = 0
+        self._last_change = now
+
+        # Totales del cliente
+        self.frames = 0
+        self.bytes = 0
+        self.load = 0.0
+        self.drain_rate = 0.0  # Bytes por segundo que vacía el cliente mientras escribimos
+
+    @property
+    def frame_interval(self) -> float:
+        return 1.0 / self.tiers[self.tier].fps
+
+    def record(self, nbytes: int, blocked: float, now: Optional[float] = None):
+        """
+        Registra un frame enviado: su tamaño y cuánto tardó en escribirse.
+        """
+        now = time.monotonic() if now is None else now
+        self.frames += 1
+        self.bytes += nbytes
+        self._window_bytes += nbytes
+        self._window_blocked += blocked
+
+        elapsed = now - self._window_start
+        if elapsed < self.window:
+            return
+
+        self.load = min(1.0, self._window_blocked / elapsed)
+        if self._window_blocked > 0:
+            self.drain_rate = self._window_bytes / self._window_blocked
+        self._window_start = now
+        self._window_blocked = 0.0
+        self._window_bytes = 0
+        if not self.fixed:
+            self._adapt(now)
+
+    def _adapt(self, now: float):
+        if self.load > self.high_load and self.tier < len(self.tiers) - 1:
+            self.tier += 1
+            self._last_change = now
+            return
+
+        if self.tier == 0 or now - self._last_change < self.upgrade_after:
+            return
+        # Subir solo si la carga estimada del nivel superior sigue siendo aceptable
+        current, better = self.tiers[self.tier], self.tiers[self.tier - 1]
+        growth = (better.fps * better.max_width ** 2) / (current.fps * current.max_width ** 2)
+        if self.load < self.low_load and self.load * growth < self.high_load:
+            self.tier -= 1
+            self._last_change = now
+
+    def stats(self) -> dict:
+        tier = self.tiers[self.tier]
+        return {
+            'tier': self.tier,
+            'max_width': tier.max_width,
+            'quality': tier.quality,
+            'fps': tier.fps,
+            'frames': self.frames,
+            'bytes': self.bytes,
+            'load': self.load,
+            'drain_rate': self.drain_rate,
+        }
+
+
+def adaptive_frames(camera, rate: AdaptiveRate, alive: Callable[[], bool]) -> Iterator[bytes]:
+    """
+    Frames JPEG de la cámara al ritmo y nivel del cliente. Mide cuánto tarda quien
+    consume el generador en pedir el siguiente frame (la escritura en el socket) y
+    se lo pasa a rate para adaptar el nivel.
+
+    Args:
+        camera: Cámara con next_frame(after_seq, timeout, tier)
+        rate: Estado adaptativo del cliente
+        alive: Función que devuelve False cuando el stream debe terminar
+    """
+    last_seq = 0
+    next_due = 0.0
+    while alive():
+        wait = next_due - time.monotonic()
+        if wait > 0:
+            # Los frames que llegan mientras tanto se saltan: se envía el más reciente
+            time.sleep(wait)
+
+        last_seq, jpeg = camera.next_frame(last_seq, timeout=1.0, tier=rate.tier)
+        if jpeg is None:
+            continue
+
+        sent = time.monotonic()
+        yield jpeg
+        rate.record(len(jpeg), time.monotonic() - sent)
+        next_due = sent + rate.frame_interval
+
+
+async def adaptive_frames_async(camera, rate: AdaptiveRate,
+                                alive: Callable[[], bool]) -> AsyncIterator[bytes]:
+    """
+    Variante de adaptive_frames para servidores ASGI. La espera del frame corre en un
+    hilo y el tiempo bloqueado se mide alrededor del yield: Django no pide el frame
+    siguiente hasta que termina el await send() del anterior, que queda esperando
+    mientras el cliente no vacía el socket.
+    """
+    next_frame = sync_to_async(camera.next_frame, thread_sensitive=False)
+    last_seq = 0
+    next_due = 0.0
+    while alive():
+        wait = next_due - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+        last_seq, jpeg = await next_frame(last_seq, timeout=1.0, tier=rate.tier)
+        if jpeg is None:
+            continue
+
+        sent = time.monotonic()
+        yield jpeg
+        rate.record(len(jpeg), time.monotonic() - sent)
+        next_due = sent + rate.frame_interval
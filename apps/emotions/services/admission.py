@@ -0,0 +1,327 @@
+"""
+Control de admisión y descarte de carga para la inferencia.
+
+Limita cuántas inferencias se ejecutan a la vez y cuántas pueden esperar turno.
+Las peticiones esperan en una cola con prioridad (tiempo real antes que análisis
+interactivo, e interactivo antes que procesamiento masivo). Cuando la cola está
+llena se rechaza rápido con un Retry-After estimado, en lugar de acumular
+peticiones dentro del detector.
+"""
+import asyncio
+import heapq
+import itertools
+import math
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+
+from django.conf import settings
+
+from apps.emotions.services import metrics
+
+
+# Prioridades (menor número = más prioritario)
+PRIORITY_REALTIME = 0
+PRIORITY_INTERACTIVE = 1
+PRIORITY_BULK = 2
+
+PRIORITY_NAMES = {
+    PRIORITY_REALTIME: 'realtime',
+    PRIORITY_INTERACTIVE: 'interactive',
+    PRIORITY_BULK: 'bulk',
+}
+
+# Estados de una petición en espera
+_WAITING = 'waiting'
+_GRANTED = 'granted'
+_REJECTED = 'rejected'
+_CANCELLED = 'cancelled'
+
+
+class AdmissionRejected(Exception):
+    """
+    La petición no fue admitida: cola llena, tiempo de espera agotado o desplazada
+    por una petición de mayor prioridad.
+    """
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(f"Servicio saturado ({reason}), reintentar en {retry_after}s")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    """
+    Petición en cola. Se despierta con un Event (hilos) o un Future (event loop).
+    """
+    __slots__ = ('priority', 'enqueued_at', 'state', 'event', 'loop', 'future')
+
+    def __init__(self, priority, loop=None):
+        self.priority = priority
+        self.enqueued_at = time.monotonic()
+        self.state = _WAITING
+        self.loop = loop
+        if loop is None:
+            self.event = threading.Event()
+            self.future = None
+        else:
+            self.event = None
+            self.future = loop.create_future()
+
+    def wake(self):
+        if self.event is not None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(self._resolve)
+
+    def _resolve(self):
+        if not self.future.done():
+            self.future.set_result(None)
+
+
+class AdmissionController:
+    """
+    Limitador de concurrencia con cola de espera acotada y prioridades.
+    """
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int, max_wait: float):
+        self.name = name
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max(0, max_queue)
+        self.max_wait = max_wait
+
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._queue = []  # heap de (prioridad, orden, waiter)
+        self._queued = 0
+        self._order = itertools.count()
+
+        # Métricas
+        self._admitted = 0
+        self._rejected = {'queue_full': 0, 'timeout': 0, 'evicted': 0}
+        self._wait_times = deque(maxlen=1000)
+        self._service_time_avg = 0.05
+
+    # ------------------------------------------------------------------
+    # Operaciones internas (siempre con self._lock tomado)
+    # ------------------------------------------------------------------
+
+    def _retry_after(self) -> int:
+        pending = self._queued + 1
+        return max(1, math.ceil(self._service_time_avg * pending / self.max_concurrent))
+
+    def _reject(self, reason: str):
+        self._rejected[reason] += 1
+        raise AdmissionRejected(reason, self._retry_after())
+
+    def _try_admit(self, priority):
+        """
+        Admite de inmediato si hay capacidad y nadie espera.
+        Si no, verifica que haya lugar en la cola (o desplaza a alguien menos prioritario).
+
+        Returns:
+            True si quedó admitido; False si debe esperar en la cola
+        """
+        if self._in_flight < self.max_concurrent and self._queued == 0:
+            self._in_flight += 1
+            self._admitted += 1
+            self._wait_times.append(0.0)
+            return True
+
+        if self._queued >= self.max_queue:
+            self._evict_lower_priority(priority)
+
+        return False
+
+    def _evict_lower_priority(self, priority):
+        """
+        Con la cola llena, una petición más prioritaria desplaza a la menos prioritaria
+        en espera (la más reciente entre las de peor prioridad). Si no hay ninguna
+        menos prioritaria, se rechaza la nueva petición.
+        """
+        victim = None
+        for entry in self._queue:
+            waiter = entry[2]
+            if waiter.state != _WAITING or waiter.priority <= priority:
+                continue
+            if victim is None or (entry[0], entry[1]) > (victim[0], victim[1]):
+                victim = entry
+
+        if victim is None:
+            self._reject('queue_full')
+
+        victim[2].state = _REJECTED
+        self._queued -= 1
+        self._rejected['evicted'] += 1
+        victim[2].wake()
+
+    def _enqueue(self, waiter):
+        heapq.heappush(self._queue, (waiter.priority, next(self._order), waiter))
+        self._queued += 1
+
+    def _finish_wait(self, waiter):
+        """
+        Resuelve el resultado de una espera (admitida, desplazada o agotada).
+        """
+        if waiter.state == _GRANTED:
+            self._wait_times.append(time.monotonic() - waiter.enqueued_at)
+            return
+        if waiter.state == _REJECTED:
+            raise AdmissionRejected('evicted', self._retry_after())
+        waiter.state = _CANCELLED
+        self._queued -= 1
+        self._reject('timeout')
+
+    # ------------------------------------------------------------------
+    # API pública
+    # ------------------------------------------------------------------
+
+    def acquire(self, priority: int = PRIORITY_INTERACTIVE, timeout: float = None):
+        """
+        Espera (bloqueando el hilo) un turno de inferencia.
+
+        Raises:
+            AdmissionRejected: Si la petición no puede ser admitida
+        """
+        timeout = self.max_wait if timeout is None else timeout
+        with self._lock:
+            if self._try_admit(priority):
+                return
+            waiter = _Waiter(priority)
+            self._enqueue(waiter)
+
+        waiter.event.wait(timeout)
+
+        with self._lock:
+            self._finish_wait(waiter)
+
+    async def aacquire(self, priority: int = PRIORITY_INTERACTIVE, timeout: float = None):
+        """
+        Variante para el event loop: espera el turno sin ocupar un hilo.
+        """
+        timeout = self.max_wait if timeout is None else timeout
+        with self._lock:
+            if self._try_admit(priority):
+                return
+            waiter = _Waiter(priority, loop=asyncio.get_running_loop())
+            self._enqueue(waiter)
+
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout)
+        except asyncio.TimeoutError:
+            pass
+        except asyncio.CancelledError:
+            # El cliente se desconectó mientras esperaba: no perder el turno
+            with self._lock:
+                granted = waiter.state == _GRANTED
+                if waiter.state == _WAITING:
+                    waiter.state = _CANCELLED
+                    self._queued -= 1
+            if granted:
+                self.release()
+            raise
+
+        with self._lock:
+            self._finish_wait(waiter)
+
+    def try_acquire(self, priority: int = PRIORITY_REALTIME) -> bool:
+        """
+        Admite solo si hay capacidad inmediata (sin esperar ni contar rechazo).
+        Útil para tareas periódicas que simplemente omiten un ciclo.
+        """
+        with self._lock:
+            if self._in_flight < self.max_concurrent and self._queued == 0:
+                self._in_flight += 1
+                self._admitted += 1
+                return True
+            return False
+
+    def release(self, service_time: float = None):
+        """
+        Libera el turno y lo cede a la petición en espera más prioritaria.
+        """
+        with self._lock:
+            if service_time is not None:
+                # Media móvil exponencial del tiempo de servicio
+                self._service_time_avg = 0.9 * self._service_time_avg + 0.1 * service_time
+
+            while self._queue:
+                _, _, waiter = heapq.heappop(self._queue)
+                if waiter.state != _WAITING:
+                    continue
+                waiter.state = _GRANTED
+                self._queued -= 1
+                self._admitted += 1
+                waiter.wake()
+                return
+
+            self._in_flight -= 1
+
+    @contextmanager
+    def slot(self, priority: int = PRIORITY_INTERACTIVE, timeout: float = None):
+        """
+        Context manager: with admission.slot(PRIORITY_REALTIME): ...
+        """
+        self.acquire(priority, timeout)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - start)
+
+    @asynccontextmanager
+    async def aslot(self, priority: int = PRIORITY_INTERACTIVE, timeout: float = None):
+        """
+        Context manager asíncrono: async with admission.aslot(...): ...
+        """
+        await self.aacquire(priority, timeout)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - start)
+
+    def pressure(self) -> float:
+        """
+        Inferencias en curso y en espera por cada lugar de ejecución (más de 1 = hay cola).
+        """
+        with self._lock:
+            return (self._in_flight + self._queued) / self.max_concurrent
+
+    def snapshot(self) -> dict:
+        """
+        Métricas actuales: longitud de cola, rechazos y tiempos de espera.
+        """
+        with self._lock:
+            waits = sorted(self._wait_times)
+            queued_by_priority = {name: 0 for name in PRIORITY_NAMES.values()}
+            for _, _, waiter in self._queue:
+                if waiter.state == _WAITING:
+                    queued_by_priority[PRIORITY_NAMES.get(waiter.priority, str(waiter.priority))] += 1
+
+            return {
+                'max_concurrent': self.max_concurrent,
+                'max_queue': self.max_queue,
+                'in_flight': self._in_flight,
+                'queue_length': self._queued,
+                'queue_by_priority': queued_by_priority,
+                'admitted_total': self._admitted,
+                'rejected_total': sum(self._rejected.values()),
+                'rejected': dict(self._rejected),
+                'wait_ms_avg': round(1000 * sum(waits) / len(waits), 2) if waits else 0.0,
+                'wait_ms_p95': round(1000 * waits[int(0.95 * (len(waits) - 1))], 2) if waits else 0.0,
+                'wait_ms_max': round(1000 * waits[-1], 2) if waits else 0.0,
+                'service_ms_avg': round(1000 * self._service_time_avg, 2),
+            }
+
+
+# Instancia global que protege al detector de emociones
+inference_admission = AdmissionController(
+    name='inference',
+    max_concurrent=getattr(settings, 'EMOTION_ADMISSION_MAX_CONCURRENT', 4),
+    max_queue=getattr(settings, 'EMOTION_ADMISSION_MAX_QUEUE', 32),
+    max_wait=getattr(settings, 'EMOTION_ADMISSION_MAX_WAIT', 5.0),
+)
+
+metrics.register('admission', inference_admission.snapshot)
@@ -0,0 +1,430 @@
+"""
+Cola de trabajos en base de datos para el análisis de imágenes y videos subidos.
+
+La vista de subida solo guarda el archivo y encola un AnalysisJob. Los workers
+(comando `run_emotion_workers`) reclaman los trabajos con SELECT ... FOR UPDATE
+SKIP LOCKED, ejecutan la detección y guardan los resultados.
+"""
+import os
+import signal
+import socket
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from datetime import timedelta
+from typing import Optional
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.emotions.models import (
+    AnalysisJob, EmotionAnalysis, EmotionStatistics, FaceDetection, VideoAnalysis
+)
+
+
+# Clave del bloqueo consultivo (PostgreSQL) que serializa el conteo de EMOTION_JOB_MAX_RUNNING
+CLAIM_LOCK_KEY = 0x656D6F01
+
+
+class AnalysisJobError(Exception):
+    """Error recuperable durante la ejecución de un trabajo de análisis."""
+
+
+class AnalysisJobTimeout(AnalysisJobError):
+    """El trabajo superó el tiempo máximo permitido."""
+
+
+class LeaseLost(AnalysisJobError):
+    """La reserva del trabajo expiró y otro worker lo reclamó."""
+
+
+def get_job_setting(name, default):
+    """
+    Obtiene una configuración de la cola desde settings con valor por defecto.
+    """
+    return getattr(settings, name, default)
+
+
+def default_worker_id(index: int = 0) -> str:
+    """
+    Identificador legible del worker: host:pid:índice.
+    """
+    return f"{socket.gethostname()}:{os.getpid()}:{index}"
+
+
+def enqueue_analysis(analysis: EmotionAnalysis, max_attempts: Optional[int] = None) -> AnalysisJob:
+    """
+    Encola el análisis para que lo procese un worker.
+
+    Args:
+        analysis: Análisis ya guardado con su imagen
+        max_attempts: Número máximo de intentos antes de marcarlo como fallido
+
+    Returns:
+        El trabajo creado
+    """
+    if max_attempts is None:
+        max_attempts = get_job_setting('EMOTION_JOB_MAX_ATTEMPTS', 3)
+
+    return AnalysisJob.objects.create(
+        analysis=analysis,
+        max_attempts=max_attempts
+    )
+
+
+def enqueue_video(video: VideoAnalysis, max_attempts: Optional[int] = None) -> AnalysisJob:
+    """
+    Encola el análisis de un video para que lo procese un worker.
+
+    Args:
+        video: Análisis de video ya guardado con su archivo
+        max_attempts: Número máximo de intentos antes de marcarlo como fallido
+
+    Returns:
+        El trabajo creado
+    """
+    if max_attempts is None:
+        max_attempts = get_job_setting('EMOTION_JOB_MAX_ATTEMPTS', 3)
+
+    return AnalysisJob.objects.create(
+        video=video,
+        max_attempts=max_attempts
+    )
+
+
+def process_video(video: VideoAnalysis, job: Optional[AnalysisJob] = None) -> VideoAnalysis:
+    """
+    Analiza un video. Si se ejecuta como trabajo, cada avance renueva su reserva para
+    que otro worker no lo reclame mientras se procesa (un video puede tardar minutos).
+
+    Raises:
+        AnalysisJobError: Si el archivo no se pudo abrir como video
+    """
+    # Importación diferida: el análisis de video carga el detector y sus modelos ONNX
+    from apps.emotions.services.video_analysis import VideoOpenError, process_video as analyze
+
+    heartbeat = None
+    if job is not None:
+        timeout = get_job_setting('EMOTION_JOB_TIMEOUT', 120)
+
+        def heartbeat(percent):
+            renewed = AnalysisJob.objects.filter(
+                pk=job.pk, worker=job.worker, attempts=job.attempts,
+                status=AnalysisJob.Status.RUNNING
+            ).update(lease_expires_at=timezone.now() + timedelta(seconds=timeout))
+            if not renewed:
+                # Otro worker procesa el video: no seguir ni guardar resultados
+                raise LeaseLost(f"El trabajo #{job.pk} fue reclamado por otro worker")
+
+    try:
+        return analyze(video, heartbeat=heartbeat)
+    except VideoOpenError as e:
+        raise AnalysisJobError(str(e))
+
+
+def detect_analysis(analysis: EmotionAnalysis):
+    """
+    Ejecuta la detección de emociones sobre la imagen del análisis, sin guardar nada.
+
+    Args:
+        analysis: Análisis con la imagen ya almacenada
+
+    Returns:
+        Tupla (resultados del detector, tiempo de procesamiento en segundos)
+
+    Raises:
+        AnalysisJobError: Si el detector no pudo procesar la imagen
+    """
+    # Importación diferida: el detector carga los modelos ONNX al importarse
+    from apps.emotions.services.emotion_detector import emotion_detector
+
+    start_time = time.time()
+    results = emotion_detector.analyze_image(analysis.image.path)
+
+    if results.get('error'):
+        raise AnalysisJobError(results['error'])
+
+    return results, time.time() - start_time
+
+
+def save_analysis_results(analysis: EmotionAnalysis, results: dict, processing_time: float) -> EmotionAnalysis:
+    """
+    Guarda los resultados de la detección, los rostros normalizados y el aporte del
+    análisis a las estadísticas, en una sola transacción.
+    """
+    with transaction.atomic():
+        # Si se reprocesa un análisis ya contado, restar primero sus resultados anteriores
+        EmotionStatistics.discard_analysis(analysis)
+
+        # Calcular confianza promedio y emoción dominante
+        faces_analysis = results.get('faces_analysis', [])
+        if faces_analysis:
+            # Calcular confianza promedio
+            total_confidence = sum(face['confidence'] * 100 for face in faces_analysis)
+            analysis.average_confidence = total_confidence / len(faces_analysis)
+
+            # Calcular emoción dominante
+            emotion_counts = {}
+            for face in faces_analysis:
+                emotion = face.get('dominant_emotion')
+                if emotion:
+                    emotion_counts[emotion] = emotion_counts.get(emotion, 0) + 1
+
+            if emotion_counts:
+                analysis.dominant_emotion = max(emotion_counts.items(), key=lambda x: x[1])[0]
+
+        # Guardar resultados
+        analysis.analysis_results = results
+        analysis.faces_detected = results.get('faces_detected', 0)
+        analysis.processing_time = processing_time
+        analysis.save()
+
+        # Guardar los rostros en la tabla normalizada y sumar el análisis a las estadísticas
+        FaceDetection.replace_for_analysis(analysis)
+        EmotionStatistics.record_analysis(analysis)
+
+    return analysis
+
+
+def process_analysis(analysis: EmotionAnalysis) -> EmotionAnalysis:
+    """
+    Ejecuta la detección de emociones sobre la imagen del análisis y guarda los resultados.
+
+    Args:
+        analysis: Análisis con la imagen ya almacenada
+
+    Returns:
+        El análisis actualizado
+
+    Raises:
+        AnalysisJobError: Si el detector no pudo procesar la imagen
+    """
+    return save_analysis_results(analysis, *detect_analysis(analysis))
+
+
+def claim_next_job(worker_id: str, timeout: Optional[float] = None) -> Optional[AnalysisJob]:
+    """
+    Reclama el siguiente trabajo disponible de forma atómica.
+
+    Se toman trabajos pendientes cuya fecha de disponibilidad ya pasó y trabajos
+    en proceso cuya reserva expiró (worker caído o colgado). Respeta el límite
+    global de trabajos simultáneos EMOTION_JOB_MAX_RUNNING.
+
+    Args:
+        worker_id: Identificador del worker que reclama
+        timeout: Duración de la reserva en segundos
+
+    Returns:
+        El trabajo reclamado o None si no hay trabajo disponible
+    """
+    if timeout is None:
+        timeout = get_job_setting('EMOTION_JOB_TIMEOUT', 120)
+    max_running = get_job_setting('EMOTION_JOB_MAX_RUNNING', 0)
+
+    now = timezone.now()
+
+    with transaction.atomic():
+        if max_running:
+            # Sin el bloqueo dos workers podían contar a la vez y superar el límite; se
+            # libera al terminar la transacción, con el trabajo ya marcado como RUNNING
+            _lock_claims()
+            running = AnalysisJob.objects.filter(
+                status=AnalysisJob.Status.RUNNING,
+                lease_expires_at__gt=now
+            ).count()
+            if running >= max_running:
+                return None
+
+        job = (
+            AnalysisJob.objects
+            .select_for_update(skip_locked=True)
+            .filter(
+                Q(status=AnalysisJob.Status.PENDING, available_at__lte=now) |
+                Q(status=AnalysisJob.Status.RUNNING, lease_expires_at__lte=now)
+            )
+            .order_by('available_at', 'pk')
+            .first()
+        )
+
+        if job is None:
+            return None
+
+        job.status = AnalysisJob.Status.RUNNING
+        job.attempts += 1
+        job.worker = worker_id
+        job.started_at = now
+        job.lease_expires_at = now + timedelta(seconds=timeout)
+        if job.attempts == 1:
+            job.queue_time = (now - job.created_at).total_seconds()
+        job.save(update_fields=[
+            'status', 'attempts', 'worker', 'started_at',
+            'lease_expires_at', 'queue_time'
+        ])
+
+    return job
+
+
+def _lock_claims():
+    """
+    Serializa los reclamos dentro de la transacción actual (bloqueo consultivo de
+    PostgreSQL). En otros motores, usados solo en desarrollo, el límite es aproximado.
+    """
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_advisory_xact_lock(%s)', [CLAIM_LOCK_KEY])
+
+
+@contextmanager
+def _time_limit(seconds: float):
+    """
+    Limita la duración de un bloque usando SIGALRM cuando la plataforma lo permite.
+    En Windows solo se cuenta con la expiración de la reserva del trabajo.
+    """
+    if (not seconds or not hasattr(signal, 'SIGALRM')
+            or threading.current_thread() is not threading.main_thread()):
+        yield
+        return
+
+    def _handler(signum, frame):
+        raise AnalysisJobTimeout(f"El trabajo superó el límite de {seconds:.0f} segundos")
+
+    previous = signal.signal(signal.SIGALRM, _handler)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def run_job(job: AnalysisJob, timeout: Optional[float] = None) -> AnalysisJob:
+    """
+    Ejecuta un trabajo reclamado y registra el resultado.
+    Si falla y quedan intentos, se reprograma con espera exponencial.
+
+    Args:
+        job: Trabajo en estado RUNNING
+        timeout: Tiempo máximo de ejecución en segundos
+
+    Returns:
+        El trabajo actualizado
+    """
+    if timeout is None:
+        timeout = get_job_setting('EMOTION_JOB_TIMEOUT', 120)
+
+    start_time = time.time()
+    detection = None
+
+    try:
+        if job.video_id:
+            # Los videos renuevan su reserva con cada avance; solo se limita su duración total
+            with _time_limit(get_job_setting('EMOTION_VIDEO_JOB_TIMEOUT', 3600)):
+                process_video(job.video, job=job)
+        else:
+            # Solo la detección: los resultados se guardan junto con el estado del trabajo
+            with _time_limit(timeout):
+                detection = detect_analysis(job.analysis)
+
+        job.status = AnalysisJob.Status.DONE
+        job.error = ''
+
+    except LeaseLost as e:
+        print(f"✗ Trabajo #{job.pk}: {e}")
+
+    except Exception as e:
+        _schedule_retry(job, e)
+
+    with transaction.atomic():
+        # Solo escribe el worker que conserva la reserva: la fila del trabajo queda
+        # bloqueada hasta el fin de la transacción, así que otro worker no puede
+        # reclamarlo entre la comprobación y la escritura de los resultados
+        owned = AnalysisJob.objects.select_for_update().filter(
+            pk=job.pk, worker=job.worker, attempts=job.attempts,
+            status=AnalysisJob.Status.RUNNING
+        ).exists()
+
+        if owned and detection is not None:
+            try:
+                with transaction.atomic():
+                    save_analysis_results(job.analysis, *detection)
+            except Exception as e:
+                _schedule_retry(job, e)
+
+        job.run_time = time.time() - start_time
+        job.lease_expires_at = None
+        if job.is_finished:
+            job.finished_at = timezone.now()
+
+        if owned:
+            AnalysisJob.objects.filter(pk=job.pk).update(
+                status=job.status, error=job.error, available_at=job.available_at,
+                run_time=job.run_time, lease_expires_at=None, finished_at=job.finished_at
+            )
+            if job.status == AnalysisJob.Status.FAILED and job.analysis_id:
+                # El análisis fallido cuenta como análisis sin rostros
+                EmotionStatistics.record_analysis(job.analysis)
+
+    if not owned:
+        print(f"✗ Trabajo #{job.pk}: {job.worker} perdió la reserva; se descarta su resultado")
+        job.refresh_from_db()
+
+    return job
+
+
+def _schedule_retry(job: AnalysisJob, error: Exception):
+    """
+    Registra el error del intento y reprograma el trabajo con espera exponencial, o lo
+    marca como fallido si no quedan intentos.
+    """
+    print(f"✗ Error en trabajo #{job.pk} (intento {job.attempts}/{job.max_attempts}): {error}")
+    print(traceback.format_exc())
+    job.error = str(error)
+
+    if job.attempts < job.max_attempts:
+        backoff = get_job_setting('EMOTION_JOB_RETRY_BACKOFF', 2) ** job.attempts
+        job.status = AnalysisJob.Status.PENDING
+        job.available_at = timezone.now() + timedelta(seconds=backoff)
+    else:
+        job.status = AnalysisJob.Status.FAILED
+
+
+def run_worker(worker_id: str, poll_interval: Optional[float] = None,
+               timeout: Optional[float] = None, once: bool = False,
+               stop_event=None) -> int:
+    """
+    Bucle principal de un worker: reclama y ejecuta trabajos hasta que se detenga.
+
+    Args:
+        worker_id: Identificador del worker
+        poll_interval: Espera entre consultas cuando la cola está vacía
+        timeout: Tiempo máximo por trabajo
+        once: Si es True, termina cuando no quedan trabajos disponibles
+        stop_event: Evento opcional para detener el bucle desde fuera
+
+    Returns:
+        Número de trabajos procesados
+    """
+    if poll_interval is None:
+        poll_interval = get_job_setting('EMOTION_JOB_POLL_INTERVAL', 1.0)
+
+    processed = 0
+
+    while stop_event is None or not stop_event.is_set():
+        job = claim_next_job(worker_id, timeout=timeout)
+
+        if job is None:
+            if once:
+                break
+            time.sleep(poll_interval)
+            continue
+
+        job = run_job(job, timeout=timeout)
+        processed += 1
+        print(f"[{worker_id}] Trabajo #{job.pk} {job.get_status_display()} "
+              f"(cola {job.queue_time:.2f}s, ejecución {job.run_time:.2f}s)")
+
+    return processed
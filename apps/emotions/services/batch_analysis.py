@@ -0,0 +1,195 @@
+"""
+Análisis de varias imágenes en una sola petición (api/analyze-batch/).
+
+Las imágenes se decodifican y sus rostros se detectan en paralelo en el executor de
+inferencia. A medida que terminan las detecciones, los rostros de las imágenes listas
+se clasifican con FER+ en un solo lote (EmotionDetector.analyze_faces_batch) y sus
+resultados se emiten de inmediato como líneas NDJSON, sin esperar al resto del lote.
+"""
+import json
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, wait
+from typing import Dict, Iterator, List, Tuple
+
+import cv2
+import numpy as np
+from django.conf import settings
+
+from apps.emotions.services.admission import PRIORITY_BULK
+from apps.emotions.services.emotion_detector import emotion_detector
+from apps.emotions.services.inference_executor import inference_executor
+
+# Límites por petición
+MAX_IMAGES = getattr(settings, 'EMOTION_BATCH_MAX_IMAGES', 32)
+MAX_BYTES = getattr(settings, 'EMOTION_BATCH_MAX_BYTES', 20 * 1024 * 1024)
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+
+
+class BatchTooLarge(ValueError):
+    """El lote supera el número de imágenes o el tamaño permitido."""
+
+
+def check_limits(count: int, total_bytes: int):
+    """
+    Raises:
+        BatchTooLarge: Si el lote supera MAX_IMAGES o MAX_BYTES
+    """
+    if count > MAX_IMAGES:
+        raise BatchTooLarge(f'Máximo {MAX_IMAGES} imágenes por lote')
+    if total_bytes > MAX_BYTES:
+        raise BatchTooLarge(f'El lote supera {MAX_BYTES // (1024 * 1024)} MB')
+
+
+def read_zip(fileobj) -> List[Tuple[str, bytes]]:
+    """
+    Extrae en memoria las imágenes de un ZIP, validando los límites con el índice del
+    archivo antes de descomprimir (un ZIP pequeño puede expandirse a gigabytes).
+
+    Returns:
+        Lista de (nombre, contenido) en el orden del archivo
+    """
+    try:
+        archive = zipfile.ZipFile(fileobj)
+    except zipfile.BadZipFile:
+        raise ValueError('El archivo ZIP no es válido')
+
+    with archive:
+        members = [
+            info for info in archive.infolist()
+            if not info.is_dir() and not info.filename.startswith('__MACOSX/')
+            and info.filename.lower().endswith(IMAGE_EXTENSIONS)
+        ]
+        check_limits(len(members), sum(info.file_size for info in members))
+        return [(info.filename, archive.read(info)) for info in members]
+
+
+def _decode_and_detect(data: bytes):
+    """
+    Decodifica la imagen y detecta sus rostros (se ejecuta en el executor de inferencia).
+    """
+    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError('No se pudo decodificar la imagen')
+    return image, emotion_detector.detect_faces(image, realtime=False)
+
+
+def _api_face(face: Dict) -> Dict:
+    """
+    Rostro en el formato de api_analyze_base64 (coordenadas planas y 'emotions').
+    """
+    coordinates = face['coordinates']
+    return {
+        'face_id': face['face_id'],
+        'x': int(coordinates['x']),
+        'y': int(coordinates['y']),
+        'width': int(coordinates['width']),
+        'height': int(coordinates['height']),
+        'dominant_emotion': face['dominant_emotion'],
+        'confidence': float(face['confidence']),
+        'emotions': face['all_emotions'],
+    }
+
+
+def iter_batch_results(images: List[Tuple[str, bytes]], admission=None) -> Iterator[Dict]:
+    """
+    Analiza las imágenes y genera un resultado por imagen en orden de finalización.
+
+    Cada detección en curso ocupa un turno de admisión: la primera usa el turno que el
+    llamador ya obtuvo y las demás piden uno sin esperar (try_acquire), que se devuelve
+    al terminar esa imagen. La siguiente imagen se envía al executor cuando termina
+    alguna de las anteriores, así un lote nunca tiene más detecciones en curso que turnos.
+
+    Args:
+        images: Lista de (nombre, contenido)
+        admission: AdmissionController del que el llamador tiene un turno (sin él, hasta
+            inference_executor.max_workers detecciones a la vez)
+
+    Yields:
+        {'index', 'name', 'faces_detected', 'faces', 'processing_time'} o, si la imagen
+        no pudo analizarse, {'index', 'name', 'error'}
+    """
+    start_time = time.time()
+    futures = {}
+    pending = set()
+    next_index = 0
+    caller_future = None  # Detección que ocupa el turno del llamador
+
+    def submit(index):
+        future = inference_executor.executor.submit(_decode_and_detect, images[index][1])
+        futures[future] = index
+        pending.add(future)
+        return future
+
+    def submit_available():
+        nonlocal next_index, caller_future
+        while next_index < len(images) and len(pending) < inference_executor.max_workers:
+            if caller_future is None or caller_future.done():
+                caller_future = submit(next_index)
+            elif admission is None:
+                submit(next_index)
+            elif admission.try_acquire(PRIORITY_BULK):
+                acquired = time.monotonic()
+                # El turno se devuelve al terminar la imagen (o al cancelarse sin empezar)
+                submit(next_index).add_done_callback(
+                    lambda _, acquired=acquired: admission.release(time.monotonic() - acquired)
+                )
+            else:
+                return
+            next_index += 1
+
+    try:
+        submit_available()
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            pending.difference_update(done)
+            # Las siguientes imágenes se detectan mientras se clasifican las listas
+            submit_available()
+
+            ready = []
+            for future in sorted(done, key=futures.get):
+                index = futures[future]
+                try:
+                    ready.append((index, *future.result()))
+                except Exception as e:
+                    yield {'index': index, 'name': images[index][0], 'error': str(e)}
+
+            if not ready:
+                continue
+
+            # Un solo lote de FER+ con los rostros de todas las imágenes listas
+            faces_per_image = emotion_detector.analyze_faces_batch(
+                [image for _, image, _ in ready], [boxes for _, _, boxes in ready]
+            )
+            elapsed = time.time() - start_time
+            for (index, _, _), faces_analysis in zip(ready, faces_per_image):
+                yield {
+                    'index': index,
+                    'name': images[index][0],
+                    'faces_detected': len(faces_analysis),
+                    'faces': [_api_face(face) for face in faces_analysis],
+                    'processing_time': elapsed,
+                }
+    finally:
+        # Cliente desconectado: no seguir detectando imágenes que nadie recibirá
+        for future in pending:
+            future.cancel()
+
+
+def iter_ndjson(images: List[Tuple[str, bytes]], admission=None) -> Iterator[bytes]:
+    """
+    Líneas NDJSON de la respuesta: un resultado por imagen y un resumen final.
+    """
+    start_time = time.time()
+    summary = {'done': True, 'images': len(images), 'faces': 0, 'errors': 0}
+
+    for result in iter_batch_results(images, admission):
+        if 'error' in result:
+            summary['errors'] += 1
+        else:
+            summary['faces'] += result['faces_detected']
+        yield (json.dumps(result, ensure_ascii=False) + '\n').encode('utf-8')
+
+    summary['processing_time'] = time.time() - start_time
+    yield (json.dumps(summary) + '\n').encode('utf-8')
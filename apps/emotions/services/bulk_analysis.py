@@ -0,0 +1,169 @@
+"""
+Análisis masivo offline de imágenes (comando analyze_images).
+
+Las imágenes se leen una a una desde un directorio o un ZIP (el ZIP se recorre por su
+índice central, sin extraerlo). Cada lote de imágenes se envía a un proceso del pool:
+el proceso decodifica, detecta los rostros, predice sus emociones en un solo lote
+(EmotionDetector.analyze_images_batch) y guarda la imagen en el storage. El proceso
+principal solo calcula hashes, descarta los archivos ya analizados y escribe las filas
+con bulk_create.
+
+Los procesos spawn importan este módulo antes de django.setup(): los modelos y el
+detector se importan dentro de las funciones.
+"""
+import contextlib
+import hashlib
+import os
+import time
+import zipfile
+from typing import Callable, Dict, Iterator, List, Tuple
+
+import cv2
+import numpy as np
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+# Extensiones de imagen que se analizan (el resto de archivos se ignora)
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+
+# Imágenes por tarea del pool (los rostros de todas van en un mismo lote de inferencia)
+BATCH_SIZE = getattr(settings, 'EMOTION_BULK_BATCH_SIZE', 16)
+
+# Análisis por bulk_create
+CHUNK_SIZE = getattr(settings, 'EMOTION_BULK_CHUNK_SIZE', 500)
+
+
+def is_image_name(name: str) -> bool:
+    return name.lower().endswith(IMAGE_EXTENSIONS)
+
+
+def iter_image_files(path: str) -> Iterator[Tuple[str, Callable[[], bytes]]]:
+    """
+    Recorre las imágenes de un directorio o de un archivo ZIP en orden estable.
+
+    Yields:
+        Tuplas (nombre relativo, función que lee el contenido). El contenido se lee
+        solo cuando se llama a la función, así que nunca hay más de un archivo en memoria.
+    """
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            for info in sorted(archive.infolist(), key=lambda info: info.filename):
+                name = info.filename
+                if info.is_dir() or name.startswith('__MACOSX/') or not is_image_name(name):
+                    continue
+                yield name, lambda info=info: archive.read(info)
+        return
+
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for filename in sorted(files):
+            if not is_image_name(filename):
+                continue
+            full_path = os.path.join(root, filename)
+
+            def read(full_path=full_path):
+                with open(full_path, 'rb') as image_file:
+                    return image_file.read()
+
+            yield os.path.relpath(full_path, path).replace(os.sep, '/'), read
+
+
+def file_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def storage_name(source_name: str) -> str:
+    """
+    Ruta en el storage con el mismo upload_to que las imágenes subidas.
+    """
+    from apps.emotions.models import EmotionAnalysis
+
+    filename = os.path.basename(source_name)
+    return EmotionAnalysis._meta.get_field('image').generate_filename(None, filename)
+
+
+def init_worker():
+    """
+    Inicializador de cada proceso del pool (contexto spawn): configura Django y
+    silencia los mensajes por imagen del detector.
+
+    Ctrl+C lo atiende solo el proceso principal: los lotes en curso terminan y se
+    guardan, así ninguna imagen queda en el storage sin su análisis.
+    """
+    import signal
+    import sys
+
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    import django
+    django.setup()
+
+    sys.stdout = open(os.devnull, 'w')
+
+    # Importar aquí carga los modelos ONNX una sola vez por proceso
+    from apps.emotions.services.emotion_detector import emotion_detector  # noqa: F401
+
+
+def analyze_batch(items: List[Tuple[str, str, bytes]]) -> List[Dict]:
+    """
+    Analiza un lote de imágenes y guarda cada archivo en el storage.
+
+    Args:
+        items: Tuplas (nombre de origen, hash, contenido)
+
+    Returns:
+        Un diccionario por imagen con 'source', 'hash' y, según el caso, 'error' o
+        'image', 'faces_analysis' y 'processing_time'
+    """
+    from apps.emotions.services.emotion_detector import emotion_detector
+
+    start_time = time.time()
+    results = []
+    images = []
+    for source, digest, data in items:
+        image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            results.append({'source': source, 'hash': digest, 'error': 'No se pudo decodificar la imagen'})
+            continue
+        images.append(image)
+        results.append({'source': source, 'hash': digest, 'data': data})
+
+    decoded = [result for result in results if 'data' in result]
+    if decoded:
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            faces_per_image = emotion_detector.analyze_images_batch(images)
+
+        # El tiempo del lote se reparte entre sus imágenes
+        processing_time = (time.time() - start_time) / len(decoded)
+        for result, faces_analysis in zip(decoded, faces_per_image):
+            data = result.pop('data')
+            result['image'] = default_storage.save(storage_name(result['source']), ContentFile(data))
+            result['faces_analysis'] = faces_analysis
+            result['processing_time'] = processing_time
+
+    return results
+
+
+def build_analysis(user, result: Dict, notes: str = ''):
+    """
+    Crea (sin guardar) el análisis de una imagen procesada por analyze_batch.
+    """
+    from apps.emotions.models import EmotionAnalysis
+
+    faces_analysis = result['faces_analysis']
+    analysis = EmotionAnalysis(
+        user=user,
+        image=result['image'],
+        image_hash=result['hash'],
+        notes=notes,
+        analysis_results={
+            'source': result['source'],
+            'faces_detected': len(faces_analysis),
+            'faces_analysis': faces_analysis,
+        },
+        faces_detected=len(faces_analysis),
+        processing_time=result['processing_time'],
+    )
+    analysis.compute_summary()
+    return analysis
@@ -0,0 +1,268 @@
+"""
+Registro de las cámaras del servidor abiertas a la vez (una por aula).
+
+Cada cámara se identifica por una clave: 'default' (EMOTION_CAMERA_SOURCE), un nombre
+de EMOTION_CAMERAS o el índice de un dispositivo local. Se abre con el primer cliente
+que la pide y lleva la cuenta de las sesiones que la usan (acquire/release_ref): cuando
+se va la última, se cierra tras EMOTION_CAMERA_IDLE_TIMEOUT segundos (margen para que
+recargar la página no vuelva a abrir el dispositivo).
+"""
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from django.conf import settings
+
+DEFAULT_CAMERA = 'default'
+
+
+class CameraNotFound(KeyError):
+    """La clave no corresponde a ninguna cámara configurada."""
+
+
+class CameraUnavailable(Exception):
+    """La cámara existe pero no se pudo abrir o se alcanzó el máximo de cámaras."""
+
+
+def resolve_camera_source(key):
+    """
+    Fuente de captura de una clave de cámara.
+
+    Raises:
+        CameraNotFound: Si la clave no está configurada ni es un índice de dispositivo
+    """
+    key = str(key).strip() if key not in (None, '') else DEFAULT_CAMERA
+    if key == DEFAULT_CAMERA:
+        return getattr(settings, 'EMOTION_CAMERA_SOURCE', 0)
+    configured = getattr(settings, 'EMOTION_CAMERAS', {})
+    if key in configured:
+        return configured[key]
+    if key.isdigit():
+        return int(key)
+    raise CameraNotFound(key)
+
+
+class _Entry:
+    __slots__ = ('camera', 'last_used', 'refs')
+
+    def __init__(self, camera):
+        self.camera = camera
+        self.last_used = time.monotonic()
+        self.refs = 0
+
+
+class CameraRegistry:
+    """
+    Cámaras abiertas por clave, con apertura perezosa, conteo de referencias y cierre
+    de las que se quedan sin sesiones.
+
+    Args:
+        factory: Crea y abre la cámara: factory(clave, fuente) -> cámara con
+                 is_initialized y cleanup()
+        scheduler: Planificador de detección en el que se registran las cámaras
+        resolver: Traduce una clave a su fuente (por defecto resolve_camera_source)
+        idle_timeout: Segundos que sigue abierta una cámara sin referencias
+        max_cameras: Máximo de cámaras abiertas a la vez
+    """
+
+    def __init__(self, factory: Callable, scheduler=None, resolver: Callable = resolve_camera_source,
+                 idle_timeout: float = 60.0, max_cameras: int = 8):
+        self.factory = factory
+        self.scheduler = scheduler
+        self.resolver = resolver
+        self.idle_timeout = idle_timeout
+        self.max_cameras = max_cameras
+        self._lock = threading.Lock()
+        self._entries: Dict[str, _Entry] = {}
+        self._opening: Dict[str, threading.Lock] = {}
+        self._reaper = None
+
+    @staticmethod
+    def normalize(key) -> str:
+        return str(key).strip() if key not in (None, '') else DEFAULT_CAMERA
+
+    def get(self, key=None):
+        """
+        Cámara de la clave, abriéndola si hace falta.
+
+        Raises:
+            CameraNotFound: Si la clave no está configurada
+            CameraUnavailable: Si no se pudo abrir o no hay lugar para otra cámara
+        """
+        key = self.normalize(key)
+        camera = self.peek(key)
+        if camera is not None:
+            return camera
+
+        source = self.resolver(key)
+        with self._lock:
+            opening = self._opening.setdefault(key, threading.Lock())
+
+        # Se abre fuera del lock global: abrir una cámara puede tardar segundos
+        with opening:
+            camera = self.peek(key)
+            if camera is not None:
+                return camera
+
+            self._make_room()
+            camera = self.factory(key, source)
+            if not camera.is_initialized:
+                camera.cleanup()
+                raise CameraUnavailable(f'No se pudo abrir la cámara {key}')
+
+            with self._lock:
+                self._entries[key] = _Entry(camera)
+                self._start_reaper()
+            if self.scheduler is not None:
+                self.scheduler.register(camera)
+            print(f"✓ Cámara '{key}' abierta ({len(self._entries)} activa(s))")
+            return camera
+
+    def acquire(self, key=None):
+        """
+        Cámara de la clave (abriéndola si hace falta) con una referencia más; la
+        cámara no se cierra por inactividad mientras tenga referencias.
+
+        Raises:
+            CameraNotFound: Si la clave no está configurada
+            CameraUnavailable: Si no se pudo abrir o no hay lugar para otra cámara
+        """
+        while True:
+            camera = self.get(key)
+            with self._lock:
+                entry = self._entries.get(camera.key)
+                # Si se cerró entre get() y aquí, se vuelve a abrir
+                if entry is not None and entry.camera is camera:
+                    entry.refs += 1
+                    entry.last_used = time.monotonic()
+                    return camera
+
+    def release_ref(self, camera):
+        """
+        Suelta una referencia tomada con acquire(). Sin referencias, la cámara se
+        cierra cuando pasan idle_timeout segundos sin que nadie la vuelva a pedir.
+        """
+        with self._lock:
+            entry = self._entries.get(camera.key)
+            if entry is None or entry.camera is not camera:
+                return
+            entry.refs = max(0, entry.refs - 1)
+            entry.last_used = time.monotonic()
+
+    def peek(self, key=None):
+        """
+        Cámara ya abierta (sin abrirla), marcándola como usada. None si no está abierta.
+        """
+        key = self.normalize(key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            entry.last_used = time.monotonic()
+            return entry.camera
+
+    def touch(self, camera) -> bool:
+        """
+        Marca la cámara como usada. Devuelve False si ya no está abierta (se liberó
+        o se cerró por inactividad) para que el stream que la usaba termine.
+        """
+        with self._lock:
+            entry = self._entries.get(camera.key)
+            if entry is None or entry.camera is not camera:
+                return False
+            entry.last_used = time.monotonic()
+            return True
+
+    def release(self, key=None) -> bool:
+        """
+        Cierra la cámara de inmediato aunque tenga referencias (los streams que la
+        usan terminan). Devuelve False si no estaba abierta.
+        """
+        key = self.normalize(key)
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        self._close(key, entry.camera)
+        return True
+
+    def release_all(self):
+        with self._lock:
+            entries, self._entries = self._entries, {}
+        for key, entry in entries.items():
+            self._close(key, entry.camera)
+
+    def evict_idle(self, now: Optional[float] = None) -> int:
+        """
+        Cierra las cámaras sin referencias ni uso durante idle_timeout. Devuelve
+        cuántas se cerraron.
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            idle = [
+                (key, entry.camera) for key, entry in self._entries.items()
+                if entry.refs == 0 and now - entry.last_used > self.idle_timeout
+            ]
+            for key, _ in idle:
+                del self._entries[key]
+        for key, camera in idle:
+            print(f"✓ Cámara '{key}' cerrada por inactividad")
+            self._close(key, camera)
+        return len(idle)
+
+    def keys(self):
+        with self._lock:
+            return list(self._entries)
+
+    def stats(self) -> Dict[str, Dict]:
+        now = time.monotonic()
+        with self._lock:
+            entries = list(self._entries.items())
+        detection = self.scheduler.stats() if self.scheduler is not None else {}
+        return {
+            key: {
+                'idle': now - entry.last_used,
+                'sessions': entry.refs,
+                'detection_enabled': entry.camera.detect_emotions,
+                'encodes_per_tier': list(entry.camera.encodes),
+                **(entry.camera.source.stats() if entry.camera.source is not None else {}),
+                **detection.get(key, {}),
+            }
+            for key, entry in entries
+        }
+
+    def _make_room(self):
+        """
+        Si se alcanzó el máximo, cierra la cámara sin referencias usada hace más
+        tiempo; si todas tienen sesiones, rechaza la nueva.
+        """
+        with self._lock:
+            if len(self._entries) < self.max_cameras:
+                return
+            unused = [item for item in self._entries.items() if item[1].refs == 0]
+            if not unused:
+                raise CameraUnavailable(f'Se alcanzó el máximo de {self.max_cameras} cámaras abiertas')
+            key, entry = min(unused, key=lambda item: item[1].last_used)
+            del self._entries[key]
+        print(f"✓ Cámara '{key}' cerrada para abrir otra")
+        self._close(key, entry.camera)
+
+    def _close(self, key, camera):
+        if self.scheduler is not None:
+            self.scheduler.unregister(camera)
+        camera.cleanup()
+
+    def _start_reaper(self):
+        if self._reaper is not None:
+            return
+        self._reaper = threading.Thread(target=self._reap, name='camera-reaper', daemon=True)
+        self._reaper.start()
+
+    def _reap(self):
+        interval = max(1.0, min(10.0, self.idle_timeout / 4))
+        while True:
+            time.sleep(interval)
+            try:
+                self.evict_idle()
+            except Exception as e:
+                print(f"Error cerrando cámaras inactivas: {e}")
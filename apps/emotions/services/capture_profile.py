@@ -0,0 +1,134 @@
+"""
+Resolución y calidad JPEG con que los navegadores capturan los frames de tiempo real.
+
+El detector trabaja a lo sumo a 640x480 (detect_faces con realtime=True reduce el
+resto), así que subir un frame de 1080p solo agrega bytes, decodificación y reducción
+que se descartan. El servidor anuncia a cada cliente un nivel (ancho y alto máximos,
+calidad JPEG) y el navegador reduce su canvas a ese tamaño antes de codificar:
+
+- Por rostros: si el rostro más pequeño del último frame completo queda por debajo de
+  EMOTION_CLIENT_CAPTURE_MIN_FACE px y el cliente estaba reduciendo su cámara, sube un nivel;
+  si aun con el nivel inferior los rostros miden el doble del mínimo, baja uno.
+- Por carga: con la inferencia saturada (cola de admisión) se anuncian uno o dos niveles
+  menos, que se decodifican y analizan más rápido.
+"""
+import threading
+from collections import OrderedDict, namedtuple
+from typing import Dict, List, Optional
+
+from django.conf import settings
+
+from apps.emotions.services.admission import inference_admission
+
+# Nivel de captura: ancho y alto máximos (px) y calidad JPEG (0-100)
+CaptureLevel = namedtuple('CaptureLevel', 'max_width max_height quality')
+
+DEFAULT_CLIENT_CAPTURE_LEVELS = [
+    (960, 720, 85),
+    (640, 480, 80),
+    (480, 360, 75),
+    (320, 240, 70),
+]
+
+
+def load_levels() -> List[CaptureLevel]:
+    """
+    Niveles configurados en EMOTION_CLIENT_CAPTURE_LEVELS, del mejor al peor.
+    """
+    levels = getattr(settings, 'EMOTION_CLIENT_CAPTURE_LEVELS', DEFAULT_CLIENT_CAPTURE_LEVELS)
+    return [CaptureLevel(int(width), int(height), int(quality)) for width, height, quality in levels]
+
+
+class CaptureAdvisor:
+    """
+    Nivel de captura de cada cliente según el tamaño de sus rostros y la carga.
+
+    Args:
+        levels: Niveles disponibles, del mejor al peor
+        default_level: Nivel inicial de cada cliente
+        min_face: Ancho mínimo (px) del rostro más pequeño en el frame subido
+        high_load: Presión de admisión (ver AdmissionController.pressure) por encima de la
+                   cual se anuncia un nivel menos (el doble: dos niveles)
+        max_clients: Máximo de clientes HTTP recordados (se descarta el más antiguo)
+    """
+
+    def __init__(self, levels: List[CaptureLevel], default_level: int = 1, min_face: int = 64,
+                 high_load: float = 1.0, max_clients: int = 500):
+        self.levels = levels
+        self.default_level = min(max(0, default_level), len(levels) - 1)
+        self.min_face = min_face
+        self.high_load = high_load
+        self.max_clients = max(1, max_clients)
+        self._lock = threading.Lock()
+        self._clients: 'OrderedDict[str, int]' = OrderedDict()
+
+    def update(self, level: int, results: Dict) -> int:
+        """
+        Nivel siguiente a partir de los rostros de un frame completo (resultados con
+        frame_size). Sin rostros se mantiene el nivel.
+        """
+        frame_size = results.get('frame_size')
+        widths = [face['width'] for face in results.get('faces') or [] if face.get('width')]
+        if not frame_size or not widths:
+            return level
+        width, height = frame_size
+        smallest = min(widths)
+        current = self.levels[level]
+
+        # Subir solo sirve si el cliente estaba reduciendo (su cámara da más píxeles)
+        downscaled = width >= current.max_width * 0.95 or height >= current.max_height * 0.95
+        if smallest < self.min_face and level > 0 and downscaled:
+            return level - 1
+
+        if level < len(self.levels) - 1:
+            lower = self.levels[level + 1]
+            scale = min(1.0, lower.max_width / width, lower.max_height / height)
+            if smallest * scale >= 2 * self.min_face:
+                return level + 1
+        return level
+
+    def observe(self, owner: str, results: Dict) -> int:
+        """
+        Actualiza y devuelve el nivel de un cliente HTTP tras un frame completo.
+        """
+        with self._lock:
+            level = self._clients.pop(owner, self.default_level)
+            level = self.update(level, results)
+            self._clients[owner] = level
+            while len(self._clients) > self.max_clients:
+                self._clients.popitem(last=False)
+        return level
+
+    def level_for(self, owner: str) -> int:
+        with self._lock:
+            return self._clients.get(owner, self.default_level)
+
+    def advise(self, level: Optional[int] = None) -> Dict:
+        """
+        Perfil que se anuncia al cliente: su nivel, bajado uno o dos si la inferencia
+        está saturada.
+        """
+        level = self.default_level if level is None else level
+        pressure = inference_admission.pressure()
+        if pressure > 2 * self.high_load:
+            level += 2
+        elif pressure > self.high_load:
+            level += 1
+        level = min(level, len(self.levels) - 1)
+        max_width, max_height, quality = self.levels[level]
+        return {
+            'level': level,
+            'max_width': max_width,
+            'max_height': max_height,
+            'quality': quality,
+        }
+
+
+# Instancia global usada por las vistas y el canal WebSocket
+capture_advisor = CaptureAdvisor(
+    load_levels(),
+    default_level=getattr(settings, 'EMOTION_CLIENT_CAPTURE_DEFAULT_LEVEL', 1),
+    min_face=getattr(settings, 'EMOTION_CLIENT_CAPTURE_MIN_FACE', 64),
+    high_load=getattr(settings, 'EMOTION_CLIENT_CAPTURE_HIGH_LOAD', 1.0),
+    max_clients=getattr(settings, 'EMOTION_CLIENT_CAPTURE_MAX_CLIENTS', 500)
+)
@@ -0,0 +1,257 @@
+"""
+Modo de recortes para los clientes en tiempo real (cámara del navegador).
+
+Tras un frame completo (keyframe) con rostros, el servidor devuelve un token y la región
+con margen de cada rostro. Los frames siguientes pueden traer solo esos recortes,
+reducidos como máximo a EMOTION_CROP_MAX_SIZE px por lado: se decodifican unos pocos KB
+en lugar del frame completo y no se ejecuta YuNet, solo el modelo de emociones sobre el
+rostro ya ubicado. El margen absorbe los movimientos pequeños; cada
+EMOTION_CROP_KEYFRAME_INTERVAL segundos se exige un keyframe para volver a detectar
+(rostros que entran, salen o se mueven). Un token desconocido, vencido o con recortes
+que no corresponden a las regiones también se responde pidiendo un keyframe.
+"""
+import base64
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from io import BytesIO
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+from django.conf import settings
+from PIL import Image
+
+from apps.emotions.services import metrics
+
+Box = Tuple[int, int, int, int]
+
+
+class CropRejected(Exception):
+    """Los recortes no corresponden a una sesión vigente: el cliente debe enviar un keyframe."""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+def padded_region(box: Box, frame_size: Tuple[int, int], padding: float) -> Box:
+    """
+    Región del rostro con un margen de padding veces su tamaño por lado, dentro del frame.
+    """
+    x, y, w, h = box
+    width, height = frame_size
+    pad_x, pad_y = int(w * padding), int(h * padding)
+    x1, y1 = max(0, x - pad_x), max(0, y - pad_y)
+    x2, y2 = min(width, x + w + pad_x), min(height, y + h + pad_y)
+    return x1, y1, x2 - x1, y2 - y1
+
+
+class CropSession:
+    """
+    Regiones de un keyframe: por cada rostro, su región con margen y su caja en el frame.
+    """
+    __slots__ = ('token', 'regions', 'faces', 'created', 'frames')
+
+    def __init__(self, regions: List[Box], faces: List[Box]):
+        self.token = secrets.token_urlsafe(12)
+        self.regions = regions
+        self.faces = faces
+        self.created = time.monotonic()
+        self.frames = 0
+
+    def offer(self, interval: float, max_size: int) -> Dict:
+        """
+        Datos que recibe el cliente para enviar recortes.
+        """
+        return {
+            'token': self.token,
+            'regions': [list(region) for region in self.regions],
+            'keyframe_interval': interval,
+            'max_size': max_size,
+        }
+
+    def face_images(self, crops: Sequence[np.ndarray]) -> List[np.ndarray]:
+        """
+        Rostro de cada recorte, ubicado con la caja del keyframe escalada al tamaño
+        con que llegó el recorte.
+
+        Raises:
+            CropRejected: Si la cantidad o las proporciones no corresponden a las regiones
+        """
+        if len(crops) != len(self.regions):
+            raise CropRejected('count')
+        faces = []
+        for crop, (rx, ry, rw, rh), (fx, fy, fw, fh) in zip(crops, self.regions, self.faces):
+            crop_h, crop_w = crop.shape[:2]
+            scale_x, scale_y = crop_w / rw, crop_h / rh
+            # Mismo recorte reducido: ambas escalas deben coincidir
+            if abs(scale_x - scale_y) > 0.05 * max(scale_x, scale_y) + 1.0 / min(rw, rh):
+                raise CropRejected('shape')
+            x1, y1 = int((fx - rx) * scale_x), int((fy - ry) * scale_y)
+            x2, y2 = int((fx - rx + fw) * scale_x), int((fy - ry + fh) * scale_y)
+            faces.append(crop[y1:y2, x1:x2])
+        return faces
+
+
+def decode_crop(data, max_size: Optional[int] = None) -> np.ndarray:
+    """
+    Decodifica un recorte (bytes o data URL base64). Con max_size, las dimensiones se
+    leen del encabezado y un recorte más grande se rechaza sin decodificarlo.
+
+    Raises:
+        CropRejected: Si la imagen no se puede decodificar o supera max_size por lado
+    """
+    if isinstance(data, str):
+        try:
+            data = base64.b64decode(data.split(',', 1)[-1])
+        except ValueError:
+            raise CropRejected('decode')
+    if max_size is not None:
+        try:
+            width, height = Image.open(BytesIO(data)).size
+        except (OSError, ValueError, Image.DecompressionBombError):
+            raise CropRejected('decode')
+        if max(width, height) > max_size:
+            raise CropRejected('size')
+    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None or image.size == 0:
+        raise CropRejected('decode')
+    return image
+
+
+class CropSessionRegistry:
+    """
+    Sesión de recortes vigente de cada cliente (frame_coalescer.client_key), con
+    vencimiento por keyframe y como máximo max_sessions (se descarta la más antigua).
+
+    Args:
+        keyframe_interval: Segundos que vale una sesión antes de exigir otro keyframe
+        padding: Margen de cada región, en fracción del tamaño del rostro
+        max_size: Lado máximo (px) con que el cliente debe enviar cada recorte
+        max_sessions: Máximo de sesiones guardadas
+        enabled: Si es False nunca se ofrecen recortes
+    """
+
+    def __init__(self, keyframe_interval: float = 2.0, padding: float = 0.3, max_size: int = 160,
+                 max_sessions: int = 500, enabled: bool = True):
+        self.keyframe_interval = keyframe_interval
+        self.padding = padding
+        self.max_size = max_size
+        self.max_sessions = max(1, max_sessions)
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._sessions: 'OrderedDict[str, CropSession]' = OrderedDict()
+
+        # Métricas
+        self.keyframes = 0
+        self.crop_frames = 0
+        self.rejected = 0
+
+    def new_session(self, results: Dict) -> Optional[CropSession]:
+        """
+        Sesión para los rostros de un keyframe (resultados con frame_size), o None si
+        no hubo rostros o el modo está desactivado.
+        """
+        self.keyframes += 1
+        frame_size = results.get('frame_size')
+        faces = [
+            (face['x'], face['y'], face['width'], face['height'])
+            for face in results.get('faces') or []
+            if face['width'] > 0 and face['height'] > 0
+        ]
+        if not self.enabled or not faces or not frame_size:
+            return None
+        regions = [padded_region(face, frame_size, self.padding) for face in faces]
+        return CropSession(regions, faces)
+
+    def expired(self, session: CropSession, now: Optional[float] = None) -> bool:
+        now = time.monotonic() if now is None else now
+        return now - session.created > self.keyframe_interval
+
+    def start(self, owner: str, results: Dict) -> Optional[CropSession]:
+        """
+        Reemplaza la sesión del cliente por la de un keyframe recién analizado.
+        """
+        session = self.new_session(results)
+        with self._lock:
+            self._sessions.pop(owner, None)
+            if session is not None:
+                self._sessions[owner] = session
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+        return session
+
+    def get(self, owner: str, token: str) -> CropSession:
+        """
+        Sesión vigente del cliente con ese token.
+
+        Raises:
+            CropRejected: Si no existe, el token no coincide o ya toca un keyframe
+        """
+        with self._lock:
+            session = self._sessions.get(owner)
+            if session is not None and session.token == token and self.expired(session):
+                del self._sessions[owner]
+        return self.check(session, token)
+
+    def check(self, session: Optional[CropSession], token: str) -> CropSession:
+        """
+        Comprueba que la sesión exista, tenga ese token y no haya vencido.
+
+        Raises:
+            CropRejected: Si no es así
+        """
+        if session is None or session.token != token:
+            reason = 'token'
+        elif self.expired(session):
+            reason = 'keyframe'
+        else:
+            return session
+        self.rejected += 1
+        raise CropRejected(reason)
+
+    def face_images(self, session: CropSession, crops: Sequence) -> List[np.ndarray]:
+        """
+        Decodifica los recortes de un frame y devuelve el rostro de cada uno.
+
+        Raises:
+            CropRejected: Si algún recorte no es válido
+        """
+        try:
+            # Antes de decodificar: la cantidad y el tamaño se comprueban sin gastar CPU
+            if len(crops) != len(session.regions):
+                raise CropRejected('count')
+            faces = session.face_images([decode_crop(crop, self.max_size) for crop in crops])
+        except CropRejected:
+            self.rejected += 1
+            raise
+        session.frames += 1
+        self.crop_frames += 1
+        return faces
+
+    def offer(self, session: CropSession) -> Dict:
+        return session.offer(self.keyframe_interval, self.max_size)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            sessions = len(self._sessions)
+        return {
+            'sessions': sessions,
+            'keyframes': self.keyframes,
+            'crop_frames': self.crop_frames,
+            'rejected': self.rejected,
+        }
+
+
+# Instancia global usada por las vistas y el canal WebSocket
+crop_sessions = CropSessionRegistry(
+    keyframe_interval=getattr(settings, 'EMOTION_CROP_KEYFRAME_INTERVAL', 2.0),
+    padding=getattr(settings, 'EMOTION_CROP_PADDING', 0.3),
+    max_size=getattr(settings, 'EMOTION_CROP_MAX_SIZE', 160),
+    max_sessions=getattr(settings, 'EMOTION_CROP_MAX_SESSIONS', 500),
+    enabled=getattr(settings, 'EMOTION_CROP_MODE', True)
+)
+
+metrics.register('crop_sessions', crop_sessions.snapshot)
@@ -0,0 +1,130 @@
+"""
+Planificador de la detección de emociones para varias cámaras del servidor.
+
+Un número fijo de hilos detectores se comparte entre todas las cámaras. Cada cámara
+pide una detección cada cierto intervalo; los hilos recorren las cámaras en turno
+rotativo (round-robin), de modo que con el detector saturado todas avanzan al mismo
+ritmo y ninguna acapara los hilos. Una cámara nunca tiene más de una detección en
+curso y siempre se analiza su frame más reciente (los atrasados se descartan).
+
+Las cámaras registradas deben ofrecer:
+    detection_due(now) -> Optional[float]   None si no necesita detección; si no,
+                                             el instante desde el que le corresponde
+    run_detection()                          Analiza el frame actual y publica el resultado
+"""
+import threading
+import time
+from typing import Dict, List
+
+
+class DetectionScheduler:
+    """
+    Reparte los hilos detectores entre las cámaras en turno rotativo.
+
+    Args:
+        workers: Hilos detectores compartidos
+    """
+
+    def __init__(self, workers: int = 2):
+        self.workers = max(1, workers)
+        self._condition = threading.Condition()
+        self._cameras: List = []
+        self._in_flight = set()
+        self._cursor = 0
+        self._threads: List[threading.Thread] = []
+
+        # Métricas por cámara: detecciones y retraso respecto al instante en que tocaban
+        self._runs: Dict[str, int] = {}
+        self._lag: Dict[str, float] = {}
+
+    def register(self, camera):
+        with self._condition:
+            if camera not in self._cameras:
+                self._cameras.append(camera)
+                self._runs.setdefault(camera.key, 0)
+                self._lag.setdefault(camera.key, 0.0)
+            self._start_workers()
+            self._condition.notify_all()
+
+    def unregister(self, camera):
+        with self._condition:
+            if camera in self._cameras:
+                index = self._cameras.index(camera)
+                self._cameras.remove(camera)
+                if index < self._cursor:
+                    self._cursor -= 1
+            self._runs.pop(camera.key, None)
+            self._lag.pop(camera.key, None)
+
+    def wake(self):
+        """
+        Despierta a los hilos (por ejemplo, al activar la detección de una cámara).
+        """
+        with self._condition:
+            self._condition.notify_all()
+
+    def stats(self) -> Dict[str, Dict]:
+        with self._condition:
+            return {
+                key: {
+                    'detections': runs,
+                    'avg_lag': self._lag[key] / runs if runs else 0.0,
+                }
+                for key, runs in self._runs.items()
+            }
+
+    def _start_workers(self):
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(
+                target=self._worker,
+                name=f'camera-detector-{len(self._threads)}',
+                daemon=True
+            )
+            self._threads.append(thread)
+            thread.start()
+
+    def _pick(self, now: float):
+        """
+        Siguiente cámara a la que le toca detección, empezando después de la última
+        atendida. Devuelve (cámara, instante en que tocaba) o (None, espera sugerida).
+        """
+        count = len(self._cameras)
+        next_due = None
+        for offset in range(count):
+            index = (self._cursor + offset) % count
+            camera = self._cameras[index]
+            if camera in self._in_flight:
+                continue
+            due = camera.detection_due(now)
+            if due is None:
+                continue
+            if due <= now:
+                self._cursor = index + 1
+                return camera, due
+            next_due = due if next_due is None else min(next_due, due)
+
+        wait = 1.0 if next_due is None else max(0.001, next_due - now)
+        return None, wait
+
+    def _worker(self):
+        while True:
+            with self._condition:
+                while True:
+                    now = time.time()
+                    camera, due_or_wait = self._pick(now)
+                    if camera is not None:
+                        self._in_flight.add(camera)
+                        break
+                    self._condition.wait(due_or_wait)
+
+            try:
+                camera.run_detection()
+            except Exception as e:
+                print(f"✗ Error en la detección de la cámara {camera.key}: {e}")
+            finally:
+                with self._condition:
+                    self._in_flight.discard(camera)
+                    if camera.key in self._runs:
+                        self._runs[camera.key] += 1
+                        self._lag[camera.key] += max(0.0, now - due_or_wait)
+                    self._condition.notify_all()
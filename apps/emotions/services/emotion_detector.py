@@ -2,6 +2,7 @@
 Servicio de detección de emociones usando el modelo FER+ con ONNX Runtime y OpenCV.
 """
 import os
+import threading
 import cv2
 import numpy as np
 import onnxruntime as ort
@@ -11,6 +12,9 @@ from typing import Dict, List, Tuple, Optional
 import base64
 from io import BytesIO
 
+from apps.emotions.services.face_crop_writer import face_crop_writer
+from apps.emotions.services.result_cache import DegradedResult, result_cache
+
 
 class EmotionDetector:
     """
@@ -37,8 +41,22 @@ class EmotionDetector:
         self.face_detector_path = os.path.join(settings.BASE_DIR, 'models', 'face_detection_yunet_2023mar_int8.onnx')
         self.session = None
         self.face_detector = None
+        # YuNet guarda el tamaño de entrada como estado: una instancia por hilo
+        self._thread_local = threading.local()
         self._load_model()
         self._load_face_detector()
+        # Forma parte de la clave del caché de resultados: cambiar el modelo lo invalida
+        self.model_version = getattr(settings, 'EMOTION_MODEL_VERSION', None) or self._model_fingerprint()
+    
+    def _model_fingerprint(self) -> str:
+        """
+        Identifica la versión de los modelos por nombre y tamaño de archivo.
+        """
+        parts = []
+        for path in (self.model_path, self.face_detector_path):
+            size = os.path.getsize(path) if os.path.exists(path) else 0
+            parts.append(f"{os.path.splitext(os.path.basename(path))[0]}-{size}")
+        return '+'.join(parts)
     
     def _load_model(self):
         """
@@ -66,24 +84,43 @@ class EmotionDetector:
             if not os.path.exists(self.face_detector_path):
                 raise FileNotFoundError(f"Modelo YuNet no encontrado en: {self.face_detector_path}")
             
-            # Inicializar el detector YuNet con tamaño de input por defecto
-            # Se ajustará dinámicamente según el tamaño de la imagen
-            self.face_detector = cv2.FaceDetectorYN.create(
-                model=self.face_detector_path,
-                config="",
-                input_size=(320, 320),
-                score_threshold=0.6,  # Umbral más alto para reducir falsos positivos
-                nms_threshold=0.3,    # Non-maximum suppression integrado
-                top_k=5000,
-                backend_id=cv2.dnn.DNN_BACKEND_OPENCV,
-                target_id=cv2.dnn.DNN_TARGET_CPU
-            )
+            self.face_detector = self._create_face_detector()
+            self._thread_local.face_detector = self.face_detector
             print(f"Detector YuNet cargado exitosamente desde: {self.face_detector_path}")
                 
         except Exception as e:
             print(f"Error al cargar el detector de rostros YuNet: {str(e)}")
             raise
     
+    def _create_face_detector(self):
+        """
+        Crea una instancia del detector YuNet.
+        """
+        # Inicializar el detector YuNet con tamaño de input por defecto
+        # Se ajustará dinámicamente según el tamaño de la imagen
+        return cv2.FaceDetectorYN.create(
+            model=self.face_detector_path,
+            config="",
+            input_size=(320, 320),
+            score_threshold=0.6,  # Umbral más alto para reducir falsos positivos
+            nms_threshold=0.3,    # Non-maximum suppression integrado
+            top_k=5000,
+            backend_id=cv2.dnn.DNN_BACKEND_OPENCV,
+            target_id=cv2.dnn.DNN_TARGET_CPU
+        )
+    
+    def get_face_detector(self):
+        """
+        Retorna el detector YuNet del hilo actual.
+        setInputSize + detect no es seguro entre hilos, así que cada hilo
+        (peticiones WSGI, executor de inferencia, workers) usa su propia instancia.
+        """
+        face_detector = getattr(self._thread_local, 'face_detector', None)
+        if face_detector is None:
+            face_detector = self._create_face_detector()
+            self._thread_local.face_detector = face_detector
+        return face_detector
+    
     def preprocess_face(self, face_img: np.ndarray) -> np.ndarray:
         """
         Preprocesa la imagen del rostro para el modelo FER+ según especificación oficial.
@@ -200,12 +237,13 @@ class EmotionDetector:
                 new_width, new_height = width, height
             
             # Ajustar el tamaño de entrada del detector
-            self.face_detector.setInputSize((new_width, new_height))
+            face_detector = self.get_face_detector()
+            face_detector.setInputSize((new_width, new_height))
             
             # Detectar rostros
             # YuNet devuelve: [x, y, w, h, x_re, y_re, x_le, y_le, x_nt, y_nt, x_rcm, y_rcm, x_lcm, y_lcm, score]
             # Donde: re=right eye, le=left eye, nt=nose tip, rcm=right corner mouth, lcm=left corner mouth
-            _, faces = self.face_detector.detect(resized_image)
+            _, faces = face_detector.detect(resized_image)
             
             if faces is None or len(faces) == 0:
                 print("No se detectaron rostros con YuNet")
@@ -244,8 +282,25 @@ class EmotionDetector:
             import traceback
             print(f"Error en detección de rostros con YuNet: {e}")
             print(traceback.format_exc())
+            self._mark_degraded()
             return []
     
+    def _mark_degraded(self):
+        """
+        Registra que el análisis en curso (en este hilo) usó valores de respaldo tras un error.
+        """
+        self._thread_local.degraded = True
+    
+    def _cacheable(self, compute, *args):
+        """
+        Ejecuta una parte cacheable del análisis. Si detect_faces o predict_emotion
+        recurrieron a valores de respaldo, el resultado se marca como degradado y el
+        caché de resultados no lo guarda.
+        """
+        self._thread_local.degraded = False
+        result = compute(*args)
+        return DegradedResult(result) if self._thread_local.degraded else result
+    
     def predict_emotion(self, face_img: np.ndarray) -> Dict[str, float]:
         """
         Predice la emoción de un rostro.
@@ -309,6 +364,7 @@ class EmotionDetector:
             print(f"Error en predicción de emoción: {e}")
             import traceback
             print(traceback.format_exc())
+            self._mark_degraded()
             # Devolver distribución neutral como fallback
             return {
                 'neutral': 0.7,
@@ -321,10 +377,119 @@ class EmotionDetector:
                 'contempt': 0.02
             }
     
+    @property
+    def supports_batch(self) -> bool:
+        """
+        True si el modelo acepta varios rostros por inferencia (primera dimensión no fija en 1).
+        """
+        return self.session.get_inputs()[0].shape[0] != 1
+    
+    def predict_emotions(self, face_imgs: List[np.ndarray]) -> List[Dict[str, float]]:
+        """
+        Predice las emociones de varios rostros con inferencia por lotes.
+        
+        Si el modelo tiene el tamaño de lote fijo en 1 (como emotion-ferplus-8), se ejecuta
+        una inferencia por rostro sobre las entradas ya preprocesadas.
+        
+        Args:
+            face_imgs: Imágenes de los rostros
+            
+        Returns:
+            Diccionarios de emociones y probabilidades, en el mismo orden
+        """
+        if self.session is None:
+            raise Exception("Modelo no cargado")
+        
+        results = [None] * len(face_imgs)
+        inputs = []
+        positions = []
+        for position, face_img in enumerate(face_imgs):
+            if face_img.shape[0] < 30 or face_img.shape[1] < 30:
+                # Mismo criterio que predict_emotion para rostros muy pequeños
+                results[position] = self.predict_emotion(face_img)
+            else:
+                inputs.append(self.preprocess_face(face_img))
+                positions.append(position)
+        
+        if not inputs:
+            return results
+        
+        input_name = self.session.get_inputs()[0].name
+        if self.supports_batch:
+            scores = self.session.run(None, {input_name: np.concatenate(inputs)})[0]
+        else:
+            scores = np.concatenate([
+                self.session.run(None, {input_name: face_input})[0] for face_input in inputs
+            ])
+        
+        for position, face_scores in zip(positions, scores):
+            results[position] = self.postprocess_prediction(face_scores[np.newaxis])
+        return results
+    
+    def analyze_images_batch(self, images: List[np.ndarray]) -> List[List[Dict]]:
+        """
+        Detecta los rostros de varias imágenes y predice sus emociones en un solo lote.
+        
+        Args:
+            images: Imágenes BGR
+            
+        Returns:
+            Por cada imagen, la lista de resultados por rostro (mismo formato que _analyze_faces)
+        """
+        boxes = [self.detect_faces(image, realtime=False) for image in images]
+        return self.analyze_faces_batch(images, boxes)
+    
+    def analyze_faces_batch(self, images: List[np.ndarray],
+                            boxes: List[List[Tuple[int, int, int, int]]]) -> List[List[Dict]]:
+        """
+        Predice en un solo lote las emociones de rostros ya detectados en varias imágenes.
+        
+        Args:
+            images: Imágenes BGR
+            boxes: Por cada imagen, sus rostros (x, y, w, h) según detect_faces
+            
+        Returns:
+            Por cada imagen, la lista de resultados por rostro (mismo formato que _analyze_faces)
+        """
+        # Se descartan recortes vacíos (rostros en el borde de la imagen)
+        boxes = [
+            [(x, y, w, h) for (x, y, w, h) in faces if w > 0 and h > 0]
+            for faces in boxes
+        ]
+        face_imgs = [
+            image[y:y+h, x:x+w]
+            for image, faces in zip(images, boxes)
+            for (x, y, w, h) in faces
+        ]
+        emotions_iter = iter(self.predict_emotions(face_imgs))
+        
+        return [
+            [self._face_result(i, box, next(emotions_iter)) for i, box in enumerate(faces)]
+            for faces in boxes
+        ]
+    
+    def _face_result(self, index: int, box: Tuple[int, int, int, int], emotions: Dict[str, float]) -> Dict:
+        """
+        Resultado de un rostro en el formato de faces_analysis.
+        """
+        x, y, w, h = box
+        dominant_emotion = max(emotions, key=emotions.get)
+        return {
+            'face_id': index + 1,
+            'coordinates': {'x': x, 'y': y, 'width': w, 'height': h},
+            'dominant_emotion': dominant_emotion,
+            'confidence': emotions[dominant_emotion],
+            'all_emotions': emotions,
+            'face_image': None  # Se completa al guardar el recorte
+        }
+    
     def analyze_image(self, image_path: str, save_faces: bool = True) -> Dict:
         """
         Analiza una imagen completa, detecta rostros y predice emociones.
         
+        La inferencia se cachea por contenido de la imagen: reenviar el mismo archivo
+        solo vuelve a recortar los rostros (sus archivos ya existen y no se reescriben).
+        
         Args:
             image_path: Ruta de la imagen a analizar
             save_faces: Si es True, guarda los rostros recortados
@@ -334,57 +499,40 @@ class EmotionDetector:
         """
         try:
             # Cargar imagen
-            image = cv2.imread(image_path)
-            if image is None:
-                raise ValueError(f"No se pudo cargar la imagen: {image_path}")
-            
-            # Detectar rostros (modo no tiempo real para mejor precisión)
-            faces = self.detect_faces(image, realtime=False)
+            with open(image_path, 'rb') as image_file:
+                image_bytes = image_file.read()
+            
+            decoded = {}
+            
+            def load_image():
+                if 'image' not in decoded:
+                    image = cv2.imdecode(np.frombuffer(image_bytes, dtype=np.uint8), cv2.IMREAD_COLOR)
+                    if image is None:
+                        raise ValueError(f"No se pudo cargar la imagen: {image_path}")
+                    decoded['image'] = image
+                return decoded['image']
+            
+            faces_analysis = result_cache.get_or_compute(
+                result_cache.make_key(image_bytes, 'image', self.model_version),
+                lambda: self._cacheable(self._analyze_faces, load_image()),
+                size=len(image_bytes)
+            )
             
             results = {
                 'image_path': image_path,
-                'faces_detected': len(faces),
-                'faces_analysis': []
+                'faces_detected': len(faces_analysis),
+                'faces_analysis': faces_analysis
             }
             
-            # Crear directorio para rostros recortados si no existe
-            if save_faces and len(faces) > 0:
-                from datetime import datetime
-                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                faces_dir = os.path.join(settings.MEDIA_ROOT, 'faces', timestamp)
-                os.makedirs(faces_dir, exist_ok=True)
-            
-            # Analizar cada rostro detectado
-            for i, (x, y, w, h) in enumerate(faces):
-                # Extraer rostro
-                face_img = image[y:y+h, x:x+w]
-                
-                # Guardar rostro recortado
-                face_path = None
-                if save_faces:
-                    face_filename = f'face_{i+1}.jpg'
-                    face_full_path = os.path.join(faces_dir, face_filename)
-                    cv2.imwrite(face_full_path, face_img)
-                    # Guardar ruta relativa desde MEDIA_ROOT con forward slashes para URLs
-                    face_path = f'faces/{timestamp}/{face_filename}'
-                
-                # Predecir emoción
-                emotions = self.predict_emotion(face_img)
-                
-                # Encontrar emoción dominante
-                dominant_emotion = max(emotions, key=emotions.get)
-                confidence = emotions[dominant_emotion]
-                
-                face_result = {
-                    'face_id': i + 1,
-                    'coordinates': {'x': x, 'y': y, 'width': w, 'height': h},
-                    'dominant_emotion': dominant_emotion,
-                    'confidence': confidence,
-                    'all_emotions': emotions,
-                    'face_image': face_path  # Agregar ruta de la imagen del rostro
-                }
-                
-                results['faces_analysis'].append(face_result)
+            # Guardar rostros recortados (también en aciertos de caché). La codificación y
+            # la escritura ocurren en segundo plano (ver services/face_crop_writer.py)
+            if save_faces and len(faces_analysis) > 0:
+                image = load_image()
+                for face_result in faces_analysis:
+                    coords = face_result['coordinates']
+                    x, y, w, h = coords['x'], coords['y'], coords['width'], coords['height']
+                    # Ruta relativa desde MEDIA_ROOT con forward slashes para URLs
+                    face_result['face_image'] = face_crop_writer.submit(image[y:y+h, x:x+w])
             
             return results
             
@@ -395,14 +543,39 @@ class EmotionDetector:
                 'faces_detected': 0,
                 'faces_analysis': []
             }
-
     
-    def analyze_image_from_base64(self, base64_image: str) -> Dict:
+    def _analyze_faces(self, image: np.ndarray) -> List[Dict]:
+        """
+        Detecta rostros y predice sus emociones (parte cacheable de analyze_image).
+        
+        Args:
+            image: Imagen BGR
+            
+        Returns:
+            Lista de resultados por rostro (sin recortes guardados)
+        """
+        # Detectar rostros (modo no tiempo real para mejor precisión)
+        faces = self.detect_faces(image, realtime=False)
+        
+        faces_analysis = []
+        for i, (x, y, w, h) in enumerate(faces):
+            # Extraer rostro
+            face_img = image[y:y+h, x:x+w]
+            
+            # Predecir emoción
+            emotions = self.predict_emotion(face_img)
+            
+            faces_analysis.append(self._face_result(i, (x, y, w, h), emotions))
+        
+        return faces_analysis
+
+    def analyze_image_from_base64(self, base64_image: str, use_cache: bool = True) -> Dict:
         """
         Analiza una imagen desde base64.
         
         Args:
             base64_image: Imagen codificada en base64
+            use_cache: Si es False no consulta ni llena el caché (frames de video en vivo)
             
         Returns:
             Diccionario con resultados del análisis
@@ -418,77 +591,15 @@ class EmotionDetector:
             
             print(f"Imagen decodificada: {len(image_data)} bytes")
             
-            # Convertir a imagen PIL y luego a array numpy
-            pil_image = Image.open(BytesIO(image_data))
-            image = cv2.cvtColor(np.array(pil_image), cv2.COLOR_RGB2BGR)
-            
-            print(f"Imagen convertida a numpy: {image.shape}")
+            if not use_cache:
+                return self._analyze_image_bytes(image_data)
             
-            # Detectar rostros (modo no tiempo real para mejor precisión)
-            faces = self.detect_faces(image, realtime=False)
-            
-            print(f"Rostros detectados: {len(faces)}")
-            
-            results = {
-                'faces_detected': len(faces),
-                'faces': []  # Cambiar de faces_analysis a faces
-            }
-            
-            # Analizar cada rostro detectado
-            for i, (x, y, w, h) in enumerate(faces):
-                try:
-                    print(f"Procesando rostro {i+1}: x={x}, y={y}, w={w}, h={h}")
-                    
-                    # Validar coordenadas
-                    if x < 0 or y < 0 or w <= 0 or h <= 0:
-                        print(f"  Coordenadas inválidas, saltando...")
-                        continue
-                    
-                    # Extraer rostro con validación
-                    y1 = max(0, y)
-                    y2 = min(image.shape[0], y + h)
-                    x1 = max(0, x)
-                    x2 = min(image.shape[1], x + w)
-                    
-                    face_img = image[y1:y2, x1:x2]
-                    
-                    if face_img.size == 0:
-                        print(f"  Rostro vacío, saltando...")
-                        continue
-                    
-                    print(f"  Rostro extraído: {face_img.shape}")
-                    
-                    # Predecir emoción
-                    emotions = self.predict_emotion(face_img)
-                    
-                    print(f"  Emociones predichas: {emotions}")
-                    
-                    # Encontrar emoción dominante
-                    dominant_emotion = max(emotions, key=emotions.get)
-                    confidence = emotions[dominant_emotion]
-                    
-                    face_result = {
-                        'face_id': i + 1,
-                        'x': int(x),
-                        'y': int(y),
-                        'width': int(w),
-                        'height': int(h),
-                        'dominant_emotion': dominant_emotion,
-                        'confidence': float(confidence),
-                        'emotions': emotions  # Importante: usar 'emotions' no 'all_emotions'
-                    }
-                    
-                    results['faces'].append(face_result)
-                    print(f"  Rostro {i+1} procesado exitosamente")
-                    
-                except Exception as e:
-                    print(f"Error procesando rostro {i}: {e}")
-                    import traceback
-                    print(traceback.format_exc())
-                    continue
-            
-            print(f"Análisis completado: {len(results['faces'])} rostros procesados")
-            return results
+            # Misma imagen ya analizada (reintentos, reenvíos): se reutiliza el resultado
+            return result_cache.get_or_compute(
+                result_cache.make_key(image_data, 'base64', self.model_version),
+                lambda: self._cacheable(self._analyze_image_bytes, image_data),
+                size=len(image_data)
+            )
             
         except Exception as e:
             import traceback
@@ -500,6 +611,126 @@ class EmotionDetector:
                 'faces': []
             }
     
+    def _analyze_image_bytes(self, image_data: bytes) -> Dict:
+        """
+        Decodifica la imagen y analiza sus rostros (parte cacheable de analyze_image_from_base64).
+        
+        Args:
+            image_data: Bytes de la imagen (JPEG/PNG)
+            
+        Returns:
+            Diccionario con resultados del análisis
+        """
+        # Convertir a imagen PIL y luego a array numpy
+        pil_image = Image.open(BytesIO(image_data))
+        image = cv2.cvtColor(np.array(pil_image), cv2.COLOR_RGB2BGR)
+        
+        print(f"Imagen convertida a numpy: {image.shape}")
+        
+        # Detectar rostros (modo no tiempo real para mejor precisión)
+        faces = self.detect_faces(image, realtime=False)
+        
+        print(f"Rostros detectados: {len(faces)}")
+        
+        results = {
+            'faces_detected': len(faces),
+            'faces': [],  # Cambiar de faces_analysis a faces
+            'frame_size': [image.shape[1], image.shape[0]]  # Para ubicar los recortes (ver crop_sessions)
+        }
+        
+        # Analizar cada rostro detectado
+        for i, (x, y, w, h) in enumerate(faces):
+            try:
+                print(f"Procesando rostro {i+1}: x={x}, y={y}, w={w}, h={h}")
+                
+                # Validar coordenadas
+                if x < 0 or y < 0 or w <= 0 or h <= 0:
+                    print(f"  Coordenadas inválidas, saltando...")
+                    continue
+                
+                # Extraer rostro con validación
+                y1 = max(0, y)
+                y2 = min(image.shape[0], y + h)
+                x1 = max(0, x)
+                x2 = min(image.shape[1], x + w)
+                
+                face_img = image[y1:y2, x1:x2]
+                
+                if face_img.size == 0:
+                    print(f"  Rostro vacío, saltando...")
+                    continue
+                
+                print(f"  Rostro extraído: {face_img.shape}")
+                
+                # Predecir emoción
+                emotions = self.predict_emotion(face_img)
+                
+                print(f"  Emociones predichas: {emotions}")
+                
+                # Encontrar emoción dominante
+                dominant_emotion = max(emotions, key=emotions.get)
+                confidence = emotions[dominant_emotion]
+                
+                face_result = {
+                    'face_id': i + 1,
+                    'x': int(x),
+                    'y': int(y),
+                    'width': int(w),
+                    'height': int(h),
+                    'dominant_emotion': dominant_emotion,
+                    'confidence': float(confidence),
+                    'emotions': emotions  # Importante: usar 'emotions' no 'all_emotions'
+                }
+                
+                results['faces'].append(face_result)
+                print(f"  Rostro {i+1} procesado exitosamente")
+                
+            except Exception as e:
+                print(f"Error procesando rostro {i}: {e}")
+                import traceback
+                print(traceback.format_exc())
+                self._mark_degraded()
+                continue
+        
+        print(f"Análisis completado: {len(results['faces'])} rostros procesados")
+        return results
+    
+    def analyze_known_faces(self, face_imgs: List[np.ndarray],
+                            boxes: List[Tuple[int, int, int, int]]) -> Dict:
+        """
+        Predice en un lote las emociones de rostros ya ubicados, sin ejecutar YuNet
+        (modo de recortes en tiempo real, ver services/crop_sessions.py).
+        
+        Args:
+            face_imgs: Imagen de cada rostro
+            boxes: Caja (x, y, w, h) de cada rostro en el frame original
+            
+        Returns:
+            Diccionario con resultados (mismo formato que analyze_frame)
+        """
+        results = {
+            'faces_detected': len(face_imgs),
+            'faces': []
+        }
+        valid = [(face_img, box) for face_img, box in zip(face_imgs, boxes) if face_img.size > 0]
+        if not valid:
+            return results
+        
+        emotions_list = self.predict_emotions([face_img for face_img, _ in valid])
+        for i, ((_, (x, y, w, h)), emotions) in enumerate(zip(valid, emotions_list)):
+            dominant_emotion = max(emotions, key=emotions.get)
+            results['faces'].append({
+                'face_id': i + 1,
+                'x': int(x),
+                'y': int(y),
+                'width': int(w),
+                'height': int(h),
+                'dominant_emotion': dominant_emotion,
+                'confidence': float(emotions[dominant_emotion]),
+                'emotions': emotions
+            })
+        return results
+    
     def analyze_frame(self, frame: np.ndarray) -> Dict:
         """
         Analiza un frame de video en tiempo real con optimización de rendimiento.
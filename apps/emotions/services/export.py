@@ -0,0 +1,186 @@
+"""
+Exportación masiva del historial de análisis en CSV o NDJSON.
+
+Las filas se leen con iterator(chunk_size=...) (en PostgreSQL, un cursor del lado del
+servidor) y se convierten en bloques de bytes a medida que se generan, con gzip
+incremental opcional. Ni la consulta ni la respuesta se cargan completas en memoria,
+así que el mismo generador sirve a StreamingHttpResponse y al comando export_analyses.
+"""
+import csv
+import json
+import zlib
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from apps.emotions.models import EMOTION_KEYS, EmotionAnalysis, FaceDetection
+
+FORMATS = ('csv', 'ndjson')
+LEVELS = ('analyses', 'faces')
+
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+}
+
+# Filas leídas por viaje al servidor y tamaño de los bloques enviados al cliente
+CHUNK_SIZE = getattr(settings, 'EMOTION_EXPORT_CHUNK_SIZE', 2000)
+BLOCK_SIZE = 64 * 1024
+
+# Inicios de celda que Excel y LibreOffice interpretan como fórmula
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+# (nombre de la columna exportada, campo del ORM)
+ANALYSIS_COLUMNS = [
+    ('id', 'id'),
+    ('user', 'user__username'),
+    ('created_at', 'created_at'),
+    ('faces_detected', 'faces_detected'),
+    ('dominant_emotion', 'dominant_emotion'),
+    ('average_confidence', 'average_confidence'),
+    ('processing_time', 'processing_time'),
+    ('image', 'image'),
+    ('notes', 'notes'),
+]
+
+FACE_COLUMNS = [
+    ('analysis_id', 'analysis_id'),
+    ('user', 'user__username'),
+    ('created_at', 'created_at'),
+    ('face_index', 'face_index'),
+    ('x', 'x'),
+    ('y', 'y'),
+    ('width', 'width'),
+    ('height', 'height'),
+    ('dominant_emotion', 'dominant_emotion'),
+    ('confidence', 'confidence'),
+] + [(emotion, emotion) for emotion in EMOTION_KEYS]
+
+
+def local_day_start(day) -> datetime:
+    """
+    Inicio del día en la zona horaria local, para filtrar created_at por rango (usa índices).
+    """
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def export_queryset(level, users=None, date_from=None, date_to=None, emotion=None):
+    """
+    Consulta de la exportación con sus filtros, ya proyectada a tuplas.
+
+    Args:
+        level: 'analyses' (una fila por análisis) o 'faces' (una fila por rostro)
+        users: Queryset o lista de IDs de usuario; None exporta todos
+        date_from, date_to: Fechas locales (inclusive)
+        emotion: Emoción dominante del análisis o, en 'faces', del rostro
+
+    Returns:
+        Tupla (nombres de columnas, queryset de values_list)
+    """
+    if level == 'faces':
+        model, columns = FaceDetection, FACE_COLUMNS
+    else:
+        model, columns = EmotionAnalysis, ANALYSIS_COLUMNS
+
+    rows = model.objects.all()
+    if users is not None:
+        rows = rows.filter(user__in=users)
+    if date_from:
+        rows = rows.filter(created_at__gte=local_day_start(date_from))
+    if date_to:
+        rows = rows.filter(created_at__lt=local_day_start(date_to + timedelta(days=1)))
+    if emotion:
+        rows = rows.filter(dominant_emotion=emotion)
+
+    order = ('created_at', 'analysis_id', 'face_index') if level == 'faces' else ('created_at', 'id')
+    header = [name for name, _ in columns]
+    return header, rows.order_by(*order).values_list(*[field for _, field in columns])
+
+
+def _prepare(row, created_at_index, tz):
+    row = list(row)
+    row[created_at_index] = row[created_at_index].astimezone(tz).isoformat()
+    return row
+
+
+def csv_safe(value):
+    """
+    Antepone un apóstrofo a los textos que una hoja de cálculo ejecutaría como
+    fórmula (inyección CSV, p. ej. notas que empiezan con "=HYPERLINK(...)").
+    """
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+class _Echo:
+    """
+    Pseudo-archivo para csv.writer: devuelve la línea en lugar de guardarla.
+    """
+
+    def write(self, value):
+        return value
+
+
+def iter_lines(header, rows, fmt):
+    """
+    Genera las líneas de texto de la exportación (CSV con encabezado o NDJSON).
+    """
+    created_at_index = header.index('created_at')
+    # La zona horaria se resuelve una sola vez (timezone.localtime la busca en cada fila)
+    tz = timezone.get_current_timezone()
+
+    if fmt == 'csv':
+        writer = csv.writer(_Echo())
+        # BOM para que Excel reconozca UTF-8 (tildes en notas y nombres)
+        yield '\ufeff' + writer.writerow(header)
+        for row in rows.iterator(chunk_size=CHUNK_SIZE):
+            yield writer.writerow([csv_safe(value) for value in _prepare(row, created_at_index, tz)])
+    else:
+        for row in rows.iterator(chunk_size=CHUNK_SIZE):
+            yield json.dumps(
+                dict(zip(header, _prepare(row, created_at_index, tz))),
+                cls=DjangoJSONEncoder, ensure_ascii=False
+            ) + '\n'
+
+
+def stream_export(header, rows, fmt='csv', compress=False):
+    """
+    Generador de bloques de bytes listos para enviar o escribir.
+
+    Args:
+        header, rows: Resultado de export_queryset
+        fmt: 'csv' o 'ndjson'
+        compress: Comprimir con gzip de forma incremental
+
+    Yields:
+        Bloques de aproximadamente BLOCK_SIZE bytes (antes de comprimir)
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+    buffer = []
+    size = 0
+
+    for line in iter_lines(header, rows, fmt):
+        data = line.encode('utf-8')
+        buffer.append(data)
+        size += len(data)
+        if size >= BLOCK_SIZE:
+            block = b''.join(buffer)
+            buffer, size = [], 0
+            if compressor:
+                block = compressor.compress(block)
+            if block:
+                yield block
+
+    block = b''.join(buffer)
+    if compressor:
+        block = compressor.compress(block) + compressor.flush()
+    if block:
+        yield block
+
+
+def export_filename(level, fmt, compress=False) -> str:
+    name = f"emociones_{level}_{timezone.localdate():%Y%m%d}.{fmt}"
+    return f"{name}.gz" if compress else name
@@ -0,0 +1,177 @@
+"""
+Escritura en segundo plano de los rostros recortados de cada análisis.
+
+Guardar los recortes con cv2.imwrite dentro de analyze_image sumaba la escritura a
+disco al tiempo de la inferencia, y las carpetas por segundo (faces/<timestamp>/)
+hacían que dos análisis del mismo segundo se pisaran los recortes. Ahora el análisis
+solo reduce el rostro a EMOTION_FACE_CROP_SIZE px (sin deformarlo, ver letterbox) y
+calcula el hash de sus píxeles, que da el nombre del archivo (faces/<ab>/<hash>.webp);
+la codificación WebP y la escritura las hace un hilo a partir de una cola acotada. Un mismo rostro (la misma
+imagen subida dos veces) se guarda una sola vez.
+"""
+import atexit
+import hashlib
+import os
+import queue
+import threading
+import time
+from typing import Dict, Optional
+
+import cv2
+import numpy as np
+from django.conf import settings
+
+from apps.emotions.services import metrics
+
+
+def letterbox(image: np.ndarray, size: int) -> np.ndarray:
+    """
+    Reduce la imagen a size px en su lado mayor, sin deformarla, y la centra en un
+    cuadrado de size x size con bandas negras.
+    """
+    height, width = image.shape[:2]
+    if max(height, width) > 2 * size:
+        # INTER_AREA es lento con factores grandes no enteros: primero una reducción
+        # lineal al doble del tamaño final, luego INTER_AREA con factor 2
+        scale = 2 * size / max(height, width)
+        image = cv2.resize(image, (max(1, round(width * scale)), max(1, round(height * scale))),
+                           interpolation=cv2.INTER_LINEAR)
+        height, width = image.shape[:2]
+    scale = size / max(height, width)
+    new_width, new_height = max(1, round(width * scale)), max(1, round(height * scale))
+    image = cv2.resize(image, (new_width, new_height), interpolation=cv2.INTER_AREA)
+    top, left = (size - new_height) // 2, (size - new_width) // 2
+    return cv2.copyMakeBorder(image, top, size - new_height - top, left, size - new_width - left,
+                              cv2.BORDER_CONSTANT, value=0)
+
+
+class FaceCropWriter:
+    """
+    Cola de recortes pendientes y el hilo que los codifica y escribe.
+
+    Args:
+        root: Directorio base (MEDIA_ROOT); los recortes van en root/faces/
+        size: Lado (px) al que se reduce cada recorte
+        quality: Calidad WebP (0-100)
+        max_pending: Recortes en cola; al llenarse, submit espera (contrapresión)
+    """
+
+    def __init__(self, root: Optional[str] = None, size: int = 128, quality: int = 80,
+                 max_pending: int = 256):
+        self.root = root
+        self.size = size
+        self.quality = quality
+        self._queue: 'queue.Queue' = queue.Queue(maxsize=max(1, max_pending))
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._thread = None
+        self._pid = None
+
+        # Métricas
+        self.written = 0
+        self.deduplicated = 0
+        self.bytes_written = 0
+        self.errors = 0
+
+    def submit(self, face_img: np.ndarray) -> Optional[str]:
+        """
+        Encola un rostro para guardarlo y devuelve su ruta relativa a MEDIA_ROOT (el
+        archivo aparece en cuanto el hilo lo escribe). None si el recorte está vacío.
+        """
+        if face_img is None or face_img.size == 0:
+            return None
+        crop = letterbox(face_img, self.size)
+        digest = hashlib.blake2b(np.ascontiguousarray(crop).data, digest_size=16).hexdigest()
+        relative_path = f'faces/{digest[:2]}/{digest}.webp'
+
+        with self._lock:
+            if relative_path in self._pending:
+                self.deduplicated += 1
+                return relative_path
+            self._pending.add(relative_path)
+        self._start()
+        self._queue.put((relative_path, crop))
+        return relative_path
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Espera a que se escriban los recortes encolados. Devuelve False si se agotó
+        el tiempo.
+        """
+        if self._thread is None:
+            return True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        # Como Queue.join, pero con límite de tiempo
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def snapshot(self) -> Dict:
+        return {
+            'pending': self._queue.qsize(),
+            'written': self.written,
+            'deduplicated': self.deduplicated,
+            'bytes_written': self.bytes_written,
+            'errors': self.errors,
+        }
+
+    def _write(self, relative_path: str, crop: np.ndarray):
+        full_path = os.path.join(self.root or settings.MEDIA_ROOT, *relative_path.split('/'))
+        if os.path.exists(full_path):
+            # Mismo contenido ya guardado por otro análisis
+            self.deduplicated += 1
+            return
+        ok, encoded = cv2.imencode('.webp', crop, [cv2.IMWRITE_WEBP_QUALITY, self.quality])
+        if not ok:
+            raise ValueError('No se pudo codificar el recorte')
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        # Escritura atómica: nunca queda a la vista un archivo a medio escribir
+        temp_path = f'{full_path}.{threading.get_ident()}.tmp'
+        with open(temp_path, 'wb') as crop_file:
+            crop_file.write(encoded.tobytes())
+        os.replace(temp_path, full_path)
+        self.written += 1
+        self.bytes_written += len(encoded)
+
+    def _start(self):
+        # Tras un fork (servidores con preload) el hilo del padre no existe en el hijo
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='face-crop-writer', daemon=True)
+        self._thread.start()
+        atexit.register(self._shutdown)
+
+    def _run(self):
+        while True:
+            relative_path, crop = self._queue.get()
+            try:
+                self._write(relative_path, crop)
+            except Exception as e:
+                self.errors += 1
+                print(f"✗ Error guardando el recorte {relative_path}: {e}")
+            finally:
+                with self._lock:
+                    self._pending.discard(relative_path)
+                self._queue.task_done()
+
+    def _shutdown(self):
+        if not self.flush(timeout=10):
+            print(f"✗ Quedaron {self._queue.qsize()} recortes de rostros sin guardar")
+
+
+# Instancia global usada por el detector
+face_crop_writer = FaceCropWriter(
+    size=getattr(settings, 'EMOTION_FACE_CROP_SIZE', 128),
+    quality=getattr(settings, 'EMOTION_FACE_CROP_QUALITY', 80),
+    max_pending=getattr(settings, 'EMOTION_FACE_CROP_MAX_PENDING', 256)
+)
+
+metrics.register('face_crop_writer', face_crop_writer.snapshot)
@@ -0,0 +1,122 @@
+"""
+Seguimiento de rostros entre frames por superposición de cajas (IoU).
+
+Asocia las detecciones de cada frame con los rostros vistos en los frames anteriores,
+de modo que una misma persona se cuente una sola vez y sus emociones se acumulen a lo
+largo del video. Es un emparejamiento voraz por IoU: suficiente para cámaras fijas de
+aula, donde los rostros se mueven poco entre frames muestreados.
+"""
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+Box = Tuple[int, int, int, int]
+
+
+def box_iou(a: Box, b: Box) -> float:
+    """
+    Intersección sobre unión de dos cajas (x, y, w, h).
+    """
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    inter_w = min(ax + aw, bx + bw) - max(ax, bx)
+    inter_h = min(ay + ah, by + bh) - max(ay, by)
+    if inter_w <= 0 or inter_h <= 0:
+        return 0.0
+    intersection = inter_w * inter_h
+    return intersection / float(aw * ah + bw * bh - intersection)
+
+
+class FaceTrack:
+    """
+    Un rostro seguido entre frames, con sus emociones acumuladas.
+    """
+    __slots__ = ('track_id', 'box', 'first_seen', 'last_seen', 'hits', 'emotion_sums')
+
+    def __init__(self, track_id: int, box: Box, timestamp: float, emotion_count: int):
+        self.track_id = track_id
+        self.box = box
+        self.first_seen = timestamp
+        self.last_seen = timestamp
+        self.hits = 0
+        self.emotion_sums = np.zeros(emotion_count, dtype=np.float64)
+
+    def add_emotions(self, probabilities: Sequence[float]):
+        self.emotion_sums += probabilities
+
+    def mean_emotions(self) -> np.ndarray:
+        return self.emotion_sums / max(1, self.hits)
+
+
+class FaceTracker:
+    """
+    Asigna un identificador estable a cada rostro mientras siga apareciendo.
+
+    Args:
+        iou_threshold: Superposición mínima para considerar que es el mismo rostro
+        max_age: Segundos sin verse tras los cuales un rostro se da por perdido
+        emotion_count: Largo del vector de probabilidades que acumula cada rostro
+    """
+
+    def __init__(self, iou_threshold: float = 0.3, max_age: float = 1.5, emotion_count: int = 8):
+        self.iou_threshold = iou_threshold
+        self.max_age = max_age
+        self.emotion_count = emotion_count
+        self.active: Dict[int, FaceTrack] = {}
+        self.finished: List[FaceTrack] = []
+        self._next_id = 1
+
+    def update(self, timestamp: float, boxes: Sequence[Box]) -> List[FaceTrack]:
+        """
+        Asocia las detecciones de un frame con los rostros activos.
+
+        Args:
+            timestamp: Segundo del frame en el video (creciente)
+            boxes: Rostros detectados (x, y, w, h)
+
+        Returns:
+            El rostro seguido de cada caja, en el mismo orden
+        """
+        # Rostros que dejaron de verse hace más de max_age
+        for track_id, track in list(self.active.items()):
+            if timestamp - track.last_seen > self.max_age:
+                self.finished.append(self.active.pop(track_id))
+
+        # Pares candidatos ordenados de mayor a menor superposición
+        candidates = sorted(
+            (
+                (iou, index, track_id)
+                for index, box in enumerate(boxes)
+                for track_id, track in self.active.items()
+                for iou in (box_iou(box, track.box),)
+                if iou >= self.iou_threshold
+            ),
+            reverse=True
+        )
+
+        assigned = [None] * len(boxes)
+        matched_tracks = set()
+        for _, index, track_id in candidates:
+            if assigned[index] is not None or track_id in matched_tracks:
+                continue
+            assigned[index] = self.active[track_id]
+            matched_tracks.add(track_id)
+
+        for index, box in enumerate(boxes):
+            track = assigned[index]
+            if track is None:
+                track = FaceTrack(self._next_id, box, timestamp, self.emotion_count)
+                self.active[track.track_id] = track
+                self._next_id += 1
+                assigned[index] = track
+            track.box = box
+            track.last_seen = timestamp
+            track.hits += 1
+
+        return assigned
+
+    def all_tracks(self) -> List[FaceTrack]:
+        """
+        Rostros terminados y activos, en orden de aparición.
+        """
+        return sorted(self.finished + list(self.active.values()), key=lambda track: track.track_id)
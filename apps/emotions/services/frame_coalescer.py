@@ -0,0 +1,189 @@
+"""
+Coalescencia de frames por cliente para el análisis en tiempo real ("el último frame gana").
+
+Cada cliente (sesión + pestaña) tiene un slot en el servidor. Mientras uno de sus
+frames se analiza, los que llegan esperan; si llega uno más nuevo, el que esperaba
+queda reemplazado y responde de inmediato como "superseded". Así el servidor nunca
+analiza frames viejos de un mismo cliente y la antigüedad de los resultados queda acotada.
+"""
+import asyncio
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+
+from django.conf import settings
+
+from apps.emotions.services import metrics
+
+
+class FrameSuperseded(Exception):
+    """
+    El frame fue reemplazado por uno más reciente del mismo cliente o esperó demasiado.
+    """
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class _Slot:
+    __slots__ = ('seq', 'busy', 'last_seen', 'waiters')
+
+    def __init__(self):
+        self.seq = 0
+        self.busy = False
+        self.last_seen = time.monotonic()
+        self.waiters = []
+
+
+class FrameCoalescer:
+    """
+    Slots por cliente con un solo frame en análisis y a lo sumo uno (el más nuevo) en espera.
+    """
+
+    def __init__(self, max_staleness: float, idle_ttl: float = 60.0):
+        self.max_staleness = max_staleness
+        self.idle_ttl = idle_ttl
+        self._lock = threading.Lock()
+        self._slots = {}
+        self._last_prune = time.monotonic()
+
+        # Métricas
+        self._processed = 0
+        self._superseded = 0
+        self._stale = 0
+
+    def _get_slot(self, key):
+        now = time.monotonic()
+        if now - self._last_prune > self.idle_ttl:
+            # Eliminar slots de clientes inactivos
+            self._slots = {
+                k: slot for k, slot in self._slots.items()
+                if slot.busy or now - slot.last_seen < self.idle_ttl
+            }
+            self._last_prune = now
+
+        slot = self._slots.get(key)
+        if slot is None:
+            slot = self._slots[key] = _Slot()
+        slot.last_seen = now
+        return slot
+
+    def _notify(self, slot):
+        waiters, slot.waiters = slot.waiters, []
+        for waiter in waiters:
+            if isinstance(waiter, threading.Event):
+                waiter.set()
+            else:
+                loop, future = waiter
+                loop.call_soon_threadsafe(_resolve, future)
+
+    def _enter(self, key):
+        """
+        Registra un frame nuevo: reemplaza al que estaba esperando.
+        """
+        with self._lock:
+            slot = self._get_slot(key)
+            slot.seq += 1
+            # Despertar al frame en espera para que vea que fue reemplazado
+            self._notify(slot)
+            return slot, slot.seq, time.monotonic()
+
+    def _try_start(self, slot, seq, arrived):
+        """
+        Con el lock tomado: True si el frame puede analizarse ahora, False si debe seguir
+        esperando. Lanza FrameSuperseded si fue reemplazado o superó la antigüedad máxima.
+        """
+        if seq != slot.seq:
+            self._superseded += 1
+            raise FrameSuperseded('superseded')
+        if not slot.busy:
+            slot.busy = True
+            self._processed += 1
+            return True
+        if time.monotonic() - arrived >= self.max_staleness:
+            self._stale += 1
+            raise FrameSuperseded('stale')
+        return False
+
+    def _finish(self, slot):
+        with self._lock:
+            slot.busy = False
+            slot.last_seen = time.monotonic()
+            self._notify(slot)
+
+    @contextmanager
+    def turn(self, key):
+        """
+        Context manager síncrono: espera el turno del cliente o lanza FrameSuperseded.
+        """
+        slot, seq, arrived = self._enter(key)
+        while True:
+            with self._lock:
+                if self._try_start(slot, seq, arrived):
+                    break
+                event = threading.Event()
+                slot.waiters.append(event)
+            event.wait(max(0.0, self.max_staleness - (time.monotonic() - arrived)))
+
+        try:
+            yield
+        finally:
+            self._finish(slot)
+
+    @asynccontextmanager
+    async def aturn(self, key):
+        """
+        Context manager asíncrono equivalente a turn().
+        """
+        loop = asyncio.get_running_loop()
+        slot, seq, arrived = self._enter(key)
+        while True:
+            with self._lock:
+                if self._try_start(slot, seq, arrived):
+                    break
+                future = loop.create_future()
+                slot.waiters.append((loop, future))
+            try:
+                await asyncio.wait_for(
+                    future, max(0.0, self.max_staleness - (time.monotonic() - arrived))
+                )
+            except asyncio.TimeoutError:
+                pass
+
+        try:
+            yield
+        finally:
+            self._finish(slot)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                'clients': len(self._slots),
+                'processed_total': self._processed,
+                'superseded_total': self._superseded,
+                'stale_total': self._stale,
+                'max_staleness_s': self.max_staleness,
+            }
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+
+def client_key(request, client_id=None) -> str:
+    """
+    Clave del slot: sesión del navegador + identificador de la pestaña enviado por el cliente.
+    La clave de sesión sale de la cookie, así que no consulta la base de datos
+    (se puede usar también desde vistas asíncronas).
+    """
+    return f"{request.session.session_key}:{str(client_id or '')[:64]}"
+
+
+# Instancia global para el análisis en tiempo real por HTTP
+realtime_coalescer = FrameCoalescer(
+    max_staleness=getattr(settings, 'EMOTION_REALTIME_MAX_STALENESS', 2.0)
+)
+
+metrics.register('realtime_coalescer', realtime_coalescer.snapshot)
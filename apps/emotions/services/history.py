@@ -0,0 +1,155 @@
+"""
+Historial de análisis paginado por cursor (keyset).
+
+En lugar de COUNT(*) + OFFSET, cada página continúa desde el último elemento visto
+(created_at, id), recorriendo el índice (user, -created_at, -id): el costo de una
+página no depende de lo profundo que esté en el historial.
+
+Solo se cargan las columnas que muestran las tarjetas; el JSON completo del
+análisis (analysis_results) nunca se lee. Las búsquedas en PostgreSQL se ordenan
+por relevancia y el cursor incluye el ranking.
+"""
+import base64
+from datetime import datetime, timedelta
+
+from django.db.models import Q
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateformat import format as date_format
+from django.utils.text import Truncator
+
+from apps.emotions.models import EmotionAnalysis
+from apps.emotions.services.search import RANK_ANNOTATION, search_analyses
+
+
+# Columnas usadas por las tarjetas del historial
+HISTORY_FIELDS = (
+    'id', 'user_id', 'image', 'faces_detected', 'dominant_emotion',
+    'average_confidence', 'processing_time', 'notes', 'created_at',
+)
+
+DEFAULT_PAGE_SIZE = 12
+MAX_PAGE_SIZE = 50
+
+
+class InvalidCursor(ValueError):
+    """
+    El cursor recibido no tiene el formato esperado.
+    """
+
+
+def encode_cursor(analysis) -> str:
+    """
+    Cursor opaco con la posición (created_at, id) del último elemento de la página.
+    En una búsqueda ordenada por relevancia incluye también el ranking.
+    """
+    raw = f"{analysis.created_at.isoformat()}|{analysis.pk}"
+    rank = getattr(analysis, RANK_ANNOTATION, None)
+    if rank is not None:
+        raw = f"{rank!r}|{raw}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str):
+    """
+    Devuelve (ranking o None, created_at, id) a partir de un cursor generado con encode_cursor.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        parts = raw.split('|')
+        if len(parts) not in (2, 3):
+            raise ValueError(raw)
+        rank = float(parts[0]) if len(parts) == 3 else None
+        created_at = datetime.fromisoformat(parts[-2])
+        pk = int(parts[-1])
+    except (ValueError, UnicodeDecodeError) as e:
+        raise InvalidCursor('Cursor inválido') from e
+    if timezone.is_naive(created_at):
+        created_at = timezone.make_aware(created_at)
+    return rank, created_at, pk
+
+
+def filter_history(user, emotion=None, date=None, search=None):
+    """
+    Queryset del historial del usuario con los filtros de la vista (sin ordenar ni paginar).
+    """
+    analyses = EmotionAnalysis.objects.filter(user=user)
+
+    if emotion and emotion != 'all':
+        analyses = analyses.filter(dominant_emotion=emotion)
+
+    if date:
+        if date == 'today':
+            analyses = analyses.filter(created_at__date=timezone.now().date())
+        elif date == 'week':
+            analyses = analyses.filter(created_at__gte=timezone.now() - timedelta(days=7))
+        elif date == 'month':
+            analyses = analyses.filter(created_at__gte=timezone.now() - timedelta(days=30))
+
+    if search:
+        analyses = search_analyses(analyses, search)
+
+    return analyses
+
+
+def history_page(analyses, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    Obtiene una página del historial a partir del cursor.
+
+    Args:
+        analyses: Queryset filtrado (ver filter_history)
+        cursor: Cursor de la página anterior o None para la primera
+        limit: Elementos por página
+
+    Returns:
+        Tupla (lista de análisis, cursor siguiente o None si no hay más)
+    """
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    ranked = RANK_ANNOTATION in analyses.query.annotations
+    analyses = analyses.only(*HISTORY_FIELDS)
+    if ranked:
+        analyses = analyses.order_by(f'-{RANK_ANNOTATION}', '-created_at', '-id')
+    else:
+        analyses = analyses.order_by('-created_at', '-id')
+
+    if cursor:
+        rank, created_at, pk = decode_cursor(cursor)
+        if (rank is not None) != ranked:
+            raise InvalidCursor('El cursor no corresponde a esta búsqueda')
+        if ranked:
+            # Resultados de búsqueda: (ranking, created_at, id) estrictamente menor
+            analyses = analyses.filter(
+                Q(**{f'{RANK_ANNOTATION}__lt': rank}) |
+                Q(**{RANK_ANNOTATION: rank, 'created_at__lt': created_at}) |
+                Q(**{RANK_ANNOTATION: rank, 'created_at': created_at, 'id__lt': pk})
+            )
+        else:
+            # created_at__lte acota el rango del índice; el OR resuelve los empates por id
+            analyses = analyses.filter(created_at__lte=created_at).filter(
+                Q(created_at__lt=created_at) | Q(id__lt=pk)
+            )
+
+    # Se pide un elemento extra para saber si hay otra página sin contar filas
+    items = list(analyses[:limit + 1])
+    next_cursor = encode_cursor(items[limit - 1]) if len(items) > limit else None
+    return items[:limit], next_cursor
+
+
+def serialize_history_item(analysis) -> dict:
+    """
+    Proyección compacta de un análisis para el scroll infinito.
+    """
+    created_at = timezone.localtime(analysis.created_at)
+    return {
+        'id': analysis.pk,
+        'url': reverse('emotions:analysis_detail', args=[analysis.pk]),
+        'image_url': analysis.image.url if analysis.image else None,
+        'faces_detected': analysis.faces_detected,
+        'dominant_emotion': analysis.dominant_emotion,
+        'dominant_emotion_display': analysis.get_dominant_emotion_display(),
+        'average_confidence': round(analysis.average_confidence, 1),
+        'processing_time': round(analysis.processing_time, 2),
+        'notes': Truncator(analysis.notes).words(15) if analysis.notes else '',
+        'created_at': created_at.isoformat(),
+        'created_display': date_format(created_at, 'd/m/Y H:i'),
+    }
@@ -0,0 +1,66 @@
+"""
+Executor acotado para ejecutar la inferencia fuera del event loop (vistas ASGI).
+
+ONNX Runtime y OpenCV liberan el GIL durante el cálculo, por lo que un pool de
+hilos pequeño aprovecha varios núcleos sin bloquear el event loop. Las peticiones
+en espera no ocupan hilos: solo esperan su turno como corrutinas.
+"""
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+
+class InferenceExecutor:
+    """
+    Pool de hilos de tamaño fijo para tareas de inferencia.
+    """
+
+    def __init__(self, max_workers: int = None):
+        if max_workers is None:
+            max_workers = getattr(
+                settings, 'EMOTION_INFERENCE_WORKERS',
+                min(4, os.cpu_count() or 1)
+            )
+        self.max_workers = max(1, max_workers)
+        self._executor = None
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        # Creación perezosa: el pool no se crea en procesos que no lo usan
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix='emotion-inference'
+            )
+        return self._executor
+
+    async def run(self, func, *args, **kwargs):
+        """
+        Ejecuta func(*args, **kwargs) en el pool y espera el resultado sin bloquear el loop.
+
+        Args:
+            func: Función síncrona a ejecutar (por ejemplo, un método del detector)
+
+        Returns:
+            El valor retornado por func
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor,
+            functools.partial(func, *args, **kwargs)
+        )
+
+    def shutdown(self, wait: bool = True):
+        """
+        Detiene el pool de hilos.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+
+# Instancia global del executor de inferencia
+inference_executor = InferenceExecutor()
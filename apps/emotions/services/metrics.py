@@ -0,0 +1,29 @@
+"""
+Registro simple de métricas del proceso para el endpoint api/metrics/.
+
+Cada componente registra una función que devuelve un diccionario con su estado
+actual; el endpoint las consulta al momento de la petición.
+"""
+from typing import Callable, Dict
+
+_sources: Dict[str, Callable[[], dict]] = {}
+
+
+def register(name: str, source: Callable[[], dict]):
+    """
+    Registra (o reemplaza) una fuente de métricas.
+    """
+    _sources[name] = source
+
+
+def collect() -> dict:
+    """
+    Recolecta las métricas de todas las fuentes registradas.
+    """
+    data = {}
+    for name, source in list(_sources.items()):
+        try:
+            data[name] = source()
+        except Exception as e:
+            data[name] = {'error': str(e)}
+    return data
@@ -0,0 +1,292 @@
+"""
+Estado de tiempo real de cada usuario sobre las cámaras del servidor.
+
+Cada sesión (navegador + pestaña, ver frame_coalescer.client_key) que usa una cámara
+tiene su propio estado: si pidió detección y cuántos streams tiene abiertos. Así
+activar la detección o liberar la cámara afecta solo a quien lo hace:
+
+- La sesión toma una referencia de la cámara (CameraRegistry.acquire) y la suelta al
+  liberarse; la cámara se cierra cuando se va la última sesión.
+- La cámara detecta mientras al menos una de sus sesiones tenga la detección activa.
+- Las sesiones sin streams abiertos expiran tras EMOTION_REALTIME_SESSION_TTL segundos
+  sin actividad, y como máximo se guardan EMOTION_REALTIME_MAX_SESSIONS (se descarta
+  la usada hace más tiempo), de modo que la memoria queda acotada.
+- Cada usuario tiene como máximo EMOTION_REALTIME_MAX_SESSIONS_PER_USER sesiones. Para
+  hacer lugar solo se descartan sesiones sin streams abiertos o las del mismo usuario:
+  nunca se corta el stream de otro usuario (si no hay lugar, attach lo rechaza).
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from apps.emotions.services.camera_registry import CameraUnavailable
+
+
+class SessionLimitReached(CameraUnavailable):
+    """No hay lugar para otra sesión sin cortar el stream de otro usuario."""
+
+
+class RealtimeSession:
+    """
+    Estado de una sesión sobre una cámara.
+    """
+    __slots__ = ('owner', 'user_id', 'camera', 'detection_enabled', 'viewers', 'last_seen')
+
+    def __init__(self, owner: str, camera, user_id=None):
+        self.owner = owner
+        self.user_id = user_id
+        self.camera = camera
+        self.detection_enabled = False
+        self.viewers = 0
+        self.last_seen = time.monotonic()
+
+    @property
+    def key(self) -> Tuple[str, str]:
+        return self.owner, self.camera.key
+
+
+class RealtimeSessionRegistry:
+    """
+    Sesiones por (dueño, cámara) con referencias a las cámaras y expiración LRU/TTL.
+
+    Args:
+        cameras: CameraRegistry del que se toman las cámaras
+        ttl: Segundos sin actividad tras los cuales expira una sesión sin streams
+        max_sessions: Máximo de sesiones guardadas
+        max_per_user: Máximo de sesiones de un mismo usuario (0 = sin límite)
+    """
+
+    def __init__(self, cameras, ttl: float = 30.0, max_sessions: int = 200, max_per_user: int = 5):
+        self.cameras = cameras
+        self.ttl = ttl
+        self.max_sessions = max(1, max_sessions)
+        self.max_per_user = max(0, max_per_user)
+        self.rejected = 0
+        self._lock = threading.Lock()
+        self._sessions: 'OrderedDict[Tuple[str, str], RealtimeSession]' = OrderedDict()
+        self._reaper = None
+
+    def attach(self, owner: str, camera_key=None, user_id=None) -> RealtimeSession:
+        """
+        Sesión del dueño sobre la cámara, creándola (y abriendo la cámara) si hace falta.
+        user_id identifica al usuario para grabar sus resultados.
+
+        Raises:
+            CameraNotFound: Si la clave no corresponde a ninguna cámara
+            CameraUnavailable: Si la cámara no se pudo abrir
+            SessionLimitReached: Si no hay lugar para la sesión
+        """
+        session = self.peek(owner, camera_key)
+        if session is not None:
+            return session
+
+        # Abrir la cámara puede tardar: se hace fuera del lock
+        camera = self.cameras.acquire(camera_key)
+        evicted = []
+        try:
+            with self._lock:
+                key = (owner, camera.key)
+                session = self._sessions.get(key)
+                if session is None:
+                    evicted = self._make_room(user_id)
+                    session = RealtimeSession(owner, camera, user_id)
+                    self._sessions[key] = session
+                    camera = None
+                else:
+                    self._sessions.move_to_end(key)
+        finally:
+            if camera is not None:
+                # Otra petición del mismo dueño creó la sesión mientras tanto, o no hubo lugar
+                self.cameras.release_ref(camera)
+        for old in evicted:
+            self._detach(old)
+        self._start_reaper()
+        return session
+
+    def peek(self, owner: str, camera_key=None) -> Optional[RealtimeSession]:
+        """
+        Sesión existente (sin crearla), marcándola como usada. None si no existe o si
+        su cámara ya se cerró.
+        """
+        key = (owner, self.cameras.normalize(camera_key))
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                return None
+            session.last_seen = time.monotonic()
+            self._sessions.move_to_end(key)
+
+        if not self.cameras.touch(session.camera):
+            # La cámara se cerró a la fuerza (release de administración): sesión obsoleta
+            self._remove(session)
+            return None
+        return session
+
+    def touch(self, session: RealtimeSession) -> bool:
+        """
+        Marca la sesión como activa. Devuelve False si se liberó, expiró o su cámara
+        se cerró, para que los streams que la usan terminen.
+        """
+        with self._lock:
+            if self._sessions.get(session.key) is not session:
+                return False
+            session.last_seen = time.monotonic()
+        return self.cameras.touch(session.camera)
+
+    def set_detection(self, session: RealtimeSession, enable: bool):
+        """
+        Activa/desactiva la detección para esta sesión; la cámara detecta mientras
+        alguna de sus sesiones la tenga activa.
+        """
+        # Bajo el lock: si la sesión se quitara entre el cambio y el pedido a la cámara,
+        # _detach podría soltar la detección antes de que se pidiera y la cámara
+        # quedaría detectando para una sesión que ya no existe
+        with self._lock:
+            if session.detection_enabled == enable or self._sessions.get(session.key) is not session:
+                return
+            session.detection_enabled = enable
+            session.camera.request_detection(enable)
+
+    def detecting(self, camera) -> List[RealtimeSession]:
+        """
+        Sesiones de la cámara con la detección activa.
+        """
+        with self._lock:
+            return [
+                session for session in self._sessions.values()
+                if session.camera is camera and session.detection_enabled
+            ]
+
+    def open_viewer(self, session: RealtimeSession):
+        with self._lock:
+            session.viewers += 1
+            session.last_seen = time.monotonic()
+
+    def close_viewer(self, session: RealtimeSession):
+        with self._lock:
+            session.viewers = max(0, session.viewers - 1)
+            session.last_seen = time.monotonic()
+
+    def release(self, owner: str, camera_key=None) -> bool:
+        """
+        Libera la sesión del dueño sobre la cámara (los demás usuarios no se ven
+        afectados). Devuelve False si no existía.
+        """
+        key = (owner, self.cameras.normalize(camera_key))
+        with self._lock:
+            session = self._sessions.pop(key, None)
+        if session is None:
+            return False
+        self._detach(session)
+        return True
+
+    def evict_idle(self, now: Optional[float] = None) -> int:
+        """
+        Libera las sesiones sin streams abiertos e inactivas durante ttl. Devuelve
+        cuántas se liberaron.
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            idle = [
+                session for session in self._sessions.values()
+                if session.viewers == 0 and now - session.last_seen > self.ttl
+            ]
+            for session in idle:
+                del self._sessions[session.key]
+        for session in idle:
+            self._detach(session)
+        return len(idle)
+
+    def camera_stats(self) -> Dict[str, Dict]:
+        """
+        Sesiones, streams abiertos y sesiones con detección por cámara.
+        """
+        stats: Dict[str, Dict] = {}
+        with self._lock:
+            for session in self._sessions.values():
+                camera = stats.setdefault(session.camera.key, {
+                    'sessions': 0, 'viewers': 0, 'detection_sessions': 0
+                })
+                camera['sessions'] += 1
+                camera['viewers'] += session.viewers
+                camera['detection_sessions'] += int(session.detection_enabled)
+        return stats
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            sessions = list(self._sessions.values())
+        return {
+            'sessions': len(sessions),
+            'max_sessions': self.max_sessions,
+            'max_per_user': self.max_per_user,
+            'rejected': self.rejected,
+            'viewers': sum(session.viewers for session in sessions),
+            'detection_sessions': sum(1 for session in sessions if session.detection_enabled),
+        }
+
+    def _make_room(self, user_id) -> List[RealtimeSession]:
+        """
+        Quita las sesiones necesarias para agregar una del usuario sin pasar de
+        max_per_user ni de max_sessions: primero las usadas hace más tiempo sin streams
+        abiertos y, si no alcanza, las del mismo usuario con streams. Las sesiones con
+        streams de otros usuarios nunca se descartan. Requiere el lock.
+
+        Raises:
+            SessionLimitReached: Si no se puede hacer lugar
+        """
+        ordered = list(self._sessions.values())
+        own = [session for session in ordered if user_id is not None and session.user_id == user_id]
+        candidates = (
+            [session for session in own if session.viewers == 0] +
+            [session for session in own if session.viewers > 0]
+        )
+
+        victims = []
+        if self.max_per_user and user_id is not None:
+            victims = candidates[:max(0, len(own) + 1 - self.max_per_user)]
+
+        excess = len(ordered) + 1 - len(victims) - self.max_sessions
+        if excess > 0:
+            idle = [session for session in ordered if session.viewers == 0 and session not in victims]
+            extra = idle + [session for session in candidates if session not in victims and session not in idle]
+            victims += extra[:excess]
+            if len(extra) < excess:
+                self.rejected += 1
+                raise SessionLimitReached('Se alcanzó el máximo de sesiones de tiempo real')
+
+        for session in victims:
+            del self._sessions[session.key]
+        return victims
+
+    def _remove(self, session: RealtimeSession):
+        with self._lock:
+            if self._sessions.get(session.key) is not session:
+                return
+            del self._sessions[session.key]
+        self._detach(session)
+
+    def _detach(self, session: RealtimeSession):
+        """
+        Suelta la detección y la referencia de cámara de una sesión ya quitada del registro.
+        """
+        if session.detection_enabled:
+            session.detection_enabled = False
+            session.camera.request_detection(False)
+        self.cameras.release_ref(session.camera)
+
+    def _start_reaper(self):
+        with self._lock:
+            if self._reaper is not None:
+                return
+            self._reaper = threading.Thread(target=self._reap, name='realtime-session-reaper', daemon=True)
+        self._reaper.start()
+
+    def _reap(self):
+        interval = max(1.0, min(10.0, self.ttl / 4))
+        while True:
+            time.sleep(interval)
+            try:
+                self.evict_idle()
+            except Exception as e:
+                print(f"Error liberando sesiones de tiempo real inactivas: {e}")
@@ -0,0 +1,122 @@
+"""
+Difusión de resultados de detección a muchos suscriptores (Server-Sent Events).
+
+El worker de detección publica cada resultado una sola vez; los suscriptores esperan
+sobre el propio broadcaster y nunca toman el lock de la cámara. Cada evento lleva un
+número de secuencia y se guardan los últimos en un buffer circular para que un
+cliente pueda reanudar con Last-Event-ID.
+"""
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+from typing import List, Optional, Tuple
+
+
+class ResultBroadcaster:
+    """
+    Canal de publicación/suscripción con secuencia y buffer de reanudación.
+    """
+
+    def __init__(self, history: int = 50):
+        self._condition = threading.Condition()
+        self._events = deque(maxlen=history)
+        self._seq = 0
+        self._async_waiters = []
+
+    @property
+    def seq(self) -> int:
+        return self._seq
+
+    def publish(self, data: dict) -> int:
+        """
+        Publica un resultado y despierta a todos los suscriptores.
+
+        Args:
+            data: Resultado serializable a JSON
+
+        Returns:
+            Número de secuencia asignado
+        """
+        # Serializar una sola vez para todos los suscriptores
+        payload = json.dumps(data)
+
+        with self._condition:
+            self._seq += 1
+            self._events.append((self._seq, payload))
+            self._condition.notify_all()
+            waiters, self._async_waiters = self._async_waiters, []
+
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(self._resolve, future)
+
+        return self._seq
+
+    @staticmethod
+    def _resolve(future):
+        if not future.done():
+            future.set_result(None)
+
+    def latest(self) -> Optional[Tuple[int, str]]:
+        """
+        Último evento publicado (secuencia, JSON) o None.
+        """
+        with self._condition:
+            return self._events[-1] if self._events else None
+
+    def _events_after(self, last_seq: int) -> List[Tuple[int, str]]:
+        """
+        Eventos con secuencia mayor a last_seq. Si el cliente se quedó más atrás
+        que el buffer, solo recibe el más reciente (el estado actual es lo que importa).
+        """
+        if not self._events or self._events[-1][0] <= last_seq:
+            return []
+        if self._events[0][0] > last_seq + 1:
+            return [self._events[-1]]
+        return [event for event in self._events if event[0] > last_seq]
+
+    def wait(self, last_seq: int, timeout: float) -> List[Tuple[int, str]]:
+        """
+        Espera (bloqueando el hilo) eventos posteriores a last_seq.
+
+        Returns:
+            Lista de eventos, vacía si se agotó el tiempo
+        """
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while True:
+                events = self._events_after(last_seq)
+                remaining = deadline - time.monotonic()
+                if events or remaining <= 0:
+                    return events
+                self._condition.wait(remaining)
+
+    async def wait_async(self, last_seq: int, timeout: float) -> List[Tuple[int, str]]:
+        """
+        Variante para el event loop: espera sin ocupar un hilo.
+        """
+        loop = asyncio.get_running_loop()
+        with self._condition:
+            events = self._events_after(last_seq)
+            if events:
+                return events
+            future = loop.create_future()
+            self._async_waiters.append((loop, future))
+
+        try:
+            await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            with self._condition:
+                if (loop, future) in self._async_waiters:
+                    self._async_waiters.remove((loop, future))
+
+        with self._condition:
+            return self._events_after(last_seq)
+
+
+def format_sse(seq: int, payload: str, event: str = 'result') -> str:
+    """
+    Formatea un evento en el formato de Server-Sent Events.
+    """
+    return f"id: {seq}\nevent: {event}\ndata: {payload}\n\n"
@@ -0,0 +1,222 @@
+"""
+Caché de resultados de análisis por contenido de la imagen.
+
+La clave es el hash SHA-256 de los bytes de la imagen más la versión del modelo y el
+modo de análisis, de modo que reenviar la misma imagen (análisis rápido seguido de la
+subida completa, reintentos tras un timeout) no vuelve a ejecutar la inferencia.
+
+- LRU acotada en memoria con TTL, opcionalmente respaldada por el caché de Django
+  (compartido entre procesos).
+- Single-flight: peticiones concurrentes con la misma clave comparten un único cálculo.
+- Los resultados degradados (valores de respaldo tras un error de inferencia) se
+  devuelven pero no se guardan: el siguiente envío de la imagen vuelve a calcularse.
+"""
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+from apps.emotions.services import metrics
+
+
+class _Flight:
+    """
+    Cálculo en curso para una clave; los demás solicitantes esperan su resultado.
+    """
+    __slots__ = ('event', 'result', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class DegradedResult:
+    """
+    Envoltorio que compute devuelve cuando el resultado se obtuvo con valores de
+    respaldo: get_or_compute entrega el resultado sin guardarlo en el caché.
+    """
+    __slots__ = ('result',)
+
+    def __init__(self, result):
+        self.result = result
+
+
+class ResultCache:
+    """
+    LRU con TTL y deduplicación de cálculos concurrentes.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: float = 3600, cache_alias: str = None):
+        self.max_entries = max(0, max_entries)
+        self.ttl = ttl
+        self.cache_alias = cache_alias
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # clave -> (expira, resultado)
+        self._in_flight = {}
+
+        # Métricas
+        self._hits = 0
+        self._shared_hits = 0
+        self._coalesced = 0
+        self._misses = 0
+        self._evictions = 0
+        self._bytes_saved = 0
+        self._degraded = 0
+
+    @staticmethod
+    def make_key(data: bytes, mode: str, model_version: str) -> str:
+        """
+        Clave de caché: modo de análisis + versión del modelo + hash del contenido.
+        """
+        return f"emotion-result:{mode}:{model_version}:{hashlib.sha256(data).hexdigest()}"
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def _get_local(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires, result = entry
+        if expires < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return result
+
+    def _set_local(self, key, result):
+        self._entries[key] = (time.monotonic() + self.ttl, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    def _get_shared(self, key):
+        if not self.cache_alias:
+            return None
+        try:
+            return caches[self.cache_alias].get(key)
+        except Exception as e:
+            print(f"Error leyendo el caché compartido de resultados: {e}")
+            return None
+
+    def _set_shared(self, key, result):
+        if not self.cache_alias:
+            return
+        try:
+            caches[self.cache_alias].set(key, result, timeout=int(self.ttl))
+        except Exception as e:
+            print(f"Error escribiendo el caché compartido de resultados: {e}")
+
+    def get_or_compute(self, key: str, compute, size: int = 0):
+        """
+        Devuelve el resultado cacheado para la clave o lo calcula una sola vez.
+
+        Args:
+            key: Clave generada con make_key
+            compute: Función sin argumentos que calcula el resultado (o un DegradedResult,
+                     que no se guarda)
+            size: Tamaño en bytes de la imagen (para la métrica de bytes ahorrados)
+
+        Returns:
+            Copia del resultado (el llamador puede modificarla libremente)
+        """
+        if not self.enabled:
+            result = compute()
+            return result.result if isinstance(result, DegradedResult) else result
+
+        with self._lock:
+            result = self._get_local(key)
+            if result is not None:
+                self._hits += 1
+                self._bytes_saved += size
+                return copy.deepcopy(result)
+
+            flight = self._in_flight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._in_flight[key] = _Flight()
+            else:
+                self._coalesced += 1
+                self._bytes_saved += size
+
+        if not leader:
+            # Otra petición ya está calculando esta misma imagen
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return copy.deepcopy(flight.result)
+
+        shared_hit = False
+        degraded = False
+        try:
+            result = self._get_shared(key)
+            shared_hit = result is not None
+            if not shared_hit:
+                result = compute()
+                degraded = isinstance(result, DegradedResult)
+                if degraded:
+                    result = result.result
+                else:
+                    self._set_shared(key, result)
+            flight.result = result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                if flight.error is None and shared_hit:
+                    self._set_local(key, flight.result)
+                    self._shared_hits += 1
+                    self._bytes_saved += size
+                elif flight.error is None and not degraded:
+                    self._set_local(key, flight.result)
+                    self._misses += 1
+                else:
+                    self._misses += 1
+                    self._degraded += degraded
+                del self._in_flight[key]
+            flight.event.set()
+
+        return copy.deepcopy(result)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            hits = self._hits + self._shared_hits + self._coalesced
+            lookups = hits + self._misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_s': self.ttl,
+                'shared_cache': self.cache_alias,
+                'hits': self._hits,
+                'shared_hits': self._shared_hits,
+                'coalesced': self._coalesced,
+                'misses': self._misses,
+                'hit_rate': round(hits / lookups, 4) if lookups else 0.0,
+                'evictions': self._evictions,
+                'degraded': self._degraded,
+                'in_flight': len(self._in_flight),
+                'bytes_saved': self._bytes_saved,
+            }
+
+
+# Instancia global usada por el detector de emociones
+result_cache = ResultCache(
+    max_entries=getattr(settings, 'EMOTION_RESULT_CACHE_SIZE', 256),
+    ttl=getattr(settings, 'EMOTION_RESULT_CACHE_TTL', 3600),
+    cache_alias=getattr(settings, 'EMOTION_RESULT_CACHE_ALIAS', None),
+)
+
+metrics.register('result_cache', result_cache.snapshot)
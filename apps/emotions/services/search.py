@@ -0,0 +1,110 @@
+"""
+Búsqueda en el historial de análisis (notas y emoción dominante).
+
+En PostgreSQL se combinan dos índices GIN (ver la migración 0007):
+- Texto completo en español sobre search_vector (mantenido por un trigger), para
+  encontrar palabras con sus variantes ("feliz" encuentra "felices").
+- Trigramas sobre UPPER(notes), que sirven al icontains (búsqueda por fragmento).
+Si hay a lo sumo EMOTION_SEARCH_RANK_WINDOW coincidencias se ordenan por relevancia
+(ts_rank + similitud de trigramas); con más, se devuelven todas por fecha y la vista
+avisa que el orden por relevancia se omitió (ver rank_truncated). El vector almacenado
+evita recalcular to_tsvector de cada fila al filtrar y ordenar.
+
+La emoción se busca por su clave o su nombre en español y se traduce a un filtro
+exacto sobre dominant_emotion (indexado). En otros motores se usa icontains sin ranking.
+"""
+import unicodedata
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+from django.conf import settings
+from django.db import connection
+from django.db.models import F, FloatField, Q
+from django.db.models.functions import Cast
+
+from apps.emotions.models import EMOTION_TRANSLATIONS
+
+# Debe coincidir con la configuración del trigger que mantiene search_vector
+SEARCH_CONFIG = 'spanish'
+
+# Máximo de coincidencias que se ordenan por relevancia
+RANK_WINDOW = getattr(settings, 'EMOTION_SEARCH_RANK_WINDOW', 1000)
+
+# Nombre de la anotación de relevancia (history_page ordena por ella si existe)
+RANK_ANNOTATION = 'search_rank'
+
+
+def _normalize(text: str) -> str:
+    """
+    Minúsculas y sin tildes, para comparar con los nombres de las emociones.
+    """
+    text = unicodedata.normalize('NFKD', text.lower())
+    return ''.join(c for c in text if not unicodedata.combining(c))
+
+
+def matching_emotions(query: str) -> list:
+    """
+    Emociones cuya clave o nombre en español contiene el texto buscado.
+    """
+    term = _normalize(query.strip())
+    if not term:
+        return []
+    return [
+        emotion for emotion, label in EMOTION_TRANSLATIONS.items()
+        if term in emotion or term in _normalize(label)
+    ]
+
+
+def search_analyses(analyses, query: str):
+    """
+    Filtra (y en PostgreSQL ordena por relevancia) un queryset de análisis.
+
+    Args:
+        analyses: Queryset de EmotionAnalysis
+        query: Texto buscado
+
+    Returns:
+        Queryset filtrado; en PostgreSQL incluye la anotación search_rank
+    """
+    query = (query or '').strip()
+    if not query:
+        return analyses
+
+    condition = Q(notes__icontains=query)
+    emotions = matching_emotions(query)
+    if emotions:
+        condition |= Q(dominant_emotion__in=emotions)
+
+    if connection.vendor != 'postgresql':
+        return analyses.filter(condition)
+
+    search_query = SearchQuery(query, config=SEARCH_CONFIG, search_type='websearch')
+    matches = analyses.filter(Q(search_vector=search_query) | condition)
+
+    # Ordenar por relevancia obliga a calcular el ranking de todas las coincidencias: con
+    # términos muy comunes se devuelven todas por fecha (el costo queda acotado por la
+    # ventana y no por el tamaño del historial, y ningún resultado queda fuera)
+    if matches.order_by().values('pk')[RANK_WINDOW:RANK_WINDOW + 1].exists():
+        return matches
+
+    # ts_rank devuelve real: se convierte a double para que el valor del cursor sea exacto
+    rank = Cast(
+        SearchRank(F('search_vector'), search_query) + TrigramWordSimilarity(query, 'notes'),
+        FloatField()
+    )
+    return matches.annotate(**{RANK_ANNOTATION: rank})
+
+
+def rank_truncated(analyses, query: str) -> bool:
+    """
+    True si una búsqueda en PostgreSQL tuvo más de RANK_WINDOW coincidencias y
+    search_analyses las devolvió por fecha en lugar de por relevancia.
+
+    Args:
+        analyses: Queryset devuelto por search_analyses
+        query: Texto buscado
+    """
+    return (
+        bool((query or '').strip())
+        and connection.vendor == 'postgresql'
+        and RANK_ANNOTATION not in analyses.query.annotations
+    )
@@ -0,0 +1,324 @@
+"""
+Grabación de las sesiones de análisis en tiempo real.
+
+Cada resultado en tiempo real (cámara del navegador o del servidor) se acumula en
+memoria: por segundo se guarda un registro compacto con el promedio de emociones, y
+la sesión lleva los agregados (frames, rostros, totales por emoción). Un hilo escribe
+cada EMOTION_RECORDING_FLUSH_INTERVAL segundos, en una sola transacción, un tramo de
+línea de tiempo por sesión (un bulk_create para todas) y la actualización de su
+resumen; una hora de sesión son unas pocas decenas de escrituras en lugar de una por
+frame. Las sesiones sin resultados durante EMOTION_RECORDING_IDLE_TIMEOUT se cierran.
+"""
+import atexit
+import threading
+import time
+from datetime import timedelta
+from typing import Dict, List, Tuple
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from apps.emotions.models import EMOTION_KEYS, RealtimeRecording, RealtimeTimelineChunk
+from apps.emotions.services import metrics
+
+
+class _Recording:
+    """
+    Sesión en memoria: el segundo en curso, los registros aún no escritos y los agregados.
+    """
+    __slots__ = (
+        'key', 'user_id', 'source', 'camera', 'pk', 'started_at', 'started', 'last_seen',
+        'second', 'bucket_sums', 'bucket_faces', 'bucket_max_faces', 'rows', 'dirty',
+        'frames', 'faces', 'seconds_with_faces', 'totals', 'confidence_sum', 'failures'
+    )
+
+    def __init__(self, key, user_id, source, camera, now):
+        self.key = key
+        self.user_id = user_id
+        self.source = source
+        self.camera = camera
+        self.pk = None
+        self.started_at = timezone.now()
+        self.started = now
+        self.last_seen = now
+
+        self.second = None
+        self.bucket_sums = [0.0] * len(EMOTION_KEYS)
+        self.bucket_faces = 0
+        self.bucket_max_faces = 0
+        self.rows: List[Dict] = []
+        self.dirty = False
+
+        self.frames = 0
+        self.faces = 0
+        self.seconds_with_faces = 0
+        self.totals = [0.0] * len(EMOTION_KEYS)
+        self.confidence_sum = 0.0
+        self.failures = 0  # Escrituras fallidas seguidas
+
+    def add(self, results: Dict, now: float):
+        second = int(now - self.started)
+        if second != self.second:
+            self.close_second()
+            self.second = second
+
+        faces = 0
+        for face in results.get('faces') or []:
+            emotions = face.get('emotions')
+            if not emotions:
+                continue
+            probabilities = [float(emotions.get(emotion, 0.0)) for emotion in EMOTION_KEYS]
+            for index, probability in enumerate(probabilities):
+                self.bucket_sums[index] += probability
+                self.totals[index] += probability
+            self.confidence_sum += float(face.get('confidence', max(probabilities)))
+            faces += 1
+
+        self.frames += 1
+        self.faces += faces
+        self.bucket_faces += faces
+        self.bucket_max_faces = max(self.bucket_max_faces, faces)
+        self.last_seen = now
+        self.dirty = True
+
+    def close_second(self):
+        """
+        Cierra el segundo en curso: un registro con el promedio de sus rostros (los
+        segundos sin rostros no se guardan).
+        """
+        if self.second is not None and self.bucket_faces:
+            emotions = [value / self.bucket_faces for value in self.bucket_sums]
+            self.rows.append({
+                'second': self.second,
+                'faces': self.bucket_max_faces,
+                'dominant_emotion': EMOTION_KEYS[emotions.index(max(emotions))],
+                'emotions': [round(p, 4) for p in emotions],
+            })
+            self.seconds_with_faces += 1
+        self.bucket_sums = [0.0] * len(EMOTION_KEYS)
+        self.bucket_faces = 0
+        self.bucket_max_faces = 0
+
+    def summary(self) -> Dict:
+        dominant = None
+        if self.faces:
+            dominant = EMOTION_KEYS[self.totals.index(max(self.totals))]
+        return {
+            'duration': round(self.last_seen - self.started, 1),
+            'frames_analyzed': self.frames,
+            'faces_detected': self.faces,
+            'seconds_with_faces': self.seconds_with_faces,
+            'emotion_totals': [round(value, 4) for value in self.totals],
+            'dominant_emotion': dominant,
+            'average_confidence': self.confidence_sum / self.faces * 100 if self.faces else 0.0,
+        }
+
+
+class SessionRecorder:
+    """
+    Acumula los resultados en tiempo real por sesión y los escribe por lotes.
+
+    Args:
+        flush_interval: Segundos entre escrituras
+        idle_timeout: Segundos sin resultados tras los cuales se cierra una sesión
+        max_active: Máximo de sesiones en memoria (al superarlo se cierra la más antigua)
+        max_retries: Escrituras fallidas seguidas tras las cuales se descarta una sesión
+        enabled: Si es False los resultados no se graban
+    """
+
+    def __init__(self, flush_interval: float = 30.0, idle_timeout: float = 60.0, max_active: int = 200,
+                 max_retries: int = 3, enabled: bool = True):
+        self.enabled = enabled
+        self.max_retries = max(1, max_retries)
+        self.flush_interval = flush_interval
+        self.idle_timeout = idle_timeout
+        self.max_active = max(1, max_active)
+        self._lock = threading.Lock()
+        self._active: Dict[Tuple, _Recording] = {}
+        self._closing: List[_Recording] = []
+        self._thread = None
+
+        # Métricas
+        self.flushes = 0
+        self.rows_written = 0
+        self.dropped = 0
+
+    def record(self, user_id, owner: str, results: Dict, source: str = RealtimeRecording.Source.BROWSER,
+               camera: str = ''):
+        """
+        Agrega un resultado a la sesión del dueño (solo en memoria; no toca la base de datos).
+        """
+        if not self.enabled or not user_id or not results or results.get('error'):
+            return
+        now = time.monotonic()
+        key = (owner, source, camera)
+        with self._lock:
+            recording = self._active.get(key)
+            if recording is None:
+                recording = _Recording(key, user_id, source, camera, now)
+                self._active[key] = recording
+                if len(self._active) > self.max_active:
+                    oldest = min(self._active.values(), key=lambda item: item.last_seen)
+                    del self._active[oldest.key]
+                    self._closing.append(oldest)
+            recording.add(results, now)
+        self._start()
+
+    def end(self, owner: str, source: str = RealtimeRecording.Source.BROWSER, camera: str = ''):
+        """
+        Cierra la sesión del dueño; se escribe en la próxima escritura por lotes.
+        """
+        with self._lock:
+            recording = self._active.pop((owner, source, camera), None)
+            if recording is not None:
+                self._closing.append(recording)
+
+    def flush(self, final: bool = False) -> int:
+        """
+        Escribe los registros pendientes y los resúmenes de todas las sesiones. Con
+        final=True cierra también las activas. Devuelve cuántas sesiones se escribieron.
+        """
+        now = time.monotonic()
+        with self._lock:
+            for key, recording in list(self._active.items()):
+                if final or now - recording.last_seen > self.idle_timeout:
+                    del self._active[key]
+                    self._closing.append(recording)
+            closing, self._closing = self._closing, []
+
+            pending = []
+            for recording in closing:
+                recording.close_second()
+                pending.append((recording, recording.rows, recording.summary(), True))
+                recording.rows = []
+            for recording in self._active.values():
+                if recording.dirty:
+                    pending.append((recording, recording.rows, recording.summary(), False))
+                    recording.rows = []
+                    recording.dirty = False
+
+        if not pending:
+            return 0
+
+        failed = []
+        try:
+            self._write(pending)
+        except Exception as e:
+            print(f"✗ Error guardando sesiones en tiempo real: {e}")
+            # Una sesión con problemas no debe bloquear a las demás: se escriben por separado
+            for item in pending:
+                try:
+                    self._write([item])
+                except Exception as item_error:
+                    print(f"✗ Error guardando la sesión {item[0].key}: {item_error}")
+                    failed.append(item)
+
+        with self._lock:
+            for recording, rows, _, ended in failed:
+                recording.failures += 1
+                if recording.failures >= self.max_retries:
+                    # Se descarta para no reintentarla para siempre
+                    if self._active.get(recording.key) is recording:
+                        del self._active[recording.key]
+                    self.dropped += 1
+                    print(f"✗ Sesión {recording.key} descartada tras {recording.failures} intentos")
+                    continue
+                # Reintentar en la próxima escritura sin perder los registros
+                recording.rows = rows + recording.rows
+                recording.dirty = True
+                if ended:
+                    self._closing.append(recording)
+
+        written = [item for item in pending if item not in failed]
+        for recording, _, _, _ in written:
+            recording.failures = 0
+        if written:
+            self.flushes += 1
+            self.rows_written += sum(len(rows) for _, rows, _, _ in written)
+        return len(written)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            active = len(self._active)
+            pending_rows = sum(len(recording.rows) for recording in self._active.values())
+        return {
+            'active': active,
+            'pending_rows': pending_rows,
+            'flushes': self.flushes,
+            'rows_written': self.rows_written,
+            'dropped': self.dropped,
+        }
+
+    def _write(self, pending):
+        chunks = []
+        created = []
+        with transaction.atomic():
+            for recording, rows, summary, ended in pending:
+                if ended:
+                    summary['ended_at'] = recording.started_at + timedelta(seconds=summary['duration'])
+                pk = recording.pk
+                if pk is None:
+                    pk = RealtimeRecording.objects.create(
+                        user_id=recording.user_id,
+                        source=recording.source,
+                        camera=recording.camera,
+                        started_at=recording.started_at,
+                        **summary
+                    ).pk
+                    created.append((recording, pk))
+                else:
+                    RealtimeRecording.objects.filter(pk=pk).update(
+                        updated_at=timezone.now(), **summary
+                    )
+                if rows:
+                    chunks.append(RealtimeTimelineChunk(
+                        recording_id=pk,
+                        start_second=rows[0]['second'],
+                        end_second=rows[-1]['second'],
+                        rows=rows
+                    ))
+            if chunks:
+                RealtimeTimelineChunk.objects.bulk_create(chunks)
+
+        # Solo tras confirmar: si la transacción se revierte, esas filas no existen
+        for recording, pk in created:
+            recording.pk = pk
+
+    def _start(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='session-recorder', daemon=True)
+        self._thread.start()
+        atexit.register(self._shutdown)
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"✗ Error en el grabador de sesiones: {e}")
+            finally:
+                close_old_connections()
+
+    def _shutdown(self):
+        try:
+            self.flush(final=True)
+        except Exception as e:
+            print(f"✗ Error cerrando las sesiones en tiempo real: {e}")
+
+
+# Instancia global usada por las vistas de tiempo real
+session_recorder = SessionRecorder(
+    flush_interval=getattr(settings, 'EMOTION_RECORDING_FLUSH_INTERVAL', 30),
+    idle_timeout=getattr(settings, 'EMOTION_RECORDING_IDLE_TIMEOUT', 60),
+    max_active=getattr(settings, 'EMOTION_RECORDING_MAX_ACTIVE', 200),
+    max_retries=getattr(settings, 'EMOTION_RECORDING_MAX_RETRIES', 3),
+    enabled=getattr(settings, 'EMOTION_RECORD_REALTIME', True)
+)
+
+metrics.register('session_recorder', session_recorder.snapshot)
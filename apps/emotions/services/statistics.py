@@ -0,0 +1,265 @@
+"""
+Reconstrucción masiva de EmotionStatistics calculada dentro de la base de datos.
+
+Las estadísticas se mantienen de forma incremental (EmotionStatistics.record_analysis);
+esta ruta es solo para reparación. En PostgreSQL todos los usuarios se recalculan con una
+única consulta: los rostros se expanden con funciones JSONB, se agregan con conteos
+condicionales y el resultado se escribe con un upsert, sin traer los JSON a Python.
+En otros motores se usa el recálculo en Python por usuario.
+
+El resumen diario (DailyEmotionRollup) se reconstruye en la misma transacción con una
+agregación del ORM, válida para cualquier motor.
+"""
+import time
+from typing import Iterable, Optional
+
+from django.db import connection, transaction
+from django.db.models import Count, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate
+
+from apps.emotions.models import (
+    EMOTION_KEYS, AnalysisJob, DailyEmotionRollup, EmotionAnalysis, EmotionStatistics
+)
+
+
+def _rebuild_sql(filter_users: bool) -> str:
+    """
+    Consulta de reconstrucción para PostgreSQL. Replica EmotionAnalysis.iter_faces:
+    - 'faces_analysis' o 'faces' como lista de rostros (emoción y confianza en %).
+    - Sin lista de rostros, la emoción dominante del análisis por cada rostro detectado.
+    """
+    analysis_table = EmotionAnalysis._meta.db_table
+    job_table = AnalysisJob._meta.db_table
+    stats_table = EmotionStatistics._meta.db_table
+    user_filter = 'AND a.user_id = ANY(%(users)s)' if filter_users else ''
+    stats_filter = 'WHERE user_id = ANY(%(users)s)' if filter_users else ''
+
+    emotion_sums = ',\n'.join(
+        f"COALESCE(SUM(f.n) FILTER (WHERE f.emotion = '{emotion}'), 0) AS {emotion}_count"
+        for emotion in EMOTION_KEYS
+    )
+    emotion_columns = ', '.join(f'{emotion}_count' for emotion in EMOTION_KEYS)
+    emotion_values = ', '.join(f'COALESCE(ft.{emotion}_count, 0) AS {emotion}_count' for emotion in EMOTION_KEYS)
+    emotion_updates = ',\n'.join(f'{emotion}_count = EXCLUDED.{emotion}_count' for emotion in EMOTION_KEYS)
+    emotion_names = ', '.join(f"'{emotion}'" for emotion in EMOTION_KEYS)
+
+    return f"""
+        WITH countable AS (
+            SELECT a.user_id, a.faces_detected, a.analysis_results AS r,
+                   a.dominant_emotion, a.average_confidence
+            FROM {analysis_table} a
+            LEFT JOIN {job_table} j ON j.analysis_id = a.id
+            WHERE (j.id IS NULL OR j.status IN (%(done)s, %(failed)s)) {user_filter}
+        ),
+        faces AS (
+            -- Un registro por rostro de la lista del análisis
+            SELECT c.user_id,
+                   COALESCE(NULLIF(face->>'dominant_emotion', ''), NULLIF(face->>'emotion', '')) AS emotion,
+                   -- Sin la clave cuenta como 0; con valor null queda NULL y no suma
+                   -- al promedio (igual que iter_faces)
+                   CASE WHEN NOT face ? 'confidence' THEN 0
+                        WHEN (face->>'confidence')::float8 < 1
+                        THEN (face->>'confidence')::float8 * 100
+                        ELSE (face->>'confidence')::float8 END AS confidence,
+                   1 AS n
+            FROM countable c
+            CROSS JOIN LATERAL jsonb_array_elements(
+                CASE
+                    WHEN jsonb_typeof(c.r) <> 'object' THEN '[]'::jsonb
+                    WHEN c.r ? 'faces_analysis' AND jsonb_typeof(c.r->'faces_analysis') = 'array'
+                        THEN c.r->'faces_analysis'
+                    WHEN NOT c.r ? 'faces_analysis' AND jsonb_typeof(c.r->'faces') = 'array'
+                        THEN c.r->'faces'
+                    ELSE '[]'::jsonb
+                END
+            ) AS face
+            UNION ALL
+            -- Sin lista de rostros: la emoción dominante pesa por cada rostro detectado
+            SELECT c.user_id, c.dominant_emotion,
+                   CASE WHEN c.average_confidence > 0 THEN c.average_confidence END,
+                   c.faces_detected
+            FROM countable c
+            WHERE jsonb_typeof(c.r) = 'object' AND c.r <> '{{}}'::jsonb
+              AND NOT c.r ? 'faces_analysis' AND NOT c.r ? 'faces'
+              AND COALESCE(c.dominant_emotion, '') <> ''
+        ),
+        face_totals AS (
+            SELECT f.user_id,
+                   {emotion_sums},
+                   COALESCE(SUM(f.confidence * f.n), 0) AS confidence_sum,
+                   COALESCE(SUM(f.n) FILTER (WHERE f.confidence IS NOT NULL), 0) AS confidence_count
+            FROM faces f
+            GROUP BY f.user_id
+        ),
+        analysis_totals AS (
+            SELECT user_id, COUNT(*) AS total_analyses, SUM(faces_detected) AS total_faces_detected
+            FROM countable
+            GROUP BY user_id
+        ),
+        users AS (
+            SELECT user_id FROM analysis_totals
+            UNION
+            SELECT user_id FROM {stats_table} {stats_filter}
+        ),
+        totals AS (
+            SELECT u.user_id,
+                   COALESCE(atot.total_analyses, 0) AS total_analyses,
+                   COALESCE(atot.total_faces_detected, 0) AS total_faces_detected,
+                   {emotion_values},
+                   COALESCE(ft.confidence_sum, 0) AS confidence_sum,
+                   COALESCE(ft.confidence_count, 0) AS confidence_count
+            FROM users u
+            LEFT JOIN analysis_totals atot ON atot.user_id = u.user_id
+            LEFT JOIN face_totals ft ON ft.user_id = u.user_id
+        )
+        INSERT INTO {stats_table} (
+            user_id, total_analyses, total_faces_detected, {emotion_columns},
+            confidence_sum, confidence_count,
+            most_frequent_emotion, average_confidence, average_faces_per_analysis, last_updated
+        )
+        SELECT t.user_id, t.total_analyses, t.total_faces_detected, {emotion_columns},
+               t.confidence_sum, t.confidence_count,
+               -- Igual que max() en Python: ante empate gana la primera emoción de la lista
+               (ARRAY[{emotion_names}])[array_position(
+                   ARRAY[{emotion_columns}], GREATEST({emotion_columns})
+               )],
+               COALESCE(t.confidence_sum / NULLIF(t.confidence_count, 0), 0),
+               COALESCE(t.total_faces_detected::float8 / NULLIF(t.total_analyses, 0), 0),
+               NOW()
+        FROM totals t
+        ON CONFLICT (user_id) DO UPDATE SET
+            total_analyses = EXCLUDED.total_analyses,
+            total_faces_detected = EXCLUDED.total_faces_detected,
+            {emotion_updates},
+            confidence_sum = EXCLUDED.confidence_sum,
+            confidence_count = EXCLUDED.confidence_count,
+            most_frequent_emotion = EXCLUDED.most_frequent_emotion,
+            average_confidence = EXCLUDED.average_confidence,
+            average_faces_per_analysis = EXCLUDED.average_faces_per_analysis,
+            last_updated = EXCLUDED.last_updated
+    """
+
+
+def _mark_counted_sql(filter_users: bool) -> str:
+    """
+    Sincroniza counted_in_statistics con el criterio de análisis contables.
+    """
+    analysis_table = EmotionAnalysis._meta.db_table
+    job_table = AnalysisJob._meta.db_table
+    user_filter = 'AND a.user_id = ANY(%(users)s)' if filter_users else ''
+    countable = (
+        f'NOT EXISTS (SELECT 1 FROM {job_table} j '
+        f'WHERE j.analysis_id = a.id AND j.status NOT IN (%(done)s, %(failed)s))'
+    )
+
+    return f"""
+        UPDATE {analysis_table} a
+        SET counted_in_statistics = ({countable})
+        WHERE a.counted_in_statistics <> ({countable}) {user_filter}
+    """
+
+
+def _rebuild_postgresql(user_ids: Optional[list]) -> int:
+    params = {
+        'done': AnalysisJob.Status.DONE,
+        'failed': AnalysisJob.Status.FAILED,
+        'users': user_ids,
+    }
+    filter_users = user_ids is not None
+
+    with connection.cursor() as cursor:
+        # Bloquear escrituras de análisis y estadísticas mientras se reconstruye
+        # (mismo orden que record_analysis: primero análisis, luego estadísticas).
+        # Las lecturas no se bloquean.
+        cursor.execute(f'LOCK TABLE {EmotionAnalysis._meta.db_table} IN SHARE ROW EXCLUSIVE MODE')
+        cursor.execute(f'LOCK TABLE {EmotionStatistics._meta.db_table} IN SHARE ROW EXCLUSIVE MODE')
+
+        cursor.execute(_mark_counted_sql(filter_users), params)
+        cursor.execute(_rebuild_sql(filter_users), params)
+        return cursor.rowcount
+
+
+def _rebuild_python(user_ids: Optional[list]) -> int:
+    users = EmotionAnalysis.objects.order_by().values_list('user_id', flat=True).union(
+        EmotionStatistics.objects.order_by().values_list('user_id', flat=True)
+    )
+    rebuilt = 0
+    for user_id in users:
+        if user_ids is not None and user_id not in user_ids:
+            continue
+        stats, created = EmotionStatistics.objects.get_or_create(user_id=user_id)
+        stats.update_statistics()
+        rebuilt += 1
+    return rebuilt
+
+
+def rebuild_daily_rollups(user_ids: Optional[list] = None) -> int:
+    """
+    Regenera el resumen diario a partir de los análisis contados en las estadísticas.
+
+    Returns:
+        Número de filas de resumen creadas
+    """
+    analyses = EmotionAnalysis.objects.filter(counted_in_statistics=True)
+    rollups = DailyEmotionRollup.objects.all()
+    if user_ids is not None:
+        analyses = analyses.filter(user_id__in=user_ids)
+        rollups = rollups.filter(user_id__in=user_ids)
+
+    rows = (
+        analyses
+        .annotate(day=TruncDate('created_at'), emotion=Coalesce('dominant_emotion', Value('')))
+        .values('user_id', 'day', 'emotion')
+        .annotate(
+            total=Count('id'),
+            total_faces=Sum('faces_detected'),
+            total_confidence=Sum('average_confidence'),
+        )
+        .order_by()
+    )
+
+    rollups.delete()
+    created = DailyEmotionRollup.objects.bulk_create([
+        DailyEmotionRollup(
+            user_id=row['user_id'],
+            date=row['day'],
+            emotion=row['emotion'],
+            analyses=row['total'],
+            faces=row['total_faces'] or 0,
+            confidence_sum=row['total_confidence'] or 0.0,
+        )
+        for row in rows.iterator()
+    ], batch_size=1000)
+    return len(created)
+
+
+def rebuild_statistics(user_ids: Optional[Iterable[int]] = None) -> dict:
+    """
+    Reconstruye las estadísticas de los usuarios indicados (o de todos).
+
+    Args:
+        user_ids: IDs de usuario; None reconstruye todos
+
+    Returns:
+        Diccionario con usuarios y filas de resumen reconstruidos, motor usado y duración
+    """
+    if user_ids is not None:
+        user_ids = [int(user_id) for user_id in user_ids]
+
+    start_time = time.time()
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            rebuilt = _rebuild_postgresql(user_ids)
+            method = 'postgresql'
+        else:
+            rebuilt = _rebuild_python(user_ids)
+            method = 'python'
+
+        rollups = rebuild_daily_rollups(user_ids)
+
+    return {
+        'users': rebuilt,
+        'rollups': rollups,
+        'method': method,
+        'duration': time.time() - start_time,
+    }
@@ -0,0 +1,277 @@
+"""
+Análisis de emociones en videos subidos.
+
+El video se decodifica en streaming con cv2.VideoCapture (nunca se carga completo en
+memoria): todos los frames se avanzan con grab(), pero solo se decodifican con
+retrieve() los que se van a analizar o a comparar para detectar cambios de escena.
+Los frames muestreados se agrupan en lotes: se detectan sus rostros, se clasifican
+todos juntos con FER+ (EmotionDetector.analyze_faces_batch) y se asocian entre frames
+con FaceTracker. En lugar de un EmotionAnalysis por frame se guarda una línea de
+tiempo con un registro por segundo.
+"""
+import time
+from typing import Callable, Dict, List, Optional
+
+import cv2
+import numpy as np
+from django.conf import settings
+
+from apps.emotions.models import EMOTION_KEYS, VideoAnalysis
+from apps.emotions.services.face_tracker import FaceTracker
+
+SAMPLE_FPS = getattr(settings, 'EMOTION_VIDEO_SAMPLE_FPS', 2.0)
+SCENE_THRESHOLD = getattr(settings, 'EMOTION_VIDEO_SCENE_THRESHOLD', 0.3)
+SCENE_PROBE_FPS = getattr(settings, 'EMOTION_VIDEO_SCENE_PROBE_FPS', 8.0)
+BATCH_FRAMES = getattr(settings, 'EMOTION_VIDEO_BATCH_FRAMES', 8)
+TRACK_MAX_AGE = getattr(settings, 'EMOTION_VIDEO_TRACK_MAX_AGE', 1.5)
+
+# Tamaño de la miniatura en escala de grises usada para detectar cambios de escena
+SCENE_THUMBNAIL_SIZE = (64, 36)
+
+# Intervalo mínimo entre actualizaciones de progreso (segundos)
+PROGRESS_INTERVAL = 2.0
+
+
+class VideoOpenError(Exception):
+    """El archivo no se pudo abrir como video."""
+
+
+def _scene_thumbnail(frame: np.ndarray) -> np.ndarray:
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    return cv2.resize(gray, SCENE_THUMBNAIL_SIZE, interpolation=cv2.INTER_AREA).astype(np.int16)
+
+
+def iter_sampled_frames(capture, fps: float, sample_fps: float, scene_threshold: float):
+    """
+    Genera (índice, segundo, frame) de los frames a analizar: uno cada 1/sample_fps
+    segundos y, además, el primer frame de cada cambio de escena.
+    """
+    sample_interval = 1.0 / sample_fps if sample_fps > 0 else None
+    probe_interval = 1.0 / SCENE_PROBE_FPS if scene_threshold > 0 and SCENE_PROBE_FPS > 0 else None
+    if sample_interval is None and probe_interval is None:
+        # Sin muestreo ni detección de escenas no habría nada que analizar
+        sample_interval = 1.0
+
+    next_sample = 0.0
+    next_probe = 0.0
+    last_thumbnail = None
+    index = -1
+
+    while capture.grab():
+        index += 1
+        timestamp = index / fps
+
+        sample_due = sample_interval is not None and timestamp >= next_sample
+        probe_due = probe_interval is not None and timestamp >= next_probe
+        if not sample_due and not probe_due:
+            continue
+
+        ok, frame = capture.retrieve()
+        if not ok or frame is None:
+            continue
+
+        thumbnail = None
+        if probe_interval is not None:
+            next_probe = timestamp + probe_interval
+            thumbnail = _scene_thumbnail(frame)
+            if last_thumbnail is None:
+                # El primer frame abre la primera escena
+                sample_due = True
+            elif not sample_due:
+                change = np.abs(thumbnail - last_thumbnail).mean() / 255.0
+                sample_due = change >= scene_threshold
+        if not sample_due:
+            continue
+
+        if sample_interval is not None:
+            next_sample = timestamp + sample_interval
+        last_thumbnail = thumbnail
+        yield index, timestamp, frame
+
+
+class TimelineBuilder:
+    """
+    Acumula las emociones por segundo de video. Cada persona seguida cuenta una vez por
+    segundo, aunque aparezca en varios frames muestreados de ese segundo.
+    """
+
+    def __init__(self):
+        self.rows: List[Dict] = []
+        self._second = None
+        self._tracks: Dict[int, List[np.ndarray]] = {}
+
+    def add(self, timestamp: float, track_id: int, probabilities: np.ndarray):
+        second = int(timestamp)
+        if second != self._second:
+            self._close_second()
+            self._second = second
+        self._tracks.setdefault(track_id, []).append(probabilities)
+
+    def finish(self) -> List[Dict]:
+        self._close_second()
+        return self.rows
+
+    def _close_second(self):
+        if self._second is None or not self._tracks:
+            self._tracks = {}
+            return
+        per_track = [np.mean(samples, axis=0) for samples in self._tracks.values()]
+        emotions = np.mean(per_track, axis=0)
+        self.rows.append({
+            'second': self._second,
+            'faces': len(per_track),
+            'dominant_emotion': EMOTION_KEYS[int(np.argmax(emotions))],
+            'emotions': [round(float(p), 4) for p in emotions],
+        })
+        self._tracks = {}
+
+
+def analyze_video_file(path: str, sample_fps: Optional[float] = None,
+                       scene_threshold: Optional[float] = None,
+                       progress: Optional[Callable[[float], None]] = None) -> Dict:
+    """
+    Analiza un video y resume sus emociones.
+
+    Args:
+        path: Ruta del archivo de video
+        sample_fps: Frames analizados por segundo (0 = solo cambios de escena)
+        scene_threshold: Diferencia media (0-1) que cuenta como cambio de escena (0 desactiva)
+        progress: Función opcional que recibe el porcentaje procesado
+
+    Returns:
+        Diccionario con las propiedades del video, la línea de tiempo, el resumen por
+        persona seguida y la velocidad como múltiplo del tiempo real
+
+    Raises:
+        VideoOpenError: Si el archivo no se puede abrir como video
+    """
+    # Importación diferida: el detector carga los modelos ONNX al importarse
+    from apps.emotions.services.emotion_detector import emotion_detector
+
+    if sample_fps is None:
+        sample_fps = SAMPLE_FPS
+    if scene_threshold is None:
+        scene_threshold = SCENE_THRESHOLD
+
+    start_time = time.time()
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise VideoOpenError('No se pudo abrir el archivo de video')
+
+    try:
+        fps = capture.get(cv2.CAP_PROP_FPS) or 0.0
+        if fps <= 0 or fps > 1000:
+            fps = 25.0
+        frame_count = int(capture.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+        width = int(capture.get(cv2.CAP_PROP_FRAME_WIDTH) or 0)
+        height = int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT) or 0)
+
+        tracker = FaceTracker(max_age=TRACK_MAX_AGE, emotion_count=len(EMOTION_KEYS))
+        timeline = TimelineBuilder()
+        counts = {'frames': 0, 'faces': 0, 'confidence': 0.0, 'last_index': 0}
+        last_progress = [0.0]
+
+        def analyze(batch):
+            images = [frame for _, _, frame in batch]
+            boxes = [emotion_detector.detect_faces(frame, realtime=True) for frame in images]
+            faces_per_frame = emotion_detector.analyze_faces_batch(images, boxes)
+
+            for (index, timestamp, _), faces in zip(batch, faces_per_frame):
+                tracks = tracker.update(timestamp, [
+                    (face['coordinates']['x'], face['coordinates']['y'],
+                     face['coordinates']['width'], face['coordinates']['height'])
+                    for face in faces
+                ])
+                for face, track in zip(faces, tracks):
+                    probabilities = np.array(
+                        [face['all_emotions'].get(emotion, 0.0) for emotion in EMOTION_KEYS]
+                    )
+                    track.add_emotions(probabilities)
+                    timeline.add(timestamp, track.track_id, probabilities)
+                    counts['confidence'] += face['confidence']
+                counts['faces'] += len(faces)
+                counts['frames'] += 1
+                counts['last_index'] = index
+
+            now = time.time()
+            if progress is not None and now - last_progress[0] >= PROGRESS_INTERVAL:
+                last_progress[0] = now
+                # Algunos contenedores no informan el número de frames: el avance queda en 0
+                progress(min(99.0, counts['last_index'] * 100.0 / frame_count) if frame_count else 0.0)
+
+        batch = []
+        for sample in iter_sampled_frames(capture, fps, sample_fps, scene_threshold):
+            batch.append(sample)
+            if len(batch) >= BATCH_FRAMES:
+                analyze(batch)
+                batch = []
+        if batch:
+            analyze(batch)
+    finally:
+        capture.release()
+
+    rows = timeline.finish()
+    duration = frame_count / fps if frame_count else (rows[-1]['second'] + 1 if rows else 0.0)
+
+    tracks = []
+    for track in tracker.all_tracks():
+        emotions = track.mean_emotions()
+        tracks.append({
+            'id': track.track_id,
+            'start': round(track.first_seen, 2),
+            'end': round(track.last_seen, 2),
+            'frames': track.hits,
+            'dominant_emotion': EMOTION_KEYS[int(np.argmax(emotions))],
+        })
+
+    # Emoción dominante del video: promedio de cada segundo ponderado por sus rostros
+    totals = np.zeros(len(EMOTION_KEYS))
+    for row in rows:
+        totals += np.array(row['emotions']) * row['faces']
+    dominant_emotion = EMOTION_KEYS[int(np.argmax(totals))] if totals.any() else None
+
+    processing_time = time.time() - start_time
+    return {
+        'duration': duration,
+        'fps': fps,
+        'width': width,
+        'height': height,
+        'frames_sampled': counts['frames'],
+        'faces_detected': counts['faces'],
+        'tracks_detected': len(tracks),
+        'dominant_emotion': dominant_emotion,
+        'average_confidence': counts['confidence'] * 100 / counts['faces'] if counts['faces'] else 0.0,
+        'timeline': rows,
+        'tracks': tracks,
+        'processing_time': processing_time,
+        'realtime_factor': duration / processing_time if processing_time > 0 else 0.0,
+    }
+
+
+def process_video(video: VideoAnalysis,
+                  heartbeat: Optional[Callable[[float], None]] = None) -> VideoAnalysis:
+    """
+    Analiza el video de un VideoAnalysis y guarda sus resultados.
+
+    Args:
+        video: Análisis de video con el archivo ya almacenado
+        heartbeat: Función opcional llamada con el progreso (renueva la reserva del trabajo)
+
+    Returns:
+        El análisis de video actualizado
+    """
+    def report_progress(percent):
+        VideoAnalysis.objects.filter(pk=video.pk).update(progress=percent)
+        if heartbeat is not None:
+            heartbeat(percent)
+
+    results = analyze_video_file(video.video.path, progress=report_progress)
+
+    for field, value in results.items():
+        setattr(video, field, value)
+    video.progress = 100.0
+    video.save()
+
+    print(f"✓ Video #{video.pk}: {video.frames_sampled} frames, {video.tracks_detected} rostro(s) "
+          f"seguido(s), {video.realtime_factor:.1f}x tiempo real")
+    return video
@@ -0,0 +1,15 @@
+"""
+Señales de la app de emociones.
+"""
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from apps.emotions.models import EmotionAnalysis, EmotionStatistics
+
+
+@receiver(post_delete, sender=EmotionAnalysis)
+def discard_deleted_analysis(sender, instance, **kwargs):
+    """
+    Resta el análisis eliminado de las estadísticas del usuario.
+    """
+    EmotionStatistics.discard_analysis(instance, deleted=True)
@@ -0,0 +1,7 @@
+"""
+Pruebas de la app de emociones, un módulo por servicio.
+
+Ninguna ejecuta inferencia: los métodos del detector y las cámaras se reemplazan por
+objetos mínimos y los resultados de análisis se escriben a mano. Los archivos de los
+modelos sí deben existir en models/, porque el detector los carga al importarse.
+"""
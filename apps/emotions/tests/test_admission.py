@@ -0,0 +1,105 @@
+import asyncio
+
+from django.test import SimpleTestCase
+
+from apps.emotions.services.admission import (
+    PRIORITY_BULK, PRIORITY_INTERACTIVE, PRIORITY_REALTIME, AdmissionController, AdmissionRejected
+)
+from apps.emotions.tests.utils import InThread, wait_until
+
+
+class AdmissionControllerTests(SimpleTestCase):
+
+    def make(self, max_concurrent=1, max_queue=1, max_wait=2.0):
+        return AdmissionController('test', max_concurrent, max_queue, max_wait)
+
+    def test_admits_immediately_while_there_is_capacity(self):
+        admission = self.make(max_concurrent=2)
+        admission.acquire()
+        admission.acquire()
+        self.assertFalse(admission.try_acquire())
+        self.assertEqual(admission.snapshot()['in_flight'], 2)
+
+    def test_rejects_when_queue_is_full(self):
+        admission = self.make(max_queue=1)
+        admission.acquire()
+        waiter = InThread(admission.acquire, PRIORITY_INTERACTIVE)
+        wait_until(lambda: admission.snapshot()['queue_length'] == 1)
+
+        with self.assertRaises(AdmissionRejected) as raised:
+            admission.acquire(PRIORITY_INTERACTIVE)
+        self.assertEqual(raised.exception.reason, 'queue_full')
+        self.assertGreaterEqual(raised.exception.retry_after, 1)
+
+        admission.release()
+        waiter.join(2)
+        self.assertIsNone(waiter.error)
+
+    def test_timeout_leaves_the_queue(self):
+        admission = self.make()
+        admission.acquire()
+        with self.assertRaises(AdmissionRejected) as raised:
+            admission.acquire(timeout=0.05)
+        self.assertEqual(raised.exception.reason, 'timeout')
+
+        snapshot = admission.snapshot()
+        self.assertEqual(snapshot['queue_length'], 0)
+        self.assertEqual(snapshot['rejected']['timeout'], 1)
+
+        # El turno no quedó reservado para la petición que se fue
+        admission.release()
+        self.assertTrue(admission.try_acquire())
+
+    def test_higher_priority_evicts_lower_priority_waiter(self):
+        admission = self.make(max_queue=1)
+        admission.acquire()
+        bulk = InThread(admission.acquire, PRIORITY_BULK)
+        wait_until(lambda: admission.snapshot()['queue_length'] == 1)
+
+        realtime = InThread(admission.acquire, PRIORITY_REALTIME)
+        bulk.join(2)
+        self.assertIsInstance(bulk.error, AdmissionRejected)
+        self.assertEqual(bulk.error.reason, 'evicted')
+
+        admission.release()
+        realtime.join(2)
+        self.assertIsNone(realtime.error)
+        self.assertEqual(admission.snapshot()['in_flight'], 1)
+
+    def test_release_grants_the_most_urgent_waiter(self):
+        admission = self.make(max_queue=2)
+        admission.acquire()
+        order = []
+
+        def acquire(priority, name):
+            admission.acquire(priority)
+            order.append(name)
+            admission.release()
+
+        bulk = InThread(acquire, PRIORITY_BULK, 'bulk')
+        wait_until(lambda: admission.snapshot()['queue_length'] == 1)
+        realtime = InThread(acquire, PRIORITY_REALTIME, 'realtime')
+        wait_until(lambda: admission.snapshot()['queue_length'] == 2)
+
+        admission.release()
+        bulk.join(2)
+        realtime.join(2)
+        self.assertEqual(order, ['realtime', 'bulk'])
+        self.assertEqual(admission.snapshot()['in_flight'], 0)
+
+    def test_cancelled_async_waiter_leaves_the_queue(self):
+        admission = self.make()
+        admission.acquire()
+
+        async def scenario():
+            task = asyncio.ensure_future(admission.aacquire())
+            while admission.snapshot()['queue_length'] == 0:
+                await asyncio.sleep(0.005)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(scenario())
+        self.assertEqual(admission.snapshot()['queue_length'], 0)
+        admission.release()
+        self.assertEqual(admission.snapshot()['in_flight'], 0)
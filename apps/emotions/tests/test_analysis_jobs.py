@@ -0,0 +1,126 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.emotions.models import AnalysisJob, EmotionAnalysis, EmotionStatistics, FaceDetection
+from apps.emotions.services import analysis_jobs
+from apps.emotions.services.analysis_jobs import (
+    AnalysisJobError, claim_next_job, enqueue_analysis, run_job
+)
+
+RESULTS = {
+    'faces_detected': 1,
+    'faces_analysis': [{
+        'face_id': 1,
+        'coordinates': {'x': 10, 'y': 10, 'width': 40, 'height': 40},
+        'dominant_emotion': 'happiness',
+        'confidence': 0.8,
+        'all_emotions': {'happiness': 0.8, 'neutral': 0.2},
+    }],
+}
+
+
+@override_settings(EMOTION_JOB_MAX_RUNNING=0, EMOTION_JOB_RETRY_BACKOFF=2)
+class AnalysisJobTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('trabajos', email='trabajos@example.com', password='x')
+
+    def setUp(self):
+        self.analysis = EmotionAnalysis.objects.create(user=self.user, image='test/job.jpg')
+        self.job = enqueue_analysis(self.analysis, max_attempts=2)
+
+    def detect(self, **kwargs):
+        kwargs.setdefault('return_value', (RESULTS, 0.1))
+        return mock.patch.object(analysis_jobs, 'detect_analysis', **kwargs)
+
+    def expire_lease(self):
+        AnalysisJob.objects.filter(pk=self.job.pk).update(lease_expires_at=timezone.now() - timedelta(seconds=1))
+
+    def statistics(self):
+        return EmotionStatistics.objects.filter(user=self.user).first()
+
+    def test_claim_takes_each_job_once(self):
+        job = claim_next_job('w1', timeout=60)
+        self.assertEqual(job.pk, self.job.pk)
+        self.assertEqual(job.status, AnalysisJob.Status.RUNNING)
+        self.assertEqual(job.attempts, 1)
+        self.assertIsNone(claim_next_job('w2', timeout=60))
+
+    def test_expired_lease_is_reclaimed(self):
+        claim_next_job('w1', timeout=60)
+        self.expire_lease()
+        job = claim_next_job('w2', timeout=60)
+        self.assertEqual((job.worker, job.attempts), ('w2', 2))
+
+    @override_settings(EMOTION_JOB_MAX_RUNNING=1)
+    def test_max_running_limits_claims(self):
+        enqueue_analysis(EmotionAnalysis.objects.create(user=self.user, image='test/other.jpg'))
+        self.assertIsNotNone(claim_next_job('w1', timeout=60))
+        self.assertIsNone(claim_next_job('w2', timeout=60))
+
+    def test_successful_job_saves_results_and_statistics(self):
+        job = claim_next_job('w1', timeout=60)
+        with self.detect():
+            job = run_job(job)
+
+        self.assertEqual(job.status, AnalysisJob.Status.DONE)
+        self.analysis.refresh_from_db()
+        self.assertEqual(self.analysis.faces_detected, 1)
+        self.assertEqual(self.analysis.dominant_emotion, 'happiness')
+        self.assertTrue(self.analysis.counted_in_statistics)
+        self.assertEqual(FaceDetection.objects.filter(analysis=self.analysis).count(), 1)
+        self.assertEqual(self.statistics().happiness_count, 1)
+
+    def test_failure_is_retried_and_then_counted_as_failed(self):
+        job = claim_next_job('w1', timeout=60)
+        with self.detect(side_effect=AnalysisJobError('imagen dañada')):
+            job = run_job(job)
+        self.assertEqual(job.status, AnalysisJob.Status.PENDING)
+        self.assertGreater(job.available_at, timezone.now())
+        self.assertIsNone(self.statistics())
+
+        AnalysisJob.objects.filter(pk=job.pk).update(available_at=timezone.now())
+        job = claim_next_job('w1', timeout=60)
+        with self.detect(side_effect=AnalysisJobError('imagen dañada')):
+            job = run_job(job)
+        self.assertEqual(job.status, AnalysisJob.Status.FAILED)
+        self.assertEqual(job.error, 'imagen dañada')
+        self.assertEqual(self.statistics().total_analyses, 1)
+
+    def test_worker_that_lost_its_lease_writes_nothing(self):
+        stale = claim_next_job('w1', timeout=60)
+        self.expire_lease()
+        current = claim_next_job('w2', timeout=60)
+
+        with self.detect():
+            stale = run_job(stale)
+
+        self.assertEqual(stale.status, AnalysisJob.Status.RUNNING)
+        self.assertEqual(stale.worker, 'w2')
+        self.analysis.refresh_from_db()
+        self.assertEqual(self.analysis.faces_detected, 0)
+        self.assertFalse(self.analysis.counted_in_statistics)
+        self.assertFalse(FaceDetection.objects.filter(analysis=self.analysis).exists())
+        self.assertIsNone(self.statistics())
+
+        with self.detect():
+            current = run_job(current)
+        self.assertEqual(current.status, AnalysisJob.Status.DONE)
+        self.assertEqual(self.statistics().total_analyses, 1)
+
+    def test_failed_save_is_retried_without_partial_results(self):
+        job = claim_next_job('w1', timeout=60)
+        with self.detect(), mock.patch.object(
+            FaceDetection, 'replace_for_analysis', side_effect=RuntimeError('db')
+        ):
+            job = run_job(job)
+
+        self.assertEqual(job.status, AnalysisJob.Status.PENDING)
+        self.analysis.refresh_from_db()
+        self.assertEqual(self.analysis.faces_detected, 0)
+        self.assertIsNone(self.statistics())
@@ -0,0 +1,98 @@
+import os
+import signal
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from apps.emotions.models import DailyEmotionRollup, EmotionAnalysis, EmotionStatistics, FaceDetection
+
+COMMAND = 'apps.emotions.management.commands.analyze_images'
+
+
+def fake_batch(items):
+    """
+    analyze_batch sin el detector: un rostro feliz por imagen y un error para 'mala.jpg'.
+    """
+    results = []
+    for source, digest, data in items:
+        if source == 'mala.jpg':
+            results.append({'source': source, 'hash': digest, 'error': 'No se pudo decodificar la imagen'})
+            continue
+        results.append({
+            'source': source, 'hash': digest, 'image': f'test/{source}', 'processing_time': 0.01,
+            'faces_analysis': [{
+                'face_id': 1, 'dominant_emotion': 'happiness', 'confidence': 0.9,
+                'coordinates': {'x': 0, 'y': 0, 'width': 10, 'height': 10},
+                'all_emotions': {'happiness': 0.9, 'neutral': 0.1},
+            }],
+        })
+    return results
+
+
+class AnalyzeImagesCommandTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('masivo', email='masivo@example.com', password='x')
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = directory.name
+        for index, name in enumerate(['a.jpg', 'b.jpg', 'c.png', 'mala.jpg', 'nota.txt']):
+            with open(os.path.join(self.path, name), 'wb') as image_file:
+                image_file.write(f'contenido {index}'.encode())
+        # Repetida: mismo contenido que a.jpg
+        with open(os.path.join(self.path, 'copia.jpg'), 'wb') as image_file:
+            image_file.write(b'contenido 0')
+
+    def run_command(self, analyze=fake_batch, **options):
+        stdout = StringIO()
+        with mock.patch(f'{COMMAND}.analyze_batch', side_effect=analyze):
+            call_command('analyze_images', self.path, user=str(self.user.pk), workers=0,
+                         stdout=stdout, stderr=StringIO(), **options)
+        return stdout.getvalue()
+
+    def test_counts_analyses_incrementally(self):
+        self.run_command(batch_size=2, chunk_size=2)
+
+        analyses = EmotionAnalysis.objects.filter(user=self.user)
+        self.assertEqual(analyses.count(), 3)
+        self.assertEqual(analyses.filter(counted_in_statistics=False).count(), 0)
+        self.assertEqual(FaceDetection.objects.filter(analysis__user=self.user).count(), 3)
+
+        stats = EmotionStatistics.objects.get(user=self.user)
+        self.assertEqual((stats.total_analyses, stats.happiness_count), (3, 3))
+        self.assertAlmostEqual(stats.average_confidence, 90.0)
+        rollup = DailyEmotionRollup.objects.get(user=self.user)
+        self.assertEqual((rollup.emotion, rollup.analyses, rollup.faces), ('happiness', 3, 3))
+
+        # Los contadores incrementales coinciden con una reconstrucción completa
+        stats.update_statistics()
+        stats.refresh_from_db()
+        self.assertEqual((stats.total_analyses, stats.happiness_count), (3, 3))
+
+    def test_second_run_skips_analyzed_files(self):
+        self.run_command()
+        output = self.run_command()
+        self.assertIn('0 imágenes analizadas', output)
+        self.assertEqual(EmotionAnalysis.objects.filter(user=self.user).count(), 3)
+        self.assertEqual(EmotionStatistics.objects.get(user=self.user).total_analyses, 3)
+
+    def test_interrupt_finishes_and_saves_the_current_batch(self):
+        def interrupted(items):
+            os.kill(os.getpid(), signal.SIGINT)
+            return fake_batch(items)
+
+        output = self.run_command(analyze=interrupted, batch_size=2)
+        self.assertIn('Parcial', output)
+        # El primer lote (a.jpg, b.jpg) se registró entero y no se empezó otro
+        self.assertEqual(
+            sorted(EmotionAnalysis.objects.filter(user=self.user).values_list('image', flat=True)),
+            ['test/a.jpg', 'test/b.jpg']
+        )
+        self.assertEqual(EmotionStatistics.objects.get(user=self.user).total_analyses, 2)
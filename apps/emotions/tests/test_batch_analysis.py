@@ -0,0 +1,97 @@
+import threading
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from apps.emotions.services import batch_analysis
+from apps.emotions.services.admission import AdmissionController
+from apps.emotions.services.batch_analysis import iter_batch_results
+from apps.emotions.services.inference_executor import InferenceExecutor
+from apps.emotions.tests.utils import wait_until
+
+
+class FakeDetection:
+    """
+    _decode_and_detect sin OpenCV: registra cuántas detecciones corren a la vez.
+    """
+
+    def __init__(self, delay=0.02):
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.running = 0
+        self.max_running = 0
+        self.started = 0
+
+    def __call__(self, data):
+        with self.lock:
+            self.running += 1
+            self.started += 1
+            self.max_running = max(self.max_running, self.running)
+        try:
+            time.sleep(self.delay)
+            if data == b'mala':
+                raise ValueError('No se pudo decodificar la imagen')
+            return data, []
+        finally:
+            with self.lock:
+                self.running -= 1
+
+
+class BatchAnalysisTests(SimpleTestCase):
+
+    def setUp(self):
+        executor = InferenceExecutor(max_workers=4)
+        self.addCleanup(executor.shutdown)
+        self.detection = FakeDetection()
+        for patcher in (
+            mock.patch.object(batch_analysis, 'inference_executor', executor),
+            mock.patch.object(batch_analysis, '_decode_and_detect', self.detection),
+            mock.patch.object(batch_analysis.emotion_detector, 'analyze_faces_batch',
+                              side_effect=lambda images, boxes: [[] for _ in images]),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def make_admission(self, max_concurrent):
+        admission = AdmissionController('test', max_concurrent, max_queue=0, max_wait=0.1)
+        admission.acquire()  # El turno que la vista obtiene antes de responder
+        return admission
+
+    def images(self, count):
+        return [(f'{index}.jpg', b'imagen') for index in range(count)]
+
+    def test_in_flight_detections_never_exceed_the_slots_held(self):
+        admission = self.make_admission(max_concurrent=2)
+        results = list(iter_batch_results(self.images(8), admission))
+
+        self.assertEqual(sorted(result['index'] for result in results), list(range(8)))
+        self.assertLessEqual(self.detection.max_running, 2)
+        # Solo queda el turno del llamador
+        wait_until(lambda: admission.snapshot()['in_flight'] == 1)
+
+    def test_batch_runs_one_at_a_time_without_free_slots(self):
+        admission = self.make_admission(max_concurrent=1)
+        results = list(iter_batch_results(self.images(4), admission))
+        self.assertEqual(len(results), 4)
+        self.assertEqual(self.detection.max_running, 1)
+        self.assertEqual(admission.snapshot()['rejected_total'], 0)
+
+    def test_without_admission_is_bounded_by_the_executor(self):
+        self.assertEqual(len(list(iter_batch_results(self.images(10)))), 10)
+        self.assertLessEqual(self.detection.max_running, 4)
+
+    def test_errors_are_reported_per_image(self):
+        images = [('a.jpg', b'imagen'), ('mala.jpg', b'mala'), ('c.jpg', b'imagen')]
+        results = {result['name']: result for result in iter_batch_results(images)}
+        self.assertEqual(results['mala.jpg']['error'], 'No se pudo decodificar la imagen')
+        self.assertEqual(results['c.jpg']['faces_detected'], 0)
+
+    def test_disconnect_stops_submitting_and_returns_the_slots(self):
+        admission = self.make_admission(max_concurrent=3)
+        results = iter_batch_results(self.images(20), admission)
+        next(results)
+        results.close()
+
+        wait_until(lambda: admission.snapshot()['in_flight'] == 1)
+        self.assertLess(self.detection.started, 20)
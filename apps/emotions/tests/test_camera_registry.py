@@ -0,0 +1,128 @@
+import threading
+import time
+
+from django.test import SimpleTestCase
+
+from apps.emotions.services.camera_registry import CameraRegistry, CameraUnavailable
+from apps.emotions.services.detection_scheduler import DetectionScheduler
+from apps.emotions.tests.utils import FakeCamera, wait_until
+
+
+class CameraRegistryTests(SimpleTestCase):
+
+    def make(self, max_cameras=2, initialized=True):
+        self.opened = []
+
+        def factory(key, source):
+            camera = FakeCamera(key, initialized)
+            self.opened.append(camera)
+            return camera
+
+        return CameraRegistry(factory, resolver=lambda key: key, idle_timeout=60, max_cameras=max_cameras)
+
+    def test_acquire_shares_the_camera_and_counts_refs(self):
+        registry = self.make()
+        first = registry.acquire('aula1')
+        second = registry.acquire('aula1')
+        self.assertIs(first, second)
+        self.assertEqual(len(self.opened), 1)
+        self.assertEqual(registry.stats()['aula1']['sessions'], 2)
+
+    def test_only_idle_cameras_without_refs_are_closed(self):
+        registry = self.make()
+        camera = registry.acquire('aula1')
+        later = time.monotonic() + 120
+
+        self.assertEqual(registry.evict_idle(now=later), 0)
+        registry.release_ref(camera)
+        self.assertEqual(registry.evict_idle(now=time.monotonic()), 0)
+        self.assertEqual(registry.evict_idle(now=later), 1)
+        self.assertTrue(camera.closed)
+        self.assertFalse(registry.touch(camera))
+
+    def test_max_cameras_closes_an_unused_one_or_rejects(self):
+        registry = self.make(max_cameras=1)
+        camera = registry.acquire('aula1')
+        with self.assertRaises(CameraUnavailable):
+            registry.acquire('aula2')
+
+        registry.release_ref(camera)
+        registry.acquire('aula2')
+        self.assertTrue(camera.closed)
+        self.assertEqual(registry.keys(), ['aula2'])
+
+    def test_camera_that_fails_to_open_is_not_registered(self):
+        registry = self.make(initialized=False)
+        with self.assertRaises(CameraUnavailable):
+            registry.acquire('aula1')
+        self.assertTrue(self.opened[0].closed)
+        self.assertEqual(registry.keys(), [])
+
+    def test_forced_release_ends_the_camera_even_with_refs(self):
+        registry = self.make()
+        camera = registry.acquire('aula1')
+        self.assertTrue(registry.release('aula1'))
+        self.assertTrue(camera.closed)
+        self.assertFalse(registry.touch(camera))
+        # Una referencia vieja no afecta a la cámara reabierta
+        registry.release_ref(camera)
+        reopened = registry.acquire('aula1')
+        self.assertIsNot(reopened, camera)
+
+
+class ScheduledCamera:
+    """
+    Cámara para DetectionScheduler: pide detección siempre que esté activa.
+    """
+
+    def __init__(self, key, enabled=True):
+        self.key = key
+        self.enabled = enabled
+        self.runs = 0
+        self.running = 0
+        self.max_running = 0
+        self._lock = threading.Lock()
+
+    def detection_due(self, now):
+        return 0.0 if self.enabled else None
+
+    def run_detection(self):
+        with self._lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(0.002)
+        with self._lock:
+            self.running -= 1
+            self.runs += 1
+
+
+class DetectionSchedulerTests(SimpleTestCase):
+
+    def register(self, scheduler, *cameras):
+        for camera in cameras:
+            scheduler.register(camera)
+            self.addCleanup(scheduler.unregister, camera)
+
+    def test_cameras_take_turns_on_a_saturated_detector(self):
+        scheduler = DetectionScheduler(workers=1)
+        first, second = ScheduledCamera('aula1'), ScheduledCamera('aula2')
+        self.register(scheduler, first, second)
+        wait_until(lambda: first.runs + second.runs >= 20)
+        scheduler.unregister(first)
+        scheduler.unregister(second)
+        self.assertLessEqual(abs(first.runs - second.runs), 1)
+
+    def test_a_camera_never_has_two_detections_in_flight(self):
+        scheduler = DetectionScheduler(workers=3)
+        camera = ScheduledCamera('aula1')
+        self.register(scheduler, camera)
+        wait_until(lambda: camera.runs >= 10)
+        self.assertEqual(camera.max_running, 1)
+
+    def test_cameras_without_detection_are_skipped(self):
+        scheduler = DetectionScheduler(workers=1)
+        idle, active = ScheduledCamera('aula1', enabled=False), ScheduledCamera('aula2')
+        self.register(scheduler, idle, active)
+        wait_until(lambda: active.runs >= 5)
+        self.assertEqual(idle.runs, 0)
+        self.assertGreaterEqual(scheduler.stats()['aula2']['detections'], 4)
@@ -0,0 +1,61 @@
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from apps.emotions.services import capture_profile
+from apps.emotions.services.capture_profile import (
+    DEFAULT_CLIENT_CAPTURE_LEVELS, CaptureAdvisor, CaptureLevel, load_levels
+)
+
+
+def frame(width, height, *face_widths):
+    return {
+        'frame_size': [width, height],
+        'faces': [{'x': 0, 'y': 0, 'width': face, 'height': face} for face in face_widths],
+    }
+
+
+class CaptureAdvisorTests(SimpleTestCase):
+
+    def setUp(self):
+        # Niveles por defecto: 960x720, 640x480, 480x360 y 320x240
+        levels = [CaptureLevel(*level) for level in DEFAULT_CLIENT_CAPTURE_LEVELS]
+        self.advisor = CaptureAdvisor(levels, default_level=1, min_face=64, high_load=1.0, max_clients=2)
+
+    def advise(self, level, pressure):
+        with mock.patch.object(capture_profile.inference_admission, 'pressure', return_value=pressure):
+            return self.advisor.advise(level)
+
+    def test_small_faces_raise_the_level_only_if_the_client_was_downscaling(self):
+        self.assertEqual(self.advisor.update(1, frame(640, 480, 40, 120)), 0)
+        # La cámara del cliente no da más píxeles: subir no serviría
+        self.assertEqual(self.advisor.update(1, frame(320, 240, 40)), 1)
+        self.assertEqual(self.advisor.update(0, frame(960, 720, 40)), 0)
+
+    def test_large_faces_lower_the_level(self):
+        # En 480x360 el rostro de 200 px mediría 150, más del doble del mínimo
+        self.assertEqual(self.advisor.update(1, frame(640, 480, 200)), 2)
+        self.assertEqual(self.advisor.update(1, frame(640, 480, 150)), 1)
+        self.assertEqual(self.advisor.update(3, frame(320, 240, 200)), 3)
+
+    def test_frames_without_faces_keep_the_level(self):
+        self.assertEqual(self.advisor.update(2, frame(640, 480)), 2)
+        self.assertEqual(self.advisor.update(2, {'faces': [{'width': 20}]}), 2)
+
+    def test_observe_remembers_a_bounded_number_of_clients(self):
+        self.assertEqual(self.advisor.observe('a', frame(640, 480, 40)), 0)
+        self.assertEqual(self.advisor.level_for('a'), 0)
+        self.advisor.observe('b', frame(640, 480))
+        self.advisor.observe('c', frame(640, 480))
+        self.assertEqual(self.advisor.level_for('a'), self.advisor.default_level)
+
+    def test_load_lowers_the_advised_level(self):
+        self.assertEqual(self.advise(1, 0.5), {'level': 1, 'max_width': 640, 'max_height': 480, 'quality': 80})
+        self.assertEqual(self.advise(1, 1.5)['level'], 2)
+        self.assertEqual(self.advise(1, 2.5)['level'], 3)
+        self.assertEqual(self.advise(3, 2.5)['level'], 3)
+        self.assertEqual(self.advise(None, 0.0)['level'], 1)
+
+    @override_settings(EMOTION_CLIENT_CAPTURE_LEVELS=[('800', '600', '90')])
+    def test_levels_come_from_settings(self):
+        self.assertEqual(load_levels(), [CaptureLevel(800, 600, 90)])
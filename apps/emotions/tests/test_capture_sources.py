@@ -0,0 +1,83 @@
+from unittest import mock
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from apps.emotions.services import capture_sources
+from apps.emotions.services.capture_sources import (
+    CaptureSource, DeviceSource, FileSource, StreamSource, SyntheticSource, _OpenCVSource, create_source
+)
+from apps.emotions.tests.utils import wait_until
+
+
+class FlakySource(CaptureSource):
+    """
+    Falla la primera apertura y después entrega frames negros.
+    """
+    kind = 'flaky'
+
+    def __init__(self):
+        super().__init__('prueba')
+        self.opens = 0
+
+    def _open(self):
+        self.opens += 1
+        return self.opens > 1
+
+    def _read(self):
+        self._stop_event.wait(0.005)
+        return np.zeros((4, 4, 3), dtype=np.uint8)
+
+
+class CaptureSourceTests(SimpleTestCase):
+
+    def test_incomplete_sources_cannot_be_instantiated(self):
+        class WithoutRead(CaptureSource):
+            def _open(self):
+                return True
+
+        class WithoutCapture(_OpenCVSource):
+            pass
+
+        for source_class in (CaptureSource, WithoutRead, WithoutCapture):
+            with self.subTest(source_class=source_class.__name__):
+                with self.assertRaises(TypeError):
+                    source_class('prueba')
+
+    def test_create_source_picks_the_source_type(self):
+        cases = [
+            (0, DeviceSource), ('1', DeviceSource), ('rtsp://camara/1', StreamSource),
+            ('synthetic', SyntheticSource), ('videos/clase.mp4', FileSource),
+        ]
+        for spec, source_class in cases:
+            with self.subTest(spec=spec):
+                self.assertIsInstance(create_source(spec), source_class)
+
+        source = create_source('synthetic:160x120@15')
+        self.assertEqual((source.width, source.height, source.fps), (160, 120, 15))
+        for spec in ('', 'synthetic:grande'):
+            with self.subTest(spec=spec), self.assertRaises(ValueError):
+                create_source(spec)
+
+    def test_synthetic_source_publishes_frames(self):
+        source = SyntheticSource(80, 60, fps=100).start()
+        self.addCleanup(source.stop)
+        self.assertTrue(source.wait_ready(2.0))
+
+        seq, frame, _ = source.latest()
+        self.assertEqual(frame.shape, (60, 80, 3))
+        newer_seq, newer, _ = source.wait_frame(seq, timeout=2.0)
+        self.assertGreater(newer_seq, seq)
+        self.assertIsNotNone(newer)
+
+        source.stop()
+        self.assertFalse(source.running)
+
+    def test_failed_open_is_retried(self):
+        source = FlakySource()
+        with mock.patch.object(capture_sources, 'RECONNECT_MIN', 0.01):
+            source.start()
+            self.addCleanup(source.stop)
+            self.assertTrue(source.wait_ready(2.0))
+        wait_until(lambda: source.connected)
+        self.assertEqual((source.opens, source.reconnects), (2, 1))
@@ -0,0 +1,84 @@
+import base64
+from unittest import mock
+
+import cv2
+import numpy as np
+from django.test import SimpleTestCase
+
+from apps.emotions.services import crop_sessions
+from apps.emotions.services.crop_sessions import CropRejected, CropSessionRegistry, decode_crop, padded_region
+
+# Un rostro de 100 px en (100, 100); con padding 0.3 su región es (70, 70, 160, 160)
+RESULTS = {
+    'frame_size': [640, 480],
+    'faces': [{'x': 100, 'y': 100, 'width': 100, 'height': 100}],
+}
+
+
+def jpeg(width, height):
+    ok, data = cv2.imencode('.jpg', np.full((height, width, 3), 128, dtype=np.uint8))
+    return data.tobytes()
+
+
+class CropSessionTests(SimpleTestCase):
+
+    def setUp(self):
+        self.registry = CropSessionRegistry(keyframe_interval=2.0, padding=0.3, max_size=160, max_sessions=2)
+        self.session = self.registry.start('tab', RESULTS)
+
+    def assertRejected(self, reason, func, *args):
+        with self.assertRaises(CropRejected) as raised:
+            func(*args)
+        self.assertEqual(raised.exception.reason, reason)
+
+    def test_regions_are_padded_and_clamped_to_the_frame(self):
+        self.assertEqual(self.session.regions, [(70, 70, 160, 160)])
+        self.assertEqual(padded_region((0, 420, 100, 60), (640, 480), 0.3), (0, 402, 130, 78))
+
+    def test_face_is_located_in_a_downscaled_crop(self):
+        faces = self.registry.face_images(self.session, [jpeg(80, 80)])
+        self.assertEqual(faces[0].shape[:2], (50, 50))
+        self.assertEqual((self.session.frames, self.registry.crop_frames), (1, 1))
+
+    def test_wrong_crop_count_is_rejected_before_decoding(self):
+        with mock.patch.object(crop_sessions, 'decode_crop') as decode:
+            self.assertRejected('count', self.registry.face_images, self.session, [jpeg(80, 80)] * 2)
+        decode.assert_not_called()
+        self.assertEqual(self.registry.rejected, 1)
+
+    def test_oversized_crop_is_rejected_before_decoding(self):
+        with mock.patch.object(crop_sessions.cv2, 'imdecode') as imdecode:
+            self.assertRejected('size', self.registry.face_images, self.session, [jpeg(200, 200)])
+        imdecode.assert_not_called()
+
+    def test_crop_with_other_proportions_is_rejected(self):
+        self.assertRejected('shape', self.registry.face_images, self.session, [jpeg(80, 40)])
+
+    def test_decode_accepts_data_urls_and_rejects_garbage(self):
+        data_url = 'data:image/jpeg;base64,' + base64.b64encode(jpeg(40, 30)).decode('ascii')
+        self.assertEqual(decode_crop(data_url, 160).shape, (30, 40, 3))
+        self.assertRejected('decode', decode_crop, b'no es una imagen', 160)
+        self.assertRejected('decode', decode_crop, b'no es una imagen')
+
+    def test_unknown_token_and_expired_session_ask_for_a_keyframe(self):
+        self.assertRejected('token', self.registry.get, 'tab', 'otro-token')
+        self.assertRejected('token', self.registry.get, 'otra-pestaña', self.session.token)
+        self.assertIs(self.registry.get('tab', self.session.token), self.session)
+
+        self.session.created -= 5
+        self.assertRejected('keyframe', self.registry.get, 'tab', self.session.token)
+        # La sesión vencida se descarta
+        self.assertEqual(self.registry.snapshot()['sessions'], 0)
+        self.assertRejected('token', self.registry.get, 'tab', self.session.token)
+
+    def test_no_session_without_faces_or_when_disabled(self):
+        self.assertIsNone(self.registry.start('tab', {'frame_size': [640, 480], 'faces': []}))
+        self.assertEqual(self.registry.snapshot()['sessions'], 0)
+        self.registry.enabled = False
+        self.assertIsNone(self.registry.new_session(RESULTS))
+
+    def test_oldest_session_is_dropped_over_the_limit(self):
+        self.registry.start('tab2', RESULTS)
+        self.registry.start('tab3', RESULTS)
+        self.assertEqual(self.registry.snapshot()['sessions'], 2)
+        self.assertRejected('token', self.registry.get, 'tab', self.session.token)
@@ -0,0 +1,49 @@
+import csv
+import gzip
+import io
+import json
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+
+from apps.emotions.models import EmotionAnalysis
+from apps.emotions.services.export import csv_safe, export_queryset, stream_export
+
+
+class CSVSafeTests(SimpleTestCase):
+
+    def test_formula_prefixes_are_neutralized(self):
+        for value in ('=HYPERLINK("http://x")', '+1', '-2+3', '@SUM(A1)', '\tdato', '\rdato'):
+            with self.subTest(value=value):
+                self.assertEqual(csv_safe(value), "'" + value)
+
+    def test_other_values_are_unchanged(self):
+        for value in ('nota normal', '', 'a=b', 3, -1.5, None):
+            with self.subTest(value=value):
+                self.assertEqual(csv_safe(value), value)
+
+
+class StreamExportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('exportar', email='exportar@example.com', password='x')
+        EmotionAnalysis.objects.create(user=cls.user, image='test/a.jpg', notes='=1+1', dominant_emotion='anger')
+        EmotionAnalysis.objects.create(user=cls.user, image='test/b.jpg', notes='clase, "tranquila"')
+
+    def export(self, fmt, compress=False, **filters):
+        header, rows = export_queryset('analyses', users=[self.user.pk], **filters)
+        data = b''.join(stream_export(header, rows, fmt, compress))
+        return gzip.decompress(data) if compress else data
+
+    def test_csv_escapes_formulas_and_quotes(self):
+        rows = list(csv.DictReader(io.StringIO(self.export('csv').decode('utf-8-sig'))))
+        self.assertEqual([row['notes'] for row in rows], ["'=1+1", 'clase, "tranquila"'])
+
+    def test_ndjson_keeps_the_original_text(self):
+        lines = self.export('ndjson').decode().splitlines()
+        self.assertEqual([json.loads(line)['notes'] for line in lines], ['=1+1', 'clase, "tranquila"'])
+
+    def test_gzip_and_filters(self):
+        lines = self.export('ndjson', compress=True, emotion='anger').decode().splitlines()
+        self.assertEqual(len(lines), 1)
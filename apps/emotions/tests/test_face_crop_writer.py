@@ -0,0 +1,87 @@
+import os
+import tempfile
+import threading
+from unittest import mock
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from apps.emotions.services.face_crop_writer import FaceCropWriter, letterbox
+
+
+def face(width, height, value=255):
+    return np.full((height, width, 3), value, dtype=np.uint8)
+
+
+class LetterboxTests(SimpleTestCase):
+
+    def test_keeps_the_aspect_ratio_with_centered_bands(self):
+        crop = letterbox(face(200, 100), 128)
+        self.assertEqual(crop.shape, (128, 128, 3))
+        # 200x100 queda en 128x64, centrado: bandas negras de 32 px arriba y abajo
+        self.assertEqual(crop[:32].max(), 0)
+        self.assertEqual(crop[96:].max(), 0)
+        self.assertEqual(crop[32:96].min(), 255)
+
+    def test_large_and_tiny_images(self):
+        self.assertEqual(letterbox(face(1000, 1500), 128).shape, (128, 128, 3))
+        crop = letterbox(face(1, 3), 128)
+        self.assertEqual(crop.shape, (128, 128, 3))
+        self.assertEqual(crop[:, 64].min(), 255)
+
+
+class FaceCropWriterTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.root = directory.name
+        self.writer = FaceCropWriter(root=self.root, size=32)
+
+    def test_writes_webp_named_by_content_hash(self):
+        path = self.writer.submit(face(40, 60))
+        self.assertTrue(self.writer.flush(timeout=2))
+
+        digest = os.path.basename(path)[:-len('.webp')]
+        self.assertEqual(path, f'faces/{digest[:2]}/{digest}.webp')
+        with open(os.path.join(self.root, path), 'rb') as crop_file:
+            self.assertEqual(crop_file.read(12)[8:], b'WEBP')
+        self.assertEqual(self.writer.snapshot()['written'], 1)
+
+    def test_same_face_is_written_once(self):
+        first = self.writer.submit(face(40, 60))
+        second = self.writer.submit(face(40, 60))
+        self.writer.flush(timeout=2)
+        third = self.writer.submit(face(40, 60))
+        self.writer.flush(timeout=2)
+
+        self.assertEqual(first, second)
+        self.assertEqual(first, third)
+        self.assertNotEqual(self.writer.submit(face(40, 60, value=10)), first)
+        self.writer.flush(timeout=2)
+        snapshot = self.writer.snapshot()
+        self.assertEqual((snapshot['written'], snapshot['deduplicated']), (2, 2))
+
+    def test_empty_crop_is_skipped(self):
+        self.assertIsNone(self.writer.submit(np.zeros((0, 0, 3), dtype=np.uint8)))
+        self.assertIsNone(self.writer.submit(None))
+        self.assertTrue(self.writer.flush(timeout=0))
+
+    def test_flush_times_out_while_a_write_is_blocked(self):
+        release = threading.Event()
+        self.addCleanup(release.set)
+        with mock.patch.object(self.writer, '_write', side_effect=lambda *args: release.wait(2)):
+            self.writer.submit(face(40, 60))
+            self.assertFalse(self.writer.flush(timeout=0.05))
+            release.set()
+            self.assertTrue(self.writer.flush(timeout=2))
+
+    def test_failed_write_is_counted_and_can_be_retried(self):
+        with mock.patch.object(self.writer, '_write', side_effect=OSError('disco lleno')):
+            path = self.writer.submit(face(40, 60))
+            self.writer.flush(timeout=2)
+        self.assertEqual(self.writer.snapshot()['errors'], 1)
+
+        self.assertEqual(self.writer.submit(face(40, 60)), path)
+        self.writer.flush(timeout=2)
+        self.assertTrue(os.path.exists(os.path.join(self.root, path)))
@@ -0,0 +1,43 @@
+from django.test import SimpleTestCase
+
+from apps.emotions.services.frame_coalescer import FrameCoalescer, FrameSuperseded
+from apps.emotions.tests.utils import InThread, wait_until
+
+
+class FrameCoalescerTests(SimpleTestCase):
+
+    def enter(self, coalescer, key):
+        def run():
+            with coalescer.turn(key):
+                return 'processed'
+        return InThread(run)
+
+    def test_newer_frame_supersedes_the_waiting_one(self):
+        coalescer = FrameCoalescer(max_staleness=2.0)
+        with coalescer.turn('client'):
+            first = self.enter(coalescer, 'client')
+            wait_until(lambda: coalescer._slots['client'].waiters)
+            second = self.enter(coalescer, 'client')
+            first.join(2)
+            self.assertIsInstance(first.error, FrameSuperseded)
+            self.assertEqual(first.error.reason, 'superseded')
+        second.join(2)
+        self.assertEqual(second.result, 'processed')
+
+        snapshot = coalescer.snapshot()
+        self.assertEqual(snapshot['processed_total'], 2)
+        self.assertEqual(snapshot['superseded_total'], 1)
+
+    def test_waiting_frame_becomes_stale(self):
+        coalescer = FrameCoalescer(max_staleness=0.05)
+        with coalescer.turn('client'):
+            waiting = self.enter(coalescer, 'client')
+            waiting.join(2)
+        self.assertEqual(waiting.error.reason, 'stale')
+
+    def test_clients_do_not_block_each_other(self):
+        coalescer = FrameCoalescer(max_staleness=0.5)
+        with coalescer.turn('a'):
+            other = self.enter(coalescer, 'b')
+            other.join(2)
+        self.assertEqual(other.result, 'processed')
@@ -0,0 +1,63 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.emotions.models import EmotionAnalysis
+from apps.emotions.services.history import InvalidCursor, encode_cursor, filter_history, history_page
+from apps.emotions.services.search import RANK_ANNOTATION
+
+
+class HistoryTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('historial', email='historial@example.com', password='x')
+        cls.other = get_user_model().objects.create_user('otro', email='otro@example.com', password='x')
+        now = timezone.now()
+        for index in range(7):
+            analysis = EmotionAnalysis.objects.create(
+                user=cls.user, image=f'test/{index}.jpg', dominant_emotion='happiness',
+                notes=f'clase {index}'
+            )
+            # Tres pares con la misma fecha: el cursor debe desempatar por id
+            EmotionAnalysis.objects.filter(pk=analysis.pk).update(
+                created_at=now - timedelta(minutes=index // 2)
+            )
+        EmotionAnalysis.objects.create(user=cls.other, image='test/otro.jpg', notes='clase')
+
+    def walk(self, analyses, limit):
+        ids, cursor = [], None
+        while True:
+            items, cursor = history_page(analyses, cursor, limit)
+            ids += [item.pk for item in items]
+            if cursor is None:
+                return ids
+
+
+class HistoryCursorTests(HistoryTestCase):
+
+    def test_pages_cover_the_history_once_in_order(self):
+        expected = list(
+            EmotionAnalysis.objects.filter(user=self.user)
+            .order_by('-created_at', '-id').values_list('pk', flat=True)
+        )
+        for limit in (1, 2, 3, 7, 50):
+            with self.subTest(limit=limit):
+                self.assertEqual(self.walk(filter_history(self.user), limit), expected)
+
+    def test_invalid_cursor_is_rejected(self):
+        with self.assertRaises(InvalidCursor):
+            history_page(filter_history(self.user), 'no-es-un-cursor')
+
+    def test_ranked_cursor_does_not_apply_to_unranked_history(self):
+        analysis = EmotionAnalysis.objects.filter(user=self.user).first()
+        setattr(analysis, RANK_ANNOTATION, 0.5)
+        with self.assertRaises(InvalidCursor):
+            history_page(filter_history(self.user), encode_cursor(analysis))
+
+    def test_filters_keep_to_the_user(self):
+        self.assertEqual(len(self.walk(filter_history(self.user, emotion='happiness'), 3)), 7)
+        self.assertEqual(self.walk(filter_history(self.user, emotion='anger'), 3), [])
+        self.assertEqual(len(self.walk(filter_history(self.other), 3)), 1)
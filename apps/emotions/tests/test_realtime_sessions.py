@@ -0,0 +1,78 @@
+import time
+
+from django.test import SimpleTestCase
+
+from apps.emotions.services.realtime_sessions import RealtimeSessionRegistry, SessionLimitReached
+from apps.emotions.tests.utils import FakeCameras
+
+
+class RealtimeSessionRegistryTests(SimpleTestCase):
+
+    def setUp(self):
+        self.cameras = FakeCameras()
+
+    def make(self, **kwargs):
+        return RealtimeSessionRegistry(self.cameras, **kwargs)
+
+    def owners(self, registry):
+        return sorted(owner for owner, _ in registry._sessions)
+
+    def test_attach_reuses_the_session_of_the_same_owner(self):
+        registry = self.make()
+        session = registry.attach('tab', user_id=1)
+        self.assertIs(registry.attach('tab', user_id=1), session)
+        self.assertEqual(self.cameras.refs['default'], 1)
+
+    def test_per_user_cap_displaces_the_users_idle_sessions_first(self):
+        registry = self.make(max_sessions=10, max_per_user=2)
+        registry.open_viewer(registry.attach('a1', user_id=1))
+        registry.attach('a2', user_id=1)
+        registry.attach('a3', user_id=1)
+        self.assertEqual(self.owners(registry), ['a1', 'a3'])
+        self.assertEqual(self.cameras.refs['default'], 2)
+
+    def test_global_cap_never_evicts_other_users_streams(self):
+        registry = self.make(max_sessions=2, max_per_user=0)
+        registry.open_viewer(registry.attach('b1', user_id=2))
+        registry.attach('b2', user_id=2)
+
+        # La sesión sin streams de otro usuario sí puede descartarse
+        registry.open_viewer(registry.attach('c1', user_id=3))
+        self.assertEqual(self.owners(registry), ['b1', 'c1'])
+
+        with self.assertRaises(SessionLimitReached):
+            registry.attach('d1', user_id=4)
+        self.assertEqual(self.owners(registry), ['b1', 'c1'])
+        self.assertEqual(self.cameras.refs['default'], 2)
+        self.assertEqual(registry.snapshot()['rejected'], 1)
+
+    def test_detection_follows_the_sessions_that_requested_it(self):
+        registry = self.make()
+        first = registry.attach('a', user_id=1)
+        second = registry.attach('b', user_id=2)
+        camera = first.camera
+
+        registry.set_detection(first, True)
+        registry.set_detection(first, True)
+        registry.set_detection(second, True)
+        self.assertEqual(camera.detection_requests, 2)
+        self.assertEqual(len(registry.detecting(camera)), 2)
+
+        registry.release('a')
+        self.assertEqual(camera.detection_requests, 1)
+        # Una sesión ya liberada no vuelve a pedir detección
+        registry.set_detection(first, True)
+        self.assertEqual(camera.detection_requests, 1)
+
+    def test_idle_sessions_without_viewers_expire(self):
+        registry = self.make(ttl=30)
+        watching = registry.attach('a', user_id=1)
+        registry.open_viewer(watching)
+        idle = registry.attach('b', user_id=2)
+        registry.set_detection(idle, True)
+
+        self.assertEqual(registry.evict_idle(now=time.monotonic() + 60), 1)
+        self.assertEqual(self.owners(registry), ['a'])
+        self.assertFalse(registry.touch(idle))
+        self.assertEqual(idle.camera.detection_requests, 0)
+        self.assertEqual(self.cameras.refs['default'], 1)
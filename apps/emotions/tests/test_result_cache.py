@@ -0,0 +1,81 @@
+import threading
+
+from django.test import SimpleTestCase
+
+from apps.emotions.services.result_cache import DegradedResult, ResultCache
+from apps.emotions.tests.utils import InThread, wait_until
+
+
+class ResultCacheTests(SimpleTestCase):
+
+    def test_hit_returns_a_copy(self):
+        cache = ResultCache(max_entries=4)
+        first = cache.get_or_compute('key', lambda: {'faces': [1]})
+        first['faces'].append(2)
+        second = cache.get_or_compute('key', lambda: self.fail('No debía recalcularse'))
+        self.assertEqual(second, {'faces': [1]})
+
+    def test_concurrent_requests_share_one_computation(self):
+        cache = ResultCache(max_entries=4)
+        started, release = threading.Event(), threading.Event()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            started.set()
+            release.wait(2)
+            return {'value': 1}
+
+        leader = InThread(cache.get_or_compute, 'key', compute)
+        started.wait(2)
+        follower = InThread(cache.get_or_compute, 'key', compute)
+        wait_until(lambda: cache.snapshot()['coalesced'] == 1)
+        release.set()
+        leader.join(2)
+        follower.join(2)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(leader.result, {'value': 1})
+        self.assertEqual(follower.result, {'value': 1})
+
+    def test_error_reaches_waiters_and_is_not_cached(self):
+        cache = ResultCache(max_entries=4)
+        started, release = threading.Event(), threading.Event()
+
+        def failing():
+            started.set()
+            release.wait(2)
+            raise ValueError('fallo')
+
+        leader = InThread(cache.get_or_compute, 'key', failing)
+        started.wait(2)
+        follower = InThread(cache.get_or_compute, 'key', failing)
+        wait_until(lambda: cache.snapshot()['coalesced'] == 1)
+        release.set()
+        leader.join(2)
+        follower.join(2)
+
+        self.assertIsInstance(leader.error, ValueError)
+        self.assertIsInstance(follower.error, ValueError)
+        self.assertEqual(cache.get_or_compute('key', lambda: 'ok'), 'ok')
+
+    def test_degraded_result_is_returned_but_not_cached(self):
+        cache = ResultCache(max_entries=4)
+        self.assertEqual(cache.get_or_compute('key', lambda: DegradedResult('fallback')), 'fallback')
+        self.assertEqual(cache.get_or_compute('key', lambda: 'real'), 'real')
+        self.assertEqual(cache.get_or_compute('key', lambda: 'other'), 'real')
+        self.assertEqual(cache.snapshot()['entries'], 1)
+
+    def test_evicts_least_recently_used(self):
+        cache = ResultCache(max_entries=2)
+        cache.get_or_compute('a', lambda: 'a')
+        cache.get_or_compute('b', lambda: 'b')
+        cache.get_or_compute('a', lambda: 'a2')
+        cache.get_or_compute('c', lambda: 'c')
+        self.assertEqual(cache.get_or_compute('a', lambda: 'a3'), 'a')
+        self.assertEqual(cache.get_or_compute('b', lambda: 'b2'), 'b2')
+
+    def test_expired_entries_are_recomputed(self):
+        cache = ResultCache(max_entries=2, ttl=0)
+        cache.get_or_compute('a', lambda: 'old')
+        self.assertEqual(cache.get_or_compute('a', lambda: 'new'), 'new')
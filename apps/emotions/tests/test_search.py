@@ -0,0 +1,28 @@
+from unittest import mock, skipUnless
+
+from django.db import connection
+
+from apps.emotions.models import EmotionAnalysis
+from apps.emotions.services.history import filter_history
+from apps.emotions.services.search import RANK_ANNOTATION, rank_truncated, search_analyses
+from apps.emotions.tests.test_history import HistoryTestCase
+
+
+class SearchTests(HistoryTestCase):
+
+    def test_search_matches_notes_and_emotion_names(self):
+        self.assertEqual(len(self.walk(filter_history(self.user, search='clase 3'), 2)), 1)
+        self.assertEqual(len(self.walk(filter_history(self.user, search='felicidad'), 2)), 7)
+        self.assertEqual(self.walk(filter_history(self.user, search='tristeza'), 2), [])
+
+    @skipUnless(connection.vendor == 'postgresql', 'El ranking solo existe en PostgreSQL')
+    def test_search_above_rank_window_returns_every_match(self):
+        analyses = EmotionAnalysis.objects.filter(user=self.user)
+        with mock.patch('apps.emotions.services.search.RANK_WINDOW', 3):
+            unranked = search_analyses(analyses, 'clase')
+            ranked = search_analyses(analyses, 'clase 3')
+        self.assertTrue(rank_truncated(unranked, 'clase'))
+        self.assertEqual(len(self.walk(unranked, 2)), 7)
+        self.assertFalse(rank_truncated(ranked, 'clase 3'))
+        self.assertIn(RANK_ANNOTATION, ranked.query.annotations)
+        self.assertEqual(len(self.walk(ranked, 1)), len(ranked))
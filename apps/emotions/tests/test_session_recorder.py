@@ -0,0 +1,132 @@
+import asyncio
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+
+from apps.emotions import consumers
+from apps.emotions.consumers import EmotionStreamConsumer
+from apps.emotions.models import RealtimeRecording, RealtimeTimelineChunk
+from apps.emotions.services.session_recorder import SessionRecorder
+
+
+class SessionRecorderTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('grabador', email='grabador@example.com', password='x')
+
+    def results(self):
+        return {'faces': [{'emotions': {'happiness': 0.9, 'neutral': 0.1}, 'confidence': 0.9}]}
+
+    def make(self, **kwargs):
+        recorder = SessionRecorder(**kwargs)
+        # Las pruebas llaman a flush directamente: sin el hilo de escritura periódica
+        recorder._start = lambda: None
+        return recorder
+
+    def test_flush_writes_summary_and_timeline(self):
+        recorder = self.make()
+        with mock.patch('apps.emotions.services.session_recorder.time') as clock:
+            for second in (0.0, 0.5, 1.2, 3.0):
+                clock.monotonic.return_value = 1000 + second
+                recorder.record(self.user.pk, 'tab', self.results())
+        recorder.end('tab')
+        self.assertEqual(recorder.flush(), 1)
+
+        recording = RealtimeRecording.objects.get(user=self.user)
+        self.assertEqual(recording.frames_analyzed, 4)
+        self.assertEqual(recording.seconds_with_faces, 3)
+        self.assertEqual(recording.dominant_emotion, 'happiness')
+        self.assertIsNotNone(recording.ended_at)
+        chunk = RealtimeTimelineChunk.objects.get(recording=recording)
+        self.assertEqual([row['second'] for row in chunk.rows], [0, 1, 3])
+        self.assertEqual(recorder.flush(), 0)
+
+    def test_failed_flush_keeps_rows_and_does_not_keep_a_rolled_back_pk(self):
+        recorder = self.make()
+        recorder.record(self.user.pk, 'tab', self.results())
+        recorder.end('tab')
+        with mock.patch.object(RealtimeTimelineChunk.objects, 'bulk_create', side_effect=RuntimeError('db')):
+            self.assertEqual(recorder.flush(), 0)
+        self.assertFalse(RealtimeRecording.objects.exists())
+
+        self.assertEqual(recorder.flush(), 1)
+        recording = RealtimeRecording.objects.get(user=self.user)
+        self.assertEqual(RealtimeTimelineChunk.objects.filter(recording=recording).count(), 1)
+
+    def test_session_is_dropped_after_max_retries(self):
+        recorder = self.make(max_retries=2)
+        recorder.record(self.user.pk, 'tab', self.results())
+        with mock.patch.object(recorder, '_write', side_effect=RuntimeError('db')):
+            recorder.flush()
+            self.assertEqual(recorder.snapshot()['active'], 1)
+            recorder.record(self.user.pk, 'tab', self.results())
+            recorder.flush()
+        snapshot = recorder.snapshot()
+        self.assertEqual(snapshot['dropped'], 1)
+        self.assertEqual(snapshot['active'], 0)
+
+    def test_idle_sessions_are_closed(self):
+        recorder = self.make(idle_timeout=10)
+        recorder.record(self.user.pk, 'tab', self.results())
+        later = time.monotonic() + 60
+        with mock.patch('apps.emotions.services.session_recorder.time') as clock:
+            clock.monotonic.return_value = later
+            self.assertEqual(recorder.flush(), 1)
+        self.assertEqual(recorder.snapshot()['active'], 0)
+        self.assertIsNotNone(RealtimeRecording.objects.get(user=self.user).ended_at)
+
+
+class ConsumerRecordingTests(SimpleTestCase):
+
+    def results(self, error=None):
+        face = {'x': 0, 'y': 0, 'width': 0, 'height': 0, 'dominant_emotion': 'happiness',
+                'confidence': 0.9, 'emotions': {'happiness': 0.9, 'neutral': 0.1}}
+        if error:
+            return {'error': error, 'faces': []}
+        return {'faces_detected': 1, 'faces': [face], 'frame_size': [64, 48]}
+
+    def stream(self, frames):
+        """
+        Conecta, envía los frames y desconecta tras recibir una respuesta por frame.
+        """
+        messages = asyncio.Queue()
+        answered = []
+
+        async def receive():
+            return await messages.get()
+
+        async def send(message):
+            if message['type'] == 'websocket.send' and '"t":"r"' in message['text']:
+                answered.append(message)
+                if len(answered) == len(frames):
+                    messages.put_nowait({'type': 'websocket.disconnect'})
+                else:
+                    messages.put_nowait({'type': 'websocket.receive', 'bytes': frames[len(answered)]})
+
+        messages.put_nowait({'type': 'websocket.connect'})
+        messages.put_nowait({'type': 'websocket.receive', 'bytes': frames[0]})
+        consumer = EmotionStreamConsumer({'type': 'websocket', 'headers': []}, receive, send)
+        consumer.max_fps = 0
+        asyncio.run(asyncio.wait_for(consumer.run(), 5))
+        return consumer
+
+    def test_each_result_is_recorded_and_the_recording_ends_on_disconnect(self):
+        user = mock.Mock(pk=7, is_authenticated=True)
+        analyzed = [self.results(), self.results(error='Frame inválido'), self.results()]
+        with mock.patch.object(consumers, 'get_user_from_scope', return_value=user), \
+                mock.patch.object(consumers, 'decode_and_analyze', side_effect=analyzed), \
+                mock.patch.object(consumers, 'session_recorder') as recorder:
+            consumer = self.stream([b'\xff1', b'\xff2', b'\xff3'])
+
+        self.assertEqual(recorder.record.call_args_list, [
+            mock.call(7, consumer.owner, analyzed[0]), mock.call(7, consumer.owner, analyzed[2])
+        ])
+        recorder.end.assert_called_once_with(consumer.owner)
+
+    def test_each_connection_records_under_its_own_key(self):
+        first = EmotionStreamConsumer({}, None, None)
+        second = EmotionStreamConsumer({}, None, None)
+        self.assertNotEqual(first.owner, second.owner)
@@ -0,0 +1,156 @@
+import importlib
+from datetime import timedelta
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.emotions.models import EMOTION_KEYS, DailyEmotionRollup, EmotionAnalysis, EmotionStatistics
+from apps.emotions.services.statistics import rebuild_daily_rollups, rebuild_statistics
+
+# Resultados con los formatos que existen en la base: subida, cámara, sin lista de
+# rostros, confianza en escala 0-1 o en porcentaje, nula o ausente
+ANALYSIS_RESULTS = [
+    {'faces_detected': 2, 'faces_analysis': [
+        {'dominant_emotion': 'happiness', 'confidence': 0.8},
+        {'dominant_emotion': 'sadness', 'confidence': 65.0},
+    ]},
+    {'faces_detected': 2, 'faces_analysis': [
+        {'dominant_emotion': 'anger', 'confidence': None},
+        {'dominant_emotion': 'anger'},
+    ]},
+    {'faces_detected': 1, 'faces': [{'emotion': 'surprise', 'confidence': 0.5}]},
+    {'source': 'camera'},
+    {},
+]
+
+STATISTICS_FIELDS = (
+    ['total_analyses', 'total_faces_detected', 'confidence_count', 'most_frequent_emotion']
+    + [f'{emotion}_count' for emotion in EMOTION_KEYS]
+)
+
+
+class StatisticsTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('estadisticas', email='estadisticas@example.com', password='x')
+
+    def create(self, results, **fields):
+        fields.setdefault('faces_detected', results.get('faces_detected', 0))
+        analysis = EmotionAnalysis.objects.create(
+            user=self.user, image='test/stats.jpg', analysis_results=results, **fields
+        )
+        EmotionStatistics.record_analysis(analysis)
+        return analysis
+
+    def create_history(self):
+        analyses = [self.create(results) for results in ANALYSIS_RESULTS]
+        analyses.append(self.create({'source': 'camera'}, dominant_emotion='fear', faces_detected=3,
+                                    average_confidence=70.0))
+        return analyses
+
+    def counters(self):
+        stats = EmotionStatistics.objects.get(user=self.user)
+        values = {field: getattr(stats, field) for field in STATISTICS_FIELDS}
+        values['confidence_sum'] = round(stats.confidence_sum, 6)
+        values['average_confidence'] = round(stats.average_confidence, 6)
+        return values
+
+    def assertMatchesRebuild(self, rebuild):
+        incremental = self.counters()
+        rebuild()
+        self.assertEqual(self.counters(), incremental)
+
+
+class IncrementalStatisticsTests(StatisticsTestCase):
+
+    def test_incremental_counters_match_a_full_rebuild(self):
+        self.create_history()
+        self.assertMatchesRebuild(lambda: EmotionStatistics.objects.get(user=self.user).update_statistics())
+
+    def test_delete_and_reprocess_match_a_full_rebuild(self):
+        analyses = self.create_history()
+        analyses[0].delete()
+
+        analysis = analyses[2]
+        EmotionStatistics.discard_analysis(analysis)
+        analysis.analysis_results = {'faces_detected': 1, 'faces_analysis': [
+            {'dominant_emotion': 'neutral', 'confidence': 0.9}
+        ]}
+        analysis.faces_detected = 1
+        analysis.save()
+        EmotionStatistics.record_analysis(analysis)
+
+        self.assertMatchesRebuild(lambda: EmotionStatistics.objects.get(user=self.user).update_statistics())
+
+    def test_recording_twice_counts_once(self):
+        analysis = self.create(ANALYSIS_RESULTS[0])
+        self.assertIsNone(EmotionStatistics.record_analysis(analysis))
+        self.assertEqual(self.counters()['total_analyses'], 1)
+
+    def test_null_confidence_does_not_count_towards_the_average(self):
+        self.create(ANALYSIS_RESULTS[1])
+        counters = self.counters()
+        # Rostro con confianza nula: no cuenta; rostro sin la clave: cuenta como 0
+        self.assertEqual(counters['anger_count'], 2)
+        self.assertEqual(counters['confidence_count'], 1)
+        self.assertEqual(counters['confidence_sum'], 0.0)
+
+    def test_counters_never_go_below_zero(self):
+        analysis = self.create(ANALYSIS_RESULTS[0])
+        EmotionStatistics.objects.filter(user=self.user).update(total_analyses=0, happiness_count=0)
+        EmotionStatistics.discard_analysis(analysis)
+        counters = self.counters()
+        self.assertEqual(counters['total_analyses'], 0)
+        self.assertEqual(counters['happiness_count'], 0)
+
+    def test_migration_copy_of_iter_faces_matches_the_model(self):
+        migration = importlib.import_module('apps.emotions.migrations.0003_incremental_statistics')
+        for analysis in self.create_history():
+            with self.subTest(results=analysis.analysis_results):
+                self.assertEqual(list(migration.iter_faces(analysis)), list(analysis.iter_faces()))
+
+
+@skipUnless(connection.vendor == 'postgresql', 'La reconstrucción en SQL solo existe en PostgreSQL')
+class SQLRebuildTests(StatisticsTestCase):
+
+    def test_sql_rebuild_matches_incremental_counters(self):
+        self.create_history()
+        self.assertMatchesRebuild(lambda: rebuild_statistics([self.user.pk]))
+
+    def test_sql_rebuild_recounts_after_a_delete(self):
+        self.create_history()[1].delete()
+        self.assertMatchesRebuild(lambda: rebuild_statistics())
+
+
+class DailyRollupTests(StatisticsTestCase):
+
+    def rollups(self):
+        # Las filas que quedaron en cero tras restar un análisis equivalen a no tenerlas
+        return sorted(
+            (row.date, row.emotion, row.analyses, row.faces, round(row.confidence_sum, 6))
+            for row in DailyEmotionRollup.objects.filter(user=self.user, analyses__gt=0)
+        )
+
+    def test_rollup_deltas_match_a_rebuild(self):
+        analyses = self.create_history()
+        analyses[0].delete()
+        EmotionStatistics.discard_analysis(analyses[3])
+        yesterday = EmotionAnalysis.objects.filter(pk=analyses[4].pk)
+        EmotionStatistics.discard_analysis(analyses[4])
+        yesterday.update(created_at=timezone.now() - timedelta(days=1))
+        EmotionStatistics.record_analysis(yesterday.get())
+
+        incremental = self.rollups()
+        rebuild_daily_rollups([self.user.pk])
+        self.assertEqual(self.rollups(), incremental)
+        self.assertEqual(len({row[0] for row in incremental}), 2)
+
+    def test_rollup_rows_follow_the_dominant_emotion(self):
+        self.create(ANALYSIS_RESULTS[0])
+        self.create(ANALYSIS_RESULTS[0])
+        row = DailyEmotionRollup.objects.get(user=self.user, emotion='happiness')
+        self.assertEqual((row.analyses, row.faces), (2, 4))
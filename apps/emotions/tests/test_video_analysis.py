@@ -0,0 +1,121 @@
+import os
+import tempfile
+from unittest import mock
+
+import cv2
+import numpy as np
+from django.test import SimpleTestCase
+
+from apps.emotions.models import EMOTION_KEYS
+from apps.emotions.services.emotion_detector import emotion_detector
+from apps.emotions.services.video_analysis import (
+    TimelineBuilder, VideoOpenError, analyze_video_file, iter_sampled_frames
+)
+
+
+class FakeCapture:
+    """
+    cv2.VideoCapture sobre una lista de frames; cuenta cuántos se decodifican.
+    """
+
+    def __init__(self, frames):
+        self.frames = frames
+        self.position = -1
+        self.retrieved = 0
+
+    def grab(self):
+        self.position += 1
+        return self.position < len(self.frames)
+
+    def retrieve(self):
+        self.retrieved += 1
+        return True, self.frames[self.position]
+
+
+def solid_frames(*values, width=64, height=48):
+    return [np.full((height, width, 3), value, dtype=np.uint8) for value in values]
+
+
+def probabilities(emotion):
+    return np.array([1.0 if key == emotion else 0.0 for key in EMOTION_KEYS])
+
+
+class SampledFramesTests(SimpleTestCase):
+
+    def sample(self, frames, fps=10.0, sample_fps=2.0, scene_threshold=0.0):
+        capture = FakeCapture(frames)
+        indexes = [index for index, _, _ in iter_sampled_frames(capture, fps, sample_fps, scene_threshold)]
+        return indexes, capture
+
+    def test_samples_at_the_requested_rate_and_skips_decoding_the_rest(self):
+        indexes, capture = self.sample(solid_frames(*[0] * 30))
+        self.assertEqual(indexes, [0, 5, 10, 15, 20, 25])
+        self.assertEqual(capture.retrieved, 6)
+
+    def test_scene_change_adds_a_sample(self):
+        # Escena negra hasta el frame 12 y blanca después; solo cambios de escena
+        indexes, _ = self.sample(solid_frames(*[0] * 12 + [255] * 18), sample_fps=0, scene_threshold=0.3)
+        self.assertEqual(indexes, [0, 12])
+
+    def test_without_sampling_or_scene_detection_takes_one_frame_per_second(self):
+        indexes, _ = self.sample(solid_frames(*[0] * 30), sample_fps=0, scene_threshold=0)
+        self.assertEqual(indexes, [0, 10, 20])
+
+
+class TimelineBuilderTests(SimpleTestCase):
+
+    def test_each_track_counts_once_per_second(self):
+        timeline = TimelineBuilder()
+        timeline.add(0.0, 1, probabilities('happiness'))
+        timeline.add(0.5, 1, probabilities('happiness'))
+        timeline.add(0.5, 2, probabilities('sadness'))
+        timeline.add(2.2, 1, probabilities('anger'))
+        rows = timeline.finish()
+
+        self.assertEqual([(row['second'], row['faces']) for row in rows], [(0, 2), (2, 1)])
+        self.assertEqual(rows[0]['emotions'][EMOTION_KEYS.index('happiness')], 0.5)
+        self.assertEqual(rows[1]['dominant_emotion'], 'anger')
+
+    def test_empty_timeline(self):
+        self.assertEqual(TimelineBuilder().finish(), [])
+
+
+class AnalyzeVideoFileTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'clase.avi')
+
+        writer = cv2.VideoWriter(self.path, cv2.VideoWriter_fourcc(*'MJPG'), 10, (64, 48))
+        for frame in solid_frames(*[40] * 30):
+            writer.write(frame)
+        writer.release()
+
+    def analyze_faces_batch(self, images, boxes):
+        return [[{
+            'coordinates': {'x': 10, 'y': 10, 'width': 20, 'height': 20},
+            'confidence': 0.9,
+            'all_emotions': {'happiness': 0.9, 'neutral': 0.1},
+        }] for _ in images]
+
+    def test_summarizes_a_video_with_one_face(self):
+        with mock.patch.object(emotion_detector, 'detect_faces', return_value=[(10, 10, 20, 20)]), \
+                mock.patch.object(emotion_detector, 'analyze_faces_batch', side_effect=self.analyze_faces_batch):
+            results = analyze_video_file(self.path, sample_fps=2, scene_threshold=0)
+
+        self.assertEqual((results['fps'], results['duration']), (10.0, 3.0))
+        self.assertEqual((results['width'], results['height']), (64, 48))
+        self.assertEqual(results['frames_sampled'], 6)
+        self.assertEqual(results['faces_detected'], 6)
+        self.assertEqual(results['tracks_detected'], 1)
+        self.assertEqual(results['tracks'][0]['frames'], 6)
+        self.assertEqual(results['dominant_emotion'], 'happiness')
+        self.assertAlmostEqual(results['average_confidence'], 90.0)
+        self.assertEqual([(row['second'], row['faces']) for row in results['timeline']], [(0, 1), (1, 1), (2, 1)])
+
+    def test_unreadable_file_is_rejected(self):
+        with open(self.path, 'wb') as video_file:
+            video_file.write(b'no es un video')
+        with self.assertRaises(VideoOpenError):
+            analyze_video_file(self.path)
@@ -0,0 +1,82 @@
+"""
+Utilidades compartidas por las pruebas.
+"""
+import threading
+import time
+
+
+def wait_until(condition, timeout=2.0):
+    """
+    Espera a que condition() sea verdadera (otro hilo llegó al punto esperado).
+    """
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError('La condición no se cumplió a tiempo')
+        time.sleep(0.005)
+
+
+class InThread(threading.Thread):
+    """
+    Ejecuta una función en otro hilo y guarda su resultado o su excepción.
+    """
+
+    def __init__(self, target, *args):
+        super().__init__(daemon=True)
+        self._target_call = (target, args)
+        self.result = None
+        self.error = None
+        self.start()
+
+    def run(self):
+        target, args = self._target_call
+        try:
+            self.result = target(*args)
+        except BaseException as e:
+            self.error = e
+
+
+class FakeCamera:
+    """
+    Cámara mínima para CameraRegistry y RealtimeSessionRegistry.
+    """
+
+    def __init__(self, key, initialized=True):
+        self.key = key
+        self.is_initialized = initialized
+        self.closed = False
+        self.detection_requests = 0
+        self.detect_emotions = False
+        self.encodes = []
+        self.source = None
+
+    def cleanup(self):
+        self.closed = True
+
+    def request_detection(self, enable):
+        self.detection_requests += 1 if enable else -1
+
+
+class FakeCameras:
+    """
+    CameraRegistry mínimo: una FakeCamera por clave con su cuenta de referencias.
+    """
+
+    def __init__(self):
+        self.cameras = {}
+        self.refs = {}
+
+    def normalize(self, key):
+        return key or 'default'
+
+    def acquire(self, key=None):
+        key = self.normalize(key)
+        camera = self.cameras.setdefault(key, FakeCamera(key))
+        self.refs[key] = self.refs.get(key, 0) + 1
+        return camera
+
+    def release_ref(self, camera):
+        self.refs[camera.key] -= 1
+
+    def touch(self, camera):
+        return True
@@ -2,7 +2,7 @@
 URLs para la aplicación de detección de emociones.
 """
 from django.urls import path
-from .views import emotion_views, video_stream
+from .views import async_views, emotion_views, export_views, recording_views, video_stream, video_views
 
 app_name = 'emotions'
 
@@ -15,9 +15,15 @@ urlpatterns = [
     path('quick/', emotion_views.quick_analysis, name='quick_analysis'),
     path('camera/', emotion_views.camera_analysis, name='camera_analysis'),
     
+    # Análisis de videos subidos
+    path('video/', video_views.video_upload, name='video_upload'),
+    path('video/<int:pk>/', video_views.video_detail, name='video_detail'),
+    
     # Análisis en tiempo real
     path('real-time/', video_stream.real_time_analysis, name='real_time'),
     path('video-feed/', video_stream.video_feed, name='video_feed'),
+    path('real-time/sessions/', recording_views.recording_list, name='recording_list'),
+    path('real-time/sessions/<int:pk>/', recording_views.recording_detail, name='recording_detail'),
     
     # Gestión de análisis
     path('analysis/', emotion_views.analysis_list, name='analysis_list'),
@@ -29,9 +35,23 @@ urlpatterns = [
     
     # API endpoints
     path('api/analyze-base64/', emotion_views.api_analyze_base64, name='api_analyze_base64'),
+    path('api/realtime-config/', emotion_views.api_realtime_config, name='api_realtime_config'),
+    path('api/analyze-batch/', emotion_views.api_analyze_batch, name='api_analyze_batch'),
+    path('api/analysis/history/', emotion_views.api_analysis_history, name='api_analysis_history'),
+    path('api/analysis/<int:pk>/status/', emotion_views.api_analysis_status, name='api_analysis_status'),
+    path('api/video/<int:pk>/status/', video_views.api_video_status, name='api_video_status'),
+    path('api/export/', export_views.export_analyses, name='export_analyses'),
+    path('api/metrics/', emotion_views.api_metrics, name='api_metrics'),
     path('api/save-camera-analysis/', emotion_views.api_save_camera_analysis, name='api_save_camera_analysis'),
     path('api/toggle-detection/', video_stream.toggle_detection, name='toggle_detection'),
     path('api/change-camera/', video_stream.change_camera, name='change_camera'),
     path('api/current-results/', video_stream.get_current_results, name='get_current_results'),
+    path('api/results-stream/', video_stream.results_stream, name='results_stream'),
     path('api/release-camera/', video_stream.release_camera, name='release_camera'),
+    path('api/cameras/', video_stream.camera_status, name='camera_status'),
+    
+    # Variantes asíncronas (ASGI)
+    path('api/async/analyze-base64/', async_views.api_analyze_base64_async, name='api_analyze_base64_async'),
+    path('api/async/quick/', async_views.quick_analysis_async, name='quick_analysis_async'),
+    path('api/async/current-results/', async_views.get_current_results_async, name='get_current_results_async'),
 ]
\ No newline at end of file
@@ -0,0 +1,71 @@
+"""
+Utilidades para respuestas en streaming (StreamingHttpResponse) bajo WSGI y ASGI.
+"""
+from asgiref.sync import sync_to_async
+
+
+async def aiter_sync(blocks, thread_sensitive=True):
+    """
+    Consume un generador síncrono bloque a bloque desde ASGI, sin que Django lo
+    cargue completo en memoria. Con thread_sensitive=True siempre se avanza en el mismo
+    hilo (necesario si el generador usa un cursor del servidor de la base de datos).
+    """
+    next_block = sync_to_async(next, thread_sensitive=thread_sensitive)
+    try:
+        while True:
+            block = await next_block(blocks, None)
+            if block is None:
+                break
+            yield block
+    finally:
+        await sync_to_async(blocks.close, thread_sensitive=thread_sensitive)()
+
+
+class ClosingIterator:
+    """
+    Iterador que llama a on_close una sola vez al agotarse o al cerrarse la respuesta,
+    incluso si el cliente se desconecta antes de leer el primer bloque (en ese caso el
+    bloque finally de un generador nunca se ejecuta).
+    """
+
+    def __init__(self, blocks, on_close):
+        self._blocks = iter(blocks)
+        self._on_close = on_close
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            return next(self._blocks)
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        on_close, self._on_close = self._on_close, None
+        if on_close is None:
+            return
+        try:
+            close = getattr(self._blocks, 'close', None)
+            if close is not None:
+                close()
+        finally:
+            on_close()
+
+
+class AsyncClosingIterator:
+    """
+    Variante de ClosingIterator para ASGI: se consume con aiter_sync y Django llama
+    a close() al terminar la respuesta.
+    """
+
+    def __init__(self, blocks, on_close, thread_sensitive=False):
+        self._blocks = ClosingIterator(blocks, on_close)
+        self._thread_sensitive = thread_sensitive
+
+    def __aiter__(self):
+        return aiter_sync(self._blocks, thread_sensitive=self._thread_sensitive)
+
+    def close(self):
+        self._blocks.close()
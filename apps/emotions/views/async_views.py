@@ -0,0 +1,158 @@
+"""
+Variantes asíncronas (ASGI) de las vistas de análisis.
+
+Bajo ASGI el cuerpo de la petición ya se recibe de forma asíncrona antes de llegar
+a la vista, y la inferencia se ejecuta en el executor acotado, de modo que un
+worker ASGI atiende muchos clientes lentos sin dedicar un hilo a cada petición.
+"""
+import json
+
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+
+from apps.emotions.forms import ImageUploadForm
+from apps.emotions.services.admission import (
+    PRIORITY_INTERACTIVE, PRIORITY_REALTIME, AdmissionRejected, inference_admission
+)
+from apps.emotions.services.crop_sessions import CropRejected
+from apps.emotions.services.frame_coalescer import FrameSuperseded, client_key, realtime_coalescer
+from apps.emotions.services.inference_executor import inference_executor
+from apps.emotions.services.session_recorder import session_recorder
+from apps.emotions.views.emotion_views import (
+    analyze_base64_timed, analyze_crops_timed, keyframe_required_response, overload_response,
+    realtime_payload, run_quick_analysis, superseded_response
+)
+from apps.emotions.services.camera_registry import CameraNotFound
+from apps.emotions.views.video_stream import (
+    camera_error_response, current_results_payload, requested_camera_key, session_owner
+)
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+@login_required
+async def api_analyze_base64_async(request):
+    """
+    API asíncrona para análisis de imágenes en base64 (AJAX).
+    """
+    try:
+        data = json.loads(request.body)
+        image_data = data.get('image_data')
+
+        if data.get('crop_token'):
+            # Solo los recortes de los rostros del último frame completo (sin YuNet)
+            owner = client_key(request, data.get('client_id'))
+            async with realtime_coalescer.aturn(owner):
+                async with inference_admission.aslot(PRIORITY_REALTIME, timeout=realtime_coalescer.max_staleness):
+                    results = await inference_executor.run(
+                        analyze_crops_timed, owner, data['crop_token'], data.get('crops') or []
+                    )
+            user = await request.auser()
+            session_recorder.record(user.pk, owner, results)
+            return JsonResponse({'success': True, 'analysis': results})
+
+        if not image_data:
+            return JsonResponse({
+                'success': False,
+                'error': 'No se proporcionaron datos de imagen'
+            })
+
+        # Realizar análisis en el executor de inferencia
+        if data.get('realtime'):
+            # Tiempo real: solo se analiza el frame más reciente de cada cliente
+            owner = client_key(request, data.get('client_id'))
+            async with realtime_coalescer.aturn(owner):
+                async with inference_admission.aslot(PRIORITY_REALTIME, timeout=realtime_coalescer.max_staleness):
+                    results = await inference_executor.run(analyze_base64_timed, image_data, use_cache=False)
+            # Solo en memoria: la escritura por lotes ocurre en el hilo del grabador
+            user = await request.auser()
+            session_recorder.record(user.pk, owner, results)
+            return JsonResponse(realtime_payload(owner, results))
+
+        async with inference_admission.aslot(PRIORITY_INTERACTIVE):
+            results = await inference_executor.run(analyze_base64_timed, image_data)
+
+        return JsonResponse({
+            'success': True,
+            'analysis': results
+        })
+
+    except CropRejected as e:
+        return keyframe_required_response(e)
+    except FrameSuperseded as e:
+        return superseded_response(e)
+    except AdmissionRejected as e:
+        return overload_response(e)
+    except Exception as e:
+        import traceback
+        print(f"Error en api_analyze_base64_async: {str(e)}")
+        print(traceback.format_exc())
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=500)
+
+
+def _validate_and_run_quick_analysis(data, files):
+    """
+    Valida el formulario y ejecuta el análisis rápido (se ejecuta dentro del executor).
+    """
+    form = ImageUploadForm(data, files)
+    if not form.is_valid():
+        return None
+    return run_quick_analysis(form.cleaned_data['image'])
+
+
+@require_http_methods(["POST"])
+@login_required
+async def quick_analysis_async(request):
+    """
+    API asíncrona para análisis rápido sin guardar en base de datos.
+    """
+    try:
+        # La validación de la imagen (Pillow) también es CPU: va al executor
+        async with inference_admission.aslot(PRIORITY_INTERACTIVE):
+            response_data = await inference_executor.run(
+                _validate_and_run_quick_analysis, request.POST, request.FILES
+            )
+
+        if response_data is None:
+            return JsonResponse({
+                'success': False,
+                'error': 'Formulario inválido'
+            })
+
+        return JsonResponse({
+            'success': True,
+            'analysis': response_data
+        })
+
+    except AdmissionRejected as e:
+        return overload_response(e)
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        })
+
+
+@csrf_exempt
+@require_http_methods(["GET"])
+@login_required
+async def get_current_results_async(request):
+    """
+    API asíncrona para obtener resultados actuales de detección de una cámara.
+    """
+    try:
+        # Solo lee el último resultado publicado: no abre la cámara ni toma su lock
+        return JsonResponse(current_results_payload(session_owner(request), requested_camera_key(request)))
+
+    except CameraNotFound as e:
+        return camera_error_response(e)
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=500)
@@ -7,21 +7,72 @@ import json
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.core.files.base import ContentFile
 from django.core.files.storage import default_storage
-from django.core.paginator import Paginator
-from django.db.models import Q
 from django.conf import settings
 import base64
 from io import BytesIO
 from PIL import Image
 
-from apps.emotions.models import EmotionAnalysis, EmotionStatistics
+from apps.emotions.models import AnalysisJob, DailyEmotionRollup, EmotionAnalysis, EmotionStatistics, FaceDetection
 from apps.emotions.forms import EmotionAnalysisForm, ImageUploadForm, CameraAnalysisForm
 from apps.emotions.services.emotion_detector import emotion_detector
+from apps.emotions.services.analysis_jobs import AnalysisJobError, enqueue_analysis, process_analysis
+from apps.emotions.services import metrics
+from apps.emotions.services.admission import (
+    PRIORITY_BULK, PRIORITY_INTERACTIVE, PRIORITY_REALTIME, AdmissionRejected, inference_admission
+)
+from apps.emotions.services.capture_profile import capture_advisor
+from apps.emotions.services.crop_sessions import CropRejected, crop_sessions
+from apps.emotions.services.frame_coalescer import FrameSuperseded, client_key, realtime_coalescer
+from apps.emotions.services.session_recorder import session_recorder
+from apps.emotions.services.history import InvalidCursor, filter_history, history_page, serialize_history_item
+from apps.emotions.services.search import RANK_WINDOW, rank_truncated
+from apps.emotions.services.batch_analysis import (
+    MAX_BYTES, BatchTooLarge, check_limits, iter_ndjson, read_zip
+)
+from apps.emotions.utils.streaming import AsyncClosingIterator, ClosingIterator
+
+
+def overload_response(exc):
+    """
+    Respuesta rápida cuando el control de admisión rechaza una petición de inferencia.
+    """
+    response = JsonResponse({
+        'success': False,
+        'error': 'El servicio de análisis está saturado, intenta nuevamente en unos segundos.',
+        'reason': exc.reason,
+        'retry_after': exc.retry_after
+    }, status=503)
+    response['Retry-After'] = str(exc.retry_after)
+    return response
+
+
+def superseded_response(exc):
+    """
+    Respuesta mínima para un frame de tiempo real reemplazado por uno más reciente.
+    """
+    return JsonResponse({
+        'success': True,
+        'superseded': True,
+        'reason': exc.reason
+    })
+
+
+def keyframe_required_response(exc):
+    """
+    Respuesta a recortes de tiempo real que ya no corresponden a una sesión vigente:
+    el cliente debe enviar el siguiente frame completo.
+    """
+    return JsonResponse({
+        'success': True,
+        'keyframe_required': True,
+        'reason': exc.reason
+    })
 
 
 @login_required
@@ -33,8 +84,6 @@ def emotion_dashboard(request):
     
     # Obtener estadísticas del usuario
     stats, created = EmotionStatistics.objects.get_or_create(user=user)
-    if created or stats.total_analyses == 0:
-        stats.update_statistics()
     
     # Obtener análisis recientes
     recent_analyses = EmotionAnalysis.objects.filter(user=user)[:5]
@@ -61,8 +110,6 @@ def upload_analysis(request):
         form = EmotionAnalysisForm(request.POST, request.FILES)
         if form.is_valid():
             try:
-                start_time = time.time()
-                
                 # Crear instancia pero no guardar aún
                 analysis = form.save(commit=False)
                 analysis.user = request.user
@@ -70,43 +117,22 @@ def upload_analysis(request):
                 # Guardar la imagen primero
                 analysis.save()
                 
-                # Realizar análisis de emociones
-                image_path = analysis.image.path
-                results = emotion_detector.analyze_image(image_path)
-                
-                # Calcular confianza promedio y emoción dominante
-                faces_analysis = results.get('faces_analysis', [])
-                if faces_analysis:
-                    # Calcular confianza promedio
-                    total_confidence = sum(face['confidence'] * 100 for face in faces_analysis)
-                    analysis.average_confidence = total_confidence / len(faces_analysis)
-                    
-                    # Calcular emoción dominante
-                    emotion_counts = {}
-                    for face in faces_analysis:
-                        emotion = face.get('dominant_emotion')
-                        if emotion:
-                            emotion_counts[emotion] = emotion_counts.get(emotion, 0) + 1
-                    
-                    if emotion_counts:
-                        analysis.dominant_emotion = max(emotion_counts.items(), key=lambda x: x[1])[0]
-                
-                # Guardar resultados
-                analysis.analysis_results = results
-                analysis.faces_detected = results.get('faces_detected', 0)
-                analysis.processing_time = time.time() - start_time
-                analysis.save()
-                
-                # Actualizar estadísticas del usuario
-                stats, created = EmotionStatistics.objects.get_or_create(user=request.user)
-                stats.update_statistics()
-                
-                if results.get('error'):
-                    messages.error(request, f"Error en el análisis: {results['error']}")
-                elif analysis.faces_detected == 0:
-                    messages.warning(request, "No se detectaron rostros en la imagen.")
+                if getattr(settings, 'EMOTION_JOBS_ENABLED', True):
+                    # Encolar el análisis: lo procesa un worker (run_emotion_workers)
+                    enqueue_analysis(analysis)
+                    messages.info(request, "Imagen recibida. El análisis se está procesando...")
                 else:
-                    messages.success(request, f"Análisis completado. Se detectaron {analysis.faces_detected} rostro(s).")
+                    # Procesamiento en la misma petición (desarrollo sin workers)
+                    try:
+                        with inference_admission.slot(PRIORITY_BULK):
+                            process_analysis(analysis)
+                    except AnalysisJobError as e:
+                        messages.error(request, f"Error en el análisis: {e}")
+                    else:
+                        if analysis.faces_detected == 0:
+                            messages.warning(request, "No se detectaron rostros en la imagen.")
+                        else:
+                            messages.success(request, f"Análisis completado. Se detectaron {analysis.faces_detected} rostro(s).")
                 
                 return redirect('emotions:analysis_detail', pk=analysis.pk)
                 
@@ -136,8 +162,12 @@ def analysis_detail(request, pk):
     faces_summary = analysis.get_faces_summary()
     emotion_distribution = analysis.get_emotion_distribution()
     
+    # Trabajo de la cola (si el análisis se procesa en segundo plano)
+    job = AnalysisJob.objects.filter(analysis=analysis).first()
+    
     context = {
         'analysis': analysis,
+        'job': job,
         'faces_summary': faces_summary,
         'emotion_distribution': emotion_distribution,
         'emotion_distribution_json': json.dumps(emotion_distribution),
@@ -146,45 +176,88 @@ def analysis_detail(request, pk):
     return render(request, 'emotions/detail.html', context)
 
 
+
+@require_http_methods(["GET"])
+@login_required
+def api_analysis_history(request):
+    """
+    API del historial paginada por cursor (scroll infinito).
+    Acepta los mismos filtros que analysis_list más cursor y limit.
+    """
+    analyses = filter_history(
+        request.user,
+        request.GET.get('emotion'),
+        request.GET.get('date'),
+        request.GET.get('search'),
+    )
+    
+    try:
+        limit = int(request.GET.get('limit', 12))
+        page_items, next_cursor = history_page(analyses, request.GET.get('cursor'), limit)
+    except (InvalidCursor, ValueError):
+        return JsonResponse({
+            'success': False,
+            'error': 'Parámetros de paginación inválidos'
+        }, status=400)
+    
+    return JsonResponse({
+        'success': True,
+        'results': [serialize_history_item(analysis) for analysis in page_items],
+        'next_cursor': next_cursor,
+        'rank_truncated': rank_truncated(analyses, request.GET.get('search')),
+    })
+
+
+@require_http_methods(["GET"])
+@login_required
+def api_analysis_status(request, pk):
+    """
+    API ligera para consultar el estado del procesamiento de un análisis.
+    """
+    analysis = get_object_or_404(
+        EmotionAnalysis.objects.only('id', 'user_id', 'faces_detected', 'dominant_emotion'),
+        pk=pk, user=request.user
+    )
+    job = AnalysisJob.objects.filter(analysis_id=analysis.pk).first()
+    
+    # Análisis sin trabajo asociado: se procesó dentro de la petición
+    if job is None:
+        return JsonResponse({
+            'success': True,
+            'status': AnalysisJob.Status.DONE,
+            'finished': True,
+            'faces_detected': analysis.faces_detected,
+        })
+    
+    return JsonResponse({
+        'success': True,
+        'status': job.status,
+        'status_display': job.get_status_display(),
+        'finished': job.is_finished,
+        'attempts': job.attempts,
+        'max_attempts': job.max_attempts,
+        'error': job.error,
+        'queue_time': job.queue_time,
+        'run_time': job.run_time,
+        'faces_detected': analysis.faces_detected,
+        'dominant_emotion': analysis.dominant_emotion,
+    })
+
 @login_required
 def analysis_list(request):
     """
     Lista de análisis de emociones del usuario.
     """
-    analyses = EmotionAnalysis.objects.filter(user=request.user)
-    
-    # Filtros
     emotion_filter = request.GET.get('emotion')
     date_filter = request.GET.get('date')
-    
-    if emotion_filter and emotion_filter != 'all':
-        analyses = analyses.filter(dominant_emotion=emotion_filter)
-    
-    if date_filter:
-        from django.utils import timezone
-        from datetime import timedelta
-        
-        if date_filter == 'today':
-            analyses = analyses.filter(created_at__date=timezone.now().date())
-        elif date_filter == 'week':
-            week_ago = timezone.now() - timedelta(days=7)
-            analyses = analyses.filter(created_at__gte=week_ago)
-        elif date_filter == 'month':
-            month_ago = timezone.now() - timedelta(days=30)
-            analyses = analyses.filter(created_at__gte=month_ago)
-    
-    # Búsqueda
     search_query = request.GET.get('search')
-    if search_query:
-        analyses = analyses.filter(
-            Q(notes__icontains=search_query) |
-            Q(dominant_emotion__icontains=search_query)
-        )
+    analyses = filter_history(request.user, emotion_filter, date_filter, search_query)
     
-    # Paginación
-    paginator = Paginator(analyses, 12)  # 12 análisis por página
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Paginación por cursor: sin COUNT(*) ni OFFSET
+    try:
+        page_items, next_cursor = history_page(analyses, request.GET.get('cursor'))
+    except InvalidCursor:
+        page_items, next_cursor = history_page(analyses)
     
     # Opciones para filtros
     emotion_options = [
@@ -200,16 +273,124 @@ def analysis_list(request):
     ]
     
     context = {
-        'page_obj': page_obj,
+        'analyses': page_items,
+        'next_cursor': next_cursor,
+        'is_continuation': bool(request.GET.get('cursor')),
         'emotion_options': emotion_options,
         'current_emotion': emotion_filter or 'all',
         'current_date': date_filter or 'all',
         'search_query': search_query or '',
+        'rank_truncated': rank_truncated(analyses, search_query),
+        'rank_window': RANK_WINDOW,
     }
     
     return render(request, 'emotions/list.html', context)
 
 
+def run_quick_analysis(image):
+    """
+    Ejecuta el análisis rápido de una imagen subida sin guardarla en la base de datos.
+    Compartido por la vista síncrona y la variante ASGI (que lo ejecuta en el executor).
+    
+    Args:
+        image: Archivo subido (UploadedFile)
+        
+    Returns:
+        Diccionario normalizado para el frontend
+    """
+    # Crear archivo temporal
+    import tempfile
+    with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as temp_file:
+        for chunk in image.chunks():
+            temp_file.write(chunk)
+        temp_path = temp_file.name
+    
+    try:
+        # Realizar análisis (sin guardar rostros en análisis rápido)
+        start_time = time.time()
+        results = emotion_detector.analyze_image(temp_path, save_faces=False)
+        processing_time = time.time() - start_time
+    finally:
+        # Limpiar archivo temporal
+        os.unlink(temp_path)
+    
+    # Calcular confianza promedio
+    faces_list = results.get('faces_analysis', [])
+    avg_confidence = 0
+    if faces_list:
+        avg_confidence = sum(f.get('confidence', 0) for f in faces_list) / len(faces_list)
+    
+    # Normalizar formato de cada rostro para el frontend
+    normalized_faces = []
+    for face in faces_list:
+        normalized_face = {
+            'face_id': face.get('face_id'),
+            'coordinates': face.get('coordinates'),
+            'dominant_emotion': face.get('dominant_emotion'),
+            'confidence': face.get('confidence'),
+            'emotions': face.get('all_emotions', {})  # Cambiar all_emotions a emotions
+        }
+        normalized_faces.append(normalized_face)
+    
+    # Normalizar respuesta para el frontend
+    return {
+        'faces_detected': results.get('faces_detected', 0),
+        'faces': normalized_faces,  # Usar lista normalizada
+        'processing_time': processing_time,
+        'average_confidence': avg_confidence
+    }
+
+
+def analyze_base64_timed(image_data, use_cache=True):
+    """
+    Analiza una imagen base64 y agrega el tiempo de procesamiento a los resultados.
+    Compartido por api_analyze_base64 y su variante ASGI.
+    Los frames en tiempo real no usan el caché de resultados (nunca se repiten).
+    """
+    start_time = time.time()
+    results = emotion_detector.analyze_image_from_base64(image_data, use_cache=use_cache)
+    processing_time = time.time() - start_time
+    
+    # Agregar tiempo de procesamiento
+    results['processing_time'] = processing_time
+    return results
+
+
+def analyze_crops_timed(owner, token, crops):
+    """
+    Analiza los recortes de rostros de un frame en modo de recortes (sin YuNet).
+    Compartido por api_analyze_base64 y su variante ASGI.
+    
+    Raises:
+        CropRejected: Si el token no está vigente o los recortes no son válidos
+    """
+    start_time = time.time()
+    session = crop_sessions.get(owner, token)
+    face_imgs = crop_sessions.face_images(session, crops)
+    results = emotion_detector.analyze_known_faces(face_imgs, session.faces)
+    results['mode'] = 'crops'
+    results['processing_time'] = time.time() - start_time
+    return results
+
+
+def realtime_payload(owner, results):
+    """
+    Respuesta a un frame completo de tiempo real: si tiene rostros, ofrece al cliente
+    enviar solo sus recortes en los frames siguientes, y le indica con qué tamaño y
+    calidad capturar (ver services/capture_profile.py).
+    """
+    payload = {'success': True, 'analysis': results}
+    if results.get('error'):
+        payload['capture'] = capture_advisor.advise(capture_advisor.level_for(owner))
+        return payload
+    session = crop_sessions.start(owner, results)
+    if session is not None:
+        payload['crop'] = crop_sessions.offer(session)
+    # Tamaño y calidad con que el cliente debe capturar los siguientes frames
+    payload['capture'] = capture_advisor.advise(capture_advisor.observe(owner, results))
+    return payload
+
+
 @login_required
 def quick_analysis(request):
     """
@@ -219,50 +400,8 @@ def quick_analysis(request):
         form = ImageUploadForm(request.POST, request.FILES)
         if form.is_valid():
             try:
-                # Guardar imagen temporalmente
-                image = form.cleaned_data['image']
-                
-                # Crear archivo temporal
-                import tempfile
-                import time
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as temp_file:
-                    for chunk in image.chunks():
-                        temp_file.write(chunk)
-                    temp_path = temp_file.name
-                
-                # Realizar análisis (sin guardar rostros en análisis rápido)
-                start_time = time.time()
-                results = emotion_detector.analyze_image(temp_path, save_faces=False)
-                processing_time = time.time() - start_time
-                
-                # Limpiar archivo temporal
-                os.unlink(temp_path)
-                
-                # Calcular confianza promedio
-                faces_list = results.get('faces_analysis', [])
-                avg_confidence = 0
-                if faces_list:
-                    avg_confidence = sum(f.get('confidence', 0) for f in faces_list) / len(faces_list)
-                
-                # Normalizar formato de cada rostro para el frontend
-                normalized_faces = []
-                for face in faces_list:
-                    normalized_face = {
-                        'face_id': face.get('face_id'),
-                        'coordinates': face.get('coordinates'),
-                        'dominant_emotion': face.get('dominant_emotion'),
-                        'confidence': face.get('confidence'),
-                        'emotions': face.get('all_emotions', {})  # Cambiar all_emotions a emotions
-                    }
-                    normalized_faces.append(normalized_face)
-                
-                # Normalizar respuesta para el frontend
-                response_data = {
-                    'faces_detected': results.get('faces_detected', 0),
-                    'faces': normalized_faces,  # Usar lista normalizada
-                    'processing_time': processing_time,
-                    'average_confidence': avg_confidence
-                }
+                with inference_admission.slot(PRIORITY_INTERACTIVE):
+                    response_data = run_quick_analysis(form.cleaned_data['image'])
                 
                 # Devolver JSON response
                 return JsonResponse({
@@ -270,6 +409,8 @@ def quick_analysis(request):
                     'analysis': response_data
                 })
                 
+            except AdmissionRejected as e:
+                return overload_response(e)
             except Exception as e:
                 return JsonResponse({
                     'success': False,
@@ -316,7 +457,11 @@ def camera_analysis(request):
                 })
             
             # Realizar análisis
-            results = emotion_detector.analyze_image_from_base64(image_data)
+            try:
+                with inference_admission.slot(PRIORITY_INTERACTIVE):
+                    results = emotion_detector.analyze_image_from_base64(image_data)
+            except AdmissionRejected as e:
+                return overload_response(e)
             
             if save_analysis and not results.get('error'):
                 # Guardar en base de datos
@@ -345,9 +490,9 @@ def camera_analysis(request):
                     analysis.image.save(filename, image_file, save=False)
                     analysis.save()
                     
-                    # Actualizar estadísticas
-                    stats, created = EmotionStatistics.objects.get_or_create(user=request.user)
-                    stats.update_statistics()
+                    # Guardar los rostros en la tabla normalizada y sumar el análisis a las estadísticas
+                    FaceDetection.replace_for_analysis(analysis)
+                    EmotionStatistics.record_analysis(analysis)
                     
                     return JsonResponse({
                         'success': True,
@@ -385,6 +530,22 @@ def camera_analysis(request):
     return render(request, 'emotions/camera.html', context)
 
 
+@require_http_methods(["GET"])
+@login_required
+def api_realtime_config(request):
+    """
+    Tamaño máximo y calidad JPEG con que el navegador debe capturar sus frames de
+    tiempo real (?client_id=<pestaña>). Se actualiza en cada respuesta a un frame completo.
+    """
+    owner = client_key(request, request.GET.get('client_id'))
+    return JsonResponse({
+        'success': True,
+        'capture': capture_advisor.advise(capture_advisor.level_for(owner)),
+        'crop_mode': crop_sessions.enabled,
+        'keyframe_interval': crop_sessions.keyframe_interval,
+    })
+
+
 @csrf_exempt
 @require_http_methods(["POST"])
 @login_required
@@ -396,25 +557,45 @@ def api_analyze_base64(request):
         data = json.loads(request.body)
         image_data = data.get('image_data')
         
+        if data.get('crop_token'):
+            # Solo los recortes de los rostros del último frame completo (sin YuNet)
+            owner = client_key(request, data.get('client_id'))
+            with realtime_coalescer.turn(owner):
+                with inference_admission.slot(PRIORITY_REALTIME, timeout=realtime_coalescer.max_staleness):
+                    results = analyze_crops_timed(owner, data['crop_token'], data.get('crops') or [])
+            session_recorder.record(request.user.pk, owner, results)
+            return JsonResponse({'success': True, 'analysis': results})
+        
         if not image_data:
             return JsonResponse({
                 'success': False,
                 'error': 'No se proporcionaron datos de imagen'
             })
         
-        # Realizar análisis
-        start_time = time.time()
-        results = emotion_detector.analyze_image_from_base64(image_data)
-        processing_time = time.time() - start_time
+        if data.get('realtime'):
+            # Tiempo real: solo se analiza el frame más reciente de cada cliente
+            owner = client_key(request, data.get('client_id'))
+            with realtime_coalescer.turn(owner):
+                with inference_admission.slot(PRIORITY_REALTIME, timeout=realtime_coalescer.max_staleness):
+                    results = analyze_base64_timed(image_data, use_cache=False)
+            # Se acumula en memoria y se guarda por lotes (ver services/session_recorder.py)
+            session_recorder.record(request.user.pk, owner, results)
+            return JsonResponse(realtime_payload(owner, results))
         
-        # Agregar tiempo de procesamiento
-        results['processing_time'] = processing_time
+        with inference_admission.slot(PRIORITY_INTERACTIVE):
+            results = analyze_base64_timed(image_data)
         
         return JsonResponse({
             'success': True,
             'analysis': results  # Cambiar de 'results' a 'analysis'
         })
         
+    except CropRejected as e:
+        return keyframe_required_response(e)
+    except FrameSuperseded as e:
+        return superseded_response(e)
+    except AdmissionRejected as e:
+        return overload_response(e)
     except Exception as e:
         import traceback
         print(f"Error en api_analyze_base64: {str(e)}")
@@ -425,6 +606,87 @@ def api_analyze_base64(request):
         }, status=500)
 
 
+def _batch_images(request):
+    """
+    Imágenes de la petición de análisis por lotes: partes multipart (un ZIP subido como
+    parte se expande) o un cuerpo application/zip.
+    
+    Returns:
+        Lista de (nombre, contenido)
+    
+    Raises:
+        BatchTooLarge: Si se superan los límites del lote
+        ValueError: Si la petición no contiene imágenes válidas
+    """
+    if request.content_type in ('application/zip', 'application/x-zip-compressed'):
+        if int(request.META.get('CONTENT_LENGTH') or 0) > MAX_BYTES:
+            raise BatchTooLarge(f'El lote supera {MAX_BYTES // (1024 * 1024)} MB')
+        # Se lee del stream: request.body aplicaría DATA_UPLOAD_MAX_MEMORY_SIZE
+        data = request.read(MAX_BYTES + 1)
+        check_limits(0, len(data))
+        return read_zip(BytesIO(data))
+    
+    uploads = [upload for key in request.FILES for upload in request.FILES.getlist(key)]
+    images = []
+    for upload in uploads:
+        if upload.name.lower().endswith('.zip'):
+            images.extend(read_zip(upload))
+        else:
+            images.append((upload.name, upload.read()))
+        check_limits(len(images), sum(len(data) for _, data in images))
+    
+    if not images:
+        raise ValueError('No se proporcionaron imágenes')
+    return images
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+@login_required
+def api_analyze_batch(request):
+    """
+    API para analizar varias imágenes en una petición (multipart o ZIP).
+    
+    Responde en streaming con NDJSON: una línea por imagen en cuanto termina su análisis
+    (con su 'index' en el lote) y una línea final con el resumen ('done': true).
+    """
+    try:
+        images = _batch_images(request)
+    except BatchTooLarge as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=413)
+    except ValueError as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=400)
+    
+    # El primer turno de admisión se obtiene antes de responder (para poder devolver 503)
+    # y se libera cuando la respuesta termina o el cliente se desconecta; las demás
+    # imágenes en paralelo piden su propio turno (iter_batch_results)
+    try:
+        inference_admission.acquire(PRIORITY_BULK)
+    except AdmissionRejected as e:
+        return overload_response(e)
+    
+    start = time.monotonic()
+    
+    def release():
+        inference_admission.release(time.monotonic() - start)
+    
+    if isinstance(request, ASGIRequest):
+        lines = AsyncClosingIterator(iter_ndjson(images, inference_admission), release)
+    else:
+        lines = ClosingIterator(iter_ndjson(images, inference_admission), release)
+    
+    response = StreamingHttpResponse(lines, content_type='application/x-ndjson; charset=utf-8')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Enviar cada resultado en cuanto está listo
+    return response
+
+
 @login_required
 def delete_analysis(request, pk):
     """
@@ -456,31 +718,38 @@ def user_statistics(request):
     Vista de estadísticas detalladas del usuario.
     """
     stats, created = EmotionStatistics.objects.get_or_create(user=request.user)
-    if created or stats.total_analyses == 0:
-        stats.update_statistics()
     
-    # Obtener análisis para gráficos adicionales
-    analyses = EmotionAnalysis.objects.filter(user=request.user).order_by('-created_at')
-    
-    # Datos para gráfico de tendencias (últimos 30 días)
+    # Resumen diario (una consulta indexada por usuario y fecha, sin importar el historial)
     from django.utils import timezone
     from datetime import timedelta
     from collections import defaultdict
     
-    thirty_days_ago = timezone.now() - timedelta(days=30)
-    recent_analyses = analyses.filter(created_at__gte=thirty_days_ago)
+    today = timezone.localdate()
+    thirty_days_ago = today - timedelta(days=29)
+    month_start = today.replace(day=1)
+    rollups = DailyEmotionRollup.objects.filter(
+        user=request.user,
+        date__gte=min(thirty_days_ago, month_start),
+        analyses__gt=0
+    ).values_list('date', 'emotion', 'analyses')
     
-    # Agrupar por día
+    # Agrupar por día y calcular los contadores de período
     daily_emotions = defaultdict(lambda: defaultdict(int))
-    for analysis in recent_analyses:
-        date_str = analysis.created_at.strftime('%Y-%m-%d')
-        if analysis.dominant_emotion:
-            emotion_translated = analysis.get_emotion_translation(analysis.dominant_emotion)
-            daily_emotions[date_str][emotion_translated] += 1
+    last_7_days = last_30_days = this_month = 0
+    for date, emotion, count in rollups:
+        if date > today - timedelta(days=7):
+            last_7_days += count
+        if date >= thirty_days_ago:
+            last_30_days += count
+            if emotion:
+                emotion_translated = emotion_detector.get_emotion_translation(emotion)
+                daily_emotions[date.strftime('%Y-%m-%d')][emotion_translated] += count
+        if date >= month_start:
+            this_month += count
     
     # Preparar datos para Chart.js
     chart_data = {
-        'labels': list(daily_emotions.keys())[-14:],  # Últimos 14 días
+        'labels': sorted(daily_emotions.keys())[-14:],  # Últimos 14 días con datos
         'datasets': []
     }
     
@@ -545,18 +814,15 @@ def user_statistics(request):
                 'percentage': emotion_dist.get(emotion_es, 0)
             }
     
-    # Calcular estadísticas de tiempo
-    seven_days_ago = timezone.now() - timedelta(days=7)
-    
     context = {
         'stats': stats,
-        'total_analyses': analyses.count(),
+        'total_analyses': stats.total_analyses,
         'emotion_distribution': emotion_distribution_formatted,
         'emotion_distribution_json': json.dumps(emotion_dist),
         'chart_data': json.dumps(chart_data),
-        'last_7_days': analyses.filter(created_at__gte=seven_days_ago).count(),
-        'last_30_days': recent_analyses.count(),
-        'this_month': analyses.filter(created_at__month=timezone.now().month, created_at__year=timezone.now().year).count(),
+        'last_7_days': last_7_days,
+        'last_30_days': last_30_days,
+        'this_month': this_month,
     }
     
     return render(request, 'emotions/statistics.html', context)
@@ -628,9 +894,9 @@ def api_save_camera_analysis(request):
         
         analysis.save()
         
-        # Actualizar estadísticas
-        stats, created = EmotionStatistics.objects.get_or_create(user=request.user)
-        stats.update_statistics()
+        # Guardar los rostros en la tabla normalizada y sumar el análisis a las estadísticas
+        FaceDetection.replace_for_analysis(analysis)
+        EmotionStatistics.record_analysis(analysis)
         
         return JsonResponse({
             'success': True,
@@ -643,4 +909,22 @@ def api_save_camera_analysis(request):
         return JsonResponse({
             'success': False,
             'error': f'Error guardando análisis: {str(e)}'
-        }, status=500)
\ No newline at end of file
+        }, status=500)
+
+
+@require_http_methods(["GET"])
+@login_required
+def api_metrics(request):
+    """
+    API de métricas del proceso (cola de admisión, etc.). Solo para personal staff.
+    """
+    if not request.user.is_staff:
+        return JsonResponse({
+            'success': False,
+            'error': 'No autorizado'
+        }, status=403)
+    
+    return JsonResponse({
+        'success': True,
+        'metrics': metrics.collect()
+    })
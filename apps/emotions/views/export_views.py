@@ -0,0 +1,97 @@
+"""
+Exportación del historial de análisis (CSV / NDJSON) como descarga en streaming.
+"""
+from django.contrib.auth import get_user_model
+from django.contrib.auth.decorators import login_required
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.dateparse import parse_date
+from django.views.decorators.http import require_http_methods
+
+from apps.emotions.models import EMOTION_KEYS
+from apps.emotions.services.export import (
+    CONTENT_TYPES, FORMATS, LEVELS, export_filename, export_queryset, stream_export
+)
+from apps.emotions.utils.streaming import aiter_sync
+
+
+def _error(message, status=400):
+    return JsonResponse({
+        'success': False,
+        'error': message
+    }, status=status)
+
+
+def _export_users(request):
+    """
+    Usuarios incluidos en la exportación. El personal staff puede exportar por grupo
+    (group=<id>), por usuarios (user=<id>, repetible) o todo (all=1).
+    Devuelve None para todos los usuarios.
+    """
+    requested = request.GET.get('group') or request.GET.getlist('user') or request.GET.get('all')
+    if not requested:
+        return [request.user.pk]
+    if not request.user.is_staff:
+        raise PermissionError('No autorizado para exportar datos de otros usuarios')
+
+    if request.GET.get('group'):
+        return get_user_model().objects.filter(groups__id=int(request.GET['group'])).values('pk')
+    if request.GET.getlist('user'):
+        return [int(user_id) for user_id in request.GET.getlist('user')]
+    return None
+
+
+@require_http_methods(["GET"])
+@login_required
+def export_analyses(request):
+    """
+    Descarga el historial en streaming.
+
+    Parámetros: format (csv|ndjson), level (analyses|faces), date_from y date_to
+    (AAAA-MM-DD), emotion, gzip=1 y, para staff, group / user / all.
+    """
+    fmt = request.GET.get('format', 'csv')
+    level = request.GET.get('level', 'analyses')
+    emotion = request.GET.get('emotion') or None
+    compress = request.GET.get('gzip') in ('1', 'true')
+
+    if fmt not in FORMATS:
+        return _error(f'Formato no soportado: {fmt}')
+    if level not in LEVELS:
+        return _error(f'Nivel no soportado: {level}')
+    if emotion == 'all':
+        emotion = None
+    if emotion and emotion not in EMOTION_KEYS:
+        return _error(f'Emoción desconocida: {emotion}')
+
+    dates = {}
+    for name in ('date_from', 'date_to'):
+        value = request.GET.get(name)
+        try:
+            dates[name] = parse_date(value) if value else None
+        except ValueError:
+            dates[name] = None
+        if value and dates[name] is None:
+            return _error(f'Fecha inválida en {name}: use AAAA-MM-DD')
+
+    try:
+        users = _export_users(request)
+    except PermissionError as e:
+        return _error(str(e), status=403)
+    except ValueError:
+        return _error('Identificador de usuario o grupo inválido')
+
+    header, rows = export_queryset(level, users=users, emotion=emotion, **dates)
+    blocks = stream_export(header, rows, fmt, compress=compress)
+    if isinstance(request, ASGIRequest):
+        # El cursor del servidor pertenece a la conexión del hilo que lo abrió
+        blocks = aiter_sync(blocks)
+
+    response = StreamingHttpResponse(
+        blocks,
+        content_type='application/gzip' if compress else CONTENT_TYPES[fmt]
+    )
+    response['Content-Disposition'] = f'attachment; filename="{export_filename(level, fmt, compress)}"'
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Enviar los bloques a medida que se generan
+    return response
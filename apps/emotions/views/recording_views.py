@@ -0,0 +1,43 @@
+"""
+Vistas de las sesiones de análisis en tiempo real grabadas automáticamente.
+"""
+import json
+
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.shortcuts import get_object_or_404, render
+
+from apps.emotions.models import RealtimeRecording
+from apps.emotions.views.video_views import timeline_chart_data
+
+
+@login_required
+def recording_list(request):
+    """
+    Lista de las sesiones en tiempo real del usuario.
+    """
+    recordings = RealtimeRecording.objects.filter(user=request.user).defer('emotion_totals')[:50]
+    context = {
+        'recordings': recordings,
+        'flush_interval': getattr(settings, 'EMOTION_RECORDING_FLUSH_INTERVAL', 30),
+    }
+    return render(request, 'emotions/recording_list.html', context)
+
+
+@login_required
+def recording_detail(request, pk):
+    """
+    Detalle de una sesión en tiempo real con su línea de tiempo de emociones.
+    """
+    recording = get_object_or_404(RealtimeRecording, pk=pk, user=request.user)
+    # Se une una sola vez (la propiedad consulta los tramos en cada acceso)
+    timeline = recording.timeline
+
+    context = {
+        'recording': recording,
+        'has_timeline': bool(timeline),
+        'emotion_distribution': recording.get_emotion_distribution(),
+        'chart_data': json.dumps(timeline_chart_data(timeline)),
+        'flush_interval': getattr(settings, 'EMOTION_RECORDING_FLUSH_INTERVAL', 30),
+    }
+    return render(request, 'emotions/recording_detail.html', context)
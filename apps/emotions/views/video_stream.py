@@ -5,28 +5,71 @@ import cv2
 import json
 import threading
 import time
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
 from django.http import StreamingHttpResponse, JsonResponse
 from django.shortcuts import render
+from django.urls import reverse
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
+from apps.emotions.services.adaptive_stream import (
+    AdaptiveRate, adaptive_frames, adaptive_frames_async, load_tiers
+)
+from apps.emotions.services.admission import PRIORITY_REALTIME, inference_admission
+from apps.emotions.services.camera_registry import (
+    DEFAULT_CAMERA, CameraNotFound, CameraRegistry, CameraUnavailable
+)
+from apps.emotions.services.capture_sources import create_source
+from apps.emotions.services.detection_scheduler import DetectionScheduler
+from apps.emotions.services import metrics
 from apps.emotions.services.emotion_detector import emotion_detector
+from apps.emotions.services.frame_coalescer import client_key
+from apps.emotions.models import RealtimeRecording
+from apps.emotions.services.realtime_sessions import RealtimeSessionRegistry, SessionLimitReached
+from apps.emotions.services.session_recorder import session_recorder
+from apps.emotions.services.result_broadcaster import ResultBroadcaster, format_sse
+
+
+# Intervalo de comentarios keep-alive en el stream SSE (segundos)
+SSE_HEARTBEAT_INTERVAL = 15
 
 
 class VideoCamera:
     """
     Clase para manejar la cámara y el streaming de video con manejo thread-safe.
+    
+    Cada cámara del registro tiene su propio pipeline: los frames provienen de una
+    fuente de captura (services/capture_sources.py) que decodifica en su propio hilo,
+    la detección la ejecutan los hilos compartidos del planificador cuando le toca
+    turno, y cada frame se codifica a JPEG una sola vez por nivel del stream
+    (resolución y calidad) para todos los clientes de ese nivel.
     """
-    def __init__(self, camera_id=0):
+    def __init__(self, camera_id=None, key=DEFAULT_CAMERA):
+        if camera_id is None:
+            camera_id = getattr(settings, 'EMOTION_CAMERA_SOURCE', 0)
+        self.key = key
         self.camera_id = camera_id
-        self.video = None
+        self.source = None
         self.lock = threading.Lock()
-        self.last_frame = None
-        self.last_frame_time = 0
-        self.frame_skip_threshold = 0.033  # ~30 FPS
         
-        # Variables para detección
+        # Canal de resultados de esta cámara (SSE)
+        self.results = ResultBroadcaster()
+        
+        # Frame con los resultados dibujados y último JPEG de cada nivel, compartidos
+        # por todos los clientes MJPEG
+        self.tiers = load_tiers()
+        self.encode_lock = threading.Lock()
+        self.drawn_seq = 0
+        self.drawn_frame = None
+        self.tier_locks = [threading.Lock() for _ in self.tiers]
+        self.encoded = [(0, None)] * len(self.tiers)
+        self.encodes = [0] * len(self.tiers)
+        
+        # Variables para detección (activa mientras alguna sesión la pida)
         self.detect_emotions = False
+        self.detection_sessions = 0
+        self.demand_lock = threading.Lock()
         self.last_detection_time = 0
         self.detection_interval = 0.5  # Detectar cada 0.5 segundos
         self.current_results = {}
@@ -37,65 +80,36 @@ class VideoCamera:
         
     def init_camera(self, camera_id=0):
         """
-        Inicializa la cámara con el ID especificado con mejoras para evitar errores.
+        Abre la fuente de captura indicada y espera su primer frame.
+        
+        Args:
+            camera_id: Índice de dispositivo, ruta de archivo, URL de stream o 'synthetic'
         """
         with self.lock:
+            # Liberar la fuente anterior (su hilo la cierra antes de abrir la nueva)
+            if self.source is not None:
+                self.source.stop()
+                self.source = None
+            
+            self.camera_id = camera_id
+            self.is_initialized = False
+            
             try:
-                # Liberar cámara anterior completamente
-                if self.video is not None:
-                    self.video.release()
-                    time.sleep(0.5)  # Dar tiempo para liberar recursos
-                    self.video = None
-                
-                # Configurar nuevo ID
-                self.camera_id = camera_id
-                
-                # Inicializar nueva cámara con backend específico de Windows
-                if camera_id == '' or camera_id is None:
-                    camera_id = 0
-                else:
-                    try:
-                        camera_id = int(camera_id)
-                    except:
-                        camera_id = 0
-                
-                # Usar backend DSHOW (DirectShow) en Windows para mejor rendimiento
-                self.video = cv2.VideoCapture(camera_id, cv2.CAP_DSHOW)
-                
-                if not self.video.isOpened():
-                    print(f"Error: No se pudo abrir la cámara {camera_id}")
-                    self.is_initialized = False
-                    return False
-                
-                # Configurar propiedades de la cámara
-                self.video.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-                self.video.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-                self.video.set(cv2.CAP_PROP_FPS, 30)
-                self.video.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # Buffer mínimo para reducir lag
-                
-                # Verificar que se inicializó correctamente
-                ret, frame = self.video.read()
-                if not ret or frame is None:
-                    print(f"Error: No se pudo leer de la cámara {camera_id}")
-                    self.video.release()
-                    self.video = None
-                    self.is_initialized = False
-                    return False
-                
-                self.last_frame = frame
-                self.last_frame_time = time.time()
-                self.is_initialized = True
-                
-                print(f"✓ Cámara {camera_id} inicializada correctamente")
-                return True
-                
-            except Exception as e:
-                print(f"✗ Error inicializando cámara {camera_id}: {e}")
-                if self.video is not None:
-                    self.video.release()
-                    self.video = None
-                self.is_initialized = False
+                source = create_source(camera_id if camera_id not in ('', None) else 0)
+            except ValueError as e:
+                print(f"✗ Fuente de captura inválida {camera_id}: {e}")
+                return False
+            
+            source.start()
+            if not source.wait_ready(getattr(settings, 'EMOTION_CAPTURE_OPEN_TIMEOUT', 5.0)):
+                print(f"Error: No se pudo leer de la fuente {source}")
+                source.stop()
                 return False
+            
+            self.source = source
+            self.is_initialized = True
+            print(f"✓ Fuente {source} inicializada correctamente")
+            return True
     
     def change_camera(self, camera_id):
         """
@@ -103,15 +117,14 @@ class VideoCamera:
         """
         # Detener detección antes de cambiar
         self.detect_emotions = False
-        time.sleep(0.1)
         
         # Inicializar nueva cámara
         success = self.init_camera(camera_id)
         
         if success:
-            print(f"✓ Cámara cambiada exitosamente a ID {camera_id}")
+            print(f"✓ Cámara cambiada exitosamente a {camera_id}")
         else:
-            print(f"✗ Fallo al cambiar a cámara ID {camera_id}")
+            print(f"✗ Fallo al cambiar a cámara {camera_id}")
         
         return success
         
@@ -122,101 +135,141 @@ class VideoCamera:
     def cleanup(self):
         """Limpia y libera recursos de la cámara."""
         with self.lock:
-            if self.video is not None:
+            if self.source is not None:
                 try:
-                    self.video.release()
+                    self.source.stop()
                     print("✓ Cámara liberada correctamente")
                 except Exception as e:
                     print(f"Error liberando cámara: {e}")
                 finally:
-                    self.video = None
+                    self.source = None
                     self.is_initialized = False
     
-    def get_frame(self):
+    def next_frame(self, after_seq=0, timeout=1.0, tier=0):
         """
-        Obtener frame de la cámara con control de flujo mejorado.
+        Espera un frame más reciente que after_seq y lo devuelve codificado en JPEG en
+        el nivel indicado (con los resultados de la detección dibujados si está activa).
+        
+        Returns:
+            (secuencia, bytes JPEG); los bytes son None si no llegó un frame nuevo a tiempo
         """
-        with self.lock:
-            if not self.is_initialized or self.video is None or not self.video.isOpened():
-                # Retornar último frame válido si existe
-                if self.last_frame is not None:
-                    return self._encode_frame(self.last_frame)
-                return None
-            
+        source = self.source
+        if source is None:
+            time.sleep(min(timeout, 0.1))
+            return after_seq, None
+        
+        seq, frame, _ = source.wait_frame(after_seq, timeout)
+        if frame is None:
+            return seq, None
+        
+        tier = min(max(0, tier), len(self.tiers) - 1)
+        # El primer cliente del nivel que ve un frame nuevo lo codifica; el resto lo reutiliza
+        with self.tier_locks[tier]:
+            encoded_seq, jpeg = self.encoded[tier]
+            if encoded_seq >= seq:
+                return encoded_seq, jpeg
             try:
-                # Limitar frecuencia de captura para evitar sobrecarga
-                current_time = time.time()
-                time_since_last_frame = current_time - self.last_frame_time
-                
-                if time_since_last_frame < self.frame_skip_threshold:
-                    # Reusar último frame para mantener FPS suave
-                    if self.last_frame is not None:
-                        return self._encode_frame(self.last_frame)
-                    return None
-                
-                # Leer frame con timeout implícito
-                success = False
-                frame = None
-                
-                # Intentar leer frame hasta 3 veces
-                for attempt in range(3):
-                    success, frame = self.video.read()
-                    if success and frame is not None:
-                        break
-                    time.sleep(0.01)  # Pequeña pausa entre intentos
-                
-                if not success or frame is None:
-                    # Reusar último frame válido
-                    if self.last_frame is not None:
-                        return self._encode_frame(self.last_frame)
-                    return None
-                
-                # Actualizar último frame y tiempo
-                self.last_frame = frame.copy()
-                self.last_frame_time = current_time
-                
-                # Aplicar detección de emociones si está habilitada
-                if self.detect_emotions:
-                    frame = self._apply_detection(frame)
-                
-                return self._encode_frame(frame)
-                
+                jpeg = self._encode_frame(self._display_frame(seq, frame), self.tiers[tier])
             except Exception as e:
                 print(f"Error capturando frame: {e}")
-                # Retornar último frame válido en caso de error
-                if self.last_frame is not None:
-                    return self._encode_frame(self.last_frame)
-                return None
+                jpeg = None
+            self.encoded[tier] = (seq, jpeg)
+            self.encodes[tier] += 1
+            return seq, jpeg
+    
+    def _display_frame(self, seq, frame):
+        """
+        Frame con los resultados dibujados, una sola vez por frame para todos los niveles.
+        """
+        if not self.detect_emotions:
+            return frame
+        with self.encode_lock:
+            if self.drawn_seq != seq:
+                self.drawn_frame = self._draw_results_on_frame(frame)
+                self.drawn_seq = seq
+            return self.drawn_frame
+    
+    def get_frame(self):
+        """
+        Último frame disponible codificado en JPEG (sin esperar uno nuevo).
+        """
+        source = self.source
+        if source is None:
+            return None
+        seq, _, _ = source.latest()
+        return self.next_frame(seq - 1, timeout=0)[1] if seq else None
+    
+    def detection_due(self, now):
+        """
+        Instante desde el que le corresponde una detección a esta cámara, o None si
+        no la necesita (usado por el planificador de detección).
+        """
+        if not self.detect_emotions or self.source is None:
+            return None
+        return self.last_detection_time + self.detection_interval
     
-    def _apply_detection(self, frame):
+    def run_detection(self):
         """
-        Aplica detección de emociones al frame.
+        Analiza el frame más reciente y publica el resultado (lo llama un hilo del
+        planificador cuando le toca turno a esta cámara).
         """
         current_time = time.time()
+        # El turno se consume aunque se omita: la cámara vuelve al final de la rotación
+        self.last_detection_time = current_time
         
-        # Solo detectar cada cierto intervalo para optimizar performance
-        if current_time - self.last_detection_time > self.detection_interval:
-            try:
-                # Realizar detección en una copia del frame
-                frame_copy = frame.copy()
-                results = emotion_detector.analyze_frame(frame_copy)
-                self.current_results = results
-                self.last_detection_time = current_time
-            except Exception as e:
-                print(f"Error en detección: {e}")
-                self.current_results = {}
+        source = self.source
+        if source is None:
+            return
+        
+        # Si el detector está saturado se omite este ciclo y se dibuja el último resultado
+        if not inference_admission.try_acquire(PRIORITY_REALTIME):
+            return
+        
+        try:
+            _, frame, _ = source.latest()
+            if frame is None:
+                return
+            # Realizar detección en una copia del frame (el original es compartido)
+            results = emotion_detector.analyze_frame(frame.copy())
+        except Exception as e:
+            print(f"Error en detección: {e}")
+            results = {}
+        finally:
+            inference_admission.release(time.time() - current_time)
+        
+        with self.lock:
+            if not self.detect_emotions:
+                return
+            self.current_results = results
+        
+        # Publicar el nuevo resultado a los suscriptores SSE
+        self.results.publish({
+            'results': results,
+            'detection_enabled': True
+        })
         
-        # Dibujar resultados en el frame
-        return self._draw_results_on_frame(frame)
+        # Grabar el resultado en la sesión de cada usuario que tiene la detección activa
+        for session in realtime_sessions.detecting(self):
+            session_recorder.record(
+                session.user_id, session.owner, results,
+                source=RealtimeRecording.Source.SERVER, camera=self.key
+            )
     
-    def _encode_frame(self, frame):
+    def _encode_frame(self, frame, tier):
         """
-        Codifica el frame a JPEG bytes.
+        Codifica el frame a JPEG bytes con la resolución y calidad del nivel. Sin
+        IMWRITE_JPEG_OPTIMIZE: ahorra poco tamaño y hace la codificación bastante más lenta.
         """
         try:
+            height, width = frame.shape[:2]
+            if width > tier.max_width:
+                scale = tier.max_width / width
+                frame = cv2.resize(
+                    frame, (tier.max_width, max(1, int(height * scale))),
+                    interpolation=cv2.INTER_AREA
+                )
             ret, buffer = cv2.imencode('.jpg', frame, [
-                cv2.IMWRITE_JPEG_QUALITY, 80,
-                cv2.IMWRITE_JPEG_OPTIMIZE, 1
+                cv2.IMWRITE_JPEG_QUALITY, tier.quality
             ])
             if not ret or buffer is None:
                 return None
@@ -305,10 +358,32 @@ class VideoCamera:
         Activar/desactivar detección de emociones.
         """
         with self.lock:
+            if enable and not self.detect_emotions:
+                # Le toca detección de inmediato (sin contar el tiempo que estuvo apagada)
+                self.last_detection_time = time.time() - self.detection_interval
             self.detect_emotions = enable
             if not enable:
                 self.current_results = {}
                 print(f"✓ Detección {'activada' if enable else 'desactivada'}")
+        
+        self.results.publish({
+            'results': {},
+            'detection_enabled': enable
+        })
+        
+        # Que un hilo detector atienda a esta cámara sin esperar su sondeo
+        detection_scheduler.wake()
+    
+    def request_detection(self, enable):
+        """
+        Una sesión activa (o desactiva) la detección; la cámara detecta mientras al
+        menos una de sus sesiones la tenga activa.
+        """
+        with self.demand_lock:
+            self.detection_sessions = max(0, self.detection_sessions + (1 if enable else -1))
+            wanted = self.detection_sessions > 0
+            if wanted != self.detect_emotions:
+                self.toggle_detection(wanted)
     
     def get_current_results(self):
         """
@@ -318,80 +393,156 @@ class VideoCamera:
             return self.current_results.copy() if self.current_results else {}
 
 
-# Instancia global de la cámara con lock para thread safety
-camera = None
-camera_lock = threading.Lock()
+# Hilos detectores compartidos por todas las cámaras (turno rotativo)
+detection_scheduler = DetectionScheduler(
+    getattr(settings, 'EMOTION_CAMERA_DETECTION_WORKERS', 2)
+)
 
+# Cámaras abiertas por clave; se cierran cuando se va su última sesión
+cameras = CameraRegistry(
+    lambda key, source: VideoCamera(source, key=key),
+    scheduler=detection_scheduler,
+    idle_timeout=getattr(settings, 'EMOTION_CAMERA_IDLE_TIMEOUT', 10),
+    max_cameras=getattr(settings, 'EMOTION_CAMERA_MAX', 8)
+)
 
-def get_camera():
+# Estado de cada usuario sobre las cámaras (detección, streams abiertos)
+realtime_sessions = RealtimeSessionRegistry(
+    cameras,
+    ttl=getattr(settings, 'EMOTION_REALTIME_SESSION_TTL', 30),
+    max_sessions=getattr(settings, 'EMOTION_REALTIME_MAX_SESSIONS', 200),
+    max_per_user=getattr(settings, 'EMOTION_REALTIME_MAX_SESSIONS_PER_USER', 5)
+)
+
+metrics.register('realtime_sessions', realtime_sessions.snapshot)
+
+
+def get_session(request, data=None):
     """
-    Obtener instancia de la cámara (singleton thread-safe).
+    Sesión del usuario sobre la cámara pedida (la abre si hace falta).
+    
+    Raises:
+        CameraNotFound: Si la clave no corresponde a ninguna cámara
+        CameraUnavailable: Si la cámara no se pudo abrir
     """
-    global camera
-    with camera_lock:
-        if camera is None:
-            camera = VideoCamera()
-        return camera
+    return realtime_sessions.attach(
+        session_owner(request, data), requested_camera_key(request, data), user_id=request.user.pk
+    )
 
 
-def release_camera_instance():
+def release_camera_instance(request, data=None):
     """
-    Liberar instancia global de la cámara.
+    Liberar la sesión del usuario sobre la cámara (la cámara se cierra si era la última).
     """
-    global camera
-    with camera_lock:
-        if camera is not None:
-            camera.cleanup()
-            camera = None
+    return realtime_sessions.release(session_owner(request, data), requested_camera_key(request, data))
 
 
-def generate_frames():
+def requested_camera_key(request, data=None):
     """
-    Generador de frames para streaming con manejo de errores.
+    Clave de la cámara pedida: parámetro ?camera= o campo 'camera' del JSON.
     """
-    camera_instance = get_camera()
-    consecutive_errors = 0
-    max_errors = 10
-    
-    while True:
-        try:
-            frame = camera_instance.get_frame()
-            
-            if frame is None:
-                consecutive_errors += 1
-                if consecutive_errors >= max_errors:
-                    print(f"Demasiados errores consecutivos ({consecutive_errors}), reiniciando cámara...")
-                    camera_instance.init_camera(camera_instance.camera_id)
-                    consecutive_errors = 0
-                time.sleep(0.1)  # Pausa para evitar loop muy rápido
-                continue
-            
-            # Resetear contador de errores en frame exitoso
-            consecutive_errors = 0
-            
+    if data and data.get('camera') not in (None, ''):
+        return str(data['camera'])
+    return request.GET.get('camera') or DEFAULT_CAMERA
+
+
+def session_owner(request, data=None):
+    """
+    Dueño del estado de tiempo real: sesión del navegador + pestaña (client_id del JSON
+    o de ?client_id=). No consulta la base de datos, sirve también en vistas asíncronas.
+    """
+    client_id = (data or {}).get('client_id') or request.GET.get('client_id')
+    return client_key(request, client_id)
+
+
+def camera_error_response(exc):
+    """
+    Respuesta para una cámara inexistente (404), sin lugar para otra sesión (429) o
+    que no se pudo abrir (503).
+    """
+    if isinstance(exc, CameraNotFound):
+        return JsonResponse({
+            'success': False,
+            'error': f'No existe la cámara {exc.args[0]}'
+        }, status=404)
+    if isinstance(exc, SessionLimitReached):
+        return JsonResponse({
+            'success': False,
+            'error': str(exc)
+        }, status=429)
+    return JsonResponse({
+        'success': False,
+        'error': str(exc)
+    }, status=503)
+
+
+def generate_frames(session, rate):
+    """
+    Generador de frames para streaming: envía el frame más reciente de la cámara en el
+    nivel (resolución, calidad y FPS) que el cliente alcanza a recibir. La fuente
+    reconecta por sí misma si se cae; el stream termina si el usuario libera su sesión
+    o la cámara se cierra.
+    """
+    realtime_sessions.open_viewer(session)
+    try:
+        for frame in adaptive_frames(session.camera, rate, lambda: realtime_sessions.touch(session)):
             yield (b'--frame\r\n'
                    b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
-            
-        except GeneratorExit:
-            # El cliente cerró la conexión
-            print("Cliente desconectado del stream")
-            break
-        except Exception as e:
-            print(f"Error en generate_frames: {e}")
-            consecutive_errors += 1
-            time.sleep(0.1)
-            continue
+    except GeneratorExit:
+        # El cliente cerró la conexión
+        print("Cliente desconectado del stream")
+    except Exception as e:
+        print(f"Error en generate_frames: {e}")
+    finally:
+        realtime_sessions.close_viewer(session)
+
+
+async def generate_frames_async(session, rate):
+    """
+    Generador de frames asíncrono (servidor ASGI). Django consume un generador síncrono
+    con sync_to_async(list): el stream infinito nunca se enviaría y acumularía los
+    frames en memoria.
+    """
+    realtime_sessions.open_viewer(session)
+    try:
+        async for frame in adaptive_frames_async(session.camera, rate,
+                                                 lambda: realtime_sessions.touch(session)):
+            yield (b'--frame\r\n'
+                   b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
+    except Exception as e:
+        print(f"Error en generate_frames_async: {e}")
+    finally:
+        realtime_sessions.close_viewer(session)
+
+
+def requested_stream_rate(request, tiers):
+    """
+    Estado adaptativo del cliente; ?tier=<n> fija un nivel (0 = el mejor).
+    """
+    tier = request.GET.get('tier', '')
+    if tier.isdigit():
+        return AdaptiveRate(tiers, tier=int(tier), fixed=True)
+    return AdaptiveRate(tiers)
 
 
 @login_required
 def video_feed(request):
     """
-    Vista para el streaming de video.
+    Vista para el streaming de video de una cámara (?camera=<clave>), con calidad
+    adaptada al cliente (?tier=<n> la fija).
     """
-    return StreamingHttpResponse(
-        generate_frames(),
-        content_type='multipart/x-mixed-replace; boundary=frame'
-    )
+    try:
+        session = get_session(request)
+    except (CameraNotFound, CameraUnavailable) as e:
+        return camera_error_response(e)
+    
+    rate = requested_stream_rate(request, session.camera.tiers)
+    if isinstance(request, ASGIRequest):
+        frames = generate_frames_async(session, rate)
+    else:
+        frames = generate_frames(session, rate)
+    
+    return StreamingHttpResponse(frames, content_type='multipart/x-mixed-replace; boundary=frame')
 
 
 @login_required
@@ -407,21 +558,25 @@ def real_time_analysis(request):
 @login_required
 def toggle_detection(request):
     """
-    API para activar/desactivar detección en tiempo real.
+    API para activar/desactivar detección en tiempo real de una cámara. Solo afecta
+    a la sesión del usuario: la cámara detecta mientras alguna sesión lo pida.
     """
     try:
         data = json.loads(request.body)
-        enable = data.get('enable', False)
+        enable = bool(data.get('enable', False))
         
-        camera = get_camera()
-        camera.toggle_detection(enable)
+        session = get_session(request, data)
+        realtime_sessions.set_detection(session, enable)
         
         return JsonResponse({
             'success': True,
+            'camera': session.camera.key,
             'detection_enabled': enable,
             'message': f"Detección {'activada' if enable else 'desactivada'} correctamente"
         })
         
+    except (CameraNotFound, CameraUnavailable) as e:
+        return camera_error_response(e)
     except Exception as e:
         return JsonResponse({
             'success': False,
@@ -429,23 +584,48 @@ def toggle_detection(request):
         }, status=500)
 
 
+def current_results_payload(owner, key):
+    """
+    Último resultado de la cámara para la sesión del usuario, sin tomar el lock de la
+    cámara ni abrirla. Si la sesión no activó la detección, no recibe resultados
+    aunque otros usuarios la tengan activa.
+    
+    Raises:
+        CameraNotFound: Si la clave no corresponde a ninguna cámara
+    """
+    cameras.resolver(key)
+    session = realtime_sessions.peek(owner, key)
+    detection_enabled = session is not None and session.detection_enabled
+    latest = session.camera.results.latest() if detection_enabled else None
+    if latest is not None:
+        return {
+            'success': True,
+            'camera': session.camera.key,
+            'results': json.loads(latest[1])['results'],
+            'detection_enabled': True,
+            'seq': latest[0]
+        }
+    
+    return {
+        'success': True,
+        'camera': cameras.normalize(key),
+        'results': {},
+        'detection_enabled': detection_enabled,
+        'seq': 0
+    }
+
+
 @csrf_exempt
 @require_http_methods(["GET"])
 @login_required
 def get_current_results(request):
     """
-    API para obtener resultados actuales de detección.
+    API para obtener resultados actuales de detección de una cámara.
     """
     try:
-        camera = get_camera()
-        results = camera.get_current_results()
-        
-        return JsonResponse({
-            'success': True,
-            'results': results,
-            'detection_enabled': camera.detect_emotions
-        })
-        
+        return JsonResponse(current_results_payload(session_owner(request), requested_camera_key(request)))
+    except CameraNotFound as e:
+        return camera_error_response(e)
     except Exception as e:
         return JsonResponse({
             'success': False,
@@ -458,43 +638,43 @@ def get_current_results(request):
 @login_required
 def change_camera(request):
     """
-    API para cambiar la cámara activa de forma segura.
+    API para abrir otra cámara para la sesión del usuario: devuelve la URL de su stream.
+    La sesión sobre la cámara anterior expira sola cuando se cierra su stream.
     """
     try:
         data = json.loads(request.body)
         camera_id = data.get('camera_id', 0)
         
-        # Validar y convertir camera_id
+        # Validar la clave (nombre configurado o índice de dispositivo)
         if camera_id == '' or camera_id is None:
-            camera_id = 0
-        else:
-            try:
-                camera_id = int(camera_id)
-            except (ValueError, TypeError):
-                return JsonResponse({
-                    'success': False,
-                    'error': 'ID de cámara inválido'
-                }, status=400)
-        
-        # Obtener instancia de cámara
-        camera = get_camera()
-        
-        # Cambiar cámara
-        success = camera.change_camera(camera_id)
-        
-        if success:
+            camera_id = DEFAULT_CAMERA
+        key = str(camera_id)
+        try:
+            cameras.resolver(key)
+        except CameraNotFound:
             return JsonResponse({
-                'success': True,
-                'camera_id': camera_id,
-                'message': f'✓ Cámara cambiada exitosamente a ID {camera_id}'
-            })
-        else:
+                'success': False,
+                'error': 'ID de cámara inválido'
+            }, status=400)
+        
+        try:
+            camera = realtime_sessions.attach(session_owner(request, data), key, user_id=request.user.pk).camera
+        except SessionLimitReached as e:
+            return camera_error_response(e)
+        except CameraUnavailable:
             return JsonResponse({
                 'success': False,
-                'error': f'No se pudo acceder a la cámara {camera_id}. Verifica que esté conectada y no esté siendo usada por otra aplicación.',
-                'camera_id': camera.camera_id  # Retornar ID de cámara actual
+                'error': f'No se pudo acceder a la cámara {key}. Verifica que esté conectada y no esté siendo usada por otra aplicación.',
+                'camera_id': key
             }, status=400)
         
+        return JsonResponse({
+            'success': True,
+            'camera_id': camera.key,
+            'feed_url': f"{reverse('emotions:video_feed')}?camera={camera.key}",
+            'message': f'✓ Cámara {camera.key} lista'
+        })
+        
     except json.JSONDecodeError:
         return JsonResponse({
             'success': False,
@@ -512,10 +692,12 @@ def change_camera(request):
 @login_required
 def release_camera(request):
     """
-    Liberar recursos de la cámara.
+    Liberar la sesión del usuario sobre una cámara. La cámara solo se cierra si no
+    quedan otras sesiones usándola.
     """
     try:
-        release_camera_instance()
+        data = json.loads(request.body) if request.body else {}
+        release_camera_instance(request, data)
         
         return JsonResponse({
             'success': True,
@@ -525,4 +707,111 @@ def release_camera(request):
         return JsonResponse({
             'success': False,
             'error': str(e)
-        }, status=500)
\ No newline at end of file
+        }, status=500)
+
+
+@require_http_methods(["GET"])
+@login_required
+def camera_status(request):
+    """
+    Estado de las cámaras abiertas: captura, detecciones, sesiones y tiempo sin uso.
+    """
+    stats = cameras.stats()
+    for key, session_stats in realtime_sessions.camera_stats().items():
+        if key in stats:
+            stats[key].update(session_stats)
+    
+    return JsonResponse({
+        'success': True,
+        'cameras': stats,
+        'sessions': realtime_sessions.snapshot()
+    })
+
+
+def _get_last_event_id(request, camera):
+    """
+    Secuencia desde la que reanudar: header Last-Event-ID o parámetro last_event_id.
+    """
+    value = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        # Cliente nuevo: empezar por el resultado más reciente
+        latest = camera.results.latest()
+        return latest[0] - 1 if latest else 0
+
+
+def _session_events(session, events):
+    """
+    Eventos SSE que le corresponden a la sesión: los resultados de la cámara solo
+    llegan a las sesiones que activaron la detección.
+    """
+    if not session.detection_enabled:
+        return []
+    return [format_sse(seq, payload) for seq, payload in events]
+
+
+def _sse_stream(session, last_seq):
+    """
+    Generador SSE síncrono (servidor WSGI).
+    """
+    camera = session.camera
+    realtime_sessions.open_viewer(session)
+    try:
+        yield "retry: 3000\n\n"
+        while realtime_sessions.touch(session):
+            events = camera.results.wait(last_seq, timeout=SSE_HEARTBEAT_INTERVAL)
+            if not events:
+                yield ": keep-alive\n\n"
+                continue
+            last_seq = events[-1][0]
+            for message in _session_events(session, events):
+                yield message
+    finally:
+        realtime_sessions.close_viewer(session)
+
+
+async def _sse_stream_async(session, last_seq):
+    """
+    Generador SSE asíncrono (servidor ASGI): los suscriptores no ocupan hilos.
+    """
+    camera = session.camera
+    realtime_sessions.open_viewer(session)
+    try:
+        yield "retry: 3000\n\n"
+        while realtime_sessions.touch(session):
+            events = await camera.results.wait_async(last_seq, timeout=SSE_HEARTBEAT_INTERVAL)
+            if not events:
+                yield ": keep-alive\n\n"
+                continue
+            last_seq = events[-1][0]
+            for message in _session_events(session, events):
+                yield message
+    finally:
+        realtime_sessions.close_viewer(session)
+
+
+@require_http_methods(["GET"])
+@login_required
+def results_stream(request):
+    """
+    Stream Server-Sent Events con los resultados de detección de una cámara del servidor.
+    Envía un evento solo cuando el planificador publica un resultado nuevo (si la sesión
+    activó la detección), y termina si el usuario libera su sesión o la cámara se cierra.
+    """
+    try:
+        session = get_session(request)
+    except (CameraNotFound, CameraUnavailable) as e:
+        return camera_error_response(e)
+    
+    last_seq = _get_last_event_id(request, session.camera)
+    
+    if isinstance(request, ASGIRequest):
+        stream = _sse_stream_async(session, last_seq)
+    else:
+        stream = _sse_stream(session, last_seq)
+    
+    response = StreamingHttpResponse(stream, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Desactivar buffering en nginx
+    return response
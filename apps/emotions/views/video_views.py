@@ -0,0 +1,169 @@
+"""
+Vistas para el análisis de videos subidos.
+"""
+import json
+
+from django.conf import settings
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404, redirect, render
+from django.views.decorators.http import require_http_methods
+
+from apps.emotions.forms import VideoAnalysisForm
+from apps.emotions.models import EMOTION_KEYS, EMOTION_TRANSLATIONS, AnalysisJob, VideoAnalysis
+from apps.emotions.services.admission import PRIORITY_BULK, inference_admission
+from apps.emotions.services.analysis_jobs import AnalysisJobError, enqueue_video, process_video
+
+# Colores de las emociones (los mismos de las estadísticas)
+EMOTION_COLORS = {
+    'happiness': '#10B981',
+    'sadness': '#3B82F6',
+    'anger': '#EF4444',
+    'surprise': '#F59E0B',
+    'fear': '#8B5CF6',
+    'disgust': '#84CC16',
+    'contempt': '#F97316',
+    'neutral': '#6B7280'
+}
+
+
+def timeline_chart_data(timeline):
+    """
+    Datos de Chart.js para una línea de tiempo por segundo (videos y sesiones en tiempo
+    real): el porcentaje de cada emoción y el número de rostros en un eje secundario.
+    """
+    chart_data = {
+        'labels': [row['second'] for row in timeline],
+        'datasets': []
+    }
+
+    for index, emotion in enumerate(EMOTION_KEYS):
+        data = [round(row['emotions'][index] * 100, 1) for row in timeline]
+        if any(data):
+            color = EMOTION_COLORS[emotion]
+            chart_data['datasets'].append({
+                'label': EMOTION_TRANSLATIONS[emotion],
+                'data': data,
+                'borderColor': color,
+                'backgroundColor': color + '20',
+                'tension': 0.3,
+                'pointRadius': 0,
+                'yAxisID': 'y'
+            })
+
+    chart_data['datasets'].append({
+        'label': 'Rostros',
+        'data': [row['faces'] for row in timeline],
+        'borderColor': '#111827',
+        'borderDash': [4, 4],
+        'stepped': True,
+        'pointRadius': 0,
+        'yAxisID': 'faces'
+    })
+    return chart_data
+
+
+@login_required
+def video_upload(request):
+    """
+    Vista para subir un video y analizar sus emociones en segundo plano.
+    """
+    if request.method == 'POST':
+        form = VideoAnalysisForm(request.POST, request.FILES)
+        if form.is_valid():
+            video = form.save(commit=False)
+            video.user = request.user
+            video.save()
+
+            if getattr(settings, 'EMOTION_JOBS_ENABLED', True):
+                # Encolar el video: lo procesa un worker (run_emotion_workers)
+                enqueue_video(video)
+                messages.info(request, "Video recibido. El análisis se está procesando...")
+            else:
+                # Procesamiento en la misma petición (desarrollo sin workers)
+                try:
+                    with inference_admission.slot(PRIORITY_BULK):
+                        process_video(video)
+                except AnalysisJobError as e:
+                    messages.error(request, f"Error en el análisis: {e}")
+                else:
+                    messages.success(
+                        request,
+                        f"Análisis completado: {video.frames_sampled} frames analizados "
+                        f"({video.realtime_factor:.1f}x tiempo real)."
+                    )
+
+            return redirect('emotions:video_detail', pk=video.pk)
+    else:
+        form = VideoAnalysisForm()
+
+    context = {
+        'form': form,
+        'title': 'Subir Video para Análisis',
+        'recent_videos': VideoAnalysis.objects.filter(user=request.user).defer('timeline', 'tracks')[:5],
+        'max_upload_mb': getattr(settings, 'EMOTION_VIDEO_MAX_UPLOAD_MB', 500),
+    }
+    return render(request, 'emotions/video_upload.html', context)
+
+
+@login_required
+def video_detail(request, pk):
+    """
+    Vista de detalle de un análisis de video con su línea de tiempo de emociones.
+    """
+    video = get_object_or_404(VideoAnalysis, pk=pk, user=request.user)
+
+    # Trabajo de la cola (si el video se procesa en segundo plano)
+    job = AnalysisJob.objects.filter(video=video).first()
+
+    tracks = [
+        dict(track, dominant_emotion_name=EMOTION_TRANSLATIONS.get(track['dominant_emotion'], track['dominant_emotion']))
+        for track in video.tracks
+    ]
+
+    context = {
+        'video': video,
+        'job': job,
+        'tracks': tracks,
+        'emotion_distribution': video.get_emotion_distribution(),
+        'chart_data': json.dumps(timeline_chart_data(video.timeline)),
+    }
+    return render(request, 'emotions/video_detail.html', context)
+
+
+@require_http_methods(["GET"])
+@login_required
+def api_video_status(request, pk):
+    """
+    API ligera para consultar el progreso del análisis de un video.
+    """
+    video = get_object_or_404(
+        VideoAnalysis.objects.only('id', 'user_id', 'progress', 'frames_sampled', 'realtime_factor'),
+        pk=pk, user=request.user
+    )
+    job = AnalysisJob.objects.filter(video_id=video.pk).first()
+
+    # Video sin trabajo asociado: se procesó dentro de la petición
+    if job is None:
+        return JsonResponse({
+            'success': True,
+            'status': AnalysisJob.Status.DONE,
+            'finished': True,
+            'progress': video.progress,
+            'frames_sampled': video.frames_sampled,
+            'realtime_factor': video.realtime_factor,
+        })
+
+    return JsonResponse({
+        'success': True,
+        'status': job.status,
+        'status_display': job.get_status_display(),
+        'finished': job.is_finished,
+        'attempts': job.attempts,
+        'max_attempts': job.max_attempts,
+        'error': job.error,
+        'progress': video.progress,
+        'frames_sampled': video.frames_sampled,
+        'realtime_factor': video.realtime_factor,
+    })
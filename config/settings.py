@@ -177,6 +177,130 @@ MEDIA_ROOT = BASE_DIR / 'media'
 STATIC_FILE_MAX_AGE = 60 * 60 * 24 * 30  # 30 días en segundos
 MEDIA_FILE_MAX_AGE = 60 * 60 * 24 * 7    # 7 días en segundos
 
+# Cola de trabajos para el análisis de imágenes subidas
+# Los trabajos se procesan con: python manage.py run_emotion_workers
+EMOTION_JOBS_ENABLED = env.bool('EMOTION_JOBS_ENABLED', default=True)
+EMOTION_JOB_WORKERS = 2             # Procesos worker por defecto
+EMOTION_JOB_MAX_RUNNING = 4         # Límite global de trabajos simultáneos (0 = sin límite)
+EMOTION_JOB_MAX_ATTEMPTS = 3        # Intentos antes de marcar el trabajo como fallido
+EMOTION_JOB_RETRY_BACKOFF = 2       # Base de la espera exponencial entre reintentos (segundos)
+EMOTION_JOB_TIMEOUT = 120           # Tiempo máximo por trabajo (segundos)
+EMOTION_JOB_POLL_INTERVAL = 1.0     # Espera del worker cuando la cola está vacía (segundos)
+
+# Hilos del executor de inferencia usado por las vistas asíncronas (ASGI)
+EMOTION_INFERENCE_WORKERS = min(4, os.cpu_count() or 1)
+
+# Canal WebSocket de análisis en tiempo real (requiere servidor ASGI)
+EMOTION_WS_MAX_FPS = 10                         # Frames analizados por segundo por conexión
+EMOTION_WS_MAX_FRAME_BYTES = 2 * 1024 * 1024    # Tamaño máximo de un frame JPEG
+
+# Control de admisión de la inferencia (descarte de carga con 503 + Retry-After)
+EMOTION_ADMISSION_MAX_CONCURRENT = EMOTION_INFERENCE_WORKERS   # Inferencias simultáneas
+EMOTION_ADMISSION_MAX_QUEUE = 32                               # Peticiones en espera
+EMOTION_ADMISSION_MAX_WAIT = 5.0                               # Espera máxima en cola (segundos)
+
+# Análisis en tiempo real por HTTP: solo se analiza el último frame de cada cliente
+EMOTION_REALTIME_MAX_STALENESS = 2.0    # Espera máxima de un frame antes de descartarlo (segundos)
+
+# Modo de recortes en tiempo real (HTTP y WebSocket): tras un frame completo con rostros el cliente
+# envía solo sus regiones y el servidor no vuelve a ejecutar YuNet hasta el siguiente keyframe
+EMOTION_CROP_MODE = True                # Ofrecer el modo de recortes a los clientes
+EMOTION_CROP_KEYFRAME_INTERVAL = 2.0    # Segundos entre frames completos (redetección de rostros)
+EMOTION_CROP_PADDING = 0.3              # Margen de cada región, en fracción del tamaño del rostro
+EMOTION_CROP_MAX_SIZE = 160             # Lado máximo de cada recorte enviado (px)
+EMOTION_CROP_MAX_SESSIONS = 500         # Clientes HTTP con regiones guardadas a la vez
+
+# Captura de los navegadores en tiempo real: el servidor anuncia (api/realtime-config/ y en cada
+# respuesta a un frame completo) el tamaño máximo y la calidad JPEG de los frames que le envían.
+# Niveles (ancho máximo, alto máximo, calidad) del mejor al peor; se sube o baja según el tamaño de
+# los rostros y se anuncian niveles menores con la inferencia saturada
+EMOTION_CLIENT_CAPTURE_LEVELS = [
+    (960, 720, 85),
+    (640, 480, 80),
+    (480, 360, 75),
+    (320, 240, 70),
+]
+EMOTION_CLIENT_CAPTURE_DEFAULT_LEVEL = 1    # 640x480: la entrada de detect_faces en tiempo real
+EMOTION_CLIENT_CAPTURE_MIN_FACE = 64        # Ancho mínimo del rostro más pequeño en el frame (px)
+EMOTION_CLIENT_CAPTURE_HIGH_LOAD = 1.0      # Presión de admisión desde la que se baja un nivel
+EMOTION_CLIENT_CAPTURE_MAX_CLIENTS = 500    # Clientes HTTP con nivel guardado a la vez
+
+# Caché de resultados por contenido de la imagen (hash + versión del modelo)
+EMOTION_RESULT_CACHE_SIZE = 256         # Entradas en memoria por proceso (0 desactiva el caché)
+EMOTION_RESULT_CACHE_TTL = 3600         # Vigencia de cada resultado (segundos)
+EMOTION_RESULT_CACHE_ALIAS = None       # Alias de CACHES para compartir entre procesos (ej. 'default')
+
+# Análisis de varias imágenes por petición (api/analyze-batch/, multipart o ZIP)
+EMOTION_BATCH_MAX_IMAGES = 32                   # Imágenes por lote
+EMOTION_BATCH_MAX_BYTES = 20 * 1024 * 1024      # Tamaño total del lote (sin comprimir)
+
+# Búsqueda del historial (PostgreSQL: texto completo + trigramas, requiere la extensión pg_trgm)
+EMOTION_SEARCH_RANK_WINDOW = 1000       # Coincidencias más recientes que se ordenan por relevancia
+
+# Exportación CSV/NDJSON en streaming
+EMOTION_EXPORT_CHUNK_SIZE = 2000        # Filas leídas por viaje al cursor del servidor
+
+# Análisis masivo offline: python manage.py analyze_images <directorio|zip> --user <usuario>
+EMOTION_BULK_WORKERS = max(1, (os.cpu_count() or 2) - 1)   # Procesos de análisis
+EMOTION_BULK_BATCH_SIZE = 16            # Imágenes por tarea (sus rostros se infieren juntos)
+EMOTION_BULK_CHUNK_SIZE = 500           # Análisis por bulk_create
+
+# Rostros recortados de cada análisis: se guardan en segundo plano como MEDIA_ROOT/faces/<ab>/<hash>.webp
+EMOTION_FACE_CROP_SIZE = 128            # Lado de cada recorte guardado (px)
+EMOTION_FACE_CROP_QUALITY = 80          # Calidad WebP (0-100)
+EMOTION_FACE_CROP_MAX_PENDING = 256     # Recortes en cola de escritura (al llenarse el análisis espera)
+
+# Cámara del servidor (stream MJPEG en tiempo real). Fuente: índice de dispositivo (V4L2 en Linux,
+# DirectShow en Windows), ruta de un video en bucle, URL rtsp:// o http://, o synthetic[:640x480@30]
+EMOTION_CAMERA_SOURCE = env.str('EMOTION_CAMERA_SOURCE', default='0')
+EMOTION_CAPTURE_WIDTH = 640                 # Resolución pedida al dispositivo
+EMOTION_CAPTURE_HEIGHT = 480
+EMOTION_CAPTURE_FPS = 30
+EMOTION_CAPTURE_OPEN_TIMEOUT = 5.0          # Espera del primer frame al abrir la fuente (segundos)
+EMOTION_CAPTURE_RECONNECT_MIN = 0.5         # Espera inicial antes de reconectar una fuente caída (segundos)
+EMOTION_CAPTURE_RECONNECT_MAX = 30.0        # Espera máxima entre reconexiones (segundos)
+EMOTION_CAPTURE_STREAM_TIMEOUT_MS = 5000    # Apertura y lectura de streams de red (milisegundos)
+
+# Varias cámaras del servidor a la vez (?camera=<clave> en video-feed y las APIs de cámara).
+# Claves: 'default' (EMOTION_CAMERA_SOURCE), las de EMOTION_CAMERAS o un índice de dispositivo
+EMOTION_CAMERAS = {}                        # Ej.: {'aula-101': 'rtsp://10.0.0.21/stream1'}
+EMOTION_CAMERA_MAX = 8                      # Cámaras abiertas a la vez
+EMOTION_CAMERA_IDLE_TIMEOUT = 10            # Segundos que sigue abierta una cámara sin sesiones
+EMOTION_CAMERA_DETECTION_WORKERS = EMOTION_INFERENCE_WORKERS   # Hilos detectores compartidos
+
+# Stream MJPEG adaptativo: niveles (ancho máximo, calidad JPEG, FPS máximos) del mejor al peor.
+# Cada cliente baja de nivel si no alcanza a recibir los frames y sube cuando le sobra capacidad;
+# cada nivel se codifica una sola vez por frame para todos sus clientes (?tier=<n> fija uno)
+EMOTION_STREAM_TIERS = [
+    (1280, 80, 30),
+    (960, 70, 20),
+    (640, 60, 12),
+    (480, 50, 8),
+    (320, 40, 4),
+]
+EMOTION_STREAM_START_TIER = 1               # Nivel con el que empieza cada cliente
+
+# Estado de tiempo real por usuario (detección y streams de cada sesión sobre cada cámara)
+EMOTION_REALTIME_SESSION_TTL = 30           # Segundos sin actividad (y sin streams) antes de liberar una sesión
+EMOTION_REALTIME_MAX_SESSIONS = 200         # Sesiones guardadas a la vez (se descarta la usada hace más tiempo)
+EMOTION_REALTIME_MAX_SESSIONS_PER_USER = 5  # Sesiones de un mismo usuario (pestañas x cámaras)
+
+# Análisis de videos subidos (se procesan en la cola de trabajos)
+EMOTION_VIDEO_MAX_UPLOAD_MB = 500       # Tamaño máximo del video
+EMOTION_VIDEO_SAMPLE_FPS = 2.0          # Frames analizados por segundo de video (0 = solo cambios de escena)
+EMOTION_VIDEO_SCENE_THRESHOLD = 0.3     # Diferencia media (0-1) que cuenta como cambio de escena (0 desactiva)
+EMOTION_VIDEO_SCENE_PROBE_FPS = 8.0     # Frames por segundo que se decodifican para buscar cambios de escena
+EMOTION_VIDEO_BATCH_FRAMES = 8          # Frames cuyos rostros se infieren en un lote
+EMOTION_VIDEO_TRACK_MAX_AGE = 1.5       # Segundos sin ver un rostro antes de darlo por perdido
+EMOTION_VIDEO_JOB_TIMEOUT = 3600        # Tiempo máximo por trabajo de video (segundos)
+
+# Grabación automática de las sesiones en tiempo real (se acumulan en memoria y se guardan por lotes)
+EMOTION_RECORD_REALTIME = True          # Grabar las sesiones en tiempo real
+EMOTION_RECORDING_FLUSH_INTERVAL = 30   # Segundos entre escrituras a la base de datos
+EMOTION_RECORDING_IDLE_TIMEOUT = 60     # Segundos sin resultados para dar la sesión por terminada
+EMOTION_RECORDING_MAX_ACTIVE = 200      # Sesiones grabándose a la vez (al superarlo se cierra la más antigua)
+EMOTION_RECORDING_MAX_RETRIES = 3       # Escrituras fallidas seguidas antes de descartar una sesión
+
 #Npm configuracion para Tailwin
 NPM_BIN_PATH = r"D:\Node Js\npm.cmd"
 